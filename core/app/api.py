@@ -1,24 +1,42 @@
+import json
 import logging
 import inspect
 import tempfile
 import os
-from fastapi import APIRouter, Path, HTTPException, Depends, Request, UploadFile, File
-from typing import Dict, Any, List, Union, get_origin, get_args, Annotated
+from fastapi import (
+    APIRouter,
+    Path,
+    HTTPException,
+    Depends,
+    Request,
+    UploadFile,
+    File,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import JSONResponse, Response
+from typing import Dict, Any, List, Optional, Union, get_origin, get_args, Annotated
 from sqlmodel import Session
 
 from .module_loader import ModuleLoader
 from .state_manager import state_manager
+from .state_projection import StatePathError, parse_fields, project_state, MAX_PAGE_SIZE
+from .state_versioning import etag_matches, make_state_etag, state_delta
 from .modules.timeline.tool import log_tool_execution, log_system_event, log_error
 from .auth import (
     get_current_user,
     get_current_user_or_service,
+    get_token_from_cookie_or_header,
     log_audit_event,
     get_client_info,
 )
 from .rbac import require_permission, require_permission_or_service
 from .models import User
 from .database_compat import get_session
-from .rate_limiter import limiter, create_rate_limit_function
+from .rate_limiter import check_tool_rate_limit, get_execute_rate_limit_key
+from .websocket_manager import manager as websocket_manager, state_change_notifier
 
 
 def create_api_routes(
@@ -84,17 +102,148 @@ def create_api_routes(
         request: Request,
         current_user: Annotated[User, Depends(get_current_user_or_service)],
         module_name: str = Path(..., title="The name of the module"),
-    ) -> Dict[str, Any]:
+        path: Optional[str] = Query(
+            None, description="Dot-separated path of the sub-tree to return, e.g. 'inbox'"
+        ),
+        fields: Optional[str] = Query(
+            None, description="Comma-separated keys to keep on the selected object(s)"
+        ),
+        limit: Optional[int] = Query(
+            None, ge=1, le=MAX_PAGE_SIZE, description="Page size for list values"
+        ),
+        offset: int = Query(0, ge=0, description="Offset into list values"),
+        include_content: bool = Query(
+            True, description="Include file contents and message bodies"
+        ),
+        max_content_length: Optional[int] = Query(
+            None, ge=0, description="Truncate longer strings to this length"
+        ),
+        since_version: Optional[int] = Query(
+            None, ge=0, description="Return a JSON patch from this state version"
+        ),
+    ) -> Any:
         """
         Returns the current state for a specific module.
         Used by UI components to fetch their data.
+
+        The optional query parameters project the state server-side so that
+        pollers only receive what they render; without them the full state
+        is returned. Responses carry an ETag, so a request with a matching
+        If-None-Match gets a 304, and ``since_version`` returns a JSON patch
+        against an earlier version instead of the state.
         """
+        version = state_manager.get_version(module_name)
         state = state_manager.get(module_name)
         if state is None:
             raise HTTPException(
                 status_code=404, detail=f"No state found for module: {module_name}"
             )
-        return state
+
+        if since_version is not None:
+            if path or fields or limit is not None or not include_content or max_content_length is not None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="since_version cannot be combined with projection parameters",
+                )
+            delta = state_delta(state_manager, module_name, since_version, state)
+            return JSONResponse(
+                delta, headers={"X-State-Version": str(delta["version"])}
+            )
+
+        headers = {
+            "ETag": make_state_etag(
+                state_manager.instance_id, module_name, version, request.url.query
+            ),
+            "X-State-Version": str(version),
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        try:
+            projected = project_state(
+                state,
+                path=path,
+                fields=parse_fields(fields),
+                limit=limit,
+                offset=offset,
+                include_content=include_content,
+                max_content_length=max_content_length,
+            )
+        except StatePathError:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Path '{path}' not found in state for module: {module_name}",
+            )
+        return JSONResponse(projected, headers=headers)
+
+    @router.websocket("/state/ws")
+    async def state_changes_websocket(
+        websocket: WebSocket,
+        modules: str = Query(..., description="Comma-separated modules to watch"),
+        token: str = Query(None),
+    ):
+        """
+        Pushes state change notifications for the requested modules.
+
+        Messages have the form ``{"type": "state_changed", "module": ...,
+        "version": ..., "paths": [...]}`` and are coalesced per module over
+        a short window; clients refetch (or fetch a ``since_version`` delta)
+        when told a module changed instead of polling. Sending
+        ``{"subscribe": [modules]}`` watches more modules. A valid access
+        token is required, and names of modules that are not loaded are
+        ignored.
+        """
+        try:
+            user = await get_token_from_cookie_or_header(token=token)
+        except Exception as e:
+            logging.warning(f"WebSocket authentication failed: {e}")
+            user = None
+        if user is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        def loaded(names):
+            return [str(name) for name in names if str(name) in module_loader.modules]
+
+        module_names = loaded(parse_fields(modules) or [])
+        try:
+            await websocket_manager.connect(websocket, channel="state")
+            for module_name in module_names:
+                websocket_manager.subscribe(
+                    websocket, state_change_notifier.channel_for(module_name)
+                )
+
+            # Let the client detect changes it missed before subscribing
+            await websocket.send_json(
+                {
+                    "type": "state_versions",
+                    "versions": {
+                        name: state_manager.get_version(name) for name in module_names
+                    },
+                }
+            )
+
+            while True:
+                message = await websocket.receive_text()
+                if message == "ping":
+                    await websocket.send_text("pong")
+                    continue
+                try:
+                    requested = json.loads(message).get("subscribe", [])
+                except (ValueError, AttributeError):
+                    continue
+                if not isinstance(requested, list):
+                    continue
+                for module_name in loaded(requested):
+                    websocket_manager.subscribe(
+                        websocket, state_change_notifier.channel_for(module_name)
+                    )
+
+        except WebSocketDisconnect:
+            websocket_manager.disconnect(websocket)
+        except Exception as e:
+            logging.error(f"WebSocket error: {e}")
+            websocket_manager.disconnect(websocket)
 
     # --- MCP Endpoints ---
 
@@ -196,7 +345,6 @@ def create_api_routes(
         return manifest
 
     @router.post("/execute")
-    @limiter.limit("60/minute")
     def execute_tool(
         request: Request,
         payload: Dict[str, Any],
@@ -263,6 +411,19 @@ def create_api_routes(
                 detail="`tool_name` is invalid. Expected format 'module.method'.",
             )
 
+        # Each tool spends its own cost from the caller's execute budget
+        rate_limit = check_tool_rate_limit(
+            request,
+            get_execute_rate_limit_key(request, current_user_or_service),
+            tool_full_name,
+        )
+        if not rate_limit.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded. Please try again later.",
+                headers=rate_limit.headers(),
+            )
+
         # Check permissions for tool execution (only for user authentication, not service)
         if isinstance(current_user_or_service, User):
             from .rbac import PermissionChecker
@@ -7,12 +7,14 @@ all the functionality of v1 plus new features and improvements.
 
 import logging
 import inspect
-from fastapi import APIRouter, Path, HTTPException, Depends, Request
-from typing import Dict, Any, List, Union, get_origin, get_args, Annotated
+from fastapi import APIRouter, Path, HTTPException, Depends, Request, Query
+from fastapi.responses import JSONResponse, Response
+from typing import Dict, Any, List, Optional, Union, get_origin, get_args, Annotated
 from sqlmodel import Session
 
 from .module_loader import ModuleLoader
 from .state_manager import state_manager
+from .state_versioning import etag_matches, make_state_etag, state_delta
 from .modules.timeline.tool import log_tool_execution, log_system_event, log_error
 from .auth import (
     get_current_user,
@@ -57,10 +59,17 @@ def create_api_routes_v2(
     @router.get("/{module_name}/state")
     def get_module_state(
         module_name: str,
+        request: Request,
         current_user: Annotated[User, Depends(get_current_user_or_service)],
-    ) -> Dict[str, Any]:
+        since_version: Optional[int] = Query(
+            None, ge=0, description="Return a JSON patch from this state version"
+        ),
+    ) -> Any:
         """
         Returns the current state of a module.
+
+        Responses carry an ETag for conditional requests; ``since_version``
+        returns a JSON patch against an earlier version instead.
         """
         # Check if the module exists
         if module_name not in module_loader.modules:
@@ -69,8 +78,22 @@ def create_api_routes_v2(
             )
 
         # Get the module state
+        version = state_manager.get_version(module_name)
         state = state_manager.get(module_name) or {}
-        return state
+
+        if since_version is not None:
+            delta = state_delta(state_manager, module_name, since_version, state)
+            return JSONResponse(
+                delta, headers={"X-State-Version": str(delta["version"])}
+            )
+
+        headers = {
+            "ETag": make_state_etag(state_manager.instance_id, module_name, version),
+            "X-State-Version": str(version),
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(state, headers=headers)
 
     @router.post("/{module_name}/state")
     def update_module_state(
@@ -87,12 +110,13 @@ def create_api_routes_v2(
                 status_code=404, detail=f"Module {module_name} not found"
             )
 
-        # Get the current state
-        current_state = state_manager.get(module_name) or {}
+        # Update the current state
+        def change(current_state):
+            current_state = current_state or {}
+            current_state.update(state_update)
+            return current_state
 
-        # Update the state
-        current_state.update(state_update)
-        state_manager.set(module_name, current_state)
+        current_state = state_manager.update(module_name, change)
 
         # Log the state update
         log_system_event(
@@ -0,0 +1,235 @@
+"""
+Query helpers for the audit log.
+
+Audit log listings and exports page through the table with keyset (cursor)
+pagination on ``(timestamp, id)`` rather than OFFSET, so fetching a page
+costs the same no matter how deep into the table it is, and string filters
+can match by prefix or exactly so that the column indexes are usable.
+"""
+
+import base64
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlmodel import Session, select
+
+from .models import AuditLog
+
+FILTER_MATCH_MODES = ("contains", "prefix", "exact")
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+EXPORT_BATCH_SIZE = 1000
+
+AUDIT_LOG_FIELDS = [
+    "id",
+    "timestamp",
+    "user_id",
+    "username",
+    "action",
+    "resource_type",
+    "resource_id",
+    "resource_name",
+    "status",
+    "error_message",
+    "ip_address",
+    "user_agent",
+    "details",
+]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(timestamp: datetime, log_id: int) -> str:
+    """Encode the position after a row as an opaque cursor string."""
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, log_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def _string_filter(column, value: str, match: str):
+    if match == "exact":
+        return column == value
+    if match == "prefix":
+        # The range bounds let the column index drive the scan on every
+        # backend; LIKE then keeps the match exact (and case sensitive)
+        conditions = [column >= value, column.startswith(value, autoescape=True)]
+        # Strings with the prefix sort below the prefix with its last
+        # character incremented; U+10FFFF has no successor, so it is
+        # dropped first, and a prefix made only of it has no upper bound
+        stem = value.rstrip(chr(sys.maxunicode))
+        if stem:
+            conditions.append(column < stem[:-1] + chr(ord(stem[-1]) + 1))
+        return and_(*conditions)
+    return column.contains(value, autoescape=True)
+
+
+def build_audit_log_query(
+    action: Optional[str] = None,
+    username: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    status: Optional[str] = None,
+    start_dt: Optional[datetime] = None,
+    end_dt: Optional[datetime] = None,
+    match: str = "contains",
+):
+    """
+    Build a query for audit logs matching the given filters, newest first.
+
+    Args:
+        action: Filter on the action name
+        username: Filter on the username
+        resource_type: Exact resource type
+        status: Exact status
+        start_dt: Only entries at or after this time
+        end_dt: Only entries at or before this time
+        match: How ``action`` and ``username`` are matched: "contains",
+            "prefix" or "exact"
+
+    Returns:
+        A select statement ordered by (timestamp, id) descending
+    """
+    if match not in FILTER_MATCH_MODES:
+        raise ValueError(f"match must be one of {FILTER_MATCH_MODES}")
+
+    query = select(AuditLog)
+
+    if action:
+        query = query.where(_string_filter(AuditLog.action, action, match))
+    if username:
+        query = query.where(_string_filter(AuditLog.username, username, match))
+    if resource_type:
+        query = query.where(AuditLog.resource_type == resource_type)
+    if status:
+        query = query.where(AuditLog.status == status)
+    if start_dt:
+        query = query.where(AuditLog.timestamp >= start_dt)
+    if end_dt:
+        query = query.where(AuditLog.timestamp <= end_dt)
+
+    return query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+
+
+def after_cursor(query, cursor: Optional[Tuple[datetime, int]]):
+    """Restrict a newest-first audit log query to rows after ``cursor``."""
+    if cursor is None:
+        return query
+    timestamp, log_id = cursor
+    return query.where(
+        or_(
+            AuditLog.timestamp < timestamp,
+            and_(AuditLog.timestamp == timestamp, AuditLog.id < log_id),
+        )
+    )
+
+
+def fetch_page(
+    session: Session, query, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[AuditLog], Optional[str]]:
+    """
+    Fetch one page of a query built by ``build_audit_log_query``.
+
+    Returns:
+        The rows and the cursor for the next page (None on the last page)
+    """
+    position = decode_cursor(cursor) if cursor else None
+    rows = session.exec(after_cursor(query, position).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return rows, next_cursor
+
+
+def iter_audit_logs(
+    session: Session, query, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[AuditLog]:
+    """
+    Iterate over every row of a query in keyset batches, so that memory use
+    and per-query work stay bounded however large the table is.
+    """
+    position = None
+    while True:
+        rows = session.exec(after_cursor(query, position).limit(batch_size)).all()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        position = (rows[-1].timestamp, rows[-1].id)
+        # Rows are not needed once yielded; keep the identity map small
+        session.expunge_all()
+
+
+def audit_log_to_dict(log: AuditLog) -> Dict[str, Any]:
+    """Convert an audit log row to a JSON-serializable dictionary."""
+    record = {field: getattr(log, field) for field in AUDIT_LOG_FIELDS}
+    record["timestamp"] = log.timestamp.isoformat() if log.timestamp else None
+    return record
+
+
+def export_audit_logs(
+    session: Session, query, export_format: str = "ndjson"
+) -> Iterator[str]:
+    """
+    Stream the rows of a query as NDJSON lines or CSV text.
+
+    Args:
+        session: Session to read with; it should not be shared with the
+            request handler since the stream outlives it
+        query: Query built by ``build_audit_log_query``
+        export_format: "ndjson" or "csv"
+
+    Yields:
+        Chunks of the export, one batch of rows at a time
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"export_format must be one of {EXPORT_FORMATS}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer:
+        writer.writerow(AUDIT_LOG_FIELDS)
+
+    count = 0
+    for log in iter_audit_logs(session, query):
+        record = audit_log_to_dict(log)
+        if writer:
+            record["details"] = (
+                json.dumps(record["details"]) if record["details"] is not None else ""
+            )
+            writer.writerow([record[field] for field in AUDIT_LOG_FIELDS])
+        else:
+            buffer.write(json.dumps(record, default=str))
+            buffer.write("\n")
+
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,614 @@
+"""
+Audit log retention for IntentVerse.
+
+Keeps the ``auditlog`` table bounded. Rows older than the hot window are:
+
+1. archived as gzip-compressed NDJSON, one file per day, if an archive
+   directory is configured,
+2. rolled up into ``AuditLogHourlyAggregate`` counts (hour, action,
+   username, status), and
+3. deleted.
+
+Rows are processed in small keyset batches, each in its own short
+transaction, so retention never holds long locks on the table. On
+PostgreSQL and MySQL, if ``auditlog`` is range-partitioned by timestamp,
+expired partitions are rolled up and dropped wholesale instead, and
+partitions for the coming months are created ahead of time. Converting an
+existing table to a partitioned layout is left to the operator.
+"""
+
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, or_, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+
+from .audit_log import audit_log_to_dict, build_audit_log_query, iter_audit_logs
+from .config import Config
+from .models import AuditLog, AuditLogHourlyAggregate
+
+
+class AuditRetentionPolicy:
+    """
+    Settings for audit log retention.
+
+    Args:
+        hot_days: Days of raw audit log rows to keep; 0 disables retention
+        rollup: Whether expired rows are rolled up into hourly aggregates
+        archive_dir: Directory for compressed NDJSON archives, or None
+        batch_size: Rows deleted per transaction
+        interval: Seconds between background retention runs
+        batch_pause: Seconds to sleep between batches, letting other writers in
+    """
+
+    def __init__(
+        self,
+        hot_days: int = 0,
+        rollup: bool = True,
+        archive_dir: Optional[str] = None,
+        batch_size: int = 1000,
+        interval: float = 3600,
+        batch_pause: float = 0.01,
+    ):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.hot_days = hot_days
+        self.rollup = rollup
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.batch_size = batch_size
+        self.interval = interval
+        self.batch_pause = batch_pause
+
+    @property
+    def enabled(self) -> bool:
+        return self.hot_days > 0
+
+    @classmethod
+    def from_config(cls) -> "AuditRetentionPolicy":
+        """Build the policy from INTENTVERSE_AUDIT_* environment settings."""
+        return cls(**Config.get_audit_retention_config())
+
+
+def _hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class AuditLogArchiver:
+    """
+    Appends audit log rows to gzip-compressed NDJSON files, one per day.
+
+    Appending to an existing file adds a new gzip member, which gzip readers
+    concatenate transparently.
+
+    Archiving is idempotent: rows whose id is already in their day's file
+    are skipped, so a batch that is archived again because its delete
+    failed is not duplicated. The ids of the most recently used files are
+    kept in memory; a file's ids are read back the first time it is used.
+    """
+
+    def __init__(self, archive_dir: Path, cached_files: int = 2):
+        self.archive_dir = Path(archive_dir)
+        self.cached_files = cached_files
+        self._archived_ids: "OrderedDict[Path, Set[int]]" = OrderedDict()
+
+    def get_archive_path(self, day: datetime) -> Path:
+        return self.archive_dir / f"auditlog-{day:%Y-%m-%d}.ndjson.gz"
+
+    def archive(self, logs: List[AuditLog]) -> int:
+        """Append rows not archived yet; returns the number written."""
+        if not logs:
+            return 0
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        by_day: Dict[Path, Dict[int, str]] = {}
+        for log in logs:
+            path = self.get_archive_path(log.timestamp)
+            by_day.setdefault(path, {})[log.id] = json.dumps(
+                audit_log_to_dict(log), default=str
+            )
+
+        written = 0
+        for path, lines in by_day.items():
+            archived_ids = self._get_archived_ids(path)
+            new_lines = {
+                log_id: line for log_id, line in lines.items() if log_id not in archived_ids
+            }
+            if not new_lines:
+                continue
+            with gzip.open(path, "at", encoding="utf-8") as archive_file:
+                archive_file.write("\n".join(new_lines.values()) + "\n")
+            archived_ids.update(new_lines)
+            written += len(new_lines)
+
+        return written
+
+    def _get_archived_ids(self, path: Path) -> Set[int]:
+        archived_ids = self._archived_ids.get(path)
+        if archived_ids is not None:
+            self._archived_ids.move_to_end(path)
+            return archived_ids
+
+        archived_ids = set()
+        if path.exists():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as archive_file:
+                    for line in archive_file:
+                        try:
+                            archived_ids.add(json.loads(line)["id"])
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except (OSError, EOFError) as e:
+                # A member torn by a crash during an append; the ids read
+                # before it are still known
+                logging.warning(f"Failed to read audit archive {path}: {e}")
+
+        self._archived_ids[path] = archived_ids
+        while len(self._archived_ids) > self.cached_files:
+            self._archived_ids.popitem(last=False)
+        return archived_ids
+
+
+class PartitionManager(ABC):
+    """
+    Base class for backends that can drop expired audit log partitions.
+
+    Partition names follow ``auditlog_pYYYYMM`` with monthly ranges.
+    """
+
+    table_name = "auditlog"
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @abstractmethod
+    def is_partitioned(self, session: Session) -> bool:
+        """Whether the audit log table is range-partitioned by timestamp."""
+        pass
+
+    @abstractmethod
+    def list_partitions(self, session: Session) -> List[Tuple[str, Optional[datetime]]]:
+        """Return (partition name, exclusive upper bound) pairs."""
+        pass
+
+    @abstractmethod
+    def create_partition(self, session: Session, start: datetime, end: datetime) -> None:
+        """Create the partition holding rows from ``start`` to ``end``."""
+        pass
+
+    @abstractmethod
+    def drop_partition(self, session: Session, name: str) -> None:
+        """Drop a partition and its rows."""
+        pass
+
+    @abstractmethod
+    def hour_expression(self) -> str:
+        """SQL expression truncating the timestamp column to the hour."""
+        pass
+
+    @abstractmethod
+    def partition_table_expression(self, name: str) -> str:
+        """SQL table expression selecting only the rows of one partition."""
+        pass
+
+    def lock_partition(self, session: Session, name: str) -> None:
+        """
+        Lock a partition for the rest of the transaction, so that only one
+        worker process rolls it up before it is dropped.
+        """
+        pass
+
+    @staticmethod
+    def month_start(value: datetime) -> datetime:
+        return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def next_month(value: datetime) -> datetime:
+        return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{self.table_name}_p{start:%Y%m}"
+
+    def expired_partitions(
+        self, session: Session, cutoff: datetime
+    ) -> List[Tuple[str, datetime]]:
+        """Partitions whose rows are all older than ``cutoff``."""
+        return [
+            (name, upper)
+            for name, upper in self.list_partitions(session)
+            if upper is not None and upper <= cutoff
+        ]
+
+    def ensure_future_partitions(
+        self, session: Session, now: datetime, months_ahead: int = 2
+    ) -> int:
+        """Create monthly partitions up to ``months_ahead`` months from now."""
+        existing = {name for name, _ in self.list_partitions(session)}
+        created = 0
+        start = self.month_start(now)
+        for _ in range(months_ahead + 1):
+            end = self.next_month(start)
+            if self.partition_name(start) not in existing:
+                self.create_partition(session, start, end)
+                created += 1
+            start = end
+        return created
+
+    def rollup_partition(self, session: Session, name: str) -> None:
+        """Insert hourly aggregates for every row of a partition."""
+        hour = self.hour_expression()
+        session.exec(
+            text(
+                f"INSERT INTO auditloghourlyaggregate (hour, action, username, status, count) "
+                f"SELECT {hour}, action, username, status, COUNT(*) "
+                f"FROM {self.partition_table_expression(name)} "
+                f"GROUP BY {hour}, action, username, status"
+            )
+        )
+
+
+class PostgreSQLPartitionManager(PartitionManager):
+    """Declarative range partitions (PARTITION BY RANGE ("timestamp"))."""
+
+    _bound_pattern = re.compile(r"TO \('([^']+)'\)")
+
+    def is_partitioned(self, session: Session) -> bool:
+        result = session.exec(
+            text(
+                "SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table"
+            ).bindparams(table=self.table_name)
+        )
+        return result.first() is not None
+
+    def list_partitions(self, session: Session) -> List[Tuple[str, Optional[datetime]]]:
+        rows = session.exec(
+            text(
+                "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+                "FROM pg_inherits "
+                "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+                "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+                "WHERE parent.relname = :table"
+            ).bindparams(table=self.table_name)
+        ).all()
+        partitions = []
+        for name, bound in rows:
+            match = self._bound_pattern.search(bound or "")
+            partitions.append(
+                (name, datetime.fromisoformat(match.group(1)) if match else None)
+            )
+        return partitions
+
+    def create_partition(self, session: Session, start: datetime, end: datetime) -> None:
+        session.exec(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {self.partition_name(start)} "
+                f"PARTITION OF {self.table_name} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+
+    def drop_partition(self, session: Session, name: str) -> None:
+        session.exec(text(f"DROP TABLE IF EXISTS {name}"))
+
+    def lock_partition(self, session: Session, name: str) -> None:
+        # Waits for a worker already dropping it; the lock then fails
+        # because the partition is gone
+        session.exec(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+
+    def hour_expression(self) -> str:
+        return "date_trunc('hour', \"timestamp\")"
+
+    def partition_table_expression(self, name: str) -> str:
+        return name
+
+
+class MySQLPartitionManager(PartitionManager):
+    """RANGE COLUMNS(`timestamp`) partitions with a trailing MAXVALUE partition."""
+
+    def is_partitioned(self, session: Session) -> bool:
+        result = session.exec(
+            text(
+                "SELECT PARTITION_METHOD FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                "AND PARTITION_NAME IS NOT NULL LIMIT 1"
+            ).bindparams(table=self.table_name)
+        ).first()
+        return result is not None and result[0] == "RANGE COLUMNS"
+
+    def list_partitions(self, session: Session) -> List[Tuple[str, Optional[datetime]]]:
+        rows = session.exec(
+            text(
+                "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+                "FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+            ).bindparams(table=self.table_name)
+        ).all()
+        partitions = []
+        for name, description in rows:
+            value = (description or "").strip("'")
+            upper = None if value in ("", "MAXVALUE") else datetime.fromisoformat(value)
+            partitions.append((name, upper))
+        return partitions
+
+    def create_partition(self, session: Session, start: datetime, end: datetime) -> None:
+        names = {name for name, _ in self.list_partitions(session)}
+        partition = (
+            f"PARTITION {self.partition_name(start)} "
+            f"VALUES LESS THAN ('{end.isoformat(sep=' ')}')"
+        )
+        if "pmax" in names:
+            session.exec(
+                text(
+                    f"ALTER TABLE {self.table_name} REORGANIZE PARTITION pmax INTO "
+                    f"({partition}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+                )
+            )
+        else:
+            session.exec(text(f"ALTER TABLE {self.table_name} ADD PARTITION ({partition})"))
+
+    def drop_partition(self, session: Session, name: str) -> None:
+        session.exec(text(f"ALTER TABLE {self.table_name} DROP PARTITION {name}"))
+
+    def hour_expression(self) -> str:
+        return "DATE_FORMAT(`timestamp`, '%Y-%m-%d %H:00:00')"
+
+    def partition_table_expression(self, name: str) -> str:
+        return f"{self.table_name} PARTITION ({name})"
+
+
+def get_partition_manager(engine: Engine) -> Optional[PartitionManager]:
+    """Return the partition manager for the engine's backend, if it has one."""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        return PostgreSQLPartitionManager(engine)
+    if dialect in ("mysql", "mariadb"):
+        return MySQLPartitionManager(engine)
+    return None
+
+
+class AuditRetentionManager:
+    """
+    Applies an AuditRetentionPolicy to the audit log, either on demand with
+    ``run_once`` or periodically on a background thread.
+    """
+
+    def __init__(self, engine: Engine, policy: Optional[AuditRetentionPolicy] = None):
+        self.engine = engine
+        self.policy = policy or AuditRetentionPolicy.from_config()
+        self.archiver = (
+            AuditLogArchiver(self.policy.archive_dir) if self.policy.archive_dir else None
+        )
+        self.partition_manager = get_partition_manager(engine)
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Apply the retention policy once.
+
+        Args:
+            now: Reference time (UTC); defaults to the current time
+
+        Returns:
+            Counts of rows archived, rolled up and deleted, batches run,
+            partitions created or dropped, and batches given up to another
+            worker process deleting the same rows
+        """
+        stats = {
+            "archived": 0,
+            "rolled_up": 0,
+            "deleted": 0,
+            "batches": 0,
+            "partitions_created": 0,
+            "partitions_dropped": 0,
+            "conflicts": 0,
+        }
+        if not self.policy.enabled:
+            return stats
+
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.policy.hot_days)
+
+        with self._run_lock:
+            self._drop_expired_partitions(cutoff, now, stats)
+            self._delete_in_batches(cutoff, stats)
+
+        if stats["deleted"] or stats["partitions_dropped"]:
+            logging.info(f"Audit log retention completed: {stats}")
+        return stats
+
+    def _delete_in_batches(self, cutoff: datetime, stats: Dict[str, int]) -> None:
+        position = None
+        while not self._stop_event.is_set():
+            with Session(self.engine) as session:
+                query = select(AuditLog).where(AuditLog.timestamp < cutoff)
+                if position is not None:
+                    query = query.where(
+                        or_(
+                            AuditLog.timestamp > position[0],
+                            and_(
+                                AuditLog.timestamp == position[0],
+                                AuditLog.id > position[1],
+                            ),
+                        )
+                    )
+                logs = session.exec(
+                    query.order_by(AuditLog.timestamp, AuditLog.id).limit(
+                        self.policy.batch_size
+                    )
+                ).all()
+                if not logs:
+                    return
+
+                # Archive first: if the delete below fails the rows are
+                # offered again on the next run rather than lost, and the
+                # archiver skips the ones it already has
+                if self.archiver:
+                    stats["archived"] += self.archiver.archive(logs)
+
+                ids = [log.id for log in logs]
+                result = session.exec(delete(AuditLog).where(AuditLog.id.in_(ids)))
+                if result.rowcount != len(ids):
+                    # Another worker process is deleting the same rows and
+                    # rolls them up itself; select what is left again
+                    session.rollback()
+                    stats["conflicts"] += 1
+                    continue
+
+                if self.policy.rollup:
+                    self._add_rollup(session, logs)
+                    stats["rolled_up"] += len(logs)
+                session.commit()
+
+                position = (logs[-1].timestamp, logs[-1].id)
+                stats["deleted"] += len(ids)
+                stats["batches"] += 1
+
+            if len(logs) < self.policy.batch_size:
+                return
+            if self.policy.batch_pause:
+                time.sleep(self.policy.batch_pause)
+
+    @staticmethod
+    def _add_rollup(session: Session, logs: List[AuditLog]) -> None:
+        counts = Counter(
+            (_hour(log.timestamp), log.action, log.username, log.status) for log in logs
+        )
+        for (hour, action, username, status), count in counts.items():
+            session.add(
+                AuditLogHourlyAggregate(
+                    hour=hour,
+                    action=action,
+                    username=username,
+                    status=status,
+                    count=count,
+                )
+            )
+
+    def _drop_expired_partitions(
+        self, cutoff: datetime, now: datetime, stats: Dict[str, int]
+    ) -> None:
+        manager = self.partition_manager
+        if manager is None:
+            return
+
+        try:
+            with Session(self.engine) as session:
+                if not manager.is_partitioned(session):
+                    return
+                stats["partitions_created"] += manager.ensure_future_partitions(
+                    session, now
+                )
+                session.commit()
+                expired = manager.expired_partitions(session, cutoff)
+        except Exception as e:
+            logging.error(f"Failed to inspect audit log partitions: {e}")
+            return
+
+        for name, upper in expired:
+            try:
+                if self.archiver:
+                    stats["archived"] += self._archive_before(upper)
+                with Session(self.engine) as session:
+                    manager.lock_partition(session, name)
+                    if self.policy.rollup:
+                        manager.rollup_partition(session, name)
+                    manager.drop_partition(session, name)
+                    session.commit()
+                stats["partitions_dropped"] += 1
+                logging.info(f"Dropped expired audit log partition {name}")
+            except Exception as e:
+                logging.error(f"Failed to drop audit log partition {name}: {e}")
+
+    def _archive_before(self, upper: datetime) -> int:
+        archived = 0
+        batch: List[AuditLog] = []
+        with Session(self.engine) as session:
+            query = build_audit_log_query().where(AuditLog.timestamp < upper)
+            for log in iter_audit_logs(session, query, self.policy.batch_size):
+                batch.append(log)
+                if len(batch) >= self.policy.batch_size:
+                    archived += self.archiver.archive(batch)
+                    batch = []
+        return archived + self.archiver.archive(batch)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Run retention every ``policy.interval`` seconds on a background thread."""
+        if self.is_running or not self.policy.enabled:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="audit-retention", daemon=True
+        )
+        self._thread.start()
+        logging.info(
+            f"Audit log retention started (keeping {self.policy.hot_days} days)"
+        )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background thread, interrupting a run between batches."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Audit log retention failed: {e}")
+            self._stop_event.wait(self.policy.interval)
+
+
+def get_hourly_activity(
+    session: Session, since: datetime, until: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return rolled-up audit counts per hour between ``since`` and ``until``.
+
+    Returns:
+        List of {"hour", "action", "username", "status", "count"} dicts
+    """
+    query = select(
+        AuditLogHourlyAggregate.hour,
+        AuditLogHourlyAggregate.action,
+        AuditLogHourlyAggregate.username,
+        AuditLogHourlyAggregate.status,
+        func.sum(AuditLogHourlyAggregate.count),
+    ).where(AuditLogHourlyAggregate.hour >= since)
+    if until is not None:
+        query = query.where(AuditLogHourlyAggregate.hour < until)
+    query = query.group_by(
+        AuditLogHourlyAggregate.hour,
+        AuditLogHourlyAggregate.action,
+        AuditLogHourlyAggregate.username,
+        AuditLogHourlyAggregate.status,
+    ).order_by(AuditLogHourlyAggregate.hour)
+
+    return [
+        {
+            "hour": hour,
+            "action": action,
+            "username": username,
+            "status": status,
+            "count": int(count),
+        }
+        for hour, action, username, status, count in session.exec(query).all()
+    ]
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import (
     OAuth2PasswordBearer,
     OAuth2PasswordRequestForm,
     APIKeyHeader,
 )
-from sqlmodel import Session, select, SQLModel
+from sqlalchemy import delete, update
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import Session, select, SQLModel, func
 from typing import Annotated, List, Optional, Dict, Any, Union
 from datetime import datetime
 import logging
@@ -23,14 +26,16 @@ from .models import (
     RolePermissionLink,
     RefreshToken,
 )
+from .password_hashing import HashingBusyError, password_hasher
 from .security import (
     get_password_hash,
-    verify_password,
     create_access_token,
     create_refresh_token,
     decode_access_token,
     decode_refresh_token,
+    decode_refresh_token_claims,
 )
+from .token_revocation import revocation_set
 from .rbac import (
     require_permission,
     require_any_permission,
@@ -39,6 +44,12 @@ from .rbac import (
     PermissionChecker,
 )
 from .rate_limiter import limiter, create_rate_limit_function
+from .audit_log import (
+    InvalidCursorError,
+    build_audit_log_query,
+    export_audit_logs,
+    fetch_page,
+)
 
 # --- API Router and Security Scheme ---
 
@@ -121,9 +132,13 @@ def log_audit_event(
     user_agent: Optional[str] = None,
     status: str = "success",
     error_message: Optional[str] = None,
+    commit: bool = True,
 ):
     """
     Log an audit event to the database.
+
+    With ``commit=False`` the row is only added to the session, so that the
+    caller can commit it together with its own changes.
     """
     # Skip audit logging during tests to avoid database issues
     import os
@@ -149,7 +164,8 @@ def log_audit_event(
             error_message=error_message,
         )
         session.add(audit_log)
-        session.commit()
+        if commit:
+            session.commit()
         logging.info(
             f"Audit log created: {username} performed {action} on {resource_type}:{resource_id}"
         )
@@ -573,26 +589,99 @@ def create_user(
     return db_user
 
 
+def _complete_login(
+    session: Session, user: User, ip_address: Optional[str], user_agent: Optional[str]
+) -> Dict[str, str]:
+    """
+    Records a successful login and issues its tokens.
+
+    Blocking database work, run on the request threadpool by
+    ``login_for_access_token``.
+    """
+    # Update last login time
+    user.last_login = datetime.utcnow()
+    session.add(user)
+
+    # Log successful login
+    log_audit_event(
+        session=session,
+        user_id=user.id,
+        username=user.username,
+        action="login_success",
+        details={"user_agent": user_agent},
+        ip_address=ip_address,
+        user_agent=user_agent,
+        status="success",
+        commit=False,
+    )
+
+    # Create access token
+    access_token = create_access_token(data={"sub": user.username})
+    
+    # Create refresh token
+    refresh_token_jwt, refresh_token_id, refresh_expires_at = create_refresh_token(
+        data={"sub": user.username, "uid": user.id}
+    )
+    
+    # Store refresh token in database
+    device_info = user_agent[:255] if user_agent else None  # Limit length for database
+    db_refresh_token = RefreshToken(
+        token=refresh_token_id,
+        user_id=user.id,
+        expires_at=refresh_expires_at,
+        device_info=device_info
+    )
+    session.add(db_refresh_token)
+    # One commit for last_login, the audit row and the refresh token
+    session.commit()
+
+    return {
+        "access_token": access_token, 
+        "refresh_token": refresh_token_jwt,
+        "token_type": "bearer"
+    }
+
+
 @router.post("/auth/login", response_model=Token, tags=["Authentication"])
 @limiter.limit("30/minute")
-def login_for_access_token(
+async def login_for_access_token(
     request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     session: Annotated[Session, Depends(get_session)],
 ):
     """
     Authenticates a user and returns a JWT access token.
+
+    Password verification runs on the dedicated hashing pool rather than the
+    request threadpool; when that pool is saturated the login is rejected
+    with 503 instead of queueing. The database work runs on the request
+    threadpool, so that it never blocks the event loop.
     """
     try:
         ip_address, user_agent = get_client_info(request)
 
-        user = session.exec(
-            select(User).where(User.username == form_data.username)
-        ).first()
+        user = await run_in_threadpool(
+            lambda: session.exec(
+                select(User).where(User.username == form_data.username)
+            ).first()
+        )
+
+        try:
+            password_ok = bool(user) and await password_hasher.verify(
+                form_data.password, user.hashed_password
+            )
+        except HashingBusyError:
+            logging.warning("Rejecting login: password hashing queue is full")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
 
-        if not user or not verify_password(form_data.password, user.hashed_password):
+        if not password_ok:
             # Log failed login attempt
-            log_audit_event(
+            await run_in_threadpool(
+                log_audit_event,
                 session=session,
                 user_id=user.id if user else None,
                 username=form_data.username,
@@ -610,45 +699,9 @@ def login_for_access_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        # Update last login time
-        user.last_login = datetime.utcnow()
-        session.add(user)
-        session.commit()
-
-        # Log successful login
-        log_audit_event(
-            session=session,
-            user_id=user.id,
-            username=user.username,
-            action="login_success",
-            details={"user_agent": user_agent},
-            ip_address=ip_address,
-            user_agent=user_agent,
-            status="success",
-        )
-
-        # Create access token
-        access_token = create_access_token(data={"sub": user.username})
-        
-        # Create refresh token
-        refresh_token_jwt, refresh_token_id, refresh_expires_at = create_refresh_token(data={"sub": user.username})
-        
-        # Store refresh token in database
-        device_info = user_agent[:255] if user_agent else None  # Limit length for database
-        db_refresh_token = RefreshToken(
-            token=refresh_token_id,
-            user_id=user.id,
-            expires_at=refresh_expires_at,
-            device_info=device_info
+        return await run_in_threadpool(
+            _complete_login, session, user, ip_address, user_agent
         )
-        session.add(db_refresh_token)
-        session.commit()
-
-        return {
-            "access_token": access_token, 
-            "refresh_token": refresh_token_jwt,
-            "token_type": "bearer"
-        }
     except HTTPException as e:
         raise e
     except Exception:
@@ -682,7 +735,8 @@ def refresh_access_token(
         ip_address, user_agent = get_client_info(request)
         
         # Decode the refresh token
-        username, token_id = decode_refresh_token(token_request.refresh_token)
+        claims = decode_refresh_token_claims(token_request.refresh_token)
+        username, token_id = (claims["sub"], claims["jti"]) if claims else (None, None)
         if not username or not token_id:
             log_audit_event(
                 session=session,
@@ -701,9 +755,34 @@ def refresh_access_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Find the user
-        user = session.exec(select(User).where(User.username == username)).first()
-        if not user:
+        # Replaying a revoked token is rejected without touching the database
+        if revocation_set.is_revoked(token_id):
+            log_audit_event(
+                session=session,
+                user_id=None,
+                username=username,
+                action="token_refresh_failed",
+                details={"reason": "refresh_token_revoked"},
+                ip_address=ip_address,
+                user_agent=user_agent,
+                status="failure",
+                error_message="Refresh token revoked",
+            )
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired refresh token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # The user's id is carried by the token; only tokens issued before
+        # it was need the user looked up. Deleting a user deletes their
+        # refresh tokens, so the revoking update below rejects those too
+        user_id = claims.get("uid")
+        user = None
+        if user_id is None:
+            user = session.exec(select(User).where(User.username == username)).first()
+            user_id = user.id if user else None
+        if user_id is None:
             log_audit_event(
                 session=session,
                 user_id=None,
@@ -721,20 +800,25 @@ def refresh_access_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Find the refresh token in database
-        db_refresh_token = session.exec(
-            select(RefreshToken)
+        # Revoke the old refresh token. The update only matches a stored,
+        # active token, so this is also the check that the token is valid
+        # (it may have been revoked by another worker or compacted away)
+        now = datetime.utcnow()
+        result = session.exec(
+            update(RefreshToken)
             .where(RefreshToken.token == token_id)
-            .where(RefreshToken.user_id == user.id)
+            .where(RefreshToken.user_id == user_id)
             .where(RefreshToken.is_revoked == False)
-            .where(RefreshToken.expires_at > datetime.utcnow())
-        ).first()
+            .where(RefreshToken.expires_at > now)
+            .values(is_revoked=True, revoked_at=now)
+        )
         
-        if not db_refresh_token:
+        if result.rowcount != 1:
+            session.rollback()
             log_audit_event(
                 session=session,
-                user_id=user.id,
-                username=user.username,
+                user_id=user_id,
+                username=username,
                 action="token_refresh_failed",
                 details={"reason": "refresh_token_not_found_or_expired"},
                 ip_address=ip_address,
@@ -749,32 +833,30 @@ def refresh_access_token(
             )
         
         # Create new access token
-        new_access_token = create_access_token(data={"sub": user.username})
+        new_access_token = create_access_token(data={"sub": username})
         
         # Create new refresh token
-        new_refresh_token_jwt, new_refresh_token_id, new_refresh_expires_at = create_refresh_token(data={"sub": user.username})
-        
-        # Revoke the old refresh token
-        db_refresh_token.is_revoked = True
-        db_refresh_token.revoked_at = datetime.utcnow()
-        session.add(db_refresh_token)
+        new_refresh_token_jwt, new_refresh_token_id, new_refresh_expires_at = create_refresh_token(
+            data={"sub": username, "uid": user_id}
+        )
         
         # Store new refresh token in database
         device_info = user_agent[:255] if user_agent else None
         new_db_refresh_token = RefreshToken(
             token=new_refresh_token_id,
-            user_id=user.id,
+            user_id=user_id,
             expires_at=new_refresh_expires_at,
             device_info=device_info
         )
         session.add(new_db_refresh_token)
         session.commit()
+        revocation_set.add(token_id)
         
         # Log successful token refresh
         log_audit_event(
             session=session,
-            user_id=user.id,
-            username=user.username,
+            user_id=user_id,
+            username=username,
             action="token_refresh_success",
             details={"device_info": device_info},
             ip_address=ip_address,
@@ -819,12 +901,15 @@ def revoke_refresh_token(
                 .where(RefreshToken.is_revoked == False)
             ).all()
             
+            revoked = []
             for token in user_refresh_tokens:
                 token.is_revoked = True
                 token.revoked_at = datetime.utcnow()
                 session.add(token)
+                revoked.append((token.token, token.expires_at))
             
             session.commit()
+            revocation_set.add_many(revoked)
             
             log_audit_event(
                 session=session,
@@ -868,7 +953,9 @@ def revoke_refresh_token(
                 db_refresh_token.is_revoked = True
                 db_refresh_token.revoked_at = datetime.utcnow()
                 session.add(db_refresh_token)
+                expires_at = db_refresh_token.expires_at
                 session.commit()
+                revocation_set.add(token_id, expires_at)
                 
                 log_audit_event(
                     session=session,
@@ -1173,6 +1260,9 @@ def delete_user(
         "was_active": db_user.is_active,
     }
 
+    # Refresh tokens carry the user's id and are not checked against the
+    # user table, so they go with the user
+    session.exec(delete(RefreshToken).where(RefreshToken.user_id == db_user.id))
     session.delete(db_user)
     session.commit()
 
@@ -1378,11 +1468,23 @@ def remove_user_from_group(
 # --- Audit Log Endpoints ---
 
 
+def _parse_audit_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid {name} format. Use ISO format."
+        )
+
+
 @router.get("/audit-logs/", response_model=List[AuditLogPublic], tags=["Audit"])
 def get_audit_logs(
     current_user: Annotated[User, Depends(require_permission("audit.read"))],
     session: Annotated[Session, Depends(get_session)],
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     action: Optional[str] = None,
@@ -1391,44 +1493,41 @@ def get_audit_logs(
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    match: str = Query("contains", pattern="^(contains|prefix|exact)$"),
+    cursor: Optional[str] = None,
 ) -> List[AuditLogPublic]:
     """
     Get audit logs. Requires audit.read permission.
+
+    Results are ordered newest first. Pass the ``X-Next-Cursor`` response
+    header back as ``cursor`` to fetch the next page; unlike ``skip`` this
+    does not get slower further into the log. ``match`` selects how the
+    ``action`` and ``username`` filters match: "contains", "prefix" or
+    "exact" (prefix and exact can use the column indexes).
     """
     ip_address, user_agent = get_client_info(request)
 
     # Build query with filters
-    query = select(AuditLog)
+    query = build_audit_log_query(
+        action=action,
+        username=username,
+        resource_type=resource_type,
+        status=status,
+        start_dt=_parse_audit_date(start_date, "start_date"),
+        end_dt=_parse_audit_date(end_date, "end_date"),
+        match=match,
+    )
 
-    if action:
-        query = query.where(AuditLog.action.contains(action))
-    if username:
-        query = query.where(AuditLog.username.contains(username))
-    if resource_type:
-        query = query.where(AuditLog.resource_type == resource_type)
-    if status:
-        query = query.where(AuditLog.status == status)
-    if start_date:
-        try:
-            start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-            query = query.where(AuditLog.timestamp >= start_dt)
-        except ValueError:
-            raise HTTPException(
-                status_code=400, detail="Invalid start_date format. Use ISO format."
-            )
-    if end_date:
-        try:
-            end_dt = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-            query = query.where(AuditLog.timestamp <= end_dt)
-        except ValueError:
-            raise HTTPException(
-                status_code=400, detail="Invalid end_date format. Use ISO format."
-            )
+    if skip:
+        query = query.offset(skip)
 
-    # Order by timestamp (newest first) and apply pagination
-    query = query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit)
+    try:
+        audit_logs, next_cursor = fetch_page(session, query, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    audit_logs = session.exec(query).all()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
     # Log the audit log access
     log_audit_event(
@@ -1444,6 +1543,7 @@ def get_audit_logs(
                 "status": status,
                 "start_date": start_date,
                 "end_date": end_date,
+                "match": match,
             },
             "results_count": len(audit_logs),
         },
@@ -1455,6 +1555,90 @@ def get_audit_logs(
     return audit_logs
 
 
+@router.get("/audit-logs/export", tags=["Audit"])
+def export_audit_logs_endpoint(
+    current_user: Annotated[User, Depends(require_permission("audit.read"))],
+    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    action: Optional[str] = None,
+    username: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    match: str = Query("contains", pattern="^(contains|prefix|exact)$"),
+) -> StreamingResponse:
+    """
+    Export audit logs as NDJSON or CSV. Requires audit.read permission.
+
+    The export is streamed in batches straight from the database, so it can
+    cover the whole table without loading it into memory.
+    """
+    ip_address, user_agent = get_client_info(request)
+
+    query = build_audit_log_query(
+        action=action,
+        username=username,
+        resource_type=resource_type,
+        status=status,
+        start_dt=_parse_audit_date(start_date, "start_date"),
+        end_dt=_parse_audit_date(end_date, "end_date"),
+        match=match,
+    )
+
+    log_audit_event(
+        session=session,
+        user_id=current_user.id,
+        username=current_user.username,
+        action="export_audit_logs",
+        details={
+            "format": format,
+            "filters": {
+                "action": action,
+                "username": username,
+                "resource_type": resource_type,
+                "status": status,
+                "start_date": start_date,
+                "end_date": end_date,
+                "match": match,
+            },
+        },
+        ip_address=ip_address,
+        user_agent=user_agent,
+        status="success",
+    )
+
+    # The stream outlives the request's session, so it reads with its own
+    engine = session.get_bind()
+
+    def stream():
+        with Session(engine) as export_session:
+            yield from export_audit_logs(export_session, query, format)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"audit-logs-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _top_audit_values(session: Session, column, limit: int = 10) -> List[tuple]:
+    """
+    Returns the most frequent values of an AuditLog column with their counts,
+    computed with GROUP BY in the database.
+    """
+    count = func.count(AuditLog.id)
+    return session.exec(
+        select(column, count)
+        .group_by(column)
+        .order_by(count.desc(), column)
+        .limit(limit)
+    ).all()
+
+
 @router.get("/audit-logs/stats", tags=["Audit"])
 def get_audit_log_stats(
     current_user: Annotated[User, Depends(require_permission("audit.read"))],
@@ -1466,41 +1650,34 @@ def get_audit_log_stats(
     """
     ip_address, user_agent = get_client_info(request)
 
-    # Get total count
-    total_logs = session.exec(select(AuditLog)).all()
-    total_count = len(total_logs)
-
-    # Get counts by status
-    success_count = len([log for log in total_logs if log.status == "success"])
-    failure_count = len([log for log in total_logs if log.status == "failure"])
-    error_count = len([log for log in total_logs if log.status == "error"])
+    # Get counts by status; the total is their sum
+    status_counts = dict(
+        session.exec(
+            select(AuditLog.status, func.count(AuditLog.id)).group_by(AuditLog.status)
+        ).all()
+    )
+    total_count = sum(status_counts.values())
 
     # Get top actions
-    action_counts = {}
-    for log in total_logs:
-        action_counts[log.action] = action_counts.get(log.action, 0) + 1
-
-    top_actions = sorted(action_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    top_actions = _top_audit_values(session, AuditLog.action)
 
     # Get top users
-    user_counts = {}
-    for log in total_logs:
-        user_counts[log.username] = user_counts.get(log.username, 0) + 1
-
-    top_users = sorted(user_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    top_users = _top_audit_values(session, AuditLog.username)
 
     # Get recent activity (last 24 hours)
     from datetime import timedelta
 
     yesterday = datetime.utcnow() - timedelta(days=1)
-    recent_logs = [log for log in total_logs if log.timestamp >= yesterday]
+    recent_count = session.exec(
+        select(func.count(AuditLog.id)).where(AuditLog.timestamp >= yesterday)
+    ).one()
 
     stats = {
         "total_logs": total_count,
         "status_breakdown": {
-            "success": success_count,
-            "failure": failure_count,
-            "error": error_count,
+            "success": status_counts.get("success", 0),
+            "failure": status_counts.get("failure", 0),
+            "error": status_counts.get("error", 0),
         },
         "top_actions": [
             {"action": action, "count": count} for action, count in top_actions
@@ -1508,7 +1685,7 @@ def get_audit_log_stats(
         "top_users": [
             {"username": username, "count": count} for username, count in top_users
         ],
-        "recent_activity_24h": len(recent_logs),
+        "recent_activity_24h": recent_count,
     }
 
     # Log the stats access
@@ -1,4 +1,6 @@
+import logging
 import os
+import tempfile
 from typing import Optional
 
 
@@ -39,6 +41,201 @@ class Config:
     DB_CONNECT_TIMEOUT: Optional[int] = int(os.getenv("INTENTVERSE_DB_CONNECT_TIMEOUT", "30")) if os.getenv("INTENTVERSE_DB_CONNECT_TIMEOUT") else None
     DB_APPLICATION_NAME: str = os.getenv("INTENTVERSE_DB_APPLICATION_NAME", "IntentVerse")
 
+    # Health sampling: seconds between background samples, and the maximum
+    # age of a sample that health and readiness probes may serve
+    HEALTH_SAMPLE_INTERVAL: float = float(
+        os.getenv("INTENTVERSE_HEALTH_SAMPLE_INTERVAL", "10")
+    )
+    HEALTH_MAX_STALENESS: float = float(
+        os.getenv("INTENTVERSE_HEALTH_MAX_STALENESS", "30")
+    )
+
+    # Audit log retention: rows older than AUDIT_RETENTION_DAYS are rolled up
+    # into hourly aggregates, archived and deleted (0 keeps everything)
+    AUDIT_RETENTION_DAYS: int = int(os.getenv("INTENTVERSE_AUDIT_RETENTION_DAYS", "0"))
+    AUDIT_ROLLUP_ENABLED: bool = (
+        os.getenv("INTENTVERSE_AUDIT_ROLLUP", "true").lower() == "true"
+    )
+    AUDIT_ARCHIVE_DIR: Optional[str] = os.getenv("INTENTVERSE_AUDIT_ARCHIVE_DIR")
+    AUDIT_RETENTION_BATCH_SIZE: int = int(
+        os.getenv("INTENTVERSE_AUDIT_RETENTION_BATCH_SIZE", "1000")
+    )
+    AUDIT_RETENTION_INTERVAL: float = float(
+        os.getenv("INTENTVERSE_AUDIT_RETENTION_INTERVAL", "3600")
+    )
+
+    # Refresh token compaction: seconds between runs that delete expired and
+    # revoked refresh tokens, and rows deleted per transaction
+    REFRESH_TOKEN_COMPACTION_INTERVAL: float = float(
+        os.getenv("INTENTVERSE_REFRESH_TOKEN_COMPACTION_INTERVAL", "3600")
+    )
+    REFRESH_TOKEN_COMPACTION_BATCH_SIZE: int = int(
+        os.getenv("INTENTVERSE_REFRESH_TOKEN_COMPACTION_BATCH_SIZE", "1000")
+    )
+
+    # Number of recent changes kept per module state for ?since_version=
+    # deltas (0 disables delta tracking)
+    STATE_CHANGE_LOG_SIZE: int = int(
+        os.getenv("INTENTVERSE_STATE_CHANGE_LOG_SIZE", "50")
+    )
+    # Module states that change too often and too widely to diff (such as
+    # the timeline, which appends and evicts on every event); their deltas
+    # always replace the whole state
+    STATE_NO_DELTA_KEYS: str = os.getenv("INTENTVERSE_STATE_NO_DELTA_KEYS", "timeline")
+
+    # Module state storage: "memory" keeps it in each worker process, while
+    # "sqlite" shares it between workers through STATE_BACKEND_PATH
+    STATE_BACKEND: str = os.getenv("INTENTVERSE_STATE_BACKEND", "memory")
+    STATE_BACKEND_PATH: str = os.getenv(
+        "INTENTVERSE_STATE_BACKEND_PATH", "./state/module_state.db"
+    )
+
+    # Module state persistence: with a directory set, state changes are
+    # logged there and compacted into a snapshot every STATE_SNAPSHOT_EVERY
+    # changes, so restarts recover the state instead of reloading content
+    # packs. The fsync policy is always, interval or never
+    STATE_PERSISTENCE_DIR: Optional[str] = os.getenv("INTENTVERSE_STATE_PERSISTENCE_DIR")
+    STATE_FSYNC_POLICY: str = os.getenv("INTENTVERSE_STATE_FSYNC_POLICY", "interval")
+    STATE_FSYNC_INTERVAL: float = float(
+        os.getenv("INTENTVERSE_STATE_FSYNC_INTERVAL", "1.0")
+    )
+    STATE_SNAPSHOT_EVERY: int = int(os.getenv("INTENTVERSE_STATE_SNAPSHOT_EVERY", "1000"))
+    # Keys in STATE_NO_DELTA_KEYS are not logged per change; a snapshot is
+    # written at most this many seconds after they change instead
+    STATE_NO_DELTA_SNAPSHOT_INTERVAL: float = float(
+        os.getenv("INTENTVERSE_STATE_NO_DELTA_SNAPSHOT_INTERVAL", "5.0")
+    )
+
+    # Sandbox module mock data is generated from MOCK_DATA_SEED on first use
+    # and, unless MOCK_DATA_CACHE is false, cached in MOCK_DATA_CACHE_DIR so
+    # restarts reuse it
+    MOCK_DATA_SEED: int = int(os.getenv("INTENTVERSE_MOCK_DATA_SEED", "1337"))
+    MOCK_DATA_CACHE: bool = os.getenv("INTENTVERSE_MOCK_DATA_CACHE", "true").lower() == "true"
+    MOCK_DATA_CACHE_DIR: str = os.getenv(
+        "INTENTVERSE_MOCK_DATA_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "intentverse", "mock_data"),
+    )
+
+    # Content pack variable overrides are cached per worker; writes made by
+    # other workers show up within VARIABLE_CACHE_TTL seconds
+    VARIABLE_CACHE_TTL: float = float(os.getenv("INTENTVERSE_VARIABLE_CACHE_TTL", "5.0"))
+
+    # Tool execution rate limit: each caller gets EXECUTE_RATE_LIMIT units,
+    # and each tool call spends its cost (1 unless overridden in
+    # TOOL_RATE_COSTS, given as "module.tool=cost,module.*=cost"). The
+    # budgets are kept in memory (per worker), shared_memory (a mapped file
+    # shared by the workers on one host) or sqlite, at RATE_LIMIT_STORAGE_PATH
+    EXECUTE_RATE_LIMIT: str = os.getenv("INTENTVERSE_EXECUTE_RATE_LIMIT", "60/minute")
+    TOOL_RATE_COSTS: str = os.getenv("INTENTVERSE_TOOL_RATE_COSTS", "")
+    RATE_LIMIT_STORAGE: str = os.getenv("INTENTVERSE_RATE_LIMIT_STORAGE", "memory")
+    RATE_LIMIT_STORAGE_PATH: Optional[str] = os.getenv(
+        "INTENTVERSE_RATE_LIMIT_STORAGE_PATH"
+    )
+
+    # Database module: without a path its SQLite database is temporary (in
+    # memory where /dev/shm is available). Writes share one connection under
+    # a lock, reads use a pool of DATABASE_TOOL_READ_CONNECTIONS read-only
+    # connections; the PRAGMAs below are applied to every connection
+    DATABASE_TOOL_PATH: Optional[str] = os.getenv("INTENTVERSE_DATABASE_TOOL_PATH")
+    DATABASE_TOOL_READ_CONNECTIONS: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_READ_CONNECTIONS", "4")
+    )
+    DATABASE_TOOL_CACHE_SIZE: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_CACHE_SIZE", "-16000")
+    )
+    DATABASE_TOOL_MMAP_SIZE: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_MMAP_SIZE", "268435456")
+    )
+    DATABASE_TOOL_JOURNAL_MODE: str = os.getenv(
+        "INTENTVERSE_DATABASE_TOOL_JOURNAL_MODE", "wal"
+    )
+    # Compiled statements cached per connection, and rows of the last query
+    # result kept in the module state
+    DATABASE_TOOL_STATEMENT_CACHE_SIZE: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_STATEMENT_CACHE_SIZE", "256")
+    )
+    DATABASE_TOOL_STATE_ROWS: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_STATE_ROWS", "100")
+    )
+    # Statement budgets: statements running longer than TIME_BUDGET seconds
+    # or returning more than ROW_BUDGET rows are aborted (0 disables). Those
+    # slower than SLOW_QUERY_MS are kept, with their query plan, in a slow
+    # query log of SLOW_QUERY_LOG_SIZE entries
+    DATABASE_TOOL_TIME_BUDGET: float = float(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_TIME_BUDGET", "5.0")
+    )
+    DATABASE_TOOL_ROW_BUDGET: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_ROW_BUDGET", "100000")
+    )
+    DATABASE_TOOL_SLOW_QUERY_MS: float = float(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_SLOW_QUERY_MS", "200")
+    )
+    DATABASE_TOOL_SLOW_QUERY_LOG_SIZE: int = int(
+        os.getenv("INTENTVERSE_DATABASE_TOOL_SLOW_QUERY_LOG_SIZE", "20")
+    )
+
+    # Timeline: event payload fields over TIMELINE_FIELD_MAX_BYTES (as JSON)
+    # are replaced by a preview and kept out of band in a blob store (in
+    # memory up to TIMELINE_BLOB_STORE_BYTES, or in TIMELINE_BLOB_DIR). The
+    # oldest events are dropped past TIMELINE_MAX_BYTES or TIMELINE_MAX_EVENTS
+    TIMELINE_FIELD_MAX_BYTES: int = int(
+        os.getenv("INTENTVERSE_TIMELINE_FIELD_MAX_BYTES", "4096")
+    )
+    TIMELINE_PREVIEW_CHARS: int = int(
+        os.getenv("INTENTVERSE_TIMELINE_PREVIEW_CHARS", "256")
+    )
+    TIMELINE_MAX_BYTES: int = int(
+        os.getenv("INTENTVERSE_TIMELINE_MAX_BYTES", str(8 * 1024 * 1024))
+    )
+    TIMELINE_MAX_EVENTS: int = int(os.getenv("INTENTVERSE_TIMELINE_MAX_EVENTS", "1000"))
+    TIMELINE_BLOB_STORE_BYTES: int = int(
+        os.getenv("INTENTVERSE_TIMELINE_BLOB_STORE_BYTES", str(64 * 1024 * 1024))
+    )
+    TIMELINE_BLOB_DIR: Optional[str] = os.getenv("INTENTVERSE_TIMELINE_BLOB_DIR")
+    # Events dropped from the in-memory timeline are archived in daily
+    # segments in TIMELINE_ARCHIVE_DIR (if set), kept for
+    # TIMELINE_ARCHIVE_RETENTION_DAYS (0 keeps them all)
+    TIMELINE_ARCHIVE_DIR: Optional[str] = os.getenv("INTENTVERSE_TIMELINE_ARCHIVE_DIR")
+    TIMELINE_ARCHIVE_RETENTION_DAYS: int = int(
+        os.getenv("INTENTVERSE_TIMELINE_ARCHIVE_RETENTION_DAYS", "0")
+    )
+
+    # JWT signing keys: without a key ring file a random key is generated
+    # per process. With one, workers share the keys in the file, and the
+    # active key is rotated every KEY_RING_ROTATION_DAYS (0 never rotates),
+    # keeping the newest KEY_RING_MAX_KEYS keys valid for verification
+    KEY_RING_FILE: Optional[str] = os.getenv("INTENTVERSE_KEY_RING_FILE")
+    KEY_RING_MAX_KEYS: int = int(os.getenv("INTENTVERSE_KEY_RING_MAX_KEYS", "3"))
+    KEY_RING_ROTATION_DAYS: float = float(
+        os.getenv("INTENTVERSE_KEY_RING_ROTATION_DAYS", "0")
+    )
+
+    # WebSocket broadcasting: messages buffered per client, and what to do
+    # when a client falls that far behind (drop_oldest, drop_newest or
+    # disconnect)
+    WEBSOCKET_SEND_QUEUE_SIZE: int = int(
+        os.getenv("INTENTVERSE_WEBSOCKET_SEND_QUEUE_SIZE", "256")
+    )
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = os.getenv(
+        "INTENTVERSE_WEBSOCKET_SLOW_CONSUMER_POLICY", "drop_oldest"
+    )
+
+    # Password hashing pool used by login: worker count, the maximum number
+    # of hashes waiting or running before logins are rejected with 503, and
+    # whether workers are processes or threads
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("INTENTVERSE_PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE_LIMIT: int = int(
+        os.getenv("INTENTVERSE_PASSWORD_HASH_QUEUE_LIMIT", "32")
+    )
+    PASSWORD_HASH_EXECUTOR: str = os.getenv(
+        "INTENTVERSE_PASSWORD_HASH_EXECUTOR", "process"
+    )
+
+    # Request pipeline stages to switch off (comma separated), e.g. "timing"
+    MIDDLEWARE_DISABLED_STAGES: str = os.getenv(
+        "INTENTVERSE_MIDDLEWARE_DISABLED_STAGES", ""
+    )
+
     @classmethod
     def get_remote_repo_url(cls) -> str:
         """Get the remote repository URL."""
@@ -61,6 +258,193 @@ class Config:
         """Get the HTTP timeout in seconds."""
         return cls.HTTP_TIMEOUT
 
+    @classmethod
+    def get_health_sample_interval(cls) -> float:
+        """Get the interval between background health samples in seconds."""
+        return cls.HEALTH_SAMPLE_INTERVAL
+
+    @classmethod
+    def get_health_max_staleness(cls) -> float:
+        """Get the maximum age of a health sample served to probes in seconds."""
+        return cls.HEALTH_MAX_STALENESS
+
+    @classmethod
+    def get_audit_retention_config(cls) -> dict:
+        """Get the audit log retention policy settings."""
+        return {
+            "hot_days": cls.AUDIT_RETENTION_DAYS,
+            "rollup": cls.AUDIT_ROLLUP_ENABLED,
+            "archive_dir": cls.AUDIT_ARCHIVE_DIR,
+            "batch_size": cls.AUDIT_RETENTION_BATCH_SIZE,
+            "interval": cls.AUDIT_RETENTION_INTERVAL,
+        }
+
+    @classmethod
+    def get_refresh_token_compaction_config(cls) -> dict:
+        """Get the refresh token compaction settings."""
+        return {
+            "interval": cls.REFRESH_TOKEN_COMPACTION_INTERVAL,
+            "batch_size": cls.REFRESH_TOKEN_COMPACTION_BATCH_SIZE,
+        }
+
+    @classmethod
+    def get_state_change_log_size(cls) -> int:
+        """Get the number of changes kept per module state for deltas."""
+        return cls.STATE_CHANGE_LOG_SIZE
+
+    @classmethod
+    def get_state_no_delta_keys(cls) -> set:
+        """Get the module states whose changes are not diffed."""
+        return {key.strip() for key in cls.STATE_NO_DELTA_KEYS.split(",") if key.strip()}
+
+    @classmethod
+    def get_state_backend(cls) -> str:
+        """Get the module state backend (memory or sqlite)."""
+        return cls.STATE_BACKEND.lower()
+
+    @classmethod
+    def get_state_backend_path(cls) -> str:
+        """Get the database file used by the sqlite state backend."""
+        return cls.STATE_BACKEND_PATH
+
+    @classmethod
+    def get_state_persistence_config(cls) -> dict:
+        """Get the module state persistence settings."""
+        return {
+            "directory": cls.STATE_PERSISTENCE_DIR,
+            "fsync_policy": cls.STATE_FSYNC_POLICY,
+            "fsync_interval": cls.STATE_FSYNC_INTERVAL,
+            "snapshot_every": cls.STATE_SNAPSHOT_EVERY,
+            "no_delta_snapshot_interval": cls.STATE_NO_DELTA_SNAPSHOT_INTERVAL,
+        }
+
+    @classmethod
+    def get_mock_data_config(cls) -> dict:
+        """Get the sandbox module mock data seed and cache settings."""
+        return {
+            "seed": cls.MOCK_DATA_SEED,
+            "cache_enabled": cls.MOCK_DATA_CACHE,
+            "cache_dir": cls.MOCK_DATA_CACHE_DIR,
+        }
+
+    @classmethod
+    def get_variable_cache_ttl(cls) -> float:
+        """Get how long cached content pack variable overrides are served."""
+        return cls.VARIABLE_CACHE_TTL
+
+    @classmethod
+    def get_execute_rate_limit(cls) -> str:
+        """Get the budget each caller spends tool executions from."""
+        return cls.EXECUTE_RATE_LIMIT
+
+    @classmethod
+    def get_tool_rate_costs(cls) -> dict:
+        """Get the configured tool cost overrides, by tool name or module.*"""
+        costs = {}
+        for item in cls.TOOL_RATE_COSTS.split(","):
+            if not item.strip():
+                continue
+            try:
+                name, cost = item.split("=", 1)
+                costs[name.strip()] = int(cost)
+            except ValueError:
+                logging.warning(f"Ignoring invalid tool rate cost '{item}'")
+        return costs
+
+    @classmethod
+    def get_rate_limit_storage(cls) -> str:
+        """Get the rate limit storage (memory, shared_memory or sqlite)."""
+        return cls.RATE_LIMIT_STORAGE.lower()
+
+    @classmethod
+    def get_rate_limit_storage_path(cls) -> Optional[str]:
+        """Get the file used by the shared_memory or sqlite rate limit storage."""
+        return cls.RATE_LIMIT_STORAGE_PATH
+
+    @classmethod
+    def get_database_tool_config(cls) -> dict:
+        """Get the database module's SQLite engine settings."""
+        return {
+            "path": cls.DATABASE_TOOL_PATH,
+            "read_connections": cls.DATABASE_TOOL_READ_CONNECTIONS,
+            "cache_size": cls.DATABASE_TOOL_CACHE_SIZE,
+            "mmap_size": cls.DATABASE_TOOL_MMAP_SIZE,
+            "journal_mode": cls.DATABASE_TOOL_JOURNAL_MODE,
+            "statement_cache_size": cls.DATABASE_TOOL_STATEMENT_CACHE_SIZE,
+        }
+
+    @classmethod
+    def get_database_tool_state_rows(cls) -> int:
+        """Get the number of result rows the database module keeps in state."""
+        return cls.DATABASE_TOOL_STATE_ROWS
+
+    @classmethod
+    def get_database_tool_profiling_config(cls) -> dict:
+        """Get the database module's statement budgets and slow query log settings."""
+        return {
+            "time_budget": cls.DATABASE_TOOL_TIME_BUDGET,
+            "row_budget": cls.DATABASE_TOOL_ROW_BUDGET,
+            "slow_query_ms": cls.DATABASE_TOOL_SLOW_QUERY_MS,
+            "slow_query_log_size": cls.DATABASE_TOOL_SLOW_QUERY_LOG_SIZE,
+        }
+
+    @classmethod
+    def get_timeline_config(cls) -> dict:
+        """Get the timeline payload compaction, retention and archive settings."""
+        return {
+            "field_max_bytes": cls.TIMELINE_FIELD_MAX_BYTES,
+            "preview_chars": cls.TIMELINE_PREVIEW_CHARS,
+            "max_bytes": cls.TIMELINE_MAX_BYTES,
+            "max_events": cls.TIMELINE_MAX_EVENTS,
+            "blob_store_bytes": cls.TIMELINE_BLOB_STORE_BYTES,
+            "blob_dir": cls.TIMELINE_BLOB_DIR,
+            "archive_dir": cls.TIMELINE_ARCHIVE_DIR,
+            "archive_retention_days": cls.TIMELINE_ARCHIVE_RETENTION_DAYS,
+        }
+
+    @classmethod
+    def get_key_ring_config(cls) -> dict:
+        """Get the JWT signing key ring settings."""
+        return {
+            "path": cls.KEY_RING_FILE,
+            "max_keys": cls.KEY_RING_MAX_KEYS,
+            "rotation_days": cls.KEY_RING_ROTATION_DAYS,
+        }
+
+    @classmethod
+    def get_websocket_send_queue_size(cls) -> int:
+        """Get the number of messages buffered per WebSocket client."""
+        return cls.WEBSOCKET_SEND_QUEUE_SIZE
+
+    @classmethod
+    def get_websocket_slow_consumer_policy(cls) -> str:
+        """Get what to do when a WebSocket client's send queue is full."""
+        return cls.WEBSOCKET_SLOW_CONSUMER_POLICY.lower()
+
+    @classmethod
+    def get_password_hash_workers(cls) -> int:
+        """Get the number of password hashing workers."""
+        return cls.PASSWORD_HASH_WORKERS
+
+    @classmethod
+    def get_password_hash_queue_limit(cls) -> int:
+        """Get the maximum number of password hashes waiting or running."""
+        return cls.PASSWORD_HASH_QUEUE_LIMIT
+
+    @classmethod
+    def get_password_hash_executor(cls) -> str:
+        """Get the password hashing executor kind (process or thread)."""
+        return cls.PASSWORD_HASH_EXECUTOR.lower()
+
+    @classmethod
+    def get_disabled_middleware_stages(cls) -> list[str]:
+        """Get the request pipeline middleware stages that are disabled."""
+        return [
+            stage.strip()
+            for stage in cls.MIDDLEWARE_DISABLED_STAGES.split(",")
+            if stage.strip()
+        ]
+
     @classmethod
     def get_database_type(cls) -> str:
         """Get the database type (sqlite, postgresql, mysql)."""
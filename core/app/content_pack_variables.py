@@ -6,22 +6,184 @@ for content packs, including creating, reading, updating, and deleting
 variable values.
 """
 
+import itertools
 import logging
-from typing import Dict, List, Optional, Any
-from sqlmodel import Session, select
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Any, Tuple
+from sqlmodel import Session, select, func, delete
 from datetime import datetime
 
+from .config import Config
 from .models import ContentPackVariable, User
 from .database_compat import get_session
 
 
+class VariableOverrideCache:
+    """
+    Version-stamped cache of user variable overrides, keyed by (pack, user).
+
+    Every write to a (pack, user) pair bumps its version. Cached entries record
+    the version current when their query started, so an entry loaded while a
+    write was in flight is never served once that write has completed.
+
+    Versions only see writes made in this process, so entries also expire
+    after ``ttl`` seconds to pick up writes made by other workers.
+    """
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self, ttl: Optional[float] = None):
+        """
+        Args:
+            ttl: Seconds an entry is served; defaults to Config's variable cache TTL
+        """
+        self.ttl = Config.get_variable_cache_ttl() if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        # Version of pairs without an entry in _versions; raised whenever
+        # versions are pruned so that loads started before never match
+        self._base_version = 0
+        self._versions: Dict[Tuple[str, int], int] = {}
+        self._entries: Dict[Tuple[str, int], Tuple[int, float, Dict[str, str]]] = {}
+
+    def version(self, content_pack_name: str, user_id: int) -> int:
+        """Return the current version of a (pack, user) pair."""
+        with self._lock:
+            return self._versions.get((content_pack_name, user_id), self._base_version)
+
+    def get(self, content_pack_name: str, user_id: int) -> Optional[Dict[str, str]]:
+        """Return cached overrides if they are still current, otherwise None."""
+        key = (content_pack_name, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._versions.get(key, self._base_version):
+                return None
+            if time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                return None
+            return entry[2]
+
+    def put(
+        self, content_pack_name: str, user_id: int, version: int, values: Dict[str, str]
+    ) -> None:
+        """Store overrides loaded at the given version."""
+        key = (content_pack_name, user_id)
+        with self._lock:
+            if version != self._versions.get(key, self._base_version):
+                return  # A write happened while loading; don't cache stale data
+            if key not in self._entries and len(self._entries) >= self.MAX_ENTRIES:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (version, time.monotonic(), values)
+
+    def invalidate(self, content_pack_name: str, user_id: int) -> None:
+        """Bump the version of a (pack, user) pair and drop its cached entry."""
+        key = (content_pack_name, user_id)
+        with self._lock:
+            self._versions[key] = next(self._counter)
+            self._entries.pop(key, None)
+            if len(self._versions) > 2 * self.MAX_ENTRIES:
+                self._prune_versions()
+
+    def clear(self) -> None:
+        """Drop all cached entries, invalidating every pair."""
+        with self._lock:
+            for key in self._entries:
+                self._versions[key] = next(self._counter)
+            self._entries.clear()
+            self._prune_versions()
+
+    def _prune_versions(self) -> None:
+        """
+        Forget the versions of pairs without a cached entry. They fall back
+        to a new base version, newer than any a load could have started at.
+        """
+        self._base_version = next(self._counter)
+        self._versions = {
+            key: self._versions[key] for key in self._entries if key in self._versions
+        }
+        # Entries loaded at the old base version keep it
+        for key, entry in self._entries.items():
+            self._versions.setdefault(key, entry[0])
+
+
+# Override caches are shared by every manager bound to the same database
+# engine, so writes made through one session invalidate reads in the others.
+_override_caches: "weakref.WeakKeyDictionary[Any, VariableOverrideCache]" = (
+    weakref.WeakKeyDictionary()
+)
+_override_caches_lock = threading.Lock()
+
+
+def get_override_cache(session: Session) -> VariableOverrideCache:
+    """
+    Get the override cache shared by all sessions bound to the same engine.
+
+    Args:
+        session: Database session
+
+    Returns:
+        VariableOverrideCache for the session's engine
+    """
+    bind = session.get_bind()
+    with _override_caches_lock:
+        cache = _override_caches.get(bind)
+        if cache is None:
+            cache = VariableOverrideCache()
+            _override_caches[bind] = cache
+        return cache
+
+
 class ContentPackVariableManager:
     """
     Manages content pack variables with CRUD operations.
+
+    Reads of user overrides go through a version-stamped cache: all overrides
+    for a (pack, user) pair are loaded with one query and reused until
+    set_variable_value, delete_variable or reset_pack_variables changes them,
+    or for at most the cache TTL when another worker might have.
     """
 
     def __init__(self, session: Session):
         self.session = session
+        try:
+            self.override_cache = get_override_cache(session)
+        except Exception:
+            self.override_cache = VariableOverrideCache()
+
+    def prefetch_pack_variables(
+        self, content_pack_name: str, user_id: int
+    ) -> Dict[str, str]:
+        """
+        Load all variable overrides for a content pack and user into the cache.
+
+        Returns the cached overrides without querying if they are current.
+        The returned dictionary is shared with the cache and must not be
+        modified; use get_pack_variables for a private copy.
+
+        Args:
+            content_pack_name: Name of the content pack
+            user_id: ID of the user
+
+        Returns:
+            Dictionary mapping variable names to their values
+        """
+        cached = self.override_cache.get(content_pack_name, user_id)
+        if cached is not None:
+            return cached
+
+        version = self.override_cache.version(content_pack_name, user_id)
+        statement = select(
+            ContentPackVariable.variable_name, ContentPackVariable.variable_value
+        ).where(
+            ContentPackVariable.content_pack_name == content_pack_name,
+            ContentPackVariable.user_id == user_id,
+        )
+        values = {name: value for name, value in self.session.exec(statement).all()}
+
+        self.override_cache.put(content_pack_name, user_id, version, values)
+        return values
 
     def get_pack_variables(
         self, content_pack_name: str, user_id: int
@@ -37,13 +199,7 @@ class ContentPackVariableManager:
             Dictionary mapping variable names to their values
         """
         try:
-            statement = select(ContentPackVariable).where(
-                ContentPackVariable.content_pack_name == content_pack_name,
-                ContentPackVariable.user_id == user_id,
-            )
-            variables = self.session.exec(statement).all()
-
-            return {var.variable_name: var.variable_value for var in variables}
+            return dict(self.prefetch_pack_variables(content_pack_name, user_id))
 
         except Exception as e:
             logging.error(
@@ -66,14 +222,8 @@ class ContentPackVariableManager:
             Variable value if found, None otherwise
         """
         try:
-            statement = select(ContentPackVariable).where(
-                ContentPackVariable.content_pack_name == content_pack_name,
-                ContentPackVariable.variable_name == variable_name,
-                ContentPackVariable.user_id == user_id,
-            )
-            variable = self.session.exec(statement).first()
-
-            return variable.variable_value if variable else None
+            overrides = self.prefetch_pack_variables(content_pack_name, user_id)
+            return overrides.get(variable_name)
 
         except Exception as e:
             logging.error(
@@ -127,6 +277,7 @@ class ContentPackVariableManager:
                 )
 
             self.session.commit()
+            self.override_cache.invalidate(content_pack_name, user_id)
             return True
 
         except Exception as e:
@@ -161,6 +312,7 @@ class ContentPackVariableManager:
             if variable:
                 self.session.delete(variable)
                 self.session.commit()
+                self.override_cache.invalidate(content_pack_name, user_id)
                 logging.info(
                     f"Deleted variable '{variable_name}' for pack '{content_pack_name}' and user {user_id}"
                 )
@@ -190,18 +342,16 @@ class ContentPackVariableManager:
             True if successful, False otherwise
         """
         try:
-            statement = select(ContentPackVariable).where(
+            statement = delete(ContentPackVariable).where(
                 ContentPackVariable.content_pack_name == content_pack_name,
                 ContentPackVariable.user_id == user_id,
             )
-            variables = self.session.exec(statement).all()
-
-            for variable in variables:
-                self.session.delete(variable)
+            result = self.session.exec(statement)
 
             self.session.commit()
+            self.override_cache.invalidate(content_pack_name, user_id)
             logging.info(
-                f"Reset all variables for pack '{content_pack_name}' and user {user_id} ({len(variables)} variables deleted)"
+                f"Reset all variables for pack '{content_pack_name}' and user {user_id} ({result.rowcount} variables deleted)"
             )
             return True
 
@@ -223,16 +373,15 @@ class ContentPackVariableManager:
             Dictionary mapping content pack names to their variable dictionaries
         """
         try:
-            statement = select(ContentPackVariable).where(
-                ContentPackVariable.user_id == user_id
-            )
-            variables = self.session.exec(statement).all()
+            statement = select(
+                ContentPackVariable.content_pack_name,
+                ContentPackVariable.variable_name,
+                ContentPackVariable.variable_value,
+            ).where(ContentPackVariable.user_id == user_id)
 
             result = {}
-            for var in variables:
-                if var.content_pack_name not in result:
-                    result[var.content_pack_name] = {}
-                result[var.content_pack_name][var.variable_name] = var.variable_value
+            for pack_name, variable_name, variable_value in self.session.exec(statement):
+                result.setdefault(pack_name, {})[variable_name] = variable_value
 
             return result
 
@@ -248,32 +397,41 @@ class ContentPackVariableManager:
             Dictionary with usage statistics
         """
         try:
-            statement = select(ContentPackVariable)
-            all_variables = self.session.exec(statement).all()
-
-            stats = {
-                "total_variables": len(all_variables),
-                "unique_packs": len(set(var.content_pack_name for var in all_variables)),
-                "unique_users": len(set(var.user_id for var in all_variables)),
-                "pack_breakdown": {},
-                "variable_breakdown": {},
-            }
+            total_variables, unique_packs, unique_users = self.session.exec(
+                select(
+                    func.count(ContentPackVariable.id),
+                    func.count(func.distinct(ContentPackVariable.content_pack_name)),
+                    func.count(func.distinct(ContentPackVariable.user_id)),
+                )
+            ).one()
 
             # Count variables per pack
-            for var in all_variables:
-                pack_name = var.content_pack_name
-                if pack_name not in stats["pack_breakdown"]:
-                    stats["pack_breakdown"][pack_name] = 0
-                stats["pack_breakdown"][pack_name] += 1
+            pack_breakdown = dict(
+                self.session.exec(
+                    select(
+                        ContentPackVariable.content_pack_name,
+                        func.count(ContentPackVariable.id),
+                    ).group_by(ContentPackVariable.content_pack_name)
+                ).all()
+            )
 
             # Count usage per variable name
-            for var in all_variables:
-                var_name = var.variable_name
-                if var_name not in stats["variable_breakdown"]:
-                    stats["variable_breakdown"][var_name] = 0
-                stats["variable_breakdown"][var_name] += 1
+            variable_breakdown = dict(
+                self.session.exec(
+                    select(
+                        ContentPackVariable.variable_name,
+                        func.count(ContentPackVariable.id),
+                    ).group_by(ContentPackVariable.variable_name)
+                ).all()
+            )
 
-            return stats
+            return {
+                "total_variables": total_variables,
+                "unique_packs": unique_packs,
+                "unique_users": unique_users,
+                "pack_breakdown": pack_breakdown,
+                "variable_breakdown": variable_breakdown,
+            }
 
         except Exception as e:
             logging.error(f"Error getting variable usage stats: {e}")
@@ -366,6 +366,41 @@ class AddModuleConfigurationCategoryMigration(Migration):
             raise
 
 
+class AddAuditLogAggregateTableMigration(Migration):
+    """
+    Migration to add the hourly audit log rollup table used by retention.
+    """
+
+    def __init__(self):
+        super().__init__(
+            version="1.2.4",
+            name="add_audit_log_aggregate_table",
+            description="Add AuditLogHourlyAggregate table for audit log retention"
+        )
+
+    def upgrade(self, session: Session, database: DatabaseInterface) -> None:
+        """Create AuditLogHourlyAggregate table."""
+        from ..models import AuditLogHourlyAggregate
+
+        AuditLogHourlyAggregate.metadata.create_all(
+            database.engine, tables=[AuditLogHourlyAggregate.__table__]
+        )
+        logging.info("Created AuditLogHourlyAggregate table")
+
+    def downgrade(self, session: Session, database: DatabaseInterface) -> None:
+        """Drop AuditLogHourlyAggregate table."""
+        from ..models import AuditLogHourlyAggregate
+
+        try:
+            AuditLogHourlyAggregate.metadata.drop_all(
+                database.engine, tables=[AuditLogHourlyAggregate.__table__]
+            )
+            logging.info("Dropped AuditLogHourlyAggregate table")
+        except SQLAlchemyError as e:
+            logging.error(f"Failed to drop AuditLogHourlyAggregate table: {e}")
+            raise
+
+
 def get_all_migrations() -> List[Migration]:
     """
     Get all available migrations in order.
@@ -380,4 +415,5 @@ def get_all_migrations() -> List[Migration]:
         AddMCPTablesMigration(),
         AddModuleCategoriesMigration(),
         AddModuleConfigurationCategoryMigration(),
+        AddAuditLogAggregateTableMigration(),
     ]
\ No newline at end of file
@@ -4,24 +4,39 @@ Health check API endpoints for IntentVerse.
 Provides REST API endpoints for monitoring database and system health.
 """
 
+import asyncio
 import logging
+import threading
 import time
-from typing import Dict, Any, Annotated, Union
+from typing import Dict, Any, Annotated, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
+from . import database_compat
+from .config import Config
 from .models import User
-from .auth import get_current_user_or_service
-from .rbac import require_permission
+from .auth import (
+    api_key_header,
+    get_current_user_or_service,
+    oauth2_scheme,
+    service_api_key_header,
+)
+from .rbac import PermissionChecker, require_permission
 from .database import get_database
 from .database.validation import validate_database_config, test_database_connection
 
 
+PROCESS_START_TIME = time.time()
+
+
 class HealthStatus(BaseModel):
     """Health status response model."""
     status: str  # "healthy", "unhealthy", "degraded"
     timestamp: float
     checks: Dict[str, Any]
+    sampled_at: Optional[float] = None
+    age_seconds: Optional[float] = None
 
 
 class DatabaseHealthResponse(BaseModel):
@@ -44,70 +59,282 @@ class ConfigValidationResponse(BaseModel):
     warnings: list[str]
 
 
-def create_health_router() -> APIRouter:
+def collect_system_health() -> Dict[str, Any]:
+    """
+    Run the database and migration health checks.
+
+    This makes blocking database round-trips, so it must not be called on
+    the event loop.
+
+    Returns:
+        Dictionary with the overall ``status`` and per-component ``checks``
+    """
+    checks = {}
+    overall_status = "healthy"
+    
+    # Database health check
+    try:
+        database = get_database()
+        db_health = database.get_health_status()
+        checks["database"] = db_health
+        
+        if db_health["status"] != "healthy":
+            overall_status = "unhealthy"
+            
+    except Exception as e:
+        checks["database"] = {
+            "status": "unhealthy",
+            "error": str(e),
+            "timestamp": time.time()
+        }
+        overall_status = "unhealthy"
+    
+    # Migration status check
+    try:
+        database = get_database()
+        migration_status = database.get_migration_status()
+        checks["migrations"] = {
+            "status": "healthy" if migration_status["validation"]["valid"] else "degraded",
+            "current_version": migration_status["current_version"],
+            "pending_migrations": migration_status["pending_migrations"],
+            "validation_issues": migration_status["validation"]["issues"]
+        }
+        
+        if not migration_status["validation"]["valid"]:
+            overall_status = "degraded" if overall_status == "healthy" else overall_status
+            
+    except Exception as e:
+        checks["migrations"] = {
+            "status": "unhealthy",
+            "error": str(e)
+        }
+        overall_status = "unhealthy"
+    
+    # System uptime check
+    checks["system"] = {
+        "status": "healthy",
+        "uptime_seconds": time.time() - PROCESS_START_TIME,
+        "timestamp": time.time()
+    }
+
+    return {"status": overall_status, "checks": checks}
+
+
+def collect_readiness(timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Check that the database accepts connections.
+
+    Returns:
+        Dictionary with ``ready`` and, when not ready, an ``error`` message
+    """
+    try:
+        database = get_database()
+        success, error = database.test_connection(timeout=timeout)
+        if not success:
+            return {"ready": False, "error": f"Database not ready: {error}"}
+        return {"ready": True, "error": None}
+    except Exception as e:
+        logging.error(f"Readiness check failed: {e}")
+        return {"ready": False, "error": f"Service not ready: {str(e)}"}
+
+
+class HealthSampler:
+    """
+    Refreshes component health on a background thread.
+
+    Health and readiness probes are served from the latest snapshot instead of
+    querying the database on every request. A snapshot older than
+    ``max_staleness`` seconds is never served: the next probe resamples (in a
+    worker thread, off the event loop) before answering. When the sampler
+    thread is not running, probes still sample on demand and share the
+    result for up to ``max_staleness`` seconds.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        max_staleness: Optional[float] = None,
+        readiness_timeout: float = 5.0,
+    ):
+        self.interval = interval if interval is not None else Config.get_health_sample_interval()
+        self.max_staleness = (
+            max_staleness
+            if max_staleness is not None
+            else Config.get_health_max_staleness()
+        )
+        self.readiness_timeout = readiness_timeout
+
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._sample_lock = threading.Lock()
+        # The sample requests are waiting for, shared so that concurrent
+        # requests run the checks once
+        self._pending: Optional[asyncio.Future] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background sampling thread."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="health-sampler", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Health sampler started (interval {self.interval}s)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background sampling thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"Health sampling failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Run all health checks now and store the result as the latest snapshot.
+
+        Blocking; call from a worker thread.
+        """
+        with self._sample_lock:
+            started = time.time()
+            snapshot = {
+                "health": collect_system_health(),
+                "readiness": collect_readiness(self.readiness_timeout),
+                "sampled_at": time.time(),
+                "duration_ms": (time.time() - started) * 1000,
+            }
+            self._snapshot = snapshot
+            return snapshot
+
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Return the latest snapshot if it is within the staleness bound."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if time.time() - snapshot["sampled_at"] > self.max_staleness:
+            return None
+        return snapshot
+
+    async def get(self, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Return a snapshot, resampling in a worker thread if ``fresh`` is set
+        or the cached snapshot is missing or too stale.
+
+        Requests that need a sample while one is already being taken wait
+        for that one instead of running the checks again; it finishes after
+        they arrived, so it is fresh enough.
+        """
+        snapshot = None if fresh else self.get_snapshot()
+        if snapshot is not None:
+            return snapshot
+
+        pending = self._pending
+        if (
+            pending is None
+            or pending.done()
+            or pending.get_loop() is not asyncio.get_running_loop()
+        ):
+            pending = asyncio.ensure_future(run_in_threadpool(self.sample))
+            self._pending = pending
+        # One waiter being cancelled must not cancel the others' sample
+        return await asyncio.shield(pending)
+
+
+health_sampler = HealthSampler()
+
+
+def _check_fresh_sample_caller(
+    token: Optional[str], api_key: Optional[str], service_api_key: Optional[str]
+) -> None:
+    """
+    Allow only services and administrators to request fresh samples.
+
+    Raises:
+        HTTPException: 401 for anonymous callers, 403 for other users
+    """
+    if not token:
+        # Service keys are checked without touching the database
+        get_current_user_or_service(
+            session=None, api_key=api_key, service_api_key=service_api_key
+        )
+        return
+
+    session_gen = database_compat.get_session()
+    session = next(session_gen)
+    try:
+        caller = get_current_user_or_service(
+            session=session,
+            token=token,
+            api_key=api_key,
+            service_api_key=service_api_key,
+        )
+        if isinstance(caller, User) and not PermissionChecker(session).has_permission(
+            caller, "admin.all"
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Fresh health samples require an administrator",
+            )
+    finally:
+        session.close()
+
+
+async def authorize_fresh_sample(
+    fresh: bool = False,
+    token: Annotated[Optional[str], Depends(oauth2_scheme)] = None,
+    api_key: Annotated[Optional[str], Depends(api_key_header)] = None,
+    service_api_key: Annotated[Optional[str], Depends(service_api_key_header)] = None,
+) -> bool:
+    """
+    Dependency for the public probes' ``fresh`` parameter. Probes without it
+    stay anonymous and never touch the database; asking for a fresh sample
+    requires an administrator or a service.
+
+    Returns:
+        Whether a fresh sample was requested and allowed
+    """
+    if not fresh:
+        return False
+    await run_in_threadpool(_check_fresh_sample_caller, token, api_key, service_api_key)
+    return True
+
+
+def create_health_router(sampler: Optional[HealthSampler] = None) -> APIRouter:
     """Create and configure the health check API router."""
     router = APIRouter(prefix="/api/v2/health", tags=["Health Checks"])
+    sampler = sampler or health_sampler
     
     @router.get("/", response_model=HealthStatus)
-    async def get_system_health():
+    async def get_system_health(fresh: Annotated[bool, Depends(authorize_fresh_sample)]):
         """
         Get overall system health status.
         
         This endpoint is public and can be used for load balancer health checks.
+        It serves the latest background sample; administrators and services
+        can pass ``fresh=true`` to run the checks before answering.
         """
-        start_time = time.time()
-        checks = {}
-        overall_status = "healthy"
-        
-        # Database health check
-        try:
-            database = get_database()
-            db_health = database.get_health_status()
-            checks["database"] = db_health
-            
-            if db_health["status"] != "healthy":
-                overall_status = "unhealthy"
-                
-        except Exception as e:
-            checks["database"] = {
-                "status": "unhealthy",
-                "error": str(e),
-                "timestamp": time.time()
-            }
-            overall_status = "unhealthy"
-        
-        # Migration status check
-        try:
-            database = get_database()
-            migration_status = database.get_migration_status()
-            checks["migrations"] = {
-                "status": "healthy" if migration_status["validation"]["valid"] else "degraded",
-                "current_version": migration_status["current_version"],
-                "pending_migrations": migration_status["pending_migrations"],
-                "validation_issues": migration_status["validation"]["issues"]
-            }
-            
-            if not migration_status["validation"]["valid"]:
-                overall_status = "degraded" if overall_status == "healthy" else overall_status
-                
-        except Exception as e:
-            checks["migrations"] = {
-                "status": "unhealthy",
-                "error": str(e)
-            }
-            overall_status = "unhealthy"
-        
-        # System uptime check
-        checks["system"] = {
-            "status": "healthy",
-            "uptime_seconds": time.time() - start_time,
-            "timestamp": time.time()
-        }
+        snapshot = await sampler.get(fresh=fresh)
+        now = time.time()
         
         return HealthStatus(
-            status=overall_status,
-            timestamp=time.time(),
-            checks=checks
+            status=snapshot["health"]["status"],
+            timestamp=now,
+            checks=snapshot["health"]["checks"],
+            sampled_at=snapshot["sampled_at"],
+            age_seconds=now - snapshot["sampled_at"],
         )
     
     @router.get("/database", response_model=DatabaseHealthResponse)
@@ -199,34 +426,49 @@ def create_health_router() -> APIRouter:
             )
     
     @router.get("/readiness")
-    async def readiness_check():
+    async def readiness_check(fresh: Annotated[bool, Depends(authorize_fresh_sample)]):
         """
         Kubernetes/Docker readiness probe endpoint.
         
-        Returns 200 if the service is ready to accept traffic.
+        Returns 200 if the service is ready to accept traffic, based on the
+        latest background sample unless an administrator or service gives
+        ``fresh=true``.
         """
-        try:
-            # Check database connectivity
-            database = get_database()
-            success, error = database.test_connection(timeout=5.0)
-            
-            if not success:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail=f"Database not ready: {error}"
-                )
-            
-            return {"status": "ready", "timestamp": time.time()}
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logging.error(f"Readiness check failed: {e}")
+        snapshot = await sampler.get(fresh=fresh)
+        readiness = snapshot["readiness"]
+        
+        if not readiness["ready"]:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"Service not ready: {str(e)}"
+                detail=readiness["error"]
             )
+        
+        return {
+            "status": "ready",
+            "timestamp": time.time(),
+            "sampled_at": snapshot["sampled_at"],
+        }
     
+    @router.get("/websockets")
+    async def websocket_stats():
+        """
+        WebSocket broadcast metrics: per-channel connections, queue depths,
+        and sent, dropped and disconnected message counts.
+        """
+        from .websocket_manager import manager
+
+        return manager.get_stats()
+
+    @router.get("/password-hashing")
+    async def password_hashing_stats():
+        """
+        Password hashing pool metrics: load, rejections, and queue wait and
+        hashing time percentiles.
+        """
+        from .password_hashing import password_hasher
+
+        return password_hasher.get_stats()
+
     @router.get("/liveness")
     async def liveness_check():
         """
@@ -0,0 +1,226 @@
+"""
+JWT signing keys.
+
+Tokens are signed with the key ring's active key, and the key id (``kid``)
+is put in the token header so that verification picks the right key. By
+default the ring holds one random key per process, so tokens do not
+survive a restart and are not accepted by other worker processes.
+
+With a key ring file, all workers share the keys in it: the first worker
+to start creates the file, and a worker that meets an unknown key id (or
+notices the file changed) reloads it. Rotation adds a new active key and
+keeps the previous ones for verification until ``max_keys`` is exceeded,
+so rotating never invalidates tokens that are still in use.
+"""
+
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+
+try:
+    import fcntl
+
+    _FCNTL_AVAILABLE = True
+except ImportError:
+    _FCNTL_AVAILABLE = False
+
+# Minimum seconds between checks of the key ring file for changes
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+def _new_key() -> Dict[str, str]:
+    return {
+        "kid": secrets.token_hex(8),
+        "secret": secrets.token_hex(32),
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+class KeyRing:
+    """
+    Signing keys identified by key id, optionally persisted to a file.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_keys: int = 3,
+        rotation_days: float = 0,
+    ):
+        """
+        Args:
+            path: Key ring file shared by worker processes; None keeps a
+                single random key in memory
+            max_keys: Number of keys kept for verification, including the
+                active one
+            rotation_days: Age at which the active key is replaced; 0
+                never rotates automatically
+        """
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+        self.path = Path(path) if path else None
+        self.max_keys = max_keys
+        self.rotation_days = rotation_days
+        self._lock = threading.Lock()
+        self._keys: List[Dict[str, str]] = []
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+        if self.path is None:
+            self._keys = [_new_key()]
+        else:
+            self._load(create=True)
+
+    @classmethod
+    def from_config(cls) -> "KeyRing":
+        """Build the key ring from INTENTVERSE_KEY_RING_* environment settings."""
+        return cls(**Config.get_key_ring_config())
+
+    @contextmanager
+    def _file_lock(self):
+        # Serialises creation and rotation between processes
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with open(lock_path, "a") as lock_file:
+            if _FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if _FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_file(self) -> Optional[List[Dict[str, str]]]:
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return None
+        return data["keys"]
+
+    def _write_file(self, keys: List[Dict[str, str]]) -> None:
+        temporary = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as key_file:
+            json.dump({"keys": keys}, key_file)
+            key_file.flush()
+            os.fsync(key_file.fileno())
+        os.replace(temporary, self.path)
+
+    def _load(self, create: bool = False) -> None:
+        keys = self._read_file()
+        if keys is None and create:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                keys = self._read_file()
+                if keys is None:
+                    keys = [_new_key()]
+                    self._write_file(keys)
+                    logging.info(f"Created JWT key ring {self.path}")
+        if keys:
+            with self._lock:
+                self._keys = keys
+                self._mtime = self.path.stat().st_mtime
+                self._checked_at = time.monotonic()
+
+    def _reload_if_changed(self, force: bool = False) -> None:
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            if force or self.path.stat().st_mtime != self._mtime:
+                self._load()
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Failed to reload JWT key ring {self.path}: {e}")
+
+    def _is_due(self, key: Dict[str, str]) -> bool:
+        if self.rotation_days <= 0:
+            return False
+        created = datetime.fromisoformat(key["created_at"])
+        return datetime.utcnow() - created >= timedelta(days=self.rotation_days)
+
+    def rotate(self, only_if_due: bool = False) -> str:
+        """
+        Make a new key active, retiring keys beyond ``max_keys``.
+
+        Args:
+            only_if_due: Only rotate if the active key has reached the
+                rotation age; checked under the file lock, so that workers
+                racing to rotate add a single key
+
+        Returns:
+            The active key id
+        """
+        if self.path is None:
+            with self._lock:
+                if not only_if_due or self._is_due(self._keys[-1]):
+                    self._keys = (self._keys + [_new_key()])[-self.max_keys :]
+                return self._keys[-1]["kid"]
+
+        with self._file_lock():
+            keys = self._read_file() or []
+            if not keys or not only_if_due or self._is_due(keys[-1]):
+                keys.append(_new_key())
+                self._write_file(keys[-self.max_keys :])
+                logging.info(f"Rotated JWT signing key, new key id {keys[-1]['kid']}")
+        self._load()
+        with self._lock:
+            return self._keys[-1]["kid"]
+
+    def get_signing_key(self) -> Tuple[str, str]:
+        """
+        Get the key new tokens are signed with, rotating it first if due.
+
+        Returns:
+            The active key id and secret
+        """
+        self._reload_if_changed()
+        with self._lock:
+            active = self._keys[-1]
+        if self._is_due(active):
+            self.rotate(only_if_due=True)
+            with self._lock:
+                active = self._keys[-1]
+        return active["kid"], active["secret"]
+
+    def get_key(self, kid: Optional[str]) -> Optional[str]:
+        """
+        Get the secret for a key id.
+
+        Args:
+            kid: Key id from a token header; None (tokens issued before key
+                ids were added) selects the active key
+
+        Returns:
+            The secret, or None if the key is unknown or retired
+        """
+        if kid is None:
+            return self.get_signing_key()[1]
+        secret = self._find(kid)
+        if secret is None:
+            # Another worker may have rotated; the file check is rate limited
+            self._reload_if_changed()
+            secret = self._find(kid)
+        return secret
+
+    def _find(self, kid: str) -> Optional[str]:
+        with self._lock:
+            for key in self._keys:
+                if key["kid"] == kid:
+                    return key["secret"]
+        return None
+
+    def key_ids(self) -> List[str]:
+        """Key ids accepted for verification, oldest first."""
+        with self._lock:
+            return [key["kid"] for key in self._keys]
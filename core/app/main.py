@@ -15,13 +15,18 @@ from .init_db import init_db
 from .content_pack_manager import ContentPackManager
 from .logging_config import setup_logging
 from .modules.timeline.tool import router as timeline_router
-from .middleware import AuthenticationMiddleware, RateLimitHeaderMiddleware, RequestLoggingMiddleware
+from .middleware import RequestPipelineMiddleware
 from .rate_limiter import limiter, custom_rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from .version_manager import VersionMiddleware, create_version_router
+from .version_manager import create_version_router
 from .migration_api import create_migration_router
-from .health_api import create_health_router
-from .security_headers import create_security_headers_middleware
+from .health_api import create_health_router, health_sampler
+from .audit_retention import AuditRetentionManager
+from .token_revocation import RefreshTokenCompactor, revocation_set
+from .websocket_manager import state_change_notifier
+from .password_hashing import password_hasher
+from .security_headers import get_security_headers_config
+from .config import Config
 
 # Apply the JSON logging configuration at the earliest point
 setup_logging()
@@ -56,10 +61,46 @@ async def lifespan(app: FastAPI):
 
     # Load default content pack after modules are loaded
     if not is_testing:
-        content_pack_manager.load_default_content_pack()
+        # With shared or persisted state it is only loaded once; later
+        # workers and restarts pick up the stored state instead
+        if state_manager.claim("default_content_pack"):
+            content_pack_manager.load_default_content_pack()
+        else:
+            logging.info("Default content pack already loaded into shared state")
     else:
         logging.info("Skipping content pack loading during tests")
 
+    # Sample health in the background so probes never block on the database
+    if not is_testing:
+        health_sampler.start()
+    else:
+        logging.info("Skipping health sampler during tests")
+
+    # Apply audit log retention in the background (if a policy is configured)
+    audit_retention = None
+    if not is_testing:
+        from .database import get_database
+
+        audit_retention = AuditRetentionManager(get_database().engine)
+        audit_retention.start()
+
+    # Serve refresh token revocation checks from memory, and delete expired
+    # and revoked refresh tokens in the background
+    token_compactor = None
+    if not is_testing:
+        from .database import get_database
+
+        try:
+            loaded = revocation_set.load(get_database().engine)
+            logging.info(f"Loaded {loaded} revoked refresh tokens")
+        except Exception as e:
+            logging.error(f"Failed to load revoked refresh tokens: {e}")
+        token_compactor = RefreshTokenCompactor(get_database().engine)
+        token_compactor.start()
+
+    # Push module state changes to WebSocket subscribers
+    state_change_notifier.start(state_manager)
+
     # Log system startup event (skip during tests to avoid database issues)
     if not is_testing:
         from .modules.timeline.tool import log_system_event
@@ -75,6 +116,14 @@ async def lifespan(app: FastAPI):
     yield
     # This code runs on server shutdown
     logging.info("--- IntentVerse Core Engine Shutting Down ---")
+    health_sampler.stop()
+    state_change_notifier.stop()
+    password_hasher.shutdown()
+    state_manager.close()
+    if audit_retention is not None:
+        audit_retention.stop()
+    if token_compactor is not None:
+        token_compactor.stop()
 
     # Log system shutdown event (skip during tests to avoid database issues)
     import os
@@ -106,23 +155,16 @@ app = FastAPI(
 )
 
 
-# Add authentication middleware (must be first to set user state)
-app.add_middleware(AuthenticationMiddleware)
-
-# Add rate limiting header middleware
-app.add_middleware(RateLimitHeaderMiddleware)
-
-# Add request logging middleware
-app.add_middleware(RequestLoggingMiddleware)
-
-# Add API versioning middleware
-app.add_middleware(VersionMiddleware)
-
-# Add security headers middleware
+# Add the request pipeline middleware. A single pure ASGI middleware handles
+# auth state, API versioning, request logging, rate limit headers and security
+# headers; stages can be disabled with INTENTVERSE_MIDDLEWARE_DISABLED_STAGES.
 import os
 environment = os.getenv("INTENTVERSE_ENVIRONMENT", "production")
-security_middleware = create_security_headers_middleware(environment)
-app.add_middleware(security_middleware)
+app.add_middleware(
+    RequestPipelineMiddleware,
+    security_config=get_security_headers_config(environment),
+    disabled_stages=Config.get_disabled_middleware_stages(),
+)
 
 # Add the rate limiter to the app
 # Rate limits are configured as follows:
@@ -133,6 +175,8 @@ app.add_middleware(security_middleware)
 # - RATE_LIMIT_UNAUTH: Rate limit for unauthenticated users (default: 30/minute)
 # - RATE_LIMIT_AUTH: Rate limit for authenticated users (default: 100/minute)
 # - RATE_LIMIT_ADMIN: Rate limit for admin users and services (default: 200/minute)
+# Tool execution is limited separately, per tool cost, by
+# rate_limiter.check_tool_rate_limit (INTENTVERSE_EXECUTE_RATE_LIMIT)
 app.state.limiter = limiter
 
 # Add custom rate limit exceeded handler
@@ -6,12 +6,86 @@ This module contains middleware components for the application.
 import logging
 import time
 import os
+from typing import Any, Dict, Iterable, Optional
 from fastapi import Request, Response
+from starlette.datastructures import Headers, QueryParams
 from starlette.middleware.base import BaseHTTPMiddleware
-from .rate_limiter import add_rate_limit_headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .rate_limiter import add_rate_limit_headers, get_rate_limit_headers
+from .security_headers import SecurityHeaderPolicy
+from .version_manager import (
+    get_version_headers,
+    resolve_request_version,
+    unsupported_version_response,
+    version_manager,
+)
 from .modules.timeline.tool import log_error as timeline_log_error
 
 
+def get_user_from_authorization(auth_header: Optional[str]) -> Optional[Any]:
+    """
+    Look up the user for a ``Bearer`` Authorization header.
+
+    Args:
+        auth_header: Value of the Authorization header, if any
+
+    Returns:
+        The User the token belongs to, or None
+    """
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+
+    try:
+        token = auth_header.split(" ")[1]
+
+        # Decode the token to get user info
+        from .security import decode_access_token
+        username = decode_access_token(token)
+
+        if username:
+            # Get user from database
+            from .database_compat import get_session
+            from .models import User
+            from sqlmodel import Session, select
+
+            session_gen = get_session()
+            session = next(session_gen)
+
+            try:
+                return session.exec(select(User).where(User.username == username)).first()
+            finally:
+                session.close()
+
+    except Exception as e:
+        # Don't fail the request if auth middleware has issues
+        logging.debug(f"Auth middleware error (non-critical): {e}")
+
+    return None
+
+
+def log_request_error(path: str, error: Exception) -> None:
+    """Log an unhandled request error to the timeline."""
+    try:
+        timeline_log_error(
+            title="API Request Error",
+            description=f"Error processing request to {path}: {str(error)}",
+            details={
+                "error_type": type(error).__name__,
+                "error_details": str(error),
+            },
+        )
+    except Exception as log_err:
+        logging.error(f"Failed to log error to timeline: {log_err}")
+
+
+def internal_server_error_response() -> Response:
+    return Response(
+        content='{"detail":"Internal server error"}',
+        status_code=500,
+        media_type="application/json",
+    )
+
+
 class AuthenticationMiddleware(BaseHTTPMiddleware):
     """
     Middleware to set user state from JWT tokens for rate limiting.
@@ -22,39 +96,10 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
         """
         Extract user information from JWT token and set it in request state.
         """
-        # Initialize user state
-        request.state.user = None
-        
-        try:
-            # Try to get JWT token from Authorization header
-            auth_header = request.headers.get("Authorization")
-            if auth_header and auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
-                
-                # Decode the token to get user info
-                from .security import decode_access_token
-                username = decode_access_token(token)
-                
-                if username:
-                    # Get user from database
-                    from .database_compat import get_session
-                    from .models import User
-                    from sqlmodel import Session, select
-                    
-                    session_gen = get_session()
-                    session = next(session_gen)
-                    
-                    try:
-                        user = session.exec(select(User).where(User.username == username)).first()
-                        if user:
-                            request.state.user = user
-                    finally:
-                        session.close()
-                        
-        except Exception as e:
-            # Don't fail the request if auth middleware has issues
-            logging.debug(f"Auth middleware error (non-critical): {e}")
-        
+        request.state.user = get_user_from_authorization(
+            request.headers.get("Authorization")
+        )
+
         # Continue with the request
         response = await call_next(request)
         return response
@@ -89,24 +134,10 @@ class RateLimitHeaderMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             logging.exception(f"Error processing request: {e}")
             # Log the error to the timeline
-            try:
-                timeline_log_error(
-                    title="API Request Error",
-                    description=f"Error processing request to {request.url.path}: {str(e)}",
-                    details={
-                        "error_type": type(e).__name__,
-                        "error_details": str(e),
-                    },
-                )
-            except Exception as log_err:
-                logging.error(f"Failed to log error to timeline: {log_err}")
+            log_request_error(request.url.path, e)
 
             # Return a 500 error response
-            return Response(
-                content='{"detail":"Internal server error"}',
-                status_code=500,
-                media_type="application/json",
-            )
+            return internal_server_error_response()
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
@@ -158,3 +189,172 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
                 f"- Error: {str(e)}"
             )
             raise
+
+
+class RequestPipelineMiddleware:
+    """
+    Pure ASGI middleware that runs every per-request stage in one pass:
+    auth-state extraction, API version routing, request timing, rate limit
+    headers and security headers.
+
+    This replaces stacking AuthenticationMiddleware, RateLimitHeaderMiddleware,
+    RequestLoggingMiddleware, VersionMiddleware and SecurityHeadersMiddleware,
+    each of which runs the rest of the app in an extra task and re-streams the
+    response. Here response headers are added to the ``http.response.start``
+    message as it passes through, so streaming responses are left intact.
+
+    Stages can be switched off individually with ``disabled_stages``.
+    """
+
+    STAGES = ("auth", "versioning", "timing", "rate_limit_headers", "security_headers")
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        security_config: Optional[Dict[str, Any]] = None,
+        disabled_stages: Iterable[str] = (),
+    ):
+        self.app = app
+        disabled = set(disabled_stages)
+        unknown = disabled - set(self.STAGES)
+        if unknown:
+            raise ValueError(
+                f"Unknown middleware stages {sorted(unknown)}, expected {self.STAGES}"
+            )
+
+        self.enabled_stages = tuple(s for s in self.STAGES if s not in disabled)
+        self.auth = "auth" in self.enabled_stages
+        self.versioning = "versioning" in self.enabled_stages
+        self.timing = "timing" in self.enabled_stages
+        self.rate_limit_headers = "rate_limit_headers" in self.enabled_stages
+        self.security_headers = "security_headers" in self.enabled_stages
+        self.security_policy = SecurityHeaderPolicy(security_config)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        path = scope["path"]
+        method = scope["method"]
+        headers = Headers(scope=scope)
+
+        # Request.state is backed by this dict
+        state = scope.setdefault("state", {})
+
+        # Handle preflight CORS requests
+        if (
+            self.security_headers
+            and method == "OPTIONS"
+            and self.security_policy.is_api_path(path)
+        ):
+            response = Response(
+                status_code=200,
+                headers=self.security_policy.cors_headers(headers.get("origin")),
+            )
+            await response(scope, receive, send)
+            return
+
+        version = None
+        endpoint = self.app
+        if self.versioning and path.startswith("/api"):
+            version = resolve_request_version(path, headers.get("X-API-Version"))
+            if version_manager.is_version_supported(version):
+                # Add version to request state for handlers to use
+                state["api_version"] = version
+            else:
+                endpoint = unsupported_version_response(version)
+                version = None
+
+        if self.auth and endpoint is self.app:
+            state["user"] = get_user_from_authorization(headers.get("Authorization"))
+
+        status_code = 500
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                self._apply_response_headers(message, scope, headers, version)
+            await send(message)
+
+        try:
+            await endpoint(scope, receive, send_wrapper)
+        except Exception as e:
+            if response_started:
+                # Too late to replace the response, let the server handle it
+                raise
+            logging.exception(f"Error processing request: {e}")
+            # Log the error to the timeline
+            log_request_error(path, e)
+            await internal_server_error_response()(scope, receive, send_wrapper)
+        finally:
+            if self.timing:
+                self._log_request(scope, headers, status_code, start_time)
+
+    def _apply_response_headers(
+        self,
+        message: Message,
+        scope: Scope,
+        request_headers: Headers,
+        version: Optional[str],
+    ) -> None:
+        """Add the enabled stages' headers to an ``http.response.start`` message."""
+        path = scope["path"]
+        updates: Dict[str, str] = {}
+
+        if version:
+            updates.update(get_version_headers(version))
+
+        # Add rate limiting headers for API endpoints and auth endpoints
+        if self.rate_limit_headers and path.startswith(("/api", "/auth")):
+            updates.update(get_rate_limit_headers(Request(scope)))
+
+        if self.security_headers:
+            try:
+                query_string = scope.get("query_string", b"")
+                download = (
+                    b"download" in query_string
+                    and "download" in QueryParams(query_string)
+                )
+                updates.update(
+                    self.security_policy.response_headers(
+                        path, request_headers.get("origin"), download
+                    )
+                )
+            except Exception as e:
+                # Continue with the response even if header application fails
+                logging.error(f"Error in security headers middleware: {e}")
+
+        if not updates:
+            return
+
+        encoded = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in updates.items()
+        ]
+        replaced = {name for name, _ in encoded}
+        message["headers"] = [
+            (name, value)
+            for name, value in message.get("headers", [])
+            if name.lower() not in replaced
+        ] + encoded
+
+    def _log_request(
+        self, scope: Scope, headers: Headers, status_code: int, start_time: float
+    ) -> None:
+        process_time = time.perf_counter() - start_time
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        user_agent = headers.get("user-agent", "unknown")
+
+        logging.info(
+            f"Request: {scope['method']} {scope['path']} "
+            f"- Status: {status_code} "
+            f"- Time: {process_time:.4f}s "
+            f"- IP: {client_ip} "
+            f"- UA: {user_agent}"
+        )
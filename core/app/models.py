@@ -192,6 +192,22 @@ class AuditLog(SQLModel, table=True):
     user: Optional[User] = Relationship()
 
 
+class AuditLogHourlyAggregate(SQLModel, table=True):
+    """
+    Hourly rollup of audit log entries that have been removed by retention.
+
+    Several rows may exist for the same hour and key (one per retention
+    batch), so readers should SUM ``count``.
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    hour: datetime = Field(index=True)  # Start of the hour (UTC)
+    action: str = Field(index=True)
+    username: str = Field(index=True)
+    status: str = Field(index=True)
+    count: int = Field(default=0)
+
+
 class ModuleCategory(SQLModel, table=True):
     """
     Represents module categories for organizing modules into logical groups.
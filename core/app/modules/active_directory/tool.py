@@ -16,6 +16,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from base_module_template import SandboxModule
+from indexed_collection import paginate
 from mock_data_generator import MockDataGenerator
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,13 @@ class ActiveDirectoryTool(SandboxModule):
     Active Directory module implementation for sandbox environment.
     Provides mock AD functionality for learning and testing.
     """
+
+    collection_indexes = {
+        "users": {
+            "hash": ["username"],
+            "text": ["display_name", "department", "username", "distinguished_name"],
+        }
+    }
     
     def __init__(self):
         super().__init__(
@@ -37,7 +45,6 @@ class ActiveDirectoryTool(SandboxModule):
         self.mock_generator = MockDataGenerator()
         self.domain_name = "sandbox.local"
         self.domain_controller = "DC01.sandbox.local"
-        self.initialize_mock_data()
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -235,7 +242,9 @@ class ActiveDirectoryTool(SandboxModule):
                 "parameters": {
                     "filter": {"type": "string", "description": "Filter users by name, department, or status"},
                     "ou": {"type": "string", "description": "Filter by Organizational Unit"},
-                    "enabled_only": {"type": "boolean", "description": "Show only enabled accounts"}
+                    "enabled_only": {"type": "boolean", "description": "Show only enabled accounts"},
+                    "limit": {"type": "integer", "description": "Maximum number of results to return", "default": 100},
+                    "offset": {"type": "integer", "description": "Number of results to skip", "default": 0}
                 },
                 "is_sandbox": True
             },
@@ -337,41 +346,29 @@ class ActiveDirectoryTool(SandboxModule):
     def list_users(self, **kwargs) -> Dict[str, Any]:
         """List domain users with filtering options."""
         try:
-            users = self.mock_data.get("users", [])
             filter_text = kwargs.get("filter", "").lower()
             ou_filter = kwargs.get("ou", "")
             enabled_only = kwargs.get("enabled_only", False)
             
             # Apply filters
-            filtered_users = users
-            
-            if filter_text:
-                filtered_users = [
-                    user for user in filtered_users
-                    if (filter_text in user["display_name"].lower() or
-                        filter_text in user["department"].lower() or
-                        filter_text in user["username"].lower())
-                ]
-            
-            if ou_filter:
-                filtered_users = [
-                    user for user in filtered_users
-                    if ou_filter.lower() in user["distinguished_name"].lower()
-                ]
-            
-            if enabled_only:
-                filtered_users = [
-                    user for user in filtered_users
-                    if user.get("enabled", True)
-                ]
+            filtered_users = self.get_collection("users").query(
+                contains=[
+                    (filter_text, ("display_name", "department", "username")),
+                    (ou_filter, ("distinguished_name",)),
+                ],
+                where=(lambda user: user.get("enabled", True)) if enabled_only else None,
+            )
+            page, pagination = paginate(
+                filtered_users, kwargs.get("limit"), kwargs.get("offset", 0)
+            )
             
             return {
                 "tool": "list_users",
                 "status": "success",
                 "timestamp": datetime.utcnow().isoformat(),
                 "data": {
-                    "users": filtered_users,
-                    "total_count": len(filtered_users),
+                    "users": page,
+                    **pagination,
                     "filters_applied": {
                         "filter": filter_text,
                         "ou": ou_filter,
@@ -406,7 +403,7 @@ class ActiveDirectoryTool(SandboxModule):
             
             # Check if user already exists
             existing_users = self.mock_data.get("users", [])
-            if any(user["username"] == username for user in existing_users):
+            if self.get_collection("users").get("username", username):
                 raise ValueError(f"User {username} already exists")
             
             # Create new user
@@ -474,8 +471,7 @@ class ActiveDirectoryTool(SandboxModule):
                 raise ValueError("Username and password are required")
             
             # Find user
-            users = self.mock_data.get("users", [])
-            user = next((u for u in users if u["username"] == username), None)
+            user = self.get_collection("users").get("username", username)
             
             if not user:
                 return {
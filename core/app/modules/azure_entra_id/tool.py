@@ -34,9 +34,8 @@ class AzureEntraIdTool(SandboxModule):
             description="Mock Azure Entra ID environment for cloud identity and access management"
         )
         self.mock_generator = MockDataGenerator()
-        self.tenant_id = str(uuid.uuid4())
         self.tenant_domain = "sandbox.onmicrosoft.com"
-        self.initialize_mock_data()
+        self.tenant_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, self.tenant_domain))
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -64,7 +63,7 @@ class AzureEntraIdTool(SandboxModule):
         users = self.mock_generator.generate_users(40)
         for user in users:
             user.update({
-                "object_id": str(uuid.uuid4()),
+                "object_id": self.mock_uuid(),
                 "user_principal_name": f"{user['username']}@{self.tenant_domain}",
                 "mail": user["email"],
                 "user_type": random.choice(["Member", "Member", "Member", "Guest"]),
@@ -94,7 +93,7 @@ class AzureEntraIdTool(SandboxModule):
         # Generate Azure AD groups and roles
         groups_and_roles = [
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "Global Administrators",
                 "description": "Can manage all aspects of Azure AD and Microsoft services",
                 "type": "Directory Role",
@@ -106,7 +105,7 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "IT Administrators",
                 "description": "IT department security group",
                 "type": "Security Group",
@@ -118,7 +117,7 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "All Company",
                 "description": "All company employees",
                 "type": "Microsoft 365 Group",
@@ -130,7 +129,7 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "Developers",
                 "description": "Software development team",
                 "type": "Security Group",
@@ -147,8 +146,8 @@ class AzureEntraIdTool(SandboxModule):
         # Generate application registrations
         applications = [
             {
-                "id": str(uuid.uuid4()),
-                "app_id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
+                "app_id": self.mock_uuid(),
                 "display_name": "Sandbox Web App",
                 "description": "Internal web application for sandbox testing",
                 "created_date": "2020-06-15T11:00:00Z",
@@ -166,8 +165,8 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
-                "app_id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
+                "app_id": self.mock_uuid(),
                 "display_name": "Mobile App",
                 "description": "Company mobile application",
                 "created_date": "2021-03-20T14:30:00Z",
@@ -184,8 +183,8 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
-                "app_id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
+                "app_id": self.mock_uuid(),
                 "display_name": "API Service",
                 "description": "Backend API service",
                 "created_date": "2021-08-10T09:15:00Z",
@@ -206,7 +205,7 @@ class AzureEntraIdTool(SandboxModule):
         # Generate conditional access policies
         conditional_access_policies = [
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "Require MFA for Admins",
                 "description": "Require multi-factor authentication for all administrator roles",
                 "state": "Enabled",
@@ -223,7 +222,7 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "Block Legacy Authentication",
                 "description": "Block legacy authentication protocols",
                 "state": "Enabled",
@@ -239,7 +238,7 @@ class AzureEntraIdTool(SandboxModule):
                 "is_sandbox": True
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": self.mock_uuid(),
                 "display_name": "Require Compliant Device",
                 "description": "Require device compliance for high-risk applications",
                 "state": "Report-only",
@@ -4,14 +4,85 @@ This provides a standardized structure and common functionality for all module t
 """
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional, Union
-from datetime import datetime
+from datetime import date, datetime
+import hashlib
+import inspect
 import logging
 import json
+import os
+import random
+import re
+import threading
+import uuid
 from pathlib import Path
 
+try:
+    from .indexed_collection import IndexedCollection
+    from ..config import Config
+except ImportError:
+    # Sandbox tools import this module top-level from the modules directory
+    from indexed_collection import IndexedCollection
+    from app.config import Config
+
 logger = logging.getLogger(__name__)
 
+# Version of the mock data cache file layout
+MOCK_DATA_CACHE_FORMAT = 1
+
+# ISO 8601 dates and datetimes (as written by isoformat() or str()) in mock
+# data, which are moved forward when cached data is loaded
+_TIMESTAMP_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?"
+)
+
+# Generators use the module-level `random` functions, so seeding swaps the
+# global generator state; the lock keeps concurrent generations apart.
+_seeded_random_lock = threading.RLock()
+
+
+@contextmanager
+def seeded_random(seed: int):
+    """
+    Seed the global `random` generator for the duration of the block and
+    restore its previous state afterwards.
+
+    Args:
+        seed: Seed to use inside the block
+    """
+    with _seeded_random_lock:
+        previous_state = random.getstate()
+        random.seed(seed)
+        try:
+            yield
+        finally:
+            random.setstate(previous_state)
+
+
+def _shift_timestamps(value: Any, offset) -> Any:
+    """
+    Return a copy of JSON data with every date and datetime string moved by
+    ``offset``, keeping each string's format.
+    """
+    if isinstance(value, dict):
+        return {key: _shift_timestamps(item, offset) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shift_timestamps(item, offset) for item in value]
+    if not isinstance(value, str) or not _TIMESTAMP_PATTERN.fullmatch(value):
+        return value
+
+    try:
+        if len(value) == 10:
+            return (date.fromisoformat(value) + offset).isoformat()
+        shifted = datetime.fromisoformat(value.replace("Z", "+00:00")) + offset
+    except (ValueError, OverflowError):
+        return value
+    text = shifted.isoformat(sep="T" if "T" in value else " ")
+    if value.endswith("Z"):
+        text = text.replace("+00:00", "Z")
+    return text
+
 
 class BaseModuleTemplate(ABC):
     """
@@ -36,11 +107,154 @@ class BaseModuleTemplate(ABC):
         self.is_sandbox = True  # All new modules are sandbox by default
         self.default_enabled = False  # New modules disabled by default
         self.tools = {}
-        self.mock_data = {}
+        self._mock_data: Optional[Dict[str, Any]] = None
+        self._mock_data_lock = threading.RLock()
+        self._mock_data_loading = False
+        # Mock data is generated lazily on first use, seeded so that the
+        # same seed yields the same dataset, and cached on disk so restarts
+        # reuse it instead of regenerating
+        mock_data_config = Config.get_mock_data_config()
+        self.mock_data_seed = mock_data_config["seed"]
+        self.mock_data_cache_enabled = mock_data_config["cache_enabled"]
+        self.mock_data_cache_dir = Path(mock_data_config["cache_dir"])
         self.config = {}
         self.health_status = "unknown"
         self.last_health_check = None
         
+    @property
+    def mock_data(self) -> Dict[str, Any]:
+        """
+        Mock data for the module, generated on first access.
+        """
+        if self._mock_data is None:
+            return self.ensure_mock_data()
+        return self._mock_data
+
+    @mock_data.setter
+    def mock_data(self, value: Dict[str, Any]) -> None:
+        self._mock_data = value
+
+    @property
+    def mock_data_loaded(self) -> bool:
+        """Whether mock data has been generated or loaded yet."""
+        return self._mock_data is not None
+
+    def ensure_mock_data(self) -> Dict[str, Any]:
+        """
+        Load mock data if it has not been loaded yet.
+
+        The disk cache is tried first; on a miss the data is generated with
+        initialize_mock_data() under the module's seed and written back to
+        the cache.
+
+        Returns:
+            The module's mock data
+        """
+        with self._mock_data_lock:
+            if self._mock_data is not None:
+                return self._mock_data
+            if self._mock_data_loading:
+                # initialize_mock_data() read self.mock_data before assigning it
+                return {}
+
+            self._mock_data_loading = True
+            try:
+                mock_data = self._read_mock_data_cache()
+                if mock_data is None:
+                    with seeded_random(self.mock_data_seed):
+                        mock_data = self.initialize_mock_data()
+                    self._write_mock_data_cache(mock_data)
+                self._mock_data = mock_data
+            finally:
+                self._mock_data_loading = False
+
+            return self._mock_data
+
+    def mock_uuid(self) -> str:
+        """
+        Return a UUID4 string drawn from `random`, so that it is reproducible
+        when generated under seeded_random().
+        """
+        return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
+    def get_mock_data_cache_path(self) -> Path:
+        """
+        Return the disk cache path for this module's mock data.
+
+        The file name includes the seed and a fingerprint of the module's
+        source, so changing either generates a fresh dataset.
+        """
+        return self.mock_data_cache_dir / (
+            f"{self.module_id}-{self.mock_data_seed}-{self._get_source_fingerprint()}.json"
+        )
+
+    def _get_source_fingerprint(self) -> str:
+        """Return a short hash of the source file that defines this module."""
+        try:
+            source_file = inspect.getsourcefile(self.__class__)
+            with open(source_file, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()[:12]
+        except (OSError, TypeError):
+            return "nosource"
+
+    def _read_mock_data_cache(self) -> Optional[Dict[str, Any]]:
+        """
+        Read cached mock data from disk, returning None on a miss.
+
+        Generated timestamps are relative to the time of generation, so they
+        are moved forward by the time elapsed since, as if the data had just
+        been generated.
+        """
+        if not self.mock_data_cache_enabled:
+            return None
+
+        cache_path = self.get_mock_data_cache_path()
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("format") != MOCK_DATA_CACHE_FORMAT:
+                return None
+            generated_at = datetime.fromisoformat(cached["generated_at"])
+            mock_data = cached["data"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable mock data cache {cache_path}: {e}")
+            return None
+
+        if not isinstance(mock_data, dict):
+            return None
+
+        logger.debug(f"Loaded mock data for {self.module_id} from {cache_path}")
+        return _shift_timestamps(mock_data, datetime.now() - generated_at)
+
+    def _write_mock_data_cache(self, mock_data: Dict[str, Any]) -> None:
+        """Write mock data to the disk cache atomically."""
+        if not self.mock_data_cache_enabled or not isinstance(mock_data, dict):
+            return
+
+        cache_path = self.get_mock_data_cache_path()
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "format": MOCK_DATA_CACHE_FORMAT,
+                        "generated_at": datetime.now().isoformat(),
+                        "data": mock_data,
+                    },
+                    f,
+                    default=str,
+                )
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write mock data cache {cache_path}: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
     @abstractmethod
     def get_schema(self) -> Dict[str, Any]:
         """
@@ -177,7 +391,7 @@ class BaseModuleTemplate(ABC):
     def _check_mock_data(self) -> bool:
         """Check if mock data is properly loaded."""
         try:
-            mock_data = self.initialize_mock_data()
+            mock_data = self.ensure_mock_data()
             return isinstance(mock_data, dict)
         except Exception:
             return False
@@ -231,7 +445,7 @@ class BaseModuleTemplate(ABC):
         if not file_path:
             file_path = f"mock_data_{self.module_id}.json"
         
-        mock_data = self.initialize_mock_data()
+        mock_data = self.ensure_mock_data()
         
         with open(file_path, 'w') as f:
             json.dump(mock_data, f, indent=2, default=str)
@@ -278,7 +492,7 @@ class BaseModuleTemplate(ABC):
             "health_status": self.health_status,
             "last_health_check": self.last_health_check.isoformat() if self.last_health_check else None,
             "tools_count": len(self.get_tools()),
-            "mock_data_size": len(self.mock_data),
+            "mock_data_size": len(self._mock_data or {}),
             "configuration": self.config
         }
 
@@ -288,12 +502,49 @@ class SandboxModule(BaseModuleTemplate):
     Base class for sandbox/mock modules.
     Provides additional functionality for simulation and mock environments.
     """
+
+    # Indexes to build for mock data collections, keyed by the collection's
+    # key in mock_data, e.g. {"users": {"hash": ["username"], "text": [...]}}.
+    # Supported index kinds are "hash", "time" and "text".
+    collection_indexes: Dict[str, Dict[str, List[str]]] = {}
     
     def __init__(self, module_id: str, category: str, display_name: str, description: str):
         super().__init__(module_id, category, display_name, description)
         self.simulation_state = {}
         self.mock_responses = {}
         self.scenario_data = {}
+        self._collections: Dict[str, IndexedCollection] = {}
+
+    def get_collection(self, name: str) -> IndexedCollection:
+        """
+        Return an indexed view of a mock data collection.
+
+        The indexes are built on first use and rebuilt when the collection is
+        replaced (reset, scenario activation) or shrinks; appended records
+        are indexed incrementally.
+
+        Args:
+            name: Key of the collection in mock_data
+
+        Returns:
+            IndexedCollection over the collection's records
+        """
+        records = self.mock_data.get(name)
+        if records is None:
+            records = self.mock_data[name] = []
+
+        with self._mock_data_lock:
+            collection = self._collections.get(name)
+            if collection is None or not collection.covers(records):
+                spec = self.collection_indexes.get(name, {})
+                collection = IndexedCollection(
+                    records,
+                    hash_fields=spec.get("hash", ()),
+                    time_fields=spec.get("time", ()),
+                    text_fields=spec.get("text", ()),
+                )
+                self._collections[name] = collection
+            return collection
     
     def create_scenario(self, scenario_name: str, scenario_data: Dict[str, Any]) -> bool:
         """
@@ -357,7 +608,8 @@ class SandboxModule(BaseModuleTemplate):
         """
         try:
             self.simulation_state = {}
-            self.mock_data = self.initialize_mock_data()
+            self._mock_data = None
+            self.ensure_mock_data()
             
             # Deactivate all scenarios
             for scenario in self.scenario_data.values():
@@ -387,7 +639,7 @@ class SandboxModule(BaseModuleTemplate):
             "simulation_active": bool(self.simulation_state),
             "active_scenario": active_scenario,
             "available_scenarios": list(self.scenario_data.keys()),
-            "mock_data_loaded": bool(self.mock_data),
+            "mock_data_loaded": bool(self._mock_data),
             "last_reset": self.simulation_state.get("last_reset"),
             "state_size": len(self.simulation_state)
         }
\ No newline at end of file
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from ..state_merger import MergeStrategy
 
 
 class BaseTool(ABC):
@@ -9,8 +11,13 @@ class BaseTool(ABC):
     This class defines the basic structure that every tool module must implement.
     It ensures that each tool is properly initialized with a reference to the
     shared StateManager instance.
+
+    Subclasses may set ``merge_strategy`` to control how content pack state
+    for the module is merged into existing state (see ``app.state_merger``).
     """
 
+    merge_strategy: Optional[MergeStrategy] = None
+
     @abstractmethod
     def __init__(self, state_manager: Any):
         """
@@ -8,7 +8,6 @@ from datetime import datetime, timedelta
 import logging
 import random
 import hashlib
-import uuid
 
 # Import the base template from the parent directory
 import sys
@@ -37,7 +36,6 @@ class CertificateAuthorityTool(SandboxModule):
         self.mock_generator = MockDataGenerator()
         self.ca_name = "Sandbox Root CA"
         self.ca_subject = "CN=Sandbox Root CA, O=Sandbox Organization, C=US"
-        self.initialize_mock_data()
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -195,7 +193,7 @@ class CertificateAuthorityTool(SandboxModule):
             
             request = {
                 "id": f"req_{i+1:03d}",
-                "request_id": str(uuid.uuid4()),
+                "request_id": self.mock_uuid(),
                 "subject": f"CN=pending{i+1:02d}.sandbox.local, O=Sandbox Organization",
                 "template_name": template["name"],
                 "template_id": template["id"],
@@ -0,0 +1,185 @@
+"""
+SQLite engine behind the database module.
+
+FastAPI runs tool calls on its thread pool, so several agents can use the
+database at once. The engine gives each kind of work its own connection:
+
+- One write connection, used under a lock, so that writes (and their
+  commits) are serialised rather than interleaved on a shared connection.
+- A pool of read-only (``query_only``) connections, so that SELECTs run in
+  parallel with each other and with a write.
+
+The database runs in WAL mode, where readers see the last committed state
+and never wait for the writer. Without a configured path it lives in a
+private temporary directory (on /dev/shm where available, so it stays in
+memory like the original ``:memory:`` database) that is removed when the
+engine is closed.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+JOURNAL_MODES = ("wal", "delete", "truncate", "persist", "memory", "off")
+
+
+def _temporary_base() -> Optional[str]:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+class SQLiteEngine:
+    """
+    A SQLite database with a locked write connection and a read-only pool.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        read_connections: int = 4,
+        cache_size: int = -16000,
+        mmap_size: int = 268435456,
+        journal_mode: str = "wal",
+        busy_timeout: float = 5.0,
+        statement_cache_size: int = 256,
+    ):
+        """
+        Args:
+            path: Database file; None uses a temporary database removed on close
+            read_connections: Maximum number of read-only connections
+            cache_size: ``PRAGMA cache_size`` for each connection (negative
+                values are KiB, positive values pages)
+            mmap_size: ``PRAGMA mmap_size`` in bytes (0 disables memory mapping)
+            journal_mode: ``PRAGMA journal_mode``; readers only run alongside
+                the writer in "wal" mode
+            busy_timeout: Seconds to wait for a lock or a free read connection
+            statement_cache_size: Compiled statements cached per connection,
+                so repeated (parameterized) queries skip parsing and planning
+        """
+        journal_mode = journal_mode.lower()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode must be one of {JOURNAL_MODES}")
+        if read_connections < 1:
+            raise ValueError("read_connections must be at least 1")
+
+        self._temporary = None
+        if path is None:
+            self._temporary = tempfile.TemporaryDirectory(
+                prefix="intentverse-database-", dir=_temporary_base()
+            )
+            path = os.path.join(self._temporary.name, "database.db")
+        self.path = path
+        self.in_memory = self._temporary is not None
+        self.read_connections = read_connections
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.statement_cache_size = statement_cache_size
+
+        # Reentrant, so that a write made while holding ``writer()`` (such as
+        # loading a content pack) can go through ``execute_sql``
+        self._write_lock = threading.RLock()
+        self._writer = self._connect(read_only=False)
+        self.journal_mode = self._writer.execute(
+            f"PRAGMA journal_mode={journal_mode}"
+        ).fetchone()[0]
+        if self.journal_mode == "wal":
+            # Safe against corruption in WAL mode; only fsyncs at checkpoints
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._reader_count = 0
+        self._pool_lock = threading.Lock()
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        connection.row_factory = sqlite3.Row  # Enable dict-like access to rows
+        connection.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        if read_only:
+            connection.execute("PRAGMA query_only=1")
+        return connection
+
+    @property
+    def write_connection(self) -> sqlite3.Connection:
+        """The write connection; hold ``writer()`` while using it."""
+        return self._writer
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Use the write connection exclusively, committing on success and
+        rolling back on error.
+        """
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read-only connection from the pool.
+
+        Raises:
+            sqlite3.OperationalError: If no connection is free within the
+                busy timeout
+        """
+        connection = self._acquire_reader()
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            self._readers.put(connection)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._reader_count < self.read_connections:
+                self._reader_count += 1
+                return self._connect(read_only=True)
+        try:
+            return self._readers.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("No database read connection available")
+
+    def describe(self) -> Dict[str, Any]:
+        """Location and tuning of the database, for the module state."""
+        return {
+            "location": "in-memory" if self.in_memory else self.path,
+            "journal_mode": self.journal_mode,
+            "cache_size": self.cache_size,
+            "mmap_size": self.mmap_size,
+            "read_connections": self.read_connections,
+        }
+
+    def close(self) -> None:
+        """Close every connection and remove a temporary database."""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._write_lock:
+            self._writer.close()
+        if self._temporary is not None:
+            try:
+                self._temporary.cleanup()
+            except OSError as e:
+                logging.warning(f"Failed to remove temporary database: {e}")
@@ -0,0 +1,185 @@
+"""
+Statement profiling for the database module.
+
+Every statement run by the DatabaseTool is timed and aggregated here by its
+normalized text (literals replaced by ``?``), so that the same query with
+different values is counted together. Statements that run longer than the
+slow query threshold, or are aborted for exceeding their budget, are also
+written to a bounded slow query log in the module state, along with their
+``EXPLAIN QUERY PLAN``.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# Virtual machine instructions between checks of the time budget
+PROGRESS_STEPS = 1000
+
+# Recent durations kept per statement for percentiles
+LATENCY_SAMPLES = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(sqlite3.OperationalError):
+    """Raised when a statement exceeds its time or row budget."""
+
+
+def normalize_statement(sql_query: str) -> str:
+    """
+    Reduce a statement to its shape, e.g.
+    ``SELECT * FROM t WHERE id IN (1, 2) AND name = 'x'`` to
+    ``SELECT * FROM t WHERE id IN (?) AND name = ?``.
+    """
+    normalized = _STRING_LITERAL.sub("?", sql_query)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().rstrip(";").strip()
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@contextmanager
+def time_budget(connection: sqlite3.Connection, seconds: float) -> Iterator[None]:
+    """
+    Abort statements on ``connection`` that run longer than ``seconds``.
+
+    SQLite calls the progress handler every PROGRESS_STEPS instructions and
+    interrupts the statement once it returns non-zero; the interruption
+    surfaces as QueryBudgetExceeded.
+    """
+    if seconds <= 0:
+        yield
+        return
+    deadline = time.perf_counter() + seconds
+    connection.set_progress_handler(
+        lambda: 1 if time.perf_counter() > deadline else 0, PROGRESS_STEPS
+    )
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if "interrupted" in str(e) and time.perf_counter() > deadline:
+            raise QueryBudgetExceeded(
+                f"Query aborted after exceeding the {seconds:g}s time budget"
+            )
+        raise
+    finally:
+        connection.set_progress_handler(None, 0)
+
+
+def explain_query_plan(
+    connection: sqlite3.Connection, sql_query: str, parameters: Any = None
+) -> List[str]:
+    """
+    Get the query plan of a statement, one line per step, indented by depth.
+
+    Returns:
+        The plan, empty if it cannot be explained (e.g. DDL)
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql_query}", parameters or ())
+        steps = cursor.fetchall()
+    except sqlite3.Error:
+        return []
+
+    depths: Dict[int, int] = {0: -1}
+    plan = []
+    for step_id, parent_id, _, detail in steps:
+        depths[step_id] = depths.get(parent_id, -1) + 1
+        plan.append("  " * depths[step_id] + detail)
+    return plan
+
+
+class _StatementRecord:
+    __slots__ = ("count", "total", "maximum", "rows", "aborted", "durations")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.rows = 0
+        self.aborted = 0
+        self.durations: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+
+class StatementStats:
+    """
+    Latency and row counts aggregated per normalized statement.
+
+    At most ``max_statements`` statements are tracked; the least recently
+    run one is dropped to make room for a new one.
+    """
+
+    def __init__(self, max_statements: int = 200):
+        self.max_statements = max_statements
+        self._records: "OrderedDict[str, _StatementRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(
+        self, sql_query: str, duration: float, rows: int, aborted: bool = False
+    ) -> None:
+        """Add one run of a statement."""
+        statement = normalize_statement(sql_query)
+        with self._lock:
+            record = self._records.get(statement)
+            if record is None:
+                record = self._records[statement] = _StatementRecord()
+                if len(self._records) > self.max_statements:
+                    self._records.popitem(last=False)
+            else:
+                self._records.move_to_end(statement)
+            record.count += 1
+            record.total += duration
+            record.maximum = max(record.maximum, duration)
+            record.rows += rows
+            record.aborted += int(aborted)
+            record.durations.append(duration)
+
+    def get_stats(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the statistics of each statement, by total time spent, highest
+        first.
+
+        Returns:
+            Per statement: run and aborted counts, rows returned, and the
+            p50, p95, max and mean latency in milliseconds
+        """
+        with self._lock:
+            records = [
+                (statement, record, list(record.durations))
+                for statement, record in self._records.items()
+            ]
+        records.sort(key=lambda item: item[1].total, reverse=True)
+
+        return [
+            {
+                "statement": statement,
+                "count": record.count,
+                "aborted": record.aborted,
+                "rows": record.rows,
+                "p50_ms": round(_percentile(durations, 0.5) * 1000, 3),
+                "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+                "max_ms": round(record.maximum * 1000, 3),
+                "mean_ms": round(record.total / record.count * 1000, 3),
+            }
+            for statement, record, durations in records[:limit]
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
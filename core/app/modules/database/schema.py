@@ -64,6 +64,22 @@ UI_SCHEMA = {
                     "sort_order": "desc",
                     "max_rows": 20,
                 },
+                {
+                    "component_type": "table",
+                    "title": "Slow Queries",
+                    "data_source_api": "/api/v1/database/state",
+                    "data_path": "slow_queries",
+                    "columns": [
+                        {"header": "Timestamp", "data_key": "timestamp"},
+                        {"header": "Query", "data_key": "query", "truncate": 50},
+                        {"header": "Duration (ms)", "data_key": "duration_ms"},
+                        {"header": "Rows", "data_key": "rows"},
+                        {"header": "Aborted", "data_key": "aborted"},
+                    ],
+                    "sort_by": "timestamp",
+                    "sort_order": "desc",
+                    "max_rows": 20,
+                },
                 {
                     "component_type": "table",
                     "title": "Database Tables",
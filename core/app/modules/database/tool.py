@@ -1,15 +1,42 @@
+import base64
+import hashlib
+import json
 import sqlite3
+import threading
+import time
 from typing import Any, Dict, List, Optional, Tuple
 import logging
-from typing import Any, Dict, List, Optional, Tuple
 from ..base_tool import BaseTool
+from ...config import Config
+from .engine import SQLiteEngine
+from .profiling import (
+    QueryBudgetExceeded,
+    StatementStats,
+    explain_query_plan,
+    normalize_statement,
+    time_budget,
+)
 from fastapi import HTTPException
 
+# Statements that only read, run on the read-only connection pool
+READ_ONLY_COMMANDS = ("select", "with", "explain", "values")
+
+# Rows per page returned by query_page, by default and at most
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+# A columnar result: column names and row tuples
+Columns = List[str]
+Rows = List[Tuple[Any, ...]]
+
 
 class DatabaseTool(BaseTool):
     """
-    Implements a fully functional in-memory SQLite database tool.
+    Implements a fully functional SQLite database tool.
     This provides a safe, observable environment for AI agents to interact with databases.
+
+    Statements run on a SQLiteEngine: writes one at a time on its write
+    connection, reads in parallel on its read-only connections.
     """
 
     def get_ui_schema(self) -> Dict[str, Any]:
@@ -20,13 +47,14 @@ class DatabaseTool(BaseTool):
 
     def __init__(self, state_manager: Any):
         """
-        Initializes the DatabaseTool with an in-memory SQLite database.
+        Initializes the DatabaseTool with the configured SQLite engine.
         """
         super().__init__(state_manager)
 
-        # Create in-memory SQLite connection
-        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
-        self.connection.row_factory = sqlite3.Row  # Enable dict-like access to rows
+        self.engine = SQLiteEngine(**Config.get_database_tool_config())
+        # Serialises read-modify-write updates of the module state
+        self._state_lock = threading.Lock()
+        self.statement_stats = StatementStats()
 
         # Initialize state if it doesn't exist
         if "database" not in self.state_manager.get_full_state():
@@ -41,14 +69,29 @@ class DatabaseTool(BaseTool):
             "last_query": "",
             "last_query_result": {"columns": [], "rows": []},
             "query_history": [],
+            "slow_queries": [],
             "connection_info": {
                 "type": "SQLite",
-                "location": "in-memory",
+                **self.engine.describe(),
                 "created_at": datetime.datetime.now().isoformat(),
             },
         }
         self.state_manager.set("database", initial_state)
 
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The engine's write connection, for callers that write to the
+        database directly (e.g. the mock data generator). Hold
+        ``self.engine.writer()`` while using it if tool calls may run
+        concurrently.
+        """
+        return self.engine.write_connection
+
+    def close(self) -> None:
+        """Close the database's connections."""
+        self.engine.close()
+
     def load_content_pack_database(self, database_content: List[str]):
         """
         Load database content from a content pack.
@@ -80,99 +123,105 @@ class DatabaseTool(BaseTool):
             List of SQL CREATE and INSERT statements
         """
         try:
-            cursor = self.connection.cursor()
-            sql_statements = []
-
-            # Get all table names (excluding sqlite internal tables)
-            cursor.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-            )
-            table_names = [row[0] for row in cursor.fetchall()]
-
-            for table_name in table_names:
-                # Get CREATE TABLE statement
-                cursor.execute(
-                    "SELECT sql FROM sqlite_master WHERE type='table' AND name=?",
-                    (table_name,),
-                )
-                create_sql = cursor.fetchone()
-                if create_sql and create_sql[0]:
-                    sql_statements.append(f"{create_sql[0]};")
-
-                # Get INSERT statements for data
-                cursor.execute(f"SELECT * FROM {table_name}")
-                rows = cursor.fetchall()
-
-                if rows:
-                    # Get column names
-                    column_names = [
-                        description[0] for description in cursor.description
-                    ]
-
-                    for row in rows:
-                        values = []
-                        for value in row:
-                            if value is None:
-                                values.append("NULL")
-                            elif isinstance(value, str):
-                                # Escape single quotes in strings
-                                escaped_value = value.replace("'", "''")
-                                values.append(f"'{escaped_value}'")
-                            else:
-                                values.append(str(value))
-
-                        insert_sql = f"INSERT OR IGNORE INTO {table_name} ({', '.join(column_names)}) VALUES ({', '.join(values)});"
-                        sql_statements.append(insert_sql)
-
-            return sql_statements
-
+            with self.engine.reader() as connection:
+                return self._export_statements(connection.cursor())
         except Exception as e:
             logging.error(f"Error exporting database content: {e}")
             return []
 
+    def _export_statements(self, cursor: sqlite3.Cursor) -> List[str]:
+        sql_statements = []
+
+        # Get all table names (excluding sqlite internal tables)
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        )
+        table_names = [row[0] for row in cursor.fetchall()]
+
+        for table_name in table_names:
+            # Get CREATE TABLE statement
+            cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE type='table' AND name=?",
+                (table_name,),
+            )
+            create_sql = cursor.fetchone()
+            if create_sql and create_sql[0]:
+                sql_statements.append(f"{create_sql[0]};")
+
+            # Get INSERT statements for data
+            cursor.execute(f"SELECT * FROM {table_name}")
+            rows = cursor.fetchall()
+
+            if rows:
+                # Get column names
+                column_names = [
+                    description[0] for description in cursor.description
+                ]
+
+                for row in rows:
+                    values = []
+                    for value in row:
+                        if value is None:
+                            values.append("NULL")
+                        elif isinstance(value, str):
+                            # Escape single quotes in strings
+                            escaped_value = value.replace("'", "''")
+                            values.append(f"'{escaped_value}'")
+                        else:
+                            values.append(str(value))
+
+                    insert_sql = f"INSERT OR IGNORE INTO {table_name} ({', '.join(column_names)}) VALUES ({', '.join(values)});"
+                    sql_statements.append(insert_sql)
+
+        return sql_statements
+
     def _update_table_info(self):
         """Update the state manager with current table information."""
         try:
-            cursor = self.connection.cursor()
-
-            # Get all table names
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            table_names = [row[0] for row in cursor.fetchall()]
-
-            tables_info = {}
-            for table_name in table_names:
-                # Get column information for each table
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = []
-                for col_info in cursor.fetchall():
-                    columns.append(
-                        {
-                            "name": col_info[1],
-                            "type": col_info[2],
-                            "not_null": bool(col_info[3]),
-                            "default_value": col_info[4],
-                            "primary_key": bool(col_info[5]),
-                        }
-                    )
-
-                # Get row count
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                row_count = cursor.fetchone()[0]
-
-                # Extract primary key column names
-                primary_keys = [col["name"] for col in columns if col["primary_key"]]
-
-                tables_info[table_name] = {
-                    "columns": columns,
-                    "column_count": len(columns),
-                    "row_count": row_count,
-                    "primary_keys": ", ".join(primary_keys) if primary_keys else "None",
-                }
+            with self.engine.reader() as connection:
+                cursor = connection.cursor()
+
+                # Get all table names
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                table_names = [row[0] for row in cursor.fetchall()]
+
+                tables_info = {}
+                for table_name in table_names:
+                    # Get column information for each table
+                    cursor.execute(f"PRAGMA table_info({table_name})")
+                    columns = []
+                    for col_info in cursor.fetchall():
+                        columns.append(
+                            {
+                                "name": col_info[1],
+                                "type": col_info[2],
+                                "not_null": bool(col_info[3]),
+                                "default_value": col_info[4],
+                                "primary_key": bool(col_info[5]),
+                            }
+                        )
+
+                    # Get row count
+                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                    row_count = cursor.fetchone()[0]
+
+                    # Extract primary key column names
+                    primary_keys = [col["name"] for col in columns if col["primary_key"]]
+
+                    tables_info[table_name] = {
+                        "columns": columns,
+                        "column_count": len(columns),
+                        "row_count": row_count,
+                        "primary_keys": ", ".join(primary_keys) if primary_keys else "None",
+                    }
 
             # Update state
-            db_state = self.state_manager.get("database")
-            db_state["tables"] = tables_info
-            self.state_manager.set("database", db_state)
+            def change(db_state):
+                db_state["tables"] = tables_info
+                return db_state
+
+            with self._state_lock:
+                self.state_manager.update("database", change)
 
         except Exception as e:
             logging.error(f"Error updating table info: {e}")
@@ -182,30 +231,21 @@ class DatabaseTool(BaseTool):
     ) -> List[Dict[str, Any]]:
         """
         Execute any SQL statement (CREATE, INSERT, UPDATE, DELETE, SELECT).
-        Returns results for SELECT queries, empty list for others.
+        Returns the rows of statements that produce them (SELECT, or
+        RETURNING clauses), empty list for others.
+
+        Reads run on a read-only connection in parallel with other calls;
+        anything else runs on the write connection, one statement at a time.
         """
         if not sql_query or not sql_query.strip():
             raise HTTPException(status_code=400, detail="SQL query cannot be empty")
 
         try:
-            cursor = self.connection.cursor()
-
-            if parameters:
-                cursor.execute(sql_query, parameters)
-            else:
-                cursor.execute(sql_query)
-
-            # Commit the transaction
-            self.connection.commit()
-
-            # Get results for SELECT queries
-            results = []
-            if sql_query.strip().lower().startswith("select"):
-                rows = cursor.fetchall()
-                results = [dict(row) for row in rows]
+            columns, rows = self._execute_columnar(sql_query, parameters)
 
             # Update state with query information
-            self._record_query(sql_query, results)
+            with self._state_lock:
+                self._record_query(sql_query, columns, rows)
 
             # Update table info if it was a DDL or DML statement
             if any(
@@ -214,13 +254,247 @@ class DatabaseTool(BaseTool):
             ):
                 self._update_table_info()
 
-            return results
+            return [dict(zip(columns, row)) for row in rows]
 
         except sqlite3.Error as e:
             raise HTTPException(status_code=400, detail=f"SQL Error: {str(e)}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database Error: {str(e)}")
 
+    def _execute_columnar(
+        self, sql_query: str, parameters: Optional[Tuple] = None
+    ) -> Tuple[Columns, Rows]:
+        """
+        Run a statement on a read connection if it only reads, else on the
+        write connection.
+
+        Returns:
+            The column names and row tuples, both empty for statements
+            without results
+        """
+        if sql_query.strip().lower().startswith(READ_ONLY_COMMANDS):
+            try:
+                with self.engine.reader() as connection:
+                    return self._run_statement(connection, sql_query, parameters)
+            except sqlite3.OperationalError as e:
+                # A WITH clause in front of an INSERT, UPDATE or DELETE
+                if "readonly" not in str(e):
+                    raise
+        with self.engine.writer() as connection:
+            return self._run_statement(connection, sql_query, parameters)
+
+    def _run_statement(
+        self,
+        connection: sqlite3.Connection,
+        sql_query: str,
+        parameters: Optional[Tuple],
+        row_budget: Optional[int] = None,
+    ) -> Tuple[Columns, Rows]:
+        """
+        Run a statement within the time and row budgets, and profile it.
+
+        Args:
+            row_budget: Most rows the statement may return; defaults to
+                the configured budget, 0 disables it
+
+        Raises:
+            QueryBudgetExceeded: If the statement ran out of its budget
+        """
+        config = Config.get_database_tool_profiling_config()
+        if row_budget is None:
+            row_budget = config["row_budget"]
+
+        cursor = connection.cursor()
+        # Plain tuples straight from SQLite, rather than sqlite3.Row objects
+        cursor.row_factory = None
+        rows: Rows = []
+        started = time.perf_counter()
+        try:
+            with time_budget(connection, config["time_budget"]):
+                cursor.execute(sql_query, parameters or ())
+                if cursor.description is not None:
+                    if row_budget > 0:
+                        rows = cursor.fetchmany(row_budget + 1)
+                        if len(rows) > row_budget:
+                            raise QueryBudgetExceeded(
+                                f"Query aborted after returning more than "
+                                f"{row_budget} rows; use query_page for large results"
+                            )
+                    else:
+                        rows = cursor.fetchall()
+        except QueryBudgetExceeded as e:
+            self._profile(
+                connection,
+                sql_query,
+                parameters,
+                time.perf_counter() - started,
+                len(rows),
+                str(e),
+            )
+            raise
+        self._profile(
+            connection, sql_query, parameters, time.perf_counter() - started, len(rows)
+        )
+
+        if cursor.description is None:
+            return [], []
+        return [column[0] for column in cursor.description], rows
+
+    def _profile(
+        self,
+        connection: sqlite3.Connection,
+        sql_query: str,
+        parameters: Optional[Tuple],
+        duration: float,
+        row_count: int,
+        aborted: Optional[str] = None,
+    ) -> None:
+        """
+        Record a statement's run, and log it with its query plan if it was
+        slow or aborted.
+
+        Args:
+            connection: The connection that ran the statement, which the
+                plan is explained on; borrowing another could wait for the
+                pool when it is exhausted
+        """
+        self.statement_stats.record(sql_query, duration, row_count, aborted is not None)
+
+        config = Config.get_database_tool_profiling_config()
+        duration_ms = round(duration * 1000, 3)
+        if aborted is None and duration_ms < config["slow_query_ms"]:
+            return
+
+        import datetime
+
+        plan = explain_query_plan(connection, sql_query, parameters)
+        entry = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "query": sql_query,
+            "duration_ms": duration_ms,
+            "rows": row_count,
+            "plan": plan,
+        }
+        if aborted:
+            entry["aborted"] = aborted
+        logging.warning(
+            f"Slow database query ({duration_ms} ms"
+            f"{', aborted' if aborted else ''}): {normalize_statement(sql_query)}"
+        )
+
+        def change(db_state):
+            slow_queries = db_state.get("slow_queries", []) + [entry]
+            db_state["slow_queries"] = slow_queries[-config["slow_query_log_size"] :]
+            return db_state
+
+        with self._state_lock:
+            self.state_manager.update("database", change)
+
+    def get_query_stats(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Get latency statistics per normalized statement, by total time spent.
+
+        Args:
+            limit: Number of statements to return
+
+        Returns:
+            Per statement: run and aborted counts, rows returned, and the
+            p50, p95, max and mean latency in milliseconds
+        """
+        return self.statement_stats.get_stats(limit)
+
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        """
+        Get the slow query log: statements over the slow query threshold or
+        aborted for exceeding their budget, with their query plans.
+        """
+        db_state = self.state_manager.get("database")
+        return db_state.get("slow_queries", [])
+
+    def query_page(
+        self,
+        sql_query: str,
+        parameters: Optional[Tuple] = None,
+        max_rows: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute a SELECT query and return one page of its results in
+        columnar form, for results too large to return at once.
+
+        Args:
+            sql_query: The SELECT (or WITH / VALUES) query
+            parameters: Positional parameters for the query
+            max_rows: Rows per page, at most 10000
+            cursor: ``next_cursor`` of the previous page, None for the first
+
+        Returns:
+            "columns", "rows" (lists in column order), "row_count", and
+            "next_cursor", which is None on the last page
+        """
+        if not sql_query or not sql_query.strip():
+            raise HTTPException(status_code=400, detail="SQL query cannot be empty")
+        if not sql_query.strip().lower().startswith(("select", "with", "values")):
+            raise HTTPException(
+                status_code=400, detail="Only SELECT queries can be paged"
+            )
+        max_rows = max(1, min(int(max_rows), MAX_PAGE_SIZE))
+        parameters = tuple(parameters or ())
+        fingerprint = hashlib.sha256(
+            json.dumps([sql_query, parameters], default=str).encode()
+        ).hexdigest()[:16]
+        offset = self._decode_cursor(cursor, fingerprint) if cursor else 0
+
+        # The text of the wrapped query does not depend on the page, so
+        # every page reuses the connection's compiled statement
+        paged_sql = (
+            f"SELECT * FROM ({sql_query.strip().rstrip(';')}) LIMIT ? OFFSET ?"
+        )
+        try:
+            with self.engine.reader() as connection:
+                # One row beyond the page tells whether there is another
+                columns, rows = self._run_statement(
+                    connection,
+                    paged_sql,
+                    parameters + (max_rows + 1, offset),
+                    row_budget=0,
+                )
+        except sqlite3.Error as e:
+            raise HTTPException(status_code=400, detail=f"SQL Error: {str(e)}")
+
+        next_cursor = None
+        if len(rows) > max_rows:
+            rows = rows[:max_rows]
+            next_cursor = self._encode_cursor(offset + max_rows, fingerprint)
+
+        with self._state_lock:
+            self._record_query(sql_query, columns, rows)
+
+        return {
+            "columns": columns,
+            "rows": [list(row) for row in rows],
+            "row_count": len(rows),
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def _encode_cursor(offset: int, fingerprint: str) -> str:
+        token = json.dumps({"offset": offset, "query": fingerprint})
+        return base64.urlsafe_b64encode(token.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, fingerprint: str) -> int:
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            offset = int(token["offset"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if token.get("query") != fingerprint or offset < 0:
+            raise HTTPException(
+                status_code=400, detail="Cursor does not belong to this query"
+            )
+        return offset
+
     def query(self, sql_query: str) -> List[Dict[str, Any]]:
         """
         Execute a SELECT query. This method is kept for backward compatibility.
@@ -346,9 +620,11 @@ class DatabaseTool(BaseTool):
         List all tables in the database.
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            return [row[0] for row in cursor.fetchall()]
+            with self.engine.reader() as connection:
+                cursor = connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'"
+                )
+                return [row[0] for row in cursor.fetchall()]
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Error listing tables: {str(e)}"
@@ -362,10 +638,11 @@ class DatabaseTool(BaseTool):
             raise HTTPException(status_code=400, detail="Table name is required")
 
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(f"PRAGMA table_info({table_name})")
+            with self.engine.reader() as connection:
+                cursor = connection.execute(f"PRAGMA table_info({table_name})")
+                table_info = cursor.fetchall()
             columns = []
-            for col_info in cursor.fetchall():
+            for col_info in table_info:
                 columns.append(
                     {
                         "column_id": col_info[0],
@@ -393,50 +670,53 @@ class DatabaseTool(BaseTool):
         db_state = self.state_manager.get("database")
         return db_state.get("query_history", [])
 
-    def _record_query(self, sql_query: str, results: List[Dict[str, Any]]):
+    def _record_query(self, sql_query: str, columns: Columns, rows: Rows):
         """
         Record the executed query in the state for observability.
+
+        Only the first ``DATABASE_TOOL_STATE_ROWS`` rows of the result are
+        kept in the state; a larger result is marked as truncated, with its
+        total row count.
         """
         import datetime
 
-        db_state = self.state_manager.get("database")
-
-        # Update last query info
-        db_state["last_query"] = sql_query
-
         # Format results for UI consumption with dynamic columns
-        if results and len(results) > 0:
-            # Extract column names from the first result row
-            columns = list(results[0].keys())
-
-            # Convert each row dict to an array in the same order as columns
-            rows = []
-            for result_row in results:
-                row_array = [result_row.get(col) for col in columns]
-                rows.append(row_array)
-
-            db_state["last_query_result"] = {"columns": columns, "rows": rows}
+        if rows:
+            state_rows = Config.get_database_tool_state_rows()
+            last_result = {
+                "columns": columns,
+                "rows": [list(row) for row in rows[:state_rows]],
+            }
+            if len(rows) > state_rows:
+                last_result["truncated"] = True
+                last_result["total_rows"] = len(rows)
         else:
             # No results - empty structure
-            db_state["last_query_result"] = {"columns": [], "rows": []}
+            last_result = {"columns": [], "rows": []}
 
         # Add to query history (keep last 50 queries)
         query_record = {
             "timestamp": datetime.datetime.now().isoformat(),
             "query": sql_query,
-            "result_count": len(results),
+            "result_count": len(rows),
             "query_type": (
                 sql_query.strip().split()[0].upper() if sql_query.strip() else "UNKNOWN"
             ),
         }
 
-        if "query_history" not in db_state:
-            db_state["query_history"] = []
+        def change(db_state):
+            # Update last query info
+            db_state["last_query"] = sql_query
+            db_state["last_query_result"] = last_result
+
+            if "query_history" not in db_state:
+                db_state["query_history"] = []
 
-        db_state["query_history"].append(query_record)
+            db_state["query_history"].append(query_record)
 
-        # Keep only the last 50 queries
-        if len(db_state["query_history"]) > 50:
-            db_state["query_history"] = db_state["query_history"][-50:]
+            # Keep only the last 50 queries
+            if len(db_state["query_history"]) > 50:
+                db_state["query_history"] = db_state["query_history"][-50:]
+            return db_state
 
-        self.state_manager.set("database", db_state)
+        self.state_manager.update("database", change)
@@ -14,6 +14,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from base_module_template import SandboxModule
+from indexed_collection import paginate
 from mock_data_generator import MockDataGenerator
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,11 @@ class DnsManagementTool(SandboxModule):
     DNS Management module implementation for sandbox environment.
     Provides mock DNS functionality for learning and testing.
     """
+
+    collection_indexes = {
+        "dns_zones": {"hash": ["type", "status"], "text": ["name"]},
+        "dns_queries": {"time": ["timestamp"]},
+    }
     
     def __init__(self):
         super().__init__(
@@ -34,7 +40,6 @@ class DnsManagementTool(SandboxModule):
         )
         self.mock_generator = MockDataGenerator()
         self.dns_server_name = "sandbox-dns-01.local"
-        self.initialize_mock_data()
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -274,7 +279,9 @@ class DnsManagementTool(SandboxModule):
                 "parameters": {
                     "filter": {"type": "string", "description": "Filter by zone name"},
                     "zone_type": {"type": "string", "enum": ["All", "Primary", "Secondary", "Stub"]},
-                    "status": {"type": "string", "enum": ["All", "Active", "Inactive"]}
+                    "status": {"type": "string", "enum": ["All", "Active", "Inactive"]},
+                    "limit": {"type": "integer", "description": "Maximum number of results to return", "default": 100},
+                    "offset": {"type": "integer", "description": "Number of results to skip", "default": 0}
                 },
                 "is_sandbox": True
             },
@@ -376,39 +383,31 @@ class DnsManagementTool(SandboxModule):
     def list_dns_zones(self, **kwargs) -> Dict[str, Any]:
         """List DNS zones with filtering options."""
         try:
-            zones = self.mock_data.get("dns_zones", [])
             filter_text = kwargs.get("filter", "").lower()
             zone_type = kwargs.get("zone_type", "All")
             status = kwargs.get("status", "All")
             
             # Apply filters
-            filtered_zones = zones
-            
-            if filter_text:
-                filtered_zones = [
-                    zone for zone in filtered_zones
-                    if filter_text in zone["name"].lower()
-                ]
-            
+            equals = {}
             if zone_type != "All":
-                filtered_zones = [
-                    zone for zone in filtered_zones
-                    if zone["type"] == zone_type
-                ]
-            
+                equals["type"] = zone_type
             if status != "All":
-                filtered_zones = [
-                    zone for zone in filtered_zones
-                    if zone["status"] == status
-                ]
+                equals["status"] = status
+            
+            filtered_zones = self.get_collection("dns_zones").query(
+                equals=equals, contains=[(filter_text, ("name",))]
+            )
+            page, pagination = paginate(
+                filtered_zones, kwargs.get("limit"), kwargs.get("offset", 0)
+            )
             
             return {
                 "tool": "list_dns_zones",
                 "status": "success",
                 "timestamp": datetime.utcnow().isoformat(),
                 "data": {
-                    "zones": filtered_zones,
-                    "total_count": len(filtered_zones),
+                    "zones": page,
+                    **pagination,
                     "filters_applied": {
                         "filter": filter_text,
                         "zone_type": zone_type,
@@ -432,7 +431,6 @@ class DnsManagementTool(SandboxModule):
         """Get DNS server statistics and performance metrics."""
         try:
             dns_server_info = self.mock_data.get("dns_server_info", {})
-            queries = self.mock_data.get("dns_queries", [])
             zones = self.mock_data.get("dns_zones", [])
             records = self.mock_data.get("dns_records", [])
             
@@ -441,10 +439,9 @@ class DnsManagementTool(SandboxModule):
             hours = {"1h": 1, "24h": 24, "7d": 168, "30d": 720}[time_range]
             
             cutoff_time = datetime.now() - timedelta(hours=hours)
-            recent_queries = [
-                q for q in queries
-                if datetime.fromisoformat(q["timestamp"]) >= cutoff_time
-            ]
+            recent_queries = self.get_collection("dns_queries").query(
+                time_field="timestamp", since=cutoff_time
+            )
             
             successful_queries = len([q for q in recent_queries if q["response_code"] == "NOERROR"])
             cache_hits = len([q for q in recent_queries if q.get("cache_hit", False)])
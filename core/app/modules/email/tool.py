@@ -38,7 +38,6 @@ class EmailTool(BaseTool):
         """
         Composes and sends an email to one or more recipients, recording it in the sent items.
         """
-        sent_items = self.state_manager.get("email").get("sent_items", [])
         email_id = f"sent-{uuid.uuid4()}"
 
         email_data = {
@@ -51,8 +50,11 @@ class EmailTool(BaseTool):
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
 
-        sent_items.append(email_data)
-        self.state_manager.get("email")["sent_items"] = sent_items
+        def change(email_state):
+            email_state.setdefault("sent_items", []).append(email_data)
+            return email_state
+
+        self.state_manager.update("email", change)
 
         logging.info(f"SENDING EMAIL to {to}: with subject: '{subject}'")
         return {"status": "Email sent successfully", "email_id": email_id}
@@ -136,7 +138,6 @@ class EmailTool(BaseTool):
         """
         Creates a draft email without sending it. Returns the email_id of the draft.
         """
-        drafts = self.state_manager.get("email").get("drafts", [])
         draft_id = f"draft-{uuid.uuid4()}"
 
         draft_data = {
@@ -148,8 +149,11 @@ class EmailTool(BaseTool):
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
 
-        drafts.append(draft_data)
-        self.state_manager.get("email")["drafts"] = drafts
+        def change(email_state):
+            email_state.setdefault("drafts", []).append(draft_data)
+            return email_state
+
+        self.state_manager.update("email", change)
 
         return {"status": "Draft created successfully", "email_id": draft_id}
 
@@ -165,29 +169,31 @@ class EmailTool(BaseTool):
         Updates the fields of an existing draft email.
         NOTE: Attachment logic is a placeholder and depends on the FileSystemTool.
         """
-        drafts = self.state_manager.get("email").get("drafts", [])
-        draft_to_update = None
-        for draft in drafts:
-            if draft["email_id"] == email_id:
-                draft_to_update = draft
-                break
-
-        if not draft_to_update:
-            raise HTTPException(
-                status_code=404, detail=f"Draft with ID '{email_id}' not found."
-            )
 
-        if to is not None:
-            draft_to_update["to"] = to
-        if subject is not None:
-            draft_to_update["subject"] = subject
-        if body is not None:
-            draft_to_update["body"] = body
-        if attachments is not None:
-            # Placeholder for future logic to verify file paths exist
-            draft_to_update["attachments"] = attachments
-
-        self.state_manager.get("email")["drafts"] = drafts
+        def change(email_state):
+            draft_to_update = None
+            for draft in email_state.get("drafts", []):
+                if draft["email_id"] == email_id:
+                    draft_to_update = draft
+                    break
+
+            if not draft_to_update:
+                raise HTTPException(
+                    status_code=404, detail=f"Draft with ID '{email_id}' not found."
+                )
+
+            if to is not None:
+                draft_to_update["to"] = to
+            if subject is not None:
+                draft_to_update["subject"] = subject
+            if body is not None:
+                draft_to_update["body"] = body
+            if attachments is not None:
+                # Placeholder for future logic to verify file paths exist
+                draft_to_update["attachments"] = attachments
+            return email_state
+
+        self.state_manager.update("email", change)
         return {"status": "Draft updated successfully", "email_id": email_id}
 
     def update_email(
@@ -202,40 +208,26 @@ class EmailTool(BaseTool):
         """
         Updates the fields of an existing email (inbox or sent items).
         """
-        email_state = self.state_manager.get("email")
-        inbox = email_state.get("inbox", [])
-        sent_items = email_state.get("sent_items", [])
 
-        # Check inbox first
-        for email in inbox:
-            if email["email_id"] == email_id:
-                if from_address is not None:
-                    email["from"] = from_address
-                if to is not None:
-                    email["to"] = to
-                if cc is not None:
-                    email["cc"] = cc
-                if subject is not None:
-                    email["subject"] = subject
-                if body is not None:
-                    email["body"] = body
-                return {"status": "Email updated successfully", "email_id": email_id}
-
-        # Then check sent items
-        for email in sent_items:
-            if email["email_id"] == email_id:
-                if from_address is not None:
-                    email["from"] = from_address
-                if to is not None:
-                    email["to"] = to
-                if cc is not None:
-                    email["cc"] = cc
-                if subject is not None:
-                    email["subject"] = subject
-                if body is not None:
-                    email["body"] = body
-                return {"status": "Email updated successfully", "email_id": email_id}
+        def change(email_state):
+            # Check inbox first, then sent items
+            for email in email_state.get("inbox", []) + email_state.get("sent_items", []):
+                if email["email_id"] == email_id:
+                    if from_address is not None:
+                        email["from"] = from_address
+                    if to is not None:
+                        email["to"] = to
+                    if cc is not None:
+                        email["cc"] = cc
+                    if subject is not None:
+                        email["subject"] = subject
+                    if body is not None:
+                        email["body"] = body
+                    return email_state
 
-        raise HTTPException(
-            status_code=404, detail=f"Email with ID '{email_id}' not found."
-        )
+            raise HTTPException(
+                status_code=404, detail=f"Email with ID '{email_id}' not found."
+            )
+
+        self.state_manager.update("email", change)
+        return {"status": "Email updated successfully", "email_id": email_id}
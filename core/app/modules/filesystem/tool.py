@@ -21,9 +21,12 @@ class FileSystemTool(BaseTool):
 
         return UI_SCHEMA
 
-    def _find_node_and_parent(self, path: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+    def _find_node_and_parent(
+        self, path: str, root: Optional[Dict] = None
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
         """A helper to find an existing node and its parent given a path."""
-        root = self.state_manager.get("filesystem")
+        if root is None:
+            root = self.state_manager.get("filesystem")
         if path == "/":
             return root, None
 
@@ -52,9 +55,10 @@ class FileSystemTool(BaseTool):
 
         return current_node, parent_node
 
-    def _create_parent_dirs(self, path: str) -> Dict:
+    def _create_parent_dirs(self, path: str, root: Optional[Dict] = None) -> Dict:
         """Helper to create all necessary parent directories for a given path."""
-        root = self.state_manager.get("filesystem")
+        if root is None:
+            root = self.state_manager.get("filesystem")
         parts = [part for part in path.split("/") if part]
 
         current_node = root
@@ -120,62 +124,68 @@ class FileSystemTool(BaseTool):
                 status_code=400, detail="Cannot write to the root directory itself."
             )
 
-        # 2. Find the target and its parent.
-        node, parent = self._find_node_and_parent(path)
+        file_name = path.split("/")[-1]
 
-        # 3. Handle validation based on what was found.
-        if node and node.get("type") == "directory":
-            raise HTTPException(
-                status_code=400, detail=f"A directory already exists at path: {path}"
-            )
+        def change(root):
+            # 2. Find the target and its parent.
+            node, parent = self._find_node_and_parent(path, root)
 
-        # 4. If parent doesn't exist, create all necessary parent directories
-        if not parent:
-            try:
-                parent = self._create_parent_dirs(path)
-            except HTTPException:
-                # Re-raise if _create_parent_dirs found an invalid path structure
-                raise
-            except Exception:
+            # 3. Handle validation based on what was found.
+            if node and node.get("type") == "directory":
                 raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid path: cannot create parent directories for {path}",
+                    status_code=400, detail=f"A directory already exists at path: {path}"
                 )
 
-        file_name = path.split("/")[-1]
-
-        # 5. Perform the write/overwrite.
-        # Remove the old file if it exists.
-        parent["children"] = [
-            child
-            for child in parent.get("children", [])
-            if not (child.get("name") == file_name and child.get("type") == "file")
-        ]
-
-        # Add the new file.
-        new_file = {"type": "file", "name": file_name, "content": content}
-        parent["children"].append(new_file)
-        self.state_manager.set("filesystem", self.state_manager.get("filesystem"))
+            # 4. If parent doesn't exist, create all necessary parent directories
+            if not parent:
+                try:
+                    parent = self._create_parent_dirs(path, root)
+                except HTTPException:
+                    # Re-raise if _create_parent_dirs found an invalid path structure
+                    raise
+                except Exception:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid path: cannot create parent directories for {path}",
+                    )
+
+            # 5. Perform the write/overwrite.
+            # Remove the old file if it exists.
+            parent["children"] = [
+                child
+                for child in parent.get("children", [])
+                if not (child.get("name") == file_name and child.get("type") == "file")
+            ]
+
+            # Add the new file.
+            new_file = {"type": "file", "name": file_name, "content": content}
+            parent["children"].append(new_file)
+            return root
+
+        self.state_manager.update("filesystem", change)
         return f"Successfully wrote to file: {path}"
 
     def delete_file(self, path: str) -> str:
         """Deletes a specified file."""
-        node, parent = self._find_node_and_parent(path)
 
-        if not node:
-            raise HTTPException(status_code=404, detail=f"File not found: {path}")
-        if not parent:
-            raise HTTPException(status_code=500, detail="Cannot delete root directory.")
-        if node.get("type") != "file":
-            raise HTTPException(
-                status_code=400, detail="Path is a directory, not a file."
-            )
+        def change(root):
+            node, parent = self._find_node_and_parent(path, root)
 
-        parent["children"] = [
-            child for child in parent["children"] if child["name"] != node["name"]
-        ]
+            if not node:
+                raise HTTPException(status_code=404, detail=f"File not found: {path}")
+            if not parent:
+                raise HTTPException(status_code=500, detail="Cannot delete root directory.")
+            if node.get("type") != "file":
+                raise HTTPException(
+                    status_code=400, detail="Path is a directory, not a file."
+                )
+
+            parent["children"] = [
+                child for child in parent["children"] if child["name"] != node["name"]
+            ]
+            return root
 
-        self.state_manager.set("filesystem", self.state_manager.get("filesystem"))
+        self.state_manager.update("filesystem", change)
         return f"Successfully deleted file: {path}"
 
     def create_directory(self, path: str) -> str:
@@ -190,62 +200,68 @@ class FileSystemTool(BaseTool):
                 status_code=400, detail="Cannot create the root directory."
             )
 
-        # 2. Find the target and its parent.
-        node, parent = self._find_node_and_parent(path)
-
-        # 3. Handle validation based on what was found.
-        if node:
-            if node.get("type") == "directory":
-                raise HTTPException(
-                    status_code=400, detail=f"Directory already exists at path: {path}"
-                )
-            else:
-                raise HTTPException(
-                    status_code=400, detail=f"A file already exists at path: {path}"
-                )
-
-        # 4. If parent doesn't exist, create all necessary parent directories
-        if not parent:
-            try:
-                parent = self._create_parent_dirs(path)
-            except HTTPException:
-                # Re-raise if _create_parent_dirs found an invalid path structure
-                raise
-            except Exception:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid path: cannot create parent directories for {path}",
-                )
-
         directory_name = path.split("/")[-1]
 
-        # 5. Create the new directory.
-        new_directory = {"type": "directory", "name": directory_name, "children": []}
-        parent["children"].append(new_directory)
-        self.state_manager.set("filesystem", self.state_manager.get("filesystem"))
+        def change(root):
+            # 2. Find the target and its parent.
+            node, parent = self._find_node_and_parent(path, root)
+
+            # 3. Handle validation based on what was found.
+            if node:
+                if node.get("type") == "directory":
+                    raise HTTPException(
+                        status_code=400, detail=f"Directory already exists at path: {path}"
+                    )
+                else:
+                    raise HTTPException(
+                        status_code=400, detail=f"A file already exists at path: {path}"
+                    )
+
+            # 4. If parent doesn't exist, create all necessary parent directories
+            if not parent:
+                try:
+                    parent = self._create_parent_dirs(path, root)
+                except HTTPException:
+                    # Re-raise if _create_parent_dirs found an invalid path structure
+                    raise
+                except Exception:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid path: cannot create parent directories for {path}",
+                    )
+
+            # 5. Create the new directory.
+            new_directory = {"type": "directory", "name": directory_name, "children": []}
+            parent["children"].append(new_directory)
+            return root
+
+        self.state_manager.update("filesystem", change)
         return f"Successfully created directory: {path}"
 
     def delete_directory(self, path: str) -> str:
         """Deletes a specified directory (must be empty)."""
-        node, parent = self._find_node_and_parent(path)
 
-        if not node:
-            raise HTTPException(status_code=404, detail=f"Directory not found: {path}")
-        if not parent:
-            raise HTTPException(status_code=500, detail="Cannot delete root directory.")
-        if node.get("type") != "directory":
-            raise HTTPException(
-                status_code=400, detail="Path is a file, not a directory."
-            )
-        if node.get("children") and len(node.get("children", [])) > 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Directory is not empty. Please delete all contents first.",
-            )
+        def change(root):
+            node, parent = self._find_node_and_parent(path, root)
 
-        parent["children"] = [
-            child for child in parent["children"] if child["name"] != node["name"]
-        ]
+            if not node:
+                raise HTTPException(status_code=404, detail=f"Directory not found: {path}")
+            if not parent:
+                raise HTTPException(status_code=500, detail="Cannot delete root directory.")
+            if node.get("type") != "directory":
+                raise HTTPException(
+                    status_code=400, detail="Path is a file, not a directory."
+                )
+            if node.get("children") and len(node.get("children", [])) > 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Directory is not empty. Please delete all contents first.",
+                )
+
+            parent["children"] = [
+                child for child in parent["children"] if child["name"] != node["name"]
+            ]
+            return root
 
-        self.state_manager.set("filesystem", self.state_manager.get("filesystem"))
+        self.state_manager.update("filesystem", change)
         return f"Successfully deleted directory: {path}"
@@ -15,6 +15,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from base_module_template import SandboxModule
+from indexed_collection import paginate
 from mock_data_generator import MockDataGenerator
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,19 @@ class FirewallManagementTool(SandboxModule):
     Firewall Management module implementation for sandbox environment.
     Provides mock firewall functionality for learning and testing.
     """
+
+    collection_indexes = {
+        "firewall_rules": {
+            "hash": ["action"],
+            "text": [
+                "name",
+                "source_address",
+                "destination_address",
+                "source_zone",
+                "destination_zone",
+            ],
+        }
+    }
     
     def __init__(self):
         super().__init__(
@@ -36,7 +50,6 @@ class FirewallManagementTool(SandboxModule):
         self.mock_generator = MockDataGenerator()
         self.firewall_name = "Sandbox-FW-01"
         self.firewall_model = "Virtual Firewall Pro"
-        self.initialize_mock_data()
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -314,7 +327,9 @@ class FirewallManagementTool(SandboxModule):
                     "filter": {"type": "string", "description": "Filter by rule name, source, or destination"},
                     "zone": {"type": "string", "description": "Filter by source or destination zone"},
                     "action": {"type": "string", "enum": ["Allow", "Deny", "Drop"]},
-                    "enabled_only": {"type": "boolean", "description": "Show only enabled rules"}
+                    "enabled_only": {"type": "boolean", "description": "Show only enabled rules"},
+                    "limit": {"type": "integer", "description": "Maximum number of results to return", "default": 100},
+                    "offset": {"type": "integer", "description": "Number of results to skip", "default": 0}
                 },
                 "is_sandbox": True
             },
@@ -419,49 +434,31 @@ class FirewallManagementTool(SandboxModule):
     def list_firewall_rules(self, **kwargs) -> Dict[str, Any]:
         """List firewall rules with filtering options."""
         try:
-            rules = self.mock_data.get("firewall_rules", [])
             filter_text = kwargs.get("filter", "").lower()
             zone_filter = kwargs.get("zone", "")
             action_filter = kwargs.get("action", "")
             enabled_only = kwargs.get("enabled_only", False)
             
             # Apply filters
-            filtered_rules = rules
-            
-            if filter_text:
-                filtered_rules = [
-                    rule for rule in filtered_rules
-                    if (filter_text in rule["name"].lower() or
-                        filter_text in rule["source_address"].lower() or
-                        filter_text in rule["destination_address"].lower())
-                ]
-            
-            if zone_filter:
-                filtered_rules = [
-                    rule for rule in filtered_rules
-                    if (zone_filter.lower() in rule["source_zone"].lower() or
-                        zone_filter.lower() in rule["destination_zone"].lower())
-                ]
-            
-            if action_filter:
-                filtered_rules = [
-                    rule for rule in filtered_rules
-                    if rule["action"] == action_filter
-                ]
-            
-            if enabled_only:
-                filtered_rules = [
-                    rule for rule in filtered_rules
-                    if rule["enabled"]
-                ]
+            filtered_rules = self.get_collection("firewall_rules").query(
+                equals={"action": action_filter} if action_filter else None,
+                contains=[
+                    (filter_text, ("name", "source_address", "destination_address")),
+                    (zone_filter, ("source_zone", "destination_zone")),
+                ],
+                where=(lambda rule: rule["enabled"]) if enabled_only else None,
+            )
+            page, pagination = paginate(
+                filtered_rules, kwargs.get("limit"), kwargs.get("offset", 0)
+            )
             
             return {
                 "tool": "list_firewall_rules",
                 "status": "success",
                 "timestamp": datetime.utcnow().isoformat(),
                 "data": {
-                    "rules": filtered_rules,
-                    "total_count": len(filtered_rules),
+                    "rules": page,
+                    **pagination,
                     "filters_applied": {
                         "filter": filter_text,
                         "zone": zone_filter,
@@ -0,0 +1,238 @@
+"""
+In-memory indexed collections for sandbox module mock data.
+
+Sandbox modules keep their mock data as lists of dictionaries. Filtering
+those lists with a comprehension on every tool call is linear in the size of
+the dataset (and parsing timestamps on every call makes it worse), so an
+IndexedCollection builds the lookups once:
+
+- hash indexes for exact matches on identity and category fields
+- sorted timestamp indexes for time-range queries
+- n-gram indexes for case-insensitive substring filters
+
+Indexed field values are treated as immutable. Records appended to the
+underlying list are picked up incrementally; any other structural change
+needs a rebuild, which SandboxModule.get_collection() handles.
+
+This module is imported by base_module_template and must stay stdlib-only.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_NGRAM_SIZE = 3
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _ngrams(text: str, size: int) -> Set[str]:
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def paginate(
+    records: Sequence[Dict[str, Any]], limit: Any = None, offset: Any = 0
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Slice a result set into one page.
+
+    Args:
+        records: Full, ordered result set
+        limit: Page size; defaults to DEFAULT_PAGE_SIZE and is capped at
+            MAX_PAGE_SIZE
+        offset: Number of results to skip
+
+    Returns:
+        The page and a pagination summary (total, limit, offset, has_more)
+    """
+    limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+    offset = int(offset or 0)
+    if limit < 1 or offset < 0:
+        raise ValueError("limit must be positive and offset non-negative")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    page = list(records[offset : offset + limit])
+    return page, {
+        "total_count": len(records),
+        "limit": limit,
+        "offset": offset,
+        "has_more": offset + len(page) < len(records),
+    }
+
+
+class IndexedCollection:
+    """
+    A list of records with hash, timestamp and n-gram indexes.
+
+    Query results preserve the order of the underlying list.
+    """
+
+    def __init__(
+        self,
+        records: Optional[List[Dict[str, Any]]] = None,
+        hash_fields: Iterable[str] = (),
+        time_fields: Iterable[str] = (),
+        text_fields: Iterable[str] = (),
+        ngram_size: int = DEFAULT_NGRAM_SIZE,
+    ):
+        """
+        Args:
+            records: Records to index; the list is referenced, not copied
+            hash_fields: Fields to index for exact-match lookups
+            time_fields: ISO timestamp fields to index for range queries
+            text_fields: Fields to index for case-insensitive substring search
+            ngram_size: Length of the n-grams in the substring index
+        """
+        self.records: List[Dict[str, Any]] = records if records is not None else []
+        self.hash_fields = tuple(hash_fields)
+        self.time_fields = tuple(time_fields)
+        self.text_fields = tuple(text_fields)
+        self.ngram_size = ngram_size
+
+        self._hash: Dict[str, Dict[Any, List[int]]] = {f: {} for f in self.hash_fields}
+        self._times: Dict[str, List[Tuple[datetime, int]]] = {
+            f: [] for f in self.time_fields
+        }
+        self._text: Dict[str, List[str]] = {f: [] for f in self.text_fields}
+        self._grams: Dict[str, Dict[str, Set[int]]] = {f: {} for f in self.text_fields}
+        self._indexed_count = 0
+
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def covers(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        Whether this collection indexes ``records`` as they are now, allowing
+        for appends (which refresh() picks up) but not removals.
+        """
+        return records is self.records and len(records) >= self._indexed_count
+
+    def refresh(self) -> None:
+        """Index records appended to the underlying list since the last call."""
+        for position in range(self._indexed_count, len(self.records)):
+            self._index_record(position, self.records[position])
+        self._indexed_count = len(self.records)
+
+    def _index_record(self, position: int, record: Dict[str, Any]) -> None:
+        for field in self.hash_fields:
+            self._hash[field].setdefault(record.get(field), []).append(position)
+
+        for field in self.time_fields:
+            timestamp = _parse_timestamp(record.get(field))
+            if timestamp is not None:
+                entries = self._times[field]
+                entry = (timestamp, position)
+                if not entries or entries[-1] <= entry:
+                    entries.append(entry)
+                else:
+                    entries.insert(bisect_right(entries, entry), entry)
+
+        for field in self.text_fields:
+            value = record.get(field)
+            text = str(value).lower() if value is not None else ""
+            self._text[field].append(text)
+            grams = self._grams[field]
+            for gram in _ngrams(text, self.ngram_size):
+                grams.setdefault(gram, set()).add(position)
+
+    def get(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Return the first record whose hash-indexed ``field`` equals ``value``."""
+        self.refresh()
+        positions = self._hash[field].get(value)
+        return self.records[positions[0]] if positions else None
+
+    def _equals(self, field: str, value: Any) -> Set[int]:
+        return set(self._hash[field].get(value, ()))
+
+    def _between(
+        self, field: str, since: Optional[datetime], until: Optional[datetime]
+    ) -> Set[int]:
+        entries = self._times[field]
+        lo = bisect_left(entries, (since,)) if since is not None else 0
+        hi = bisect_right(entries, (until, len(self.records))) if until is not None else len(entries)
+        return {position for _, position in entries[lo:hi]}
+
+    def _contains(self, field: str, text: str, candidates: Optional[Set[int]]) -> Set[int]:
+        values = self._text[field]
+        if len(text) >= self.ngram_size:
+            grams = self._grams[field]
+            postings = sorted(
+                (grams.get(gram, set()) for gram in _ngrams(text, self.ngram_size)),
+                key=len,
+            )
+            narrowed = set(postings[0])
+            for posting in postings[1:]:
+                narrowed &= posting
+                if not narrowed:
+                    break
+            if candidates is not None:
+                narrowed &= candidates
+        else:
+            narrowed = candidates if candidates is not None else range(len(values))
+        # n-grams only narrow the candidates; confirm the substring itself
+        return {position for position in narrowed if text in values[position]}
+
+    def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        contains: Optional[Sequence[Tuple[str, Sequence[str]]]] = None,
+        time_field: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the records matching every given condition.
+
+        Args:
+            equals: Exact values for hash-indexed fields
+            contains: (text, fields) pairs; each text must occur, case
+                insensitively, in at least one of its text-indexed fields.
+                Pairs with empty text are ignored
+            time_field: Timestamp-indexed field for ``since``/``until``
+            since: Inclusive lower time bound
+            until: Inclusive upper time bound
+            where: Predicate for conditions on non-indexed fields, applied
+                to the records left after the indexed conditions
+
+        Returns:
+            Matching records in their original order
+        """
+        self.refresh()
+        candidates: Optional[Set[int]] = None
+
+        for field, value in (equals or {}).items():
+            matched = self._equals(field, value)
+            candidates = matched if candidates is None else candidates & matched
+
+        if time_field and (since is not None or until is not None):
+            matched = self._between(time_field, since, until)
+            candidates = matched if candidates is None else candidates & matched
+
+        for text, fields in contains or ():
+            if not text:
+                continue
+            text = text.lower()
+            matched = set()
+            for field in fields:
+                matched |= self._contains(field, text, candidates)
+            candidates = matched
+
+        positions = sorted(candidates) if candidates is not None else range(len(self.records))
+        records = [self.records[position] for position in positions]
+        if where is not None:
+            records = [record for record in records if where(record)]
+        return records
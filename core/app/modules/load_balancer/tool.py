@@ -14,6 +14,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from base_module_template import SandboxModule
+from indexed_collection import paginate
 from mock_data_generator import MockDataGenerator
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,10 @@ class LoadBalancerTool(SandboxModule):
     Load Balancer module implementation for sandbox environment.
     Provides mock load balancing functionality for learning and testing.
     """
+
+    collection_indexes = {
+        "virtual_servers": {"hash": ["status", "protocol"], "text": ["name", "vip"]}
+    }
     
     def __init__(self):
         super().__init__(
@@ -34,7 +39,6 @@ class LoadBalancerTool(SandboxModule):
         )
         self.mock_generator = MockDataGenerator()
         self.lb_name = "sandbox-lb-01"
-        self.initialize_mock_data()
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -308,7 +312,9 @@ class LoadBalancerTool(SandboxModule):
                 "parameters": {
                     "filter": {"type": "string", "description": "Filter by virtual server name or VIP"},
                     "status": {"type": "string", "enum": ["All", "Active", "Inactive"]},
-                    "protocol": {"type": "string", "enum": ["All", "HTTP", "HTTPS", "TCP", "UDP"]}
+                    "protocol": {"type": "string", "enum": ["All", "HTTP", "HTTPS", "TCP", "UDP"]},
+                    "limit": {"type": "integer", "description": "Maximum number of results to return", "default": 100},
+                    "offset": {"type": "integer", "description": "Number of results to skip", "default": 0}
                 },
                 "is_sandbox": True
             },
@@ -409,40 +415,31 @@ class LoadBalancerTool(SandboxModule):
     def list_virtual_servers(self, **kwargs) -> Dict[str, Any]:
         """List virtual servers with filtering options."""
         try:
-            virtual_servers = self.mock_data.get("virtual_servers", [])
             filter_text = kwargs.get("filter", "").lower()
             status = kwargs.get("status", "All")
             protocol = kwargs.get("protocol", "All")
             
             # Apply filters
-            filtered_servers = virtual_servers
-            
-            if filter_text:
-                filtered_servers = [
-                    vs for vs in filtered_servers
-                    if (filter_text in vs["name"].lower() or
-                        filter_text in vs["vip"])
-                ]
-            
+            equals = {}
             if status != "All":
-                filtered_servers = [
-                    vs for vs in filtered_servers
-                    if vs["status"] == status
-                ]
-            
+                equals["status"] = status
             if protocol != "All":
-                filtered_servers = [
-                    vs for vs in filtered_servers
-                    if vs["protocol"] == protocol
-                ]
+                equals["protocol"] = protocol
+            
+            filtered_servers = self.get_collection("virtual_servers").query(
+                equals=equals, contains=[(filter_text, ("name", "vip"))]
+            )
+            page, pagination = paginate(
+                filtered_servers, kwargs.get("limit"), kwargs.get("offset", 0)
+            )
             
             return {
                 "tool": "list_virtual_servers",
                 "status": "success",
                 "timestamp": datetime.utcnow().isoformat(),
                 "data": {
-                    "virtual_servers": filtered_servers,
-                    "total_count": len(filtered_servers),
+                    "virtual_servers": page,
+                    **pagination,
                     "filters_applied": {
                         "filter": filter_text,
                         "status": status,
@@ -30,9 +30,11 @@ class MemoryTool(BaseTool):
         """
         Stores or updates a value in the memory scratchpad.
         """
-        memory_state = self.state_manager.get("memory")
-        memory_state[key] = value
-        self.state_manager.set("memory", memory_state)
+        def change(memory_state):
+            memory_state[key] = value
+            return memory_state
+
+        self.state_manager.update("memory", change)
 
         print(f"SETTING MEMORY for key '{key}'")
         return f"Successfully set memory for key: '{key}'"
@@ -52,10 +54,16 @@ class MemoryTool(BaseTool):
         """
         Deletes a key-value pair from the memory scratchpad.
         """
-        memory_state = self.state_manager.get("memory")
-        if key in memory_state:
-            del memory_state[key]
-            self.state_manager.set("memory", memory_state)
+        deleted = False
+
+        def change(memory_state):
+            nonlocal deleted
+            deleted = key in memory_state
+            memory_state.pop(key, None)
+            return memory_state
+
+        self.state_manager.update("memory", change)
+        if deleted:
             return f"Successfully deleted memory for key: '{key}'"
         return f"Error: No memory found for key: '{key}'"
 
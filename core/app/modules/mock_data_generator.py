@@ -1,14 +1,209 @@
 """
 Mock data generator for IntentVerse modules.
 Provides realistic but safe mock data for sandbox environments.
+
+Besides the per-record ``generate_*`` methods, the generator has a columnar
+mode for large datasets: each field is sampled in one vectorized pass into a
+typed array (NumPy when installed, the stdlib ``array`` module otherwise) and
+records are only materialized as dicts when they are read. The ``stream_*``
+and ``write_*`` methods build on this to write large scenarios into content
+packs or a SQLite connection (such as the database module's) chunk by chunk.
 """
 
+import itertools
+import json
 import random
+import re
 import string
+from array import array
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Sequence, Tuple
 import uuid
 
+try:
+    import numpy as np
+
+    _NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    _NUMPY_AVAILABLE = False
+
+
+DEFAULT_CHUNK_SIZE = 10000
+
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class VectorSampler:
+    """
+    Draws whole columns of random values at once.
+
+    Uses a NumPy ``Generator`` when NumPy is installed and a seeded
+    ``random.Random`` otherwise. Integer ranges are inclusive on both ends,
+    matching ``random.randint``.
+    """
+
+    def __init__(self, seed: Optional[int] = None, use_numpy: Optional[bool] = None):
+        self.use_numpy = _NUMPY_AVAILABLE if use_numpy is None else use_numpy
+        if self.use_numpy and not _NUMPY_AVAILABLE:
+            raise ImportError("NumPy is not installed")
+
+        if self.use_numpy:
+            self._generator = np.random.default_rng(seed)
+        else:
+            self._random = random.Random(seed)
+
+    def integers(self, low: int, high: int, size: int) -> Sequence[int]:
+        """Samples ``size`` integers uniformly from ``[low, high]``."""
+        if self.use_numpy:
+            return self._generator.integers(low, high + 1, size=size, dtype=np.int64)
+        return array("q", self._random.choices(range(low, high + 1), k=size))
+
+    def codes(
+        self, category_count: int, size: int, weights: Optional[Sequence[float]] = None
+    ) -> Sequence[int]:
+        """Samples ``size`` category codes in ``[0, category_count)``."""
+        if weights is None:
+            return self.integers(0, category_count - 1, size)
+        if self.use_numpy:
+            p = np.asarray(weights, dtype=np.float64)
+            return self._generator.choice(category_count, size=size, p=p / p.sum())
+        return array(
+            "q", self._random.choices(range(category_count), weights=weights, k=size)
+        )
+
+    def uniform(self, low: float, high: float, size: int) -> Sequence[float]:
+        """Samples ``size`` floats uniformly from ``[low, high)``."""
+        if self.use_numpy:
+            return self._generator.uniform(low, high, size=size)
+        draw = self._random.random
+        span = high - low
+        return array("d", [low + span * draw() for _ in range(size)])
+
+    def booleans(self, size: int, probability: float = 0.5) -> Sequence[int]:
+        """Samples ``size`` flags that are set with the given probability."""
+        if self.use_numpy:
+            return self._generator.random(size) < probability
+        draw = self._random.random
+        return array("b", [draw() < probability for _ in range(size)])
+
+
+def _python_value(value: Any) -> Any:
+    # NumPy scalars are not JSON serializable, so convert them on the way out
+    return value.item() if hasattr(value, "item") else value
+
+
+class ArrayColumn:
+    """A column backed by a typed array of numbers or flags."""
+
+    __slots__ = ("values", "as_bool")
+
+    def __init__(self, values: Sequence[Any], as_bool: bool = False):
+        self.values = values
+        self.as_bool = as_bool
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index: int) -> Any:
+        value = _python_value(self.values[index])
+        return bool(value) if self.as_bool else value
+
+
+class CategoricalColumn:
+    """A column stored as integer codes into a list of categories."""
+
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, codes: Sequence[int], categories: Sequence[Any]):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> Any:
+        value = self.categories[self.codes[index]]
+        # Categories may be lists (e.g. group memberships); hand out copies
+        return list(value) if isinstance(value, list) else value
+
+
+class DerivedColumn:
+    """A column whose values are computed from the row index on access."""
+
+    __slots__ = ("func", "length")
+
+    def __init__(self, func: Callable[[int], Any], length: int):
+        self.func = func
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Any:
+        return self.func(index)
+
+
+class ConstantColumn:
+    """A column holding the same value for every row."""
+
+    __slots__ = ("value", "length")
+
+    def __init__(self, value: Any, length: int):
+        self.value = value
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Any:
+        return self.value
+
+
+class ColumnarDataset:
+    """
+    A set of equally long columns that behaves like a read-only list of
+    records. Records are built as dicts only when indexed or iterated.
+    """
+
+    def __init__(self, kind: str, columns: Dict[str, Any], length: int):
+        self.kind = kind
+        self.columns = columns
+        self.length = length
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.columns)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("record index out of range")
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self.length):
+            yield {name: column[index] for name, column in self.columns.items()}
+
+    def column(self, name: str) -> List[Any]:
+        """Returns the values of one field as a list of Python objects."""
+        column = self.columns[name]
+        return [column[index] for index in range(self.length)]
+
+    def iter_rows(self, fields: Optional[Sequence[str]] = None) -> Iterator[Tuple]:
+        """Yields rows as tuples in ``fields`` order (all fields by default)."""
+        columns = [self.columns[name] for name in (fields or self.columns)]
+        for index in range(self.length):
+            yield tuple(column[index] for column in columns)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Materializes every record."""
+        return list(self)
+
 
 class MockDataGenerator:
     """
@@ -16,7 +211,18 @@ class MockDataGenerator:
     All data is clearly marked as mock/sandbox data.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        reference_time: Optional[datetime] = None,
+        use_numpy: Optional[bool] = None,
+    ):
+        # Used by the columnar mode only; the per-record methods keep using
+        # the global random module so callers can seed it themselves.
+        self.seed = seed
+        self.reference_time = reference_time
+        self.use_numpy = use_numpy
+
         self.first_names = [
             "Alice", "Bob", "Charlie", "Diana", "Edward", "Fiona", "George", "Helen",
             "Ian", "Julia", "Kevin", "Laura", "Michael", "Nancy", "Oliver", "Patricia",
@@ -325,4 +531,378 @@ class MockDataGenerator:
             domain = f"sandbox-{company}-{i+1}{tld}"
             domains.append(domain)
         
-        return domains
\ No newline at end of file
+        return domains
+
+    # ------------------------------------------------------------------
+    # Columnar mode
+    # ------------------------------------------------------------------
+
+    COLUMNAR_KINDS = ("users", "servers", "security_events", "dns_queries")
+
+    def create_sampler(self, seed: Optional[int] = None) -> VectorSampler:
+        """Creates a vector sampler seeded with ``seed`` or the generator seed."""
+        return VectorSampler(self.seed if seed is None else seed, self.use_numpy)
+
+    def generate_columnar(
+        self,
+        kind: str,
+        count: int,
+        start: int = 0,
+        sampler: Optional[VectorSampler] = None,
+    ) -> ColumnarDataset:
+        """
+        Generate ``count`` records of the given kind in columnar form.
+
+        Args:
+            kind: One of ``COLUMNAR_KINDS``
+            count: Number of records to generate
+            start: Index of the first record, used for sequential ids
+            sampler: Sampler to draw from (a new seeded one by default)
+
+        Returns:
+            ColumnarDataset whose records match the per-record generator
+        """
+        if kind not in self.COLUMNAR_KINDS:
+            raise ValueError(
+                f"Unknown columnar kind '{kind}', expected one of {self.COLUMNAR_KINDS}"
+            )
+        if count < 0:
+            raise ValueError("count must not be negative")
+
+        builder = getattr(self, f"_build_{kind}_columns")
+        columns = builder(sampler or self.create_sampler(), count, start)
+        return ColumnarDataset(kind, columns, count)
+
+    def stream_columnar(
+        self, kind: str, count: int, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[ColumnarDataset]:
+        """
+        Generate ``count`` records as a sequence of columnar chunks, so that
+        memory use is bounded by ``chunk_size`` rather than ``count``.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        sampler = self.create_sampler()
+        for start in range(0, count, chunk_size):
+            yield self.generate_columnar(
+                kind, min(chunk_size, count - start), start, sampler
+            )
+
+    def stream_records(
+        self, kind: str, count: int, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield ``count`` records one at a time, generated in chunks."""
+        for chunk in self.stream_columnar(kind, count, chunk_size):
+            yield from chunk
+
+    def write_json_array(
+        self,
+        fp: IO[str],
+        kind: str,
+        count: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """
+        Stream records as a JSON array to a text file object, e.g. a list in
+        the ``content_state`` section of a content pack being written out.
+
+        Returns:
+            Number of records written
+        """
+        written = 0
+        fp.write("[")
+        for record in self.stream_records(kind, count, chunk_size):
+            if written:
+                fp.write(",")
+            fp.write(json.dumps(record))
+            written += 1
+        fp.write("]")
+        return written
+
+    def write_sqlite_table(
+        self,
+        connection: Any,
+        table_name: str,
+        kind: str,
+        count: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """
+        Stream records into a SQLite table, creating it if needed. Works with
+        the database module's connection (``DatabaseTool.connection``).
+
+        List and dict values are stored as JSON text and booleans as 0/1.
+
+        Returns:
+            Number of rows inserted
+        """
+        if not _IDENTIFIER_PATTERN.match(table_name):
+            raise ValueError(f"Invalid table name: {table_name}")
+
+        inserted = 0
+        insert_sql = None
+        for chunk in self.stream_columnar(kind, count, chunk_size):
+            if insert_sql is None:
+                fields = chunk.fields
+                first = chunk[0]
+                column_defs = ", ".join(
+                    f'"{name}" {_sqlite_type(first[name])}' for name in fields
+                )
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table_name}" ({column_defs})'
+                )
+                placeholders = ", ".join("?" for _ in fields)
+                quoted = ", ".join(f'"{name}"' for name in fields)
+                insert_sql = (
+                    f'INSERT INTO "{table_name}" ({quoted}) VALUES ({placeholders})'
+                )
+
+            connection.executemany(
+                insert_sql,
+                (tuple(map(_sqlite_value, row)) for row in chunk.iter_rows()),
+            )
+            inserted += len(chunk)
+
+        connection.commit()
+        return inserted
+
+    def _reference_time(self) -> datetime:
+        return self.reference_time or datetime.now()
+
+    def _days_ago(self, offsets: Sequence[int]) -> Callable[[int], str]:
+        now = self._reference_time()
+        return lambda i: (now - timedelta(days=int(offsets[i]))).isoformat()
+
+    def _minutes_ago(self, offsets: Sequence[int]) -> Callable[[int], str]:
+        now = self._reference_time()
+        return lambda i: (now - timedelta(minutes=int(offsets[i]))).isoformat()
+
+    def _build_users_columns(
+        self, sampler: VectorSampler, count: int, start: int
+    ) -> Dict[str, Any]:
+        first = sampler.codes(len(self.first_names), count)
+        last = sampler.codes(len(self.last_names), count)
+        department = sampler.codes(len(self.departments), count)
+        job = sampler.codes(len(self.job_titles), count)
+        phone_prefix = sampler.integers(100, 999, count)
+        phone_line = sampler.integers(1000, 9999, count)
+        building = sampler.codes(3, count)
+        floor = sampler.integers(1, 10, count)
+        manager = sampler.integers(1, 5, count)
+        created = sampler.integers(30, 365, count)
+        last_login = sampler.integers(0, 30, count)
+        groups, group_weights = _subset_categories(
+            ["Domain Users", "IT Staff", "Managers", "Developers", "Sales Team"], 1, 3
+        )
+
+        first_lower = [name.lower() for name in self.first_names]
+        last_lower = [name.lower() for name in self.last_names]
+        buildings = ["A", "B", "C"]
+
+        def username(i):
+            return f"{first_lower[first[i]]}.{last_lower[last[i]]}"
+
+        return {
+            "id": DerivedColumn(lambda i: f"user_{start + i + 1:03d}", count),
+            "username": DerivedColumn(username, count),
+            "email": DerivedColumn(lambda i: f"{username(i)}@sandbox.local", count),
+            "first_name": CategoricalColumn(first, self.first_names),
+            "last_name": CategoricalColumn(last, self.last_names),
+            "display_name": DerivedColumn(
+                lambda i: f"{self.first_names[first[i]]} {self.last_names[last[i]]}",
+                count,
+            ),
+            "department": CategoricalColumn(department, self.departments),
+            "job_title": DerivedColumn(
+                lambda i: f"{self.job_titles[job[i]]} - {self.departments[department[i]]}",
+                count,
+            ),
+            "employee_id": DerivedColumn(lambda i: f"EMP{start + i + 1000:04d}", count),
+            "phone": DerivedColumn(
+                lambda i: f"+1-555-{int(phone_prefix[i]):03d}-{int(phone_line[i]):04d}",
+                count,
+            ),
+            "office_location": DerivedColumn(
+                lambda i: f"Building {buildings[building[i]]}, Floor {int(floor[i])}",
+                count,
+            ),
+            "manager": DerivedColumn(
+                lambda i: f"manager_{int(manager[i]):03d}" if start + i > 5 else None,
+                count,
+            ),
+            "status": CategoricalColumn(
+                sampler.codes(2, count, weights=[3, 1]), ["Active", "Inactive"]
+            ),
+            "created_date": DerivedColumn(self._days_ago(created), count),
+            "last_login": DerivedColumn(self._days_ago(last_login), count),
+            "groups": CategoricalColumn(
+                sampler.codes(len(groups), count, weights=group_weights), groups
+            ),
+            "is_sandbox": ConstantColumn(True, count),
+        }
+
+    def _build_servers_columns(
+        self, sampler: VectorSampler, count: int, start: int
+    ) -> Dict[str, Any]:
+        server_type = sampler.codes(len(self.server_types), count)
+        octet_3 = sampler.integers(1, 254, count)
+        octet_4 = sampler.integers(1, 254, count)
+        last_backup = sampler.integers(0, 7, count)
+        installed = sampler.integers(30, 730, count)
+        window_day = sampler.codes(2, count)
+        window_hour = sampler.integers(1, 6, count)
+        slugs = [name.lower().replace(" ", "-") for name in self.server_types]
+        days = ["Sunday", "Saturday"]
+
+        return {
+            "id": DerivedColumn(lambda i: f"srv_{start + i + 1:03d}", count),
+            "hostname": DerivedColumn(
+                lambda i: f"sandbox-{slugs[server_type[i]]}-{start + i + 1:02d}", count
+            ),
+            "ip_address": DerivedColumn(
+                lambda i: f"192.168.{int(octet_3[i])}.{int(octet_4[i])}", count
+            ),
+            "server_type": CategoricalColumn(server_type, self.server_types),
+            "operating_system": CategoricalColumn(
+                sampler.codes(len(self.operating_systems), count),
+                self.operating_systems,
+            ),
+            "cpu_cores": CategoricalColumn(sampler.codes(4, count), [2, 4, 8, 16]),
+            "memory_gb": CategoricalColumn(
+                sampler.codes(5, count), [4, 8, 16, 32, 64]
+            ),
+            "disk_gb": CategoricalColumn(
+                sampler.codes(5, count), [100, 250, 500, 1000, 2000]
+            ),
+            "status": CategoricalColumn(
+                sampler.codes(3, count, weights=[3, 1, 1]),
+                ["Running", "Stopped", "Maintenance"],
+            ),
+            "uptime_days": ArrayColumn(sampler.integers(1, 365, count)),
+            "last_backup": DerivedColumn(self._days_ago(last_backup), count),
+            "installed_date": DerivedColumn(self._days_ago(installed), count),
+            "location": CategoricalColumn(
+                sampler.codes(3, count),
+                ["Datacenter East", "Datacenter West", "Datacenter Central"],
+            ),
+            "owner": CategoricalColumn(
+                sampler.codes(len(self.departments), count), self.departments
+            ),
+            "maintenance_window": DerivedColumn(
+                lambda i: f"{days[window_day[i]]} {int(window_hour[i]):02d}:00", count
+            ),
+            "is_sandbox": ConstantColumn(True, count),
+        }
+
+    def _build_security_events_columns(
+        self, sampler: VectorSampler, count: int, start: int
+    ) -> Dict[str, Any]:
+        event_types = [
+            "Login Attempt",
+            "File Access",
+            "Network Connection",
+            "Policy Violation",
+            "Malware Detection",
+        ]
+        descriptions = [f"Mock {name.lower()} event for testing" for name in event_types]
+        event_type = sampler.codes(len(event_types), count)
+        timestamp = sampler.integers(0, 10080, count)  # Last week
+        octet_3 = sampler.integers(1, 254, count)
+        octet_4 = sampler.integers(1, 254, count)
+        user = sampler.integers(1, 100, count)
+        resolution_time = sampler.integers(5, 240, count)
+        resolved = sampler.booleans(count)
+
+        return {
+            "id": DerivedColumn(lambda i: f"sec_{start + i + 1:03d}", count),
+            "timestamp": DerivedColumn(self._minutes_ago(timestamp), count),
+            "event_type": CategoricalColumn(event_type, event_types),
+            "severity": CategoricalColumn(
+                sampler.codes(4, count), ["Low", "Medium", "High", "Critical"]
+            ),
+            "source_ip": DerivedColumn(
+                lambda i: f"192.168.{int(octet_3[i])}.{int(octet_4[i])}", count
+            ),
+            "user": DerivedColumn(lambda i: f"user_{int(user[i]):03d}", count),
+            "description": CategoricalColumn(event_type, descriptions),
+            "status": CategoricalColumn(
+                sampler.codes(4, count),
+                ["Open", "Investigating", "Resolved", "False Positive"],
+            ),
+            "assigned_to": CategoricalColumn(
+                sampler.codes(3, count),
+                ["Security Team", "IT Admin", "Incident Response"],
+            ),
+            "resolution_time": DerivedColumn(
+                lambda i: int(resolution_time[i]) if resolved[i] else None, count
+            ),
+            "is_sandbox": ConstantColumn(True, count),
+        }
+
+    def _build_dns_queries_columns(
+        self, sampler: VectorSampler, count: int, start: int
+    ) -> Dict[str, Any]:
+        # Mirrors the query log records kept by the DNS management module
+        domains = [
+            "www.sandbox.local", "mail.sandbox.local", "ftp.sandbox.local",
+            "google.com", "microsoft.com", "github.com", "stackoverflow.com"
+        ]
+        query_types = ["A", "AAAA", "CNAME", "MX", "TXT", "NS", "PTR"]
+        timestamp = sampler.integers(0, 1440, count)  # Last day
+        octet_3 = sampler.integers(1, 10, count)
+        octet_4 = sampler.integers(1, 254, count)
+
+        return {
+            "id": DerivedColumn(lambda i: f"query_{start + i + 1:03d}", count),
+            "timestamp": DerivedColumn(self._minutes_ago(timestamp), count),
+            "client_ip": DerivedColumn(
+                lambda i: f"192.168.{int(octet_3[i])}.{int(octet_4[i])}", count
+            ),
+            "query_name": CategoricalColumn(
+                sampler.codes(len(domains), count), domains
+            ),
+            "query_type": CategoricalColumn(
+                sampler.codes(len(query_types), count), query_types
+            ),
+            "response_code": CategoricalColumn(
+                sampler.codes(3, count, weights=[3, 1, 1]),
+                ["NOERROR", "NXDOMAIN", "SERVFAIL"],
+            ),
+            "response_time_ms": ArrayColumn(sampler.integers(1, 50, count)),
+            "cache_hit": ArrayColumn(sampler.booleans(count), as_bool=True),
+            "recursive": ArrayColumn(sampler.booleans(count), as_bool=True),
+            "is_sandbox": ConstantColumn(True, count),
+        }
+
+
+def _subset_categories(
+    items: List[str], min_size: int, max_size: int
+) -> Tuple[List[List[str]], List[float]]:
+    """
+    Enumerates the subsets of ``items`` with ``min_size`` to ``max_size``
+    members, weighted so that every subset size is equally likely, the same
+    distribution as ``random.sample(items, random.randint(min_size, max_size))``.
+    """
+    subsets, weights = [], []
+    for size in range(min_size, max_size + 1):
+        combos = [list(combo) for combo in itertools.combinations(items, size)]
+        subsets.extend(combos)
+        weights.extend([1.0 / len(combos)] * len(combos))
+    return subsets, weights
+
+
+def _sqlite_type(value: Any) -> str:
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+def _sqlite_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
@@ -249,7 +249,6 @@ class {class_name}Tool(SandboxModule):
             description="Mock {class_name.replace('_', ' ').lower()} module for sandbox testing"
         )
         self.mock_generator = MockDataGenerator()
-        self.initialize_mock_data()
     
     def get_schema(self) -> Dict[str, Any]:
         """Return the UI schema for this module."""
@@ -283,7 +282,7 @@ class {class_name}Tool(SandboxModule):
         return {{
             "module_id": self.module_id,
             "status": "active",
-            "mock_data_loaded": bool(self.mock_data),
+            "mock_data_loaded": self.mock_data_loaded,
             "tools_available": len(self.get_tools()),
             "last_updated": datetime.utcnow().isoformat(),
             "is_sandbox": True
@@ -0,0 +1,300 @@
+"""
+On-disk archive of timeline events.
+
+The in-memory timeline only keeps the most recent events (see the byte
+budget in tool.py). With an archive directory configured, the events it
+drops are appended here instead of being lost, and timeline queries
+continue into the archive once the in-memory events are exhausted.
+
+Events are stored in daily, append-only NDJSON segments named
+``events-YYYY-MM-DD.ndjson`` (UTC dates). Next to each segment, a sparse
+time index ``events-YYYY-MM-DD.idx`` records the timestamp and byte offset
+of an event about every INDEX_INTERVAL bytes, so that a query starting
+part way through a day seeks close to its start instead of reading the
+whole segment. Queries stream segments line by line and keep at most
+``limit`` events, so their memory use does not depend on the archive size.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ...config import Config
+
+try:
+    import fcntl
+
+    _FCNTL_AVAILABLE = True
+except ImportError:
+    _FCNTL_AVAILABLE = False
+
+# Bytes of events between entries of a segment's time index
+INDEX_INTERVAL = 64 * 1024
+
+SEGMENT_PREFIX = "events-"
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse an event timestamp; naive timestamps are taken as UTC."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class TimelineArchive:
+    """Daily NDJSON segments of timeline events, with sparse time indexes."""
+
+    def __init__(self, directory: str, retention_days: int = 0):
+        """
+        Args:
+            directory: Directory holding the segments; created if missing
+            retention_days: Days of segments kept; 0 keeps them all
+        """
+        self.directory = Path(directory)
+        self.retention_days = retention_days
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pruned_on: Optional[date] = None
+
+    def _segment_path(self, day: date) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{day.isoformat()}.ndjson"
+
+    def _segment_days(self) -> List[date]:
+        days = []
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*.ndjson"):
+            try:
+                days.append(date.fromisoformat(path.stem[len(SEGMENT_PREFIX) :]))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        # Serialises appends between worker processes
+        with open(self.directory / ".lock", "a") as lock_file:
+            if _FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if _FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, events: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append events to the segments of their days, in timestamp order
+        whatever order they are passed in, so that the time index stays
+        usable.
+
+        Returns:
+            Number of events archived
+        """
+        by_day: Dict[date, List[Tuple[datetime, str, str]]] = {}
+        for event in events:
+            timestamp = parse_timestamp(event.get("timestamp"))
+            if timestamp is None:
+                timestamp = datetime.now(timezone.utc)
+            timestamp = timestamp.astimezone(timezone.utc)
+            by_day.setdefault(timestamp.date(), []).append(
+                (timestamp, event.get("timestamp", ""), json.dumps(event, default=str))
+            )
+
+        count = 0
+        with self._lock, self._file_lock():
+            for day, entries in sorted(by_day.items()):
+                entries.sort(key=lambda entry: entry[0])
+                self._append_segment(day, [entry[1:] for entry in entries])
+                count += len(entries)
+        self._prune()
+        return count
+
+    def _append_segment(self, day: date, lines: List[Tuple[str, str]]) -> None:
+        path = self._segment_path(day)
+        index_path = path.with_suffix(".idx")
+        last_indexed = self._last_indexed_offset(index_path)
+
+        index_entries = []
+        with open(path, "a+b") as segment:
+            offset = segment.tell()
+            if offset:
+                # Start a new line after a line torn by a crash during an append
+                segment.seek(offset - 1)
+                if segment.read(1) != b"\n":
+                    segment.write(b"\n")
+                    offset += 1
+            for timestamp, line in lines:
+                if last_indexed is None or offset - last_indexed >= INDEX_INTERVAL:
+                    index_entries.append(f"{timestamp}\t{offset}\n")
+                    last_indexed = offset
+                data = (line + "\n").encode()
+                segment.write(data)
+                offset += len(data)
+        if index_entries:
+            with open(index_path, "a") as index:
+                index.writelines(index_entries)
+
+    @staticmethod
+    def _last_indexed_offset(index_path: Path) -> Optional[int]:
+        try:
+            with open(index_path, "rb") as index:
+                index.seek(0, os.SEEK_END)
+                index.seek(max(0, index.tell() - 256))
+                last_line = index.read().splitlines()[-1]
+            return int(last_line.split(b"\t")[1])
+        except (FileNotFoundError, IndexError, ValueError):
+            return None
+
+    def _seek_offset(self, day: date, start: Optional[datetime]) -> int:
+        """Offset of the last indexed event before ``start`` in a segment."""
+        if start is None:
+            return 0
+        offset = 0
+        try:
+            with open(self._segment_path(day).with_suffix(".idx")) as index:
+                for line in index:
+                    timestamp, _, entry_offset = line.rstrip("\n").partition("\t")
+                    parsed = parse_timestamp(timestamp)
+                    if parsed is not None and parsed >= start:
+                        break
+                    offset = int(entry_offset)
+        except (FileNotFoundError, ValueError):
+            return 0
+        return offset
+
+    def query(
+        self,
+        event_types: Optional[Set[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 100,
+        exclude_ids: Optional[Set[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find archived events, newest first.
+
+        Args:
+            event_types: Event types to include; None includes all
+            start: Earliest timestamp included
+            end: Latest timestamp included
+            limit: Maximum number of events returned
+            exclude_ids: Ids of events to skip, e.g. those still in memory
+
+        Returns:
+            The matching events, newest first
+        """
+        start = parse_timestamp(start) if start else None
+        end = parse_timestamp(end) if end else None
+        results: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return results
+
+        for day in reversed(self._segment_days()):
+            if start is not None and day < start.astimezone(timezone.utc).date():
+                break
+            if end is not None and day > end.astimezone(timezone.utc).date():
+                continue
+            # The newest matches of the day, by timestamp rather than by
+            # position, in case appends from several processes interleaved
+            remaining = limit - len(results)
+            matches: List[Tuple[datetime, int, Dict[str, Any]]] = []
+            order = itertools.count()
+            for event in self._scan(day, start):
+                timestamp = parse_timestamp(event.get("timestamp"))
+                if timestamp is None:
+                    continue
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp > end:
+                    continue
+                if event_types and event.get("event_type") not in event_types:
+                    continue
+                if exclude_ids and event.get("id") in exclude_ids:
+                    continue
+                entry = (timestamp, next(order), event)
+                if len(matches) < remaining:
+                    heapq.heappush(matches, entry)
+                else:
+                    heapq.heappushpop(matches, entry)
+            results.extend(event for _, _, event in sorted(matches, reverse=True))
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def _scan(self, day: date, start: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+        path = self._segment_path(day)
+        try:
+            segment = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with segment:
+            segment.seek(self._seek_offset(day, start))
+            for line in segment:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line torn by a crash during an append
+                    continue
+
+    def _prune(self) -> None:
+        if self.retention_days <= 0:
+            return
+        today = datetime.now(timezone.utc).date()
+        if self._pruned_on == today:
+            return
+        self._pruned_on = today
+        cutoff = today - timedelta(days=self.retention_days)
+        for day in self._segment_days():
+            if day >= cutoff:
+                break
+            for path in (self._segment_path(day), self._segment_path(day).with_suffix(".idx")):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            logging.info(f"Removed timeline archive segment for {day}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of segments and bytes in the archive."""
+        days = self._segment_days()
+        size = sum(
+            self._segment_path(day).stat().st_size
+            for day in days
+            if self._segment_path(day).exists()
+        )
+        return {
+            "segments": len(days),
+            "bytes": size,
+            "oldest": days[0].isoformat() if days else None,
+            "newest": days[-1].isoformat() if days else None,
+        }
+
+
+def create_timeline_archive() -> Optional[TimelineArchive]:
+    """
+    Create the configured timeline archive.
+
+    Returns:
+        The archive, or None if no archive directory is configured
+    """
+    config = Config.get_timeline_config()
+    if not config["archive_dir"]:
+        return None
+    try:
+        return TimelineArchive(config["archive_dir"], config["archive_retention_days"])
+    except OSError as e:
+        logging.error(f"Failed to open timeline archive {config['archive_dir']}: {e}")
+        return None
@@ -0,0 +1,218 @@
+"""
+Compaction of timeline event payloads.
+
+Timeline events carry the parameters and results of tool calls, which can
+be whole files, query results or email bodies. Events are kept in memory
+and pushed to every WebSocket client, so their ``details`` are compacted
+before they are stored:
+
+- Any field (a string, or a list or object as a whole) whose JSON encoding
+  exceeds ``field_max_bytes`` is replaced by a marker holding a preview,
+  its original length and the SHA-256 of its content.
+- The full value is kept out of band in a ``BlobStore`` under that hash,
+  so identical payloads are stored once, and can be fetched on demand
+  from ``/api/v1/timeline/blobs/{blob_id}``.
+
+The blob store keeps blobs in memory up to a byte limit, evicting the least
+recently used ones, or in a directory when one is configured.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from ...config import Config
+
+# Key identifying a compacted field's marker
+TRUNCATED_MARKER = "_truncated"
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, default=str).encode())
+
+
+def is_truncated(value: Any) -> bool:
+    """Whether a value is the marker of a compacted field."""
+    return isinstance(value, dict) and value.get(TRUNCATED_MARKER) is True
+
+
+class BlobStore:
+    """
+    Content-addressed store for the full values of compacted fields.
+
+    Blobs are zlib-compressed JSON, named by the SHA-256 of the JSON.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None):
+        """
+        Args:
+            max_bytes: Compressed bytes kept in memory; unused with a directory
+            directory: Directory to keep blobs in instead of memory
+        """
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, blob_id: str) -> Path:
+        return self.directory / blob_id[:2] / blob_id
+
+    def put(self, value: Any) -> str:
+        """
+        Store a value.
+
+        Returns:
+            The blob id, the SHA-256 of the value's JSON encoding
+        """
+        encoded = json.dumps(value, default=str).encode()
+        blob_id = hashlib.sha256(encoded).hexdigest()
+
+        if self.directory is not None:
+            path = self._path(blob_id)
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                temporary = path.with_name(f"{blob_id}.{os.getpid()}.tmp")
+                temporary.write_bytes(zlib.compress(encoded))
+                os.replace(temporary, path)
+            return blob_id
+
+        with self._lock:
+            if blob_id in self._blobs:
+                self._blobs.move_to_end(blob_id)
+                return blob_id
+            compressed = zlib.compress(encoded)
+            self._blobs[blob_id] = compressed
+            self._bytes += len(compressed)
+            while self._bytes > self.max_bytes and len(self._blobs) > 1:
+                _, evicted = self._blobs.popitem(last=False)
+                self._bytes -= len(evicted)
+        return blob_id
+
+    def get(self, blob_id: str) -> Optional[Any]:
+        """
+        Fetch a value by blob id.
+
+        Returns:
+            The value, or None if it is unknown or was evicted
+        """
+        if self.directory is not None:
+            # Blob ids are hex digests; anything else could escape the directory
+            if len(blob_id) != 64 or not all(c in "0123456789abcdef" for c in blob_id):
+                return None
+            try:
+                compressed = self._path(blob_id).read_bytes()
+            except FileNotFoundError:
+                return None
+        else:
+            with self._lock:
+                compressed = self._blobs.get(blob_id)
+                if compressed is None:
+                    return None
+                self._blobs.move_to_end(blob_id)
+        return json.loads(zlib.decompress(compressed))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blobs.clear()
+            self._bytes = 0
+
+    @property
+    def size(self) -> int:
+        """Compressed bytes held in memory."""
+        return self._bytes
+
+
+class PayloadCompactor:
+    """Replaces large fields of event payloads with blob markers."""
+
+    def __init__(
+        self,
+        blob_store: BlobStore,
+        field_max_bytes: int = 4096,
+        preview_chars: int = 256,
+    ):
+        """
+        Args:
+            blob_store: Store for the full values of compacted fields
+            field_max_bytes: Largest JSON size of a field kept in the event
+            preview_chars: Characters of a compacted field kept as preview
+        """
+        self.blob_store = blob_store
+        self.field_max_bytes = field_max_bytes
+        self.preview_chars = preview_chars
+
+    def compact(self, value: Any) -> Any:
+        """
+        Compact a payload.
+
+        Children are compacted first, so that a large object keeps its small
+        fields and only loses the large ones; an object or list still over
+        the limit after that (e.g. many small rows) is replaced as a whole.
+        A top-level object is never replaced itself, only its fields.
+
+        Returns:
+            The compacted payload; the original is not modified
+        """
+        if self.field_max_bytes <= 0:
+            return value
+        if isinstance(value, dict):
+            return {key: self._compact(child)[0] for key, child in value.items()}
+        compacted, _ = self._compact(value)
+        return compacted
+
+    def _compact(self, value: Any) -> Tuple[Any, int]:
+        if isinstance(value, dict):
+            items = {}
+            size = 2
+            for key, child in value.items():
+                items[key], child_size = self._compact(child)
+                size += _json_size(str(key)) + 2 + child_size
+            return self._limit(value, items, size)
+        if isinstance(value, (list, tuple)):
+            children = [self._compact(child) for child in value]
+            size = 2 + sum(child_size + 2 for _, child_size in children)
+            return self._limit(value, [child for child, _ in children], size)
+        return self._limit(value, value, _json_size(value))
+
+    def _limit(self, original: Any, compacted: Any, size: int) -> Tuple[Any, int]:
+        if size <= self.field_max_bytes:
+            return compacted, size
+        try:
+            blob_id = self.blob_store.put(original)
+        except Exception as e:
+            # The marker is still useful without the blob
+            logging.error(f"Failed to store timeline payload blob: {e}")
+            blob_id = None
+
+        if isinstance(original, str):
+            preview = original[: self.preview_chars]
+        else:
+            preview = json.dumps(original, default=str)[: self.preview_chars]
+        marker = {
+            TRUNCATED_MARKER: True,
+            "type": type(original).__name__,
+            "preview": preview,
+            # Characters of a string, items of a list or keys of an object
+            "length": len(original) if hasattr(original, "__len__") else None,
+            "blob_id": blob_id,
+        }
+        return marker, _json_size(marker)
+
+
+def create_payload_compactor() -> PayloadCompactor:
+    """Create the payload compactor from the timeline settings."""
+    config = Config.get_timeline_config()
+    return PayloadCompactor(
+        BlobStore(config["blob_store_bytes"], config["blob_dir"]),
+        field_max_bytes=config["field_max_bytes"],
+        preview_chars=config["preview_chars"],
+    )
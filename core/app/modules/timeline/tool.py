@@ -1,8 +1,9 @@
+import json
+import threading
 import uuid
 import logging
-import asyncio
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional, Annotated, Union
+from typing import Dict, Any, List, Optional, Annotated, Tuple, Union
 from fastapi import (
     APIRouter,
     Depends,
@@ -13,13 +14,17 @@ from fastapi import (
     Request,
     status,
 )
+from starlette.concurrency import run_in_threadpool
 
-from ...state_manager import state_manager
+from ...config import Config
+from ...state_manager import UPDATE_ATTEMPTS, StateConflictError, state_manager
 from ...auth import get_current_user_or_service, get_token_from_cookie_or_header
 from ...models import User
 from ..base_tool import BaseTool
 from ...websocket_manager import manager as websocket_manager
 from ...rate_limiter import limiter
+from .archive import create_timeline_archive, parse_timestamp
+from .compaction import create_payload_compactor
 
 # Create a router for the timeline endpoints
 router = APIRouter(
@@ -34,6 +39,56 @@ router = APIRouter(
 if not state_manager.get("timeline"):
     state_manager.set("timeline", {"events": []})
 
+# Large event payload fields are kept out of band, see compaction.py
+payload_compactor = create_payload_compactor()
+
+# Events dropped from memory are archived on disk if configured, see archive.py
+timeline_archive = create_timeline_archive()
+
+# Most events returned by one query
+MAX_QUERY_LIMIT = 1000
+
+# Serialises read-modify-write updates of the timeline state
+_timeline_lock = threading.Lock()
+
+# JSON size of each event in the timeline, by event id
+_event_sizes: Dict[str, int] = {}
+
+
+def _event_size(event: Dict[str, Any]) -> int:
+    event_id = event.get("id")
+    size = _event_sizes.get(event_id) if event_id else None
+    if size is None:
+        size = len(json.dumps(event, default=str).encode())
+        if event_id:
+            _event_sizes[event_id] = size
+    return size
+
+
+def _trim_events(
+    events: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Drop the oldest events beyond the timeline's byte budget or event limit.
+    The newest event is always kept.
+
+    Returns:
+        The events kept and the events dropped
+    """
+    config = Config.get_timeline_config()
+    total = sum(_event_size(event) for event in events)
+    drop = 0
+    while drop < len(events) - 1 and (
+        total > config["max_bytes"] or len(events) - drop > config["max_events"]
+    ):
+        total -= _event_size(events[drop])
+        drop += 1
+
+    dropped = events[:drop]
+    for event in dropped:
+        _event_sizes.pop(event.get("id"), None)
+    return events[drop:], dropped
+
 
 def get_events() -> List[Dict[str, Any]]:
     """Get all timeline events."""
@@ -41,6 +96,67 @@ def get_events() -> List[Dict[str, Any]]:
     return state.get("events", [])
 
 
+def query_events(
+    event_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """
+    Find timeline events, newest first, in memory and then in the archive.
+
+    Args:
+        event_type: Event type to include, or several separated by commas
+        start: Earliest timestamp included
+        end: Latest timestamp included
+        limit: Maximum number of events returned, at most MAX_QUERY_LIMIT
+
+    Returns:
+        The matching events, newest first
+    """
+    limit = min(limit, MAX_QUERY_LIMIT)
+    if limit <= 0:
+        return []
+    event_types = (
+        {name.strip() for name in event_type.split(",") if name.strip()}
+        if event_type
+        else None
+    )
+    start = parse_timestamp(start) if start else None
+    end = parse_timestamp(end) if end else None
+
+    def matches(event: Dict[str, Any]) -> bool:
+        if event_types and event.get("event_type") not in event_types:
+            return False
+        if start is None and end is None:
+            return True
+        timestamp = parse_timestamp(event.get("timestamp", ""))
+        if timestamp is None:
+            return False
+        return (start is None or timestamp >= start) and (end is None or timestamp <= end)
+
+    in_memory = get_events()
+    events = [event for event in in_memory if matches(event)]
+
+    # Sort by timestamp (newest first)
+    events.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    events = events[:limit]
+
+    # The archive holds the events older than those in memory
+    if len(events) < limit and timeline_archive is not None:
+        try:
+            events += timeline_archive.query(
+                event_types,
+                start,
+                end,
+                limit - len(events),
+                exclude_ids={event.get("id") for event in in_memory},
+            )
+        except OSError as e:
+            logging.error(f"Failed to query timeline archive: {e}")
+    return events
+
+
 async def broadcast_event(event: Dict[str, Any]):
     """
     Broadcast an event to all connected WebSocket clients.
@@ -90,46 +206,43 @@ def add_event(
     }
 
     if details:
-        event["details"] = details
-
-    # Get the current events
-    state = state_manager.get("timeline") or {}
-    events = state.get("events", [])
-
-    # Add the new event
-    events.append(event)
-
-    # Limit the number of events to 1000 to prevent excessive memory usage
-    if len(events) > 1000:
-        events = events[-1000:]
-
-    # Update the state
-    state["events"] = events
-    state_manager.set("timeline", state)
+        # Large fields are replaced by previews, with the full values kept in
+        # the blob store
+        event["details"] = payload_compactor.compact(details)
+
+    with _timeline_lock:
+        for attempt in range(UPDATE_ATTEMPTS):
+            # Get the current events
+            state = state_manager.get("timeline") or {}
+            events = state.get("events", [])
+
+            # Add the new event
+            events.append(event)
+
+            # Keep the timeline within its byte budget and event limit
+            events, dropped = _trim_events(events)
+
+            # Update the state; another worker process may have added events
+            # since the read, in which case the events are read again
+            state["events"] = events
+            try:
+                state_manager.set("timeline", state)
+                break
+            except StateConflictError:
+                if attempt == UPDATE_ATTEMPTS - 1:
+                    raise
+
+        if dropped and timeline_archive is not None:
+            try:
+                timeline_archive.append(dropped)
+            except OSError as e:
+                logging.error(f"Failed to archive {len(dropped)} timeline events: {e}")
 
     logging.info(f"Added timeline event: {title}")
 
-    # Broadcast the event via WebSockets asynchronously
-    # We need to safely handle this since this function can be called from synchronous contexts
-    try:
-        # Try to get the current event loop
-        loop = asyncio.get_running_loop()
-        # If we have a running loop, create the task
-        asyncio.create_task(broadcast_event(event))
-    except RuntimeError:
-        # No running event loop, try to schedule the broadcast for later
-        try:
-            # Try to get the event loop for the current thread
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Loop is running in another thread, schedule the coroutine
-                asyncio.run_coroutine_threadsafe(broadcast_event(event), loop)
-            else:
-                # No running loop, skip broadcasting for now
-                logging.debug("No running event loop available for WebSocket broadcast, skipping")
-        except RuntimeError:
-            # No event loop at all, skip broadcasting
-            logging.debug("No event loop available for WebSocket broadcast, skipping")
+    # Queue the event for WebSocket clients; this is safe from synchronous
+    # code on any thread and does nothing when no client is connected
+    websocket_manager.publish({"type": "timeline_event", "event": event}, channel="timeline")
 
     return event
 
@@ -142,33 +255,48 @@ async def get_timeline_events(
         Union[User, str], Depends(get_current_user_or_service)
     ],
     event_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     limit: int = 100,
 ) -> List[Dict[str, Any]]:
     """
-    Get timeline events, optionally filtered by event_type.
+    Get timeline events, optionally filtered by event_type and time range.
+    Queries continue into the on-disk archive when one is configured.
 
     Args:
         current_user_or_service: The authenticated user or service
-        event_type: Optional filter for event type
-        limit: Maximum number of events to return
+        event_type: Optional filter for event type, or several separated by commas
+        start: Optional earliest timestamp (ISO 8601)
+        end: Optional latest timestamp (ISO 8601)
+        limit: Maximum number of events to return (at most 1000)
 
     Returns:
-        List of timeline events
+        List of timeline events, newest first
     """
-    if limit <= 0:
-        return []
+    # Archive queries read segment files, so keep them off the event loop
+    return await run_in_threadpool(query_events, event_type, start, end, limit)
 
-    events = get_events()
 
-    # Filter by event_type if provided
-    if event_type:
-        events = [e for e in events if e.get("event_type") == event_type]
+@router.get("/blobs/{blob_id}")
+async def get_timeline_blob(
+    blob_id: str,
+    current_user_or_service: Annotated[
+        Union[User, str], Depends(get_current_user_or_service)
+    ],
+) -> Dict[str, Any]:
+    """
+    Get the full value of a compacted event payload field.
 
-    # Sort by timestamp (newest first)
-    events.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    Args:
+        blob_id: The ``blob_id`` of the field's marker
 
-    # Limit the number of events
-    return events[:limit]
+    Returns:
+        The blob id and the field's full value
+    """
+    value = await run_in_threadpool(payload_compactor.blob_store.get, blob_id)
+    if value is None:
+        raise HTTPException(status_code=404, detail="Blob not found or expired")
+    return {"blob_id": blob_id, "value": value}
 
 
 @router.websocket("/ws")
@@ -194,9 +322,9 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
     try:
         await websocket_manager.connect(websocket, channel="timeline")
 
-        # Send the last 10 events immediately after connection
-        events = get_events()
-        events.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        # Send the last 10 events immediately after connection; sorted()
+        # leaves the timeline itself oldest first, as trimming expects
+        events = sorted(get_events(), key=lambda x: x.get("timestamp", ""), reverse=True)
         recent_events = events[:10]
 
         await websocket.send_json({"type": "initial_events", "events": recent_events})
@@ -319,33 +447,26 @@ class TimelineTool(BaseTool):
             }
 
     def get_events(
-        self, event_type: Optional[str] = None, limit: int = 100
+        self,
+        event_type: Optional[str] = None,
+        limit: int = 100,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Get timeline events, optionally filtered by event_type.
+        Get timeline events, optionally filtered by event_type and time range.
+        Queries continue into the on-disk archive when one is configured.
 
         Args:
-            event_type: Optional filter for event type
-            limit: Maximum number of events to return
+            event_type: Optional filter for event type, or several separated by commas
+            limit: Maximum number of events to return (at most 1000)
+            start: Optional earliest timestamp (ISO 8601)
+            end: Optional latest timestamp (ISO 8601)
 
         Returns:
-            List of timeline events
+            List of timeline events, newest first
         """
-        if limit <= 0:
-            return []
-
-        state = self.state_manager.get("timeline") or {}
-        events = state.get("events", [])
-
-        # Filter by event_type if provided
-        if event_type:
-            events = [e for e in events if e.get("event_type") == event_type]
-
-        # Sort by timestamp (newest first)
-        events.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-
-        # Limit the number of events
-        return events[:limit]
+        return query_events(event_type, start, end, limit)
 
     def add_event(
         self,
@@ -370,12 +491,30 @@ class TimelineTool(BaseTool):
         """
         return add_event(event_type, title, description, details, status)
 
+    def get_payload(self, blob_id: str) -> Any:
+        """
+        Get the full value of a compacted event payload field.
+
+        Args:
+            blob_id: The ``blob_id`` of the field's marker
+
+        Returns:
+            The field's full value
+        """
+        value = payload_compactor.blob_store.get(blob_id)
+        if value is None:
+            raise HTTPException(status_code=404, detail="Blob not found or expired")
+        return value
+
     def clear_events(self) -> str:
         """
-        Clear all timeline events.
+        Clear all timeline events. Events already archived on disk are kept.
 
         Returns:
             Success message
         """
-        self.state_manager.set("timeline", {"events": []})
+        with _timeline_lock:
+            self.state_manager.set("timeline", {"events": []})
+            _event_sizes.clear()
+        payload_compactor.blob_store.clear()
         return "Timeline events cleared successfully"
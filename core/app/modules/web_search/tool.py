@@ -98,27 +98,25 @@ class WebSearchTool(BaseTool):
         # Generate realistic search results based on the query
         results = self._generate_search_results(query)
 
-        # Get the current state
-        web_search_state = self.state_manager.get("web_search")
-        search_history = web_search_state.get("search_history", [])
-
         # Add the new search to history with timestamp
         search_entry = {
             "query": query,
             "timestamp": datetime.now().isoformat(),
             "results_count": len(results),
         }
-        search_history.append(search_entry)
 
-        # Keep only the last 20 searches in history
-        if len(search_history) > 20:
-            search_history = search_history[-20:]
+        def change(web_search_state):
+            search_history = (web_search_state or {}).get("search_history", [])
+            search_history.append(search_entry)
+
+            # Keep only the last 20 searches in history
+            if len(search_history) > 20:
+                search_history = search_history[-20:]
 
-        # Update the state with new history and last results
-        self.state_manager.set(
-            "web_search",
-            {"search_history": search_history, "last_search_results": results},
-        )
+            # The new history and last results
+            return {"search_history": search_history, "last_search_results": results}
+
+        self.state_manager.update("web_search", change)
 
         return results
 
@@ -247,9 +245,11 @@ class WebSearchTool(BaseTool):
         Returns:
             A status message
         """
-        web_search_state = self.state_manager.get("web_search")
-        web_search_state["search_history"] = []
-        self.state_manager.set("web_search", web_search_state)
+        def change(web_search_state):
+            web_search_state["search_history"] = []
+            return web_search_state
+
+        self.state_manager.update("web_search", change)
 
         return {"status": "success", "message": "Search history cleared successfully"}
 
@@ -0,0 +1,192 @@
+"""
+Bounded executor for password hashing.
+
+bcrypt is deliberately slow. Verifying passwords on the shared request
+threadpool lets a burst of logins (or a brute-force attempt) occupy every
+worker thread and starve unrelated endpoints. Instead, hashing runs on a
+small dedicated pool (processes by default, so it also stays off the GIL),
+and admission is capped: once ``queue_limit`` hashes are waiting or running,
+further requests are rejected immediately rather than queued.
+"""
+
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .config import Config
+
+EXECUTOR_KINDS = ("process", "thread")
+
+# Number of recent hashes kept for latency percentiles
+LATENCY_SAMPLES = 1000
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when the hashing queue is full."""
+
+
+def _timed_verify(plain_password: str, hashed_password: str) -> Tuple[bool, float, float]:
+    # Runs in the worker, so the start time marks the end of queueing;
+    # wall-clock time is used because it is comparable across processes
+    started = time.time()
+    from .security import pwd_context
+
+    result = pwd_context.verify(plain_password, hashed_password)
+    return result, started, time.time()
+
+
+def _timed_hash(password: str) -> Tuple[str, float, float]:
+    started = time.time()
+    from .security import pwd_context
+
+    result = pwd_context.hash(password)
+    return result, started, time.time()
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a dedicated, size-limited pool.
+
+    ``verify`` and ``hash`` are coroutines: the caller's event loop is free
+    while the pool works. Queue wait (submission to start of hashing) and
+    hashing time are recorded for ``get_stats``.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_limit: Optional[int] = None,
+        executor_kind: Optional[str] = None,
+    ):
+        """
+        Args:
+            workers: Number of hashing workers; defaults to the configured
+                number
+            queue_limit: Maximum hashes waiting or running at once; defaults
+                to the configured limit
+            executor_kind: "process" or "thread"; defaults to the configured
+                kind
+        """
+        self.workers = workers or Config.get_password_hash_workers()
+        self.queue_limit = queue_limit or Config.get_password_hash_queue_limit()
+        self.executor_kind = executor_kind or Config.get_password_hash_executor()
+        if self.executor_kind not in EXECUTOR_KINDS:
+            raise ValueError(f"executor_kind must be one of {EXECUTOR_KINDS}")
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_waits: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._hash_times: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.executor_kind == "process":
+                    # spawn: forking a process that runs threads is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password-hash"
+                    )
+            return self._executor
+
+    async def _run(self, func: Callable[..., Tuple[Any, float, float]], *args) -> Any:
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                self._rejected += 1
+                raise HashingBusyError("Password hashing queue is full")
+            self._pending += 1
+
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(func, *args)
+            result, started, finished = await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        with self._lock:
+            self._completed += 1
+            self._queue_waits.append(max(0.0, started - submitted))
+            self._hash_times.append(finished - started)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash on the hashing pool.
+
+        Raises:
+            HashingBusyError: If the hashing queue is full
+        """
+        return await self._run(_timed_verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password on the hashing pool.
+
+        Raises:
+            HashingBusyError: If the hashing queue is full
+        """
+        return await self._run(_timed_hash, password)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hashing pool metrics.
+
+        Returns:
+            Pool settings, current load, completed and rejected counts, and
+            queue wait and hashing time percentiles in milliseconds
+        """
+        with self._lock:
+            waits = list(self._queue_waits)
+            hash_times = list(self._hash_times)
+            stats = {
+                "executor": self.executor_kind,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+        stats["queue_wait_ms"] = {
+            "p50": round(_percentile(waits, 0.5) * 1000, 3),
+            "p95": round(_percentile(waits, 0.95) * 1000, 3),
+            "max": round(max(waits, default=0.0) * 1000, 3),
+        }
+        stats["hash_time_ms"] = {
+            "p50": round(_percentile(hash_times, 0.5) * 1000, 3),
+            "p95": round(_percentile(hash_times, 0.95) * 1000, 3),
+            "mean": round(statistics.fmean(hash_times) * 1000, 3) if hash_times else 0.0,
+        }
+        return stats
+
+    def shutdown(self) -> None:
+        """Shut the pool down; it is recreated on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logging.info("Password hashing pool shut down")
+
+
+# Shared hasher used by the login endpoint
+password_hasher = PasswordHasher()
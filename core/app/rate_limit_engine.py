@@ -0,0 +1,418 @@
+"""
+GCRA rate limiting with pluggable storage.
+
+The generic cell rate algorithm keeps a single number per key, the
+theoretical arrival time (TAT): the moment at which the key's budget will
+be completely refilled. A limit of ``N`` per ``period`` refills one unit
+every ``period / N`` seconds and allows bursts of up to ``N`` units. A
+request costing ``c`` units is allowed if, after pushing the TAT forward by
+``c`` units, it is no more than ``period`` ahead of now. This behaves like
+a sliding window without storing individual requests, and gives exact
+values for the remaining budget and the time until it resets.
+
+Storage backends only need to update one float per key atomically:
+
+- ``MemoryRateLimitStorage``: a dict in this process.
+- ``SharedMemoryRateLimitStorage``: a hash table in a memory-mapped file
+  (under /dev/shm where available), locked with ``flock``, shared by all
+  worker processes on the host.
+- ``SQLiteRateLimitStorage``: a table in a SQLite database in WAL mode.
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from .config import Config
+
+try:
+    import fcntl
+
+    _FCNTL_AVAILABLE = True
+except ImportError:
+    _FCNTL_AVAILABLE = False
+
+RATE_LIMIT_STORAGES = ("memory", "shared_memory", "sqlite")
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Updates between sweeps of expired keys from the in-process storage
+_PRUNE_EVERY = 1000
+
+# Tolerance for floating point error in the TAT arithmetic
+_EPSILON = 1e-9
+
+# Seconds a TAT read by ``GCRALimiter.peek`` is reused before reading the
+# storage again, and the most keys remembered
+PEEK_CACHE_TTL = 1.0
+PEEK_CACHE_SIZE = 10000
+
+TatUpdate = Callable[[Optional[float]], Tuple[Optional[float], "RateLimitResult"]]
+
+
+class RateLimit(NamedTuple):
+    """A budget of ``limit`` units per ``period`` seconds."""
+
+    limit: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """
+        Parse a limit such as "60/minute" or "1000/hour".
+
+        Raises:
+            ValueError: If the limit is malformed
+        """
+        try:
+            count, unit = value.strip().split("/", 1)
+            unit = unit.strip().lower().rstrip("s")
+            limit = int(count)
+            period = _PERIODS[unit]
+        except (ValueError, KeyError):
+            raise ValueError(f"Invalid rate limit '{value}'")
+        if limit <= 0:
+            raise ValueError(f"Invalid rate limit '{value}'")
+        return cls(limit, float(period))
+
+    @property
+    def interval(self) -> float:
+        """Seconds it takes to refill one unit."""
+        return self.period / self.limit
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the full budget is available again
+    reset_after: float
+    # Seconds until the request would be allowed (0 if it was)
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* headers, plus Retry-After if the request was denied."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimitStorage(ABC):
+    """Base class for stores of theoretical arrival times."""
+
+    @abstractmethod
+    def update(self, key: str, now: float, func: TatUpdate) -> "RateLimitResult":
+        """
+        Atomically read a key's TAT, pass it to ``func`` and store the TAT
+        it returns (None leaves the stored value unchanged).
+
+        Returns:
+            The result returned by ``func``
+        """
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[float]:
+        """Read a key's TAT, None if unknown."""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryRateLimitStorage(RateLimitStorage):
+    """TATs in a dict; limits apply to this process only."""
+
+    def __init__(self):
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._updates = 0
+
+    def update(self, key: str, now: float, func: TatUpdate) -> "RateLimitResult":
+        with self._lock:
+            tat, result = func(self._tats.get(key))
+            if tat is not None:
+                self._tats[key] = tat
+            self._updates += 1
+            if self._updates % _PRUNE_EVERY == 0:
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+            return result
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._tats.get(key)
+
+
+class SharedMemoryRateLimitStorage(RateLimitStorage):
+    """
+    TATs in a fixed-size, memory-mapped hash table shared between processes.
+
+    Each slot holds an 8-byte key hash and the TAT. Lookups probe linearly
+    from the key's home slot; slots whose TAT has passed are free for reuse,
+    and when every probed slot is live the one refilled soonest is evicted,
+    which at worst hands that key a fresh budget.
+    """
+
+    SLOT = struct.Struct("<Qd")
+    MAX_PROBES = 32
+
+    def __init__(self, path: Optional[str] = None, slots: int = 65536):
+        """
+        Args:
+            path: File backing the table; defaults to a file under /dev/shm
+                (or the temporary directory)
+            slots: Number of keys the table can hold
+        """
+        if not _FCNTL_AVAILABLE:
+            raise RuntimeError("Shared memory rate limit storage requires fcntl")
+        if path is None:
+            base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            path = os.path.join(base, "intentverse-rate-limits")
+        self.path = path
+        self.slots = slots
+        size = slots * self.SLOT.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                # New (or resized) table; zeroed slots are empty
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+        # flock does not exclude threads sharing the descriptor
+        self._lock = threading.Lock()
+
+    def _hash(self, key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        # 0 marks an empty slot
+        return int.from_bytes(digest, "little") or 1
+
+    def _find(self, key_hash: int, now: float) -> Tuple[int, Optional[float]]:
+        """Find the key's slot, or the slot to store it in."""
+        home = key_hash % self.slots
+        free = None
+        oldest, oldest_tat = home, math.inf
+        for probe in range(min(self.MAX_PROBES, self.slots)):
+            index = (home + probe) % self.slots
+            slot_hash, tat = self.SLOT.unpack_from(self._map, index * self.SLOT.size)
+            if slot_hash == key_hash:
+                return index, tat
+            if slot_hash == 0:
+                return (free if free is not None else index), None
+            if free is None and tat <= now:
+                free = index
+            if tat < oldest_tat:
+                oldest, oldest_tat = index, tat
+        return (free if free is not None else oldest), None
+
+    def update(self, key: str, now: float, func: TatUpdate) -> "RateLimitResult":
+        key_hash = self._hash(key)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                index, current = self._find(key_hash, now)
+                tat, result = func(current)
+                if tat is not None:
+                    self.SLOT.pack_into(self._map, index * self.SLOT.size, key_hash, tat)
+                return result
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[float]:
+        # Reading a slot without the lock may see a torn write, which at
+        # worst skews the reported budget of one response
+        _, tat = self._find(self._hash(key), time.time())
+        return tat
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class SQLiteRateLimitStorage(RateLimitStorage):
+    """TATs in a SQLite table, shared by every process using the file."""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = str(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._updates = 0
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def update(self, key: str, now: float, func: TatUpdate) -> "RateLimitResult":
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tat FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            tat, result = func(row[0] if row else None)
+            if tat is not None:
+                connection.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, tat),
+                )
+            self._updates += 1
+            if self._updates % _PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+            connection.execute("COMMIT")
+            return result
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[float]:
+        row = self._connect().execute(
+            "SELECT tat FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class GCRALimiter:
+    """
+    Rate limiter implementing GCRA on top of a RateLimitStorage.
+
+    Timestamps are wall-clock seconds, so that processes sharing a storage
+    agree on them.
+
+    ``peek`` is called for the rate limit headers of every API response, so
+    it reuses the TAT it last saw for a key (from a ``hit`` in this process
+    or an earlier read) for ``peek_ttl`` seconds instead of reading the
+    storage each time. Spending from other processes shows up after that.
+    """
+
+    def __init__(
+        self, storage: Optional[RateLimitStorage] = None, peek_ttl: float = PEEK_CACHE_TTL
+    ):
+        self.storage = storage or MemoryRateLimitStorage()
+        self.peek_ttl = peek_ttl
+        # Key -> (when it was seen, TAT)
+        self._seen: "OrderedDict[str, Tuple[float, Optional[float]]]" = OrderedDict()
+        self._seen_lock = threading.Lock()
+
+    def _remember(self, key: str, now: float, tat: Optional[float]) -> None:
+        with self._seen_lock:
+            self._seen[key] = (now, tat)
+            self._seen.move_to_end(key)
+            if len(self._seen) > PEEK_CACHE_SIZE:
+                self._seen.popitem(last=False)
+
+    def hit(
+        self, key: str, rate: RateLimit, cost: int = 1, now: Optional[float] = None
+    ) -> RateLimitResult:
+        """
+        Spend ``cost`` units of a key's budget if enough are left.
+
+        A cost above the limit is charged as the full limit, so that it can
+        still be allowed with a full budget.
+
+        Returns:
+            Whether the request is allowed, and the budget after it
+        """
+        now = time.time() if now is None else now
+        cost = max(1, min(cost, rate.limit))
+
+        def spend(tat: Optional[float]) -> Tuple[Optional[float], RateLimitResult]:
+            tat = max(tat or now, now)
+            new_tat = tat + cost * rate.interval
+            if new_tat - now > rate.period + _EPSILON:
+                return None, self._result(False, rate, tat, now, new_tat - rate.period - now)
+            return new_tat, self._result(True, rate, new_tat, now, 0.0)
+
+        result = self.storage.update(key, now, spend)
+        self._remember(key, now, now + result.reset_after)
+        return result
+
+    def peek(self, key: str, rate: RateLimit, now: Optional[float] = None) -> RateLimitResult:
+        """Report a key's budget without spending any of it."""
+        now = time.time() if now is None else now
+        with self._seen_lock:
+            seen = self._seen.get(key)
+        if seen is not None and 0 <= now - seen[0] < self.peek_ttl:
+            tat = seen[1]
+        else:
+            tat = self.storage.get(key)
+            self._remember(key, now, tat)
+        tat = max(tat or now, now)
+        return self._result(True, rate, tat, now, 0.0)
+
+    @staticmethod
+    def _result(
+        allowed: bool, rate: RateLimit, tat: float, now: float, retry_after: float
+    ) -> RateLimitResult:
+        used = tat - now
+        remaining = int((rate.period - used) / rate.interval + _EPSILON)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=rate.limit,
+            remaining=max(0, min(rate.limit, remaining)),
+            reset_after=max(0.0, used),
+            retry_after=max(0.0, retry_after),
+        )
+
+
+def create_rate_limit_storage(kind: Optional[str] = None) -> RateLimitStorage:
+    """
+    Create the configured rate limit storage.
+
+    Falls back to in-process storage (and logs why) if the configured
+    storage cannot be opened.
+
+    Args:
+        kind: "memory", "shared_memory" or "sqlite"; defaults to the
+            configured storage
+    """
+    kind = (kind or Config.get_rate_limit_storage()).lower()
+    if kind not in RATE_LIMIT_STORAGES:
+        raise ValueError(f"Rate limit storage must be one of {RATE_LIMIT_STORAGES}")
+    path = Config.get_rate_limit_storage_path()
+    try:
+        if kind == "shared_memory":
+            return SharedMemoryRateLimitStorage(path)
+        if kind == "sqlite":
+            return SQLiteRateLimitStorage(path or "./state/rate_limits.db")
+    except Exception as e:
+        logging.error(f"Failed to open {kind} rate limit storage, using memory: {e}")
+    return MemoryRateLimitStorage()
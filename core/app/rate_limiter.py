@@ -3,18 +3,28 @@ Rate limiting configuration for the API endpoints.
 This module provides rate limiting functionality to protect the API from abuse.
 """
 
+import hashlib
 import logging
 import os
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from fastapi import Request, Response
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+from .config import Config
+from .rate_limit_engine import (
+    GCRALimiter,
+    RateLimit,
+    RateLimitResult,
+    create_rate_limit_storage,
+)
+
 # Configure the rate limiter
 # Rate limiting strategy:
 # - UI/State endpoints: NO rate limiting (frequent polling needed)
-# - Execute endpoints: 60 requests per minute (actual operations)
+# - Execute endpoints: 60 units per minute, each tool costing its weight
+#   (enforced per tool by the GCRA limiter below, not by slowapi)
 # - Login endpoint: 30 requests per minute (anti-brute force)
 # - Service accounts: Higher limits for automation
 DEFAULT_AUTH_LIMIT = os.getenv("RATE_LIMIT_AUTH", "100/minute")
@@ -39,6 +49,20 @@ def get_rate_limit_key(request: Request) -> str:
 # Initialize the limiter with our custom key function
 limiter = Limiter(key_func=get_rate_limit_key)
 
+# Cost of a tool call in units of the execute budget; tools not listed
+# (directly or through "module.*") cost 1. Overridden by
+# INTENTVERSE_TOOL_RATE_COSTS
+DEFAULT_TOOL_COSTS: Dict[str, int] = {
+    "database.execute_sql": 5,
+    "database.query": 3,
+    "database.create_table": 2,
+    "web_search.search": 2,
+}
+
+# Limiter for tool execution; its storage is shared between workers unless
+# configured as "memory"
+tool_rate_limiter = GCRALimiter(create_rate_limit_storage())
+
 
 def get_user_identifier(request: Request) -> str:
     """
@@ -65,7 +89,10 @@ def get_rate_limit_key_and_rate(request: Request) -> Tuple[str, str]:
     service_key = request.headers.get("X-Service-API-Key")
     
     if api_key == SERVICE_API_KEY or service_key == SERVICE_API_KEY:
-        return f"service:{api_key or service_key}", DEFAULT_ADMIN_LIMIT
+        # Keys end up in the rate limit storage, which may be a file, so the
+        # secret itself is never part of one
+        digest = hashlib.sha256((api_key or service_key).encode()).hexdigest()[:16]
+        return f"service:{digest}", DEFAULT_ADMIN_LIMIT
     
     # Try to get the user from the request state (set by auth middleware)
     user = getattr(request.state, "user", None)
@@ -101,28 +128,90 @@ def create_rate_limit_function():
     return lambda request: get_rate_limit_for_request(request)
 
 
-def add_rate_limit_headers(request: Request, response: Response) -> None:
+def get_tool_cost(tool_name: str) -> int:
     """
-    Add rate limiting headers to the response.
+    Get the cost of a tool call in units of the execute budget.
+
+    Args:
+        tool_name: Full tool name, e.g. "database.execute_sql"
+
+    Returns:
+        The cost for the tool, else for its module ("module.*"), else 1
+    """
+    costs = {**DEFAULT_TOOL_COSTS, **Config.get_tool_rate_costs()}
+    module_name = tool_name.split(".", 1)[0]
+    return max(1, costs.get(tool_name, costs.get(f"{module_name}.*", 1)))
+
+
+def get_execute_rate_limit_key(request: Request, current_user_or_service: Any) -> str:
+    """
+    Get the execute budget's key for an authenticated caller.
+
+    Uses the same keys as ``get_rate_limit_key_and_rate``, but takes the
+    user from the endpoint's dependency rather than the request state.
+    """
+    if isinstance(current_user_or_service, str):
+        key, _ = get_rate_limit_key_and_rate(request)
+        return key
+    prefix = "admin" if getattr(current_user_or_service, "is_admin", False) else "user"
+    return f"{prefix}:{current_user_or_service.id}"
+
+
+def check_tool_rate_limit(request: Request, key: str, tool_name: str) -> RateLimitResult:
+    """
+    Spend a tool call's cost from the caller's execute budget.
+
+    The result is stored on the request, so that the rate limit headers of
+    the response report it.
+
+    Args:
+        request: The execute request
+        key: The caller's budget key, from ``get_execute_rate_limit_key``
+        tool_name: Full tool name
+
+    Returns:
+        The result; if it is not allowed the call must be rejected with 429
+    """
+    rate = RateLimit.parse(Config.get_execute_rate_limit())
+    result = tool_rate_limiter.hit(key, rate, get_tool_cost(tool_name))
+    request.state.rate_limit = result
+    if not result.allowed:
+        logging.info(f"Rate limit exceeded for {key} calling {tool_name}")
+    return result
+
+
+def get_rate_limit_headers(request: Request) -> Dict[str, str]:
+    """
+    Build the rate limiting headers for a request.
     This should be called after the rate limiting check.
+
+    Requests checked by the tool limiter report the result of that check;
+    others report the caller's execute budget without spending it.
     """
     try:
-        key, rate = get_rate_limit_key_and_rate(request)
-        
-        # Parse the rate limit to get the limit number
-        limit_str = rate.split("/")[0]
-        
-        # Add basic rate limit headers (slowapi handles the actual limiting)
-        response.headers["X-RateLimit-Limit"] = limit_str
-        response.headers["X-RateLimit-Remaining"] = limit_str  # Simplified for now
-        response.headers["X-RateLimit-Reset"] = "0"
-            
+        result = getattr(request.state, "rate_limit", None)
+        if result is None:
+            key, _ = get_rate_limit_key_and_rate(request)
+            rate = RateLimit.parse(Config.get_execute_rate_limit())
+            result = tool_rate_limiter.peek(key, rate)
+        return result.headers()
+
     except Exception as e:
         logging.warning(f"Error adding rate limit headers: {e}")
-        # Add minimal headers as fallback
-        response.headers["X-RateLimit-Limit"] = "30"
-        response.headers["X-RateLimit-Remaining"] = "30"
-        response.headers["X-RateLimit-Reset"] = "0"
+        # Minimal headers as fallback
+        return {
+            "X-RateLimit-Limit": "30",
+            "X-RateLimit-Remaining": "30",
+            "X-RateLimit-Reset": "0",
+        }
+
+
+def add_rate_limit_headers(request: Request, response: Response) -> None:
+    """
+    Add rate limiting headers to the response.
+    This should be called after the rate limiting check.
+    """
+    response.headers.update(get_rate_limit_headers(request))
 
 
 # Custom rate limit exceeded handler
@@ -6,6 +6,8 @@ import os
 import secrets
 import logging
 
+from .key_ring import KeyRing
+
 # Use bcrypt for password hashing, which is a strong and standard choice.
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -39,15 +41,38 @@ def get_password_hash(password: str) -> str:
 
 # --- JWT Token Handling ---
 
-# Generate a random secret key on each startup
-# This is secure because refresh tokens are stored in the database
-# and can be used to get new access tokens after restart
-SECRET_KEY = secrets.token_hex(32)
+# Signing keys. Without INTENTVERSE_KEY_RING_FILE a random key is generated
+# on each startup; this is secure because refresh tokens are stored in the
+# database and can be used to get new access tokens after restart. Running
+# several workers requires a key ring file so that they share keys.
+key_ring = KeyRing.from_config()
+# Key that was active at startup, kept for callers that sign or verify
+# tokens themselves
+SECRET_KEY = key_ring.get_signing_key()[1]
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
 
+def _encode_token(claims: Dict[str, Any]) -> str:
+    kid, secret = key_ring.get_signing_key()
+    return jwt.encode(claims, secret, algorithm=ALGORITHM, headers={"kid": kid})
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a token with the key named in its header.
+
+    Raises:
+        JWTError: If the token is malformed, its key is unknown or retired,
+            or verification fails
+    """
+    secret = key_ring.get_key(jwt.get_unverified_header(token).get("kid"))
+    if secret is None:
+        raise JWTError("Token was signed with an unknown key")
+    return jwt.decode(token, secret, algorithms=[ALGORITHM])
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Creates a new JWT access token.
@@ -68,7 +93,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         )
 
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _encode_token(to_encode)
     return encoded_jwt
 
 
@@ -94,7 +119,7 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     # Add a unique token ID (jti) to allow token revocation
     jti = secrets.token_hex(32)
     to_encode.update({"exp": expire, "jti": jti, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _encode_token(to_encode)
     return encoded_jwt, jti, expire
 
 
@@ -109,7 +134,7 @@ def decode_access_token(token: str) -> Optional[str]:
         The username (from the 'sub' claim) if the token is valid, otherwise None.
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         username: str = payload.get("sub")
         token_type: str = payload.get("type", "access")  # Default to access for backward compatibility
         
@@ -127,34 +152,50 @@ def decode_access_token(token: str) -> Optional[str]:
         return None
 
 
-def decode_refresh_token(token: str) -> Tuple[Optional[str], Optional[str]]:
+def decode_refresh_token_claims(token: str) -> Optional[Dict[str, Any]]:
     """
-    Decodes the refresh token to get the username and token ID.
+    Decodes and validates a refresh token.
 
     Args:
         token: The JWT refresh token to decode
 
     Returns:
-        A tuple containing (username, token_id) if valid, otherwise (None, None)
+        The token's claims, including 'sub' and 'jti', if valid, otherwise None
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         username: str = payload.get("sub")
         token_id: str = payload.get("jti")
         token_type: str = payload.get("type")
         
         if username is None or token_id is None:
-            return None, None
+            return None
             
         # Verify this is a refresh token
         if token_type != "refresh":
             logging.warning(f"Token type mismatch: expected 'refresh', got '{token_type}'")
-            return None, None
+            return None
             
-        return username, token_id
+        return payload
     except JWTError as e:
         logging.warning(f"JWT refresh token decode error: {e}")
+        return None
+
+
+def decode_refresh_token(token: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Decodes the refresh token to get the username and token ID.
+
+    Args:
+        token: The JWT refresh token to decode
+
+    Returns:
+        A tuple containing (username, token_id) if valid, otherwise (None, None)
+    """
+    claims = decode_refresh_token_claims(token)
+    if claims is None:
         return None, None
+    return claims["sub"], claims["jti"]
 
 
 def verify_token_type(token: str, expected_type: str) -> bool:
@@ -169,7 +210,7 @@ def verify_token_type(token: str, expected_type: str) -> bool:
         True if the token is of the expected type, False otherwise
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         token_type = payload.get("type")
         return token_type == expected_type
     except JWTError:
@@ -6,25 +6,24 @@ common web vulnerabilities and enhance the security posture of the application.
 """
 
 import logging
-from typing import Callable, Dict, Any
+from typing import Any, Callable, Dict, Optional
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeaderPolicy:
     """
-    Middleware to add comprehensive security headers to all HTTP responses.
-    
-    Implements security headers based on OWASP recommendations and modern
-    web security best practices.
+    Computes the security and CORS headers for a request.
+
+    Shared by SecurityHeadersMiddleware and the fused request pipeline
+    middleware. The per-path CSP variants are built once, so applying the
+    policy to a response is a couple of dictionary copies.
     """
-    
-    def __init__(self, app: ASGIApp, config: Dict[str, Any] = None):
-        super().__init__(app)
+
+    def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
-        self.logger = logging.getLogger(__name__)
-        
+
         # Default security headers configuration
         self.default_headers = {
             # Prevent clickjacking attacks
@@ -81,6 +80,22 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         
         # API paths that need CORS headers
         self.api_paths = self.config.get("api_paths", ["/api/", "/auth/", "/health/", "/users/"])
+
+        # Precomputed header sets for strict and relaxed CSP paths
+        base_headers = {
+            header: value
+            for header, value in self.headers.items()
+            if header != "Content-Security-Policy"
+        }
+        self._strict_headers = {
+            **base_headers,
+            "Content-Security-Policy": self._build_csp_header(),
+        }
+        self._relaxed_headers = {
+            **base_headers,
+            "Content-Security-Policy": self._build_relaxed_csp_header(),
+        }
+        self._cors_config = None
     
     def _build_csp_header(self) -> str:
         """Build Content Security Policy header."""
@@ -121,79 +136,136 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         
         return "; ".join(csp_directives)
     
-    def _should_use_relaxed_csp(self, path: str) -> bool:
+    def should_use_relaxed_csp(self, path: str) -> bool:
         """Check if path should use relaxed CSP."""
         return any(path.startswith(relaxed_path) for relaxed_path in self.relaxed_csp_paths)
     
-    def _is_api_path(self, path: str) -> bool:
+    def is_api_path(self, path: str) -> bool:
         """Check if path is an API endpoint."""
         return any(path.startswith(api_path) for api_path in self.api_paths)
+
+    def _get_cors_config(self) -> Dict[str, Any]:
+        if self._cors_config is None:
+            # Use centralized CORS configuration
+            from .security_config import security_config
+            self._cors_config = security_config.get_security_headers_config()
+        return self._cors_config
     
-    def _add_cors_headers(self, response: Response, request: Request) -> None:
-        """Add CORS headers for API endpoints."""
-        origin = request.headers.get("origin")
-        
-        # Use centralized CORS configuration
-        from .security_config import security_config
-        config = security_config.get_security_headers_config()
+    def cors_headers(self, origin: Optional[str]) -> Dict[str, str]:
+        """Build the CORS headers for an API request from the given origin."""
+        config = self._get_cors_config()
         allowed_origins = config.get("cors_allowed_origins", ["*"])
         allowed_methods = config.get("cors_allowed_methods", ["GET", "POST", "OPTIONS"])
         allowed_headers = config.get("cors_allowed_headers", ["Content-Type", "Authorization"])
         allow_credentials = config.get("cors_allow_credentials", True)
         max_age = config.get("cors_max_age", 86400)
+
+        headers = {}
         
         # Handle wildcard or specific origins
         if "*" in allowed_origins:
             # When using credentials, we can't use wildcard with specific origin
             if allow_credentials and origin:
-                response.headers["Access-Control-Allow-Origin"] = origin
+                headers["Access-Control-Allow-Origin"] = origin
             else:
-                response.headers["Access-Control-Allow-Origin"] = "*"
+                headers["Access-Control-Allow-Origin"] = "*"
         elif origin and origin in allowed_origins:
-            response.headers["Access-Control-Allow-Origin"] = origin
+            headers["Access-Control-Allow-Origin"] = origin
         else:
             # For internal applications, be more permissive
-            response.headers["Access-Control-Allow-Origin"] = origin or "*"
+            headers["Access-Control-Allow-Origin"] = origin or "*"
         
-        response.headers["Access-Control-Allow-Methods"] = ", ".join(allowed_methods)
-        response.headers["Access-Control-Allow-Headers"] = ", ".join(allowed_headers)
-        response.headers["Access-Control-Allow-Credentials"] = "true" if allow_credentials else "false"
-        response.headers["Access-Control-Max-Age"] = str(max_age)
-    
-    def _add_security_headers(self, response: Response, request: Request) -> None:
-        """Add security headers to response."""
-        path = request.url.path
-        
-        # Add all standard security headers
-        for header, value in self.headers.items():
-            # Skip CSP here, we'll handle it separately
-            if header != "Content-Security-Policy":
-                response.headers[header] = value
-        
-        # Add appropriate CSP based on path
-        if self._should_use_relaxed_csp(path):
-            response.headers["Content-Security-Policy"] = self._build_relaxed_csp_header()
+        headers["Access-Control-Allow-Methods"] = ", ".join(allowed_methods)
+        headers["Access-Control-Allow-Headers"] = ", ".join(allowed_headers)
+        headers["Access-Control-Allow-Credentials"] = "true" if allow_credentials else "false"
+        headers["Access-Control-Max-Age"] = str(max_age)
+        return headers
+
+    def response_headers(
+        self, path: str, origin: Optional[str] = None, download: bool = False
+    ) -> Dict[str, str]:
+        """
+        Build the headers to set on a response.
+
+        Args:
+            path: Request path
+            origin: Value of the request's Origin header, if any
+            download: True if the request asked for a download
+
+        Returns:
+            Header names and values, to be set over any existing values
+        """
+        # Add all standard security headers with the CSP for this path
+        if self.should_use_relaxed_csp(path):
+            headers = dict(self._relaxed_headers)
         else:
-            response.headers["Content-Security-Policy"] = self._build_csp_header()
+            headers = dict(self._strict_headers)
         
         # Add CORS headers for API endpoints
-        if self._is_api_path(path):
-            self._add_cors_headers(response, request)
-        
-        # Remove server information leakage
-        if "server" in response.headers:
-            response.headers["server"] = "IntentVerse"
+        if self.is_api_path(path):
+            headers.update(self.cors_headers(origin))
         
         # Add security headers for sensitive endpoints
         if path.startswith(("/auth/", "/api/v", "/admin/")):
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
+            headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
+            headers["Pragma"] = "no-cache"
+            headers["Expires"] = "0"
         
         # Add specific headers for file downloads
-        if "download" in request.query_params or path.endswith((".pdf", ".doc", ".xls")):
-            response.headers["X-Download-Options"] = "noopen"
-            response.headers["Content-Disposition"] = "attachment"
+        if download or path.endswith((".pdf", ".doc", ".xls")):
+            headers["X-Download-Options"] = "noopen"
+            headers["Content-Disposition"] = "attachment"
+
+        return headers
+
+
+class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware to add comprehensive security headers to all HTTP responses.
+
+    Implements security headers based on OWASP recommendations and modern
+    web security best practices.
+    """
+
+    def __init__(self, app: ASGIApp, config: Dict[str, Any] = None):
+        super().__init__(app)
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+        self.policy = SecurityHeaderPolicy(self.config)
+        self.default_headers = self.policy.default_headers
+        self.headers = self.policy.headers
+        self.relaxed_csp_paths = self.policy.relaxed_csp_paths
+        self.api_paths = self.policy.api_paths
+
+    def _build_csp_header(self) -> str:
+        """Build Content Security Policy header."""
+        return self.policy._build_csp_header()
+
+    def _build_relaxed_csp_header(self) -> str:
+        """Build relaxed CSP header for UI assets."""
+        return self.policy._build_relaxed_csp_header()
+
+    def _should_use_relaxed_csp(self, path: str) -> bool:
+        """Check if path should use relaxed CSP."""
+        return self.policy.should_use_relaxed_csp(path)
+
+    def _is_api_path(self, path: str) -> bool:
+        """Check if path is an API endpoint."""
+        return self.policy.is_api_path(path)
+
+    def _add_cors_headers(self, response: Response, request: Request) -> None:
+        """Add CORS headers for API endpoints."""
+        response.headers.update(self.policy.cors_headers(request.headers.get("origin")))
+
+    def _add_security_headers(self, response: Response, request: Request) -> None:
+        """Add security headers to response."""
+        response.headers.update(
+            self.policy.response_headers(
+                request.url.path,
+                request.headers.get("origin"),
+                "download" in request.query_params,
+            )
+        )
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Process request and add security headers to response."""
@@ -279,22 +351,35 @@ class SecurityConfig:
         }
 
 
-def create_security_headers_middleware(environment: str = "production") -> SecurityHeadersMiddleware:
+def get_security_headers_config(environment: str = "production") -> Dict[str, Any]:
     """
-    Create security headers middleware with environment-specific configuration.
+    Get the security headers configuration for an environment.
     
     Args:
         environment: Environment name (development, production, testing)
         
     Returns:
-        Configured SecurityHeadersMiddleware instance
+        Configuration dictionary, the production one for unknown environments
     """
     config_map = {
-        "development": SecurityConfig.get_development_config(),
-        "production": SecurityConfig.get_production_config(),
-        "testing": SecurityConfig.get_testing_config()
+        "development": SecurityConfig.get_development_config,
+        "production": SecurityConfig.get_production_config,
+        "testing": SecurityConfig.get_testing_config,
     }
     
-    config = config_map.get(environment, SecurityConfig.get_production_config())
+    return config_map.get(environment, SecurityConfig.get_production_config)()
+
+
+def create_security_headers_middleware(environment: str = "production") -> SecurityHeadersMiddleware:
+    """
+    Create security headers middleware with environment-specific configuration.
+
+    Args:
+        environment: Environment name (development, production, testing)
+
+    Returns:
+        Configured SecurityHeadersMiddleware instance
+    """
+    config = get_security_headers_config(environment)
     
-    return lambda app: SecurityHeadersMiddleware(app, config)
\ No newline at end of file
+    return lambda app: SecurityHeadersMiddleware(app, config)
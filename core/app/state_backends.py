@@ -0,0 +1,225 @@
+"""
+Shared storage for module state.
+
+By default the StateManager keeps module state in a per-process dict, which
+is fine for a single uvicorn worker but splits the state when the core runs
+with ``--workers N``. A state backend is a store that every worker process
+can reach: the StateManager writes each change through to it together with
+a version number, and before serving a key checks the stored version,
+reloading the value only when another worker changed it.
+
+``SQLiteStateBackend`` keeps the state in a local SQLite database in WAL
+mode, so readers never block the writer and no external service is
+needed. Values are stored as JSON, so a worker that reloads a value sees
+JSON types (for example, datetimes become strings).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .config import Config
+
+STATE_BACKENDS = ("memory", "sqlite")
+
+
+class StateBackend(ABC):
+    """
+    Base class for stores that share module state between processes.
+
+    Values are passed in and out as JSON text. ``write`` must increment the
+    key's version atomically, so that concurrent writers in different
+    processes never hand out the same version twice, and must only write
+    when the stored version is the one the writer expects, so that a
+    writer never overwrites a change it has not seen.
+    """
+
+    @property
+    @abstractmethod
+    def instance_id(self) -> str:
+        """Identifies the store, so ETags from another store never match."""
+        pass
+
+    @abstractmethod
+    def get_version(self, key: str) -> int:
+        """Get a key's version, 0 if it was never written."""
+        pass
+
+    @abstractmethod
+    def get_versions(self) -> Dict[str, int]:
+        """Get the versions of all keys."""
+        pass
+
+    @abstractmethod
+    def read(self, key: str) -> Tuple[int, Optional[str]]:
+        """Get a key's version and JSON value (0 and None if missing)."""
+        pass
+
+    @abstractmethod
+    def write(
+        self, key: str, payload: str, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Store a key's JSON value.
+
+        Args:
+            key: The key to store
+            payload: The JSON value
+            expected_version: Only write if the stored version is this one
+                (0 for a key never written); None writes unconditionally
+
+        Returns:
+            The key's new version, or None if the stored version moved
+        """
+        pass
+
+    @abstractmethod
+    def claim(self, name: str) -> bool:
+        """
+        Claim a one-off task, such as loading initial content.
+
+        Returns:
+            True for the first caller across all processes, False after
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Module state in a SQLite database shared by all worker processes.
+
+    Each thread gets its own connection. The database runs in WAL mode with
+    ``synchronous=NORMAL``: a write costs one append to the log, and a
+    version check is a primary key lookup that does not wait for writers.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        Args:
+            path: Database file; created if missing
+            busy_timeout: Seconds a writer waits for another process's
+                write to finish
+        """
+        self.path = str(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS module_state ("
+                "key TEXT PRIMARY KEY, version INTEGER NOT NULL, value TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS state_meta (name TEXT PRIMARY KEY, value TEXT)"
+            )
+            # The first process to get here picks the id, the others read it
+            connection.execute(
+                "INSERT OR IGNORE INTO state_meta (name, value) VALUES ('instance_id', ?)",
+                (uuid.uuid4().hex[:12],),
+            )
+        self._instance_id = connection.execute(
+            "SELECT value FROM state_meta WHERE name = 'instance_id'"
+        ).fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @property
+    def instance_id(self) -> str:
+        return self._instance_id
+
+    def get_version(self, key: str) -> int:
+        row = self._connect().execute(
+            "SELECT version FROM module_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_versions(self) -> Dict[str, int]:
+        return dict(
+            self._connect().execute("SELECT key, version FROM module_state").fetchall()
+        )
+
+    def read(self, key: str) -> Tuple[int, Optional[str]]:
+        row = self._connect().execute(
+            "SELECT version, value FROM module_state WHERE key = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def write(
+        self, key: str, payload: str, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        # Each statement checks and bumps the version atomically, and
+        # fetchall() steps it to completion, which commits it
+        if expected_version is None:
+            sql = (
+                "INSERT INTO module_state (key, version, value) VALUES (?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET version = version + 1, "
+                "value = excluded.value RETURNING version"
+            )
+            parameters: Tuple = (key, payload)
+        elif expected_version == 0:
+            sql = (
+                "INSERT INTO module_state (key, version, value) VALUES (?, 1, ?) "
+                "ON CONFLICT(key) DO NOTHING RETURNING version"
+            )
+            parameters = (key, payload)
+        else:
+            sql = (
+                "UPDATE module_state SET version = version + 1, value = ? "
+                "WHERE key = ? AND version = ? RETURNING version"
+            )
+            parameters = (payload, key, expected_version)
+        rows = self._connect().execute(sql, parameters).fetchall()
+        return rows[0][0] if rows else None
+
+    def claim(self, name: str) -> bool:
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO state_meta (name, value) VALUES (?, ?)",
+            (f"claim:{name}", str(os.getpid())),
+        )
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def create_state_backend(kind: Optional[str] = None) -> Optional[StateBackend]:
+    """
+    Create the configured state backend.
+
+    Args:
+        kind: "memory" or "sqlite"; defaults to the configured backend
+
+    Returns:
+        The backend, or None for per-process memory
+    """
+    kind = (kind or Config.get_state_backend()).lower()
+    if kind not in STATE_BACKENDS:
+        raise ValueError(f"State backend must be one of {STATE_BACKENDS}")
+    if kind == "memory":
+        return None
+
+    path = Config.get_state_backend_path()
+    logging.info(f"Sharing module state through SQLite at {path} (pid {os.getpid()})")
+    return SQLiteStateBackend(path)
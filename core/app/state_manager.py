@@ -1,5 +1,22 @@
+import json
+import logging
 import threading
-from typing import Any, Dict
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import Config
+from .state_backends import StateBackend, create_state_backend
+from .state_persistence import StatePersistence, create_state_persistence
+from .state_versioning import JsonPatch, make_json_patch, summarize_paths
+
+# Times ``StateManager.update`` retries a change that lost a race
+UPDATE_ATTEMPTS = 5
+
+
+class StateConflictError(RuntimeError):
+    """Raised by ``set`` when another worker process changed the key since
+    this process last read it."""
 
 
 class StateManager:
@@ -9,25 +26,374 @@ class StateManager:
     This class provides a simple key-value store for modules to maintain their
     state. It uses a lock to ensure that concurrent requests in the web server
     do not cause race conditions when modifying the state.
+
+    Every ``set`` that changes a key's value increments its version. A bounded log of the JSON
+    patches between recent versions is kept so that clients can fetch deltas
+    instead of whole states, and listeners are told about every change.
+    Keys that change wholesale on every ``set`` (see ``no_delta_keys``) are
+    not diffed; their deltas replace the whole value.
+
+    With a shared backend, every change is also written through to the
+    backend and keys changed by other worker processes are reloaded before
+    they are served, so several workers see one state. A ``set`` based on
+    a value another worker has since changed fails with StateConflictError
+    instead of overwriting that change; ``update`` retries such changes.
+
+    With persistence, state is recovered from disk on creation and every
+    change is logged, so the state survives restarts. Changes to no-delta
+    keys are saved by a snapshot shortly after instead of being logged.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        change_log_size: Optional[int] = None,
+        backend: Optional[StateBackend] = None,
+        persistence: Optional[StatePersistence] = None,
+        no_delta_keys: Optional[Iterable[str]] = None,
+    ):
         """
         Initializes the StateManager with an empty state dictionary and a lock.
+
+        Args:
+            change_log_size: Number of changes kept per key for deltas;
+                defaults to the configured size, 0 disables deltas.
+            backend: Store shared with other worker processes; None keeps
+                the state in this process only.
+            persistence: Log and snapshots to recover from and write
+                changes to; not used together with a backend.
+            no_delta_keys: Keys whose changes are not diffed; defaults to
+                the configured keys.
         """
+        if backend is not None and persistence is not None:
+            raise ValueError("A shared backend cannot be combined with persistence")
         self._state: Dict[str, Any] = {}
         self._lock = threading.Lock()
+        self._backend = backend
+        self.instance_id = backend.instance_id if backend else uuid.uuid4().hex[:12]
+        self.change_log_size = (
+            Config.get_state_change_log_size()
+            if change_log_size is None
+            else change_log_size
+        )
+        self.no_delta_keys = set(
+            Config.get_state_no_delta_keys() if no_delta_keys is None else no_delta_keys
+        )
+        self._versions: Dict[str, int] = {}
+        # Modules mutate their state in place before calling set(), so the
+        # previous value has to be snapshotted to diff against
+        self._snapshots: Dict[str, Any] = {}
+        self._change_log: Dict[str, Deque[Tuple[int, JsonPatch]]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._claims: Set[str] = set()
+        self._persistence = persistence
+        # Pending snapshot of no-delta keys, which are not logged
+        self._checkpoint_timer: Optional[threading.Timer] = None
+        if persistence is not None:
+            self._recover()
+
+    def _recover(self) -> None:
+        recovered = self._persistence.recover()
+        self._state = recovered.state
+        self._versions = recovered.versions
+        self._claims = recovered.claims
+        for key, value in self._state.items():
+            if self._tracks_deltas(key):
+                snapshot = json.loads(json.dumps(value, default=str))
+                self._snapshots[key] = snapshot
+                # Versions continue across restarts but the change log does
+                # not, so older versions get the whole value
+                self._change_log[key] = deque(
+                    [(self._versions[key], [{"op": "replace", "path": "", "value": snapshot}])],
+                    maxlen=self.change_log_size,
+                )
+
+    def _tracks_deltas(self, key: str) -> bool:
+        return self.change_log_size > 0 and key not in self.no_delta_keys
+
+    def _persist(self, record: Tuple) -> bool:
+        """
+        Logs a change. Must hold the lock.
+
+        Returns:
+            True if a snapshot is due
+        """
+        try:
+            self._persistence.append(record)
+            return self._persistence.snapshot_due()
+        except Exception as e:
+            logging.error(f"Failed to persist state change {record[:2]}: {e}")
+            return False
+
+    def _schedule_checkpoint(self) -> None:
+        """Snapshots unlogged changes after a delay. Must hold the lock."""
+        if self._checkpoint_timer is not None:
+            return
+        self._checkpoint_timer = threading.Timer(
+            self._persistence.no_delta_snapshot_interval, self._scheduled_checkpoint
+        )
+        self._checkpoint_timer.daemon = True
+        self._checkpoint_timer.start()
+
+    def _scheduled_checkpoint(self) -> None:
+        with self._lock:
+            self._checkpoint_timer = None
+        self.checkpoint()
+
+    def checkpoint(self, background: bool = True) -> None:
+        """
+        Compacts the persisted change log into a snapshot of the current
+        state. Does nothing without persistence.
+
+        Args:
+            background: Write the snapshot file on a background thread.
+        """
+        if self._persistence is None:
+            return
+        with self._lock:
+            # The JSON snapshots are what logged patches apply to
+            state = {
+                key: self._snapshots.get(key, value) for key, value in self._state.items()
+            }
+            try:
+                self._persistence.begin_snapshot(
+                    state, self._versions, self._claims, background=background
+                )
+            except Exception as e:
+                logging.error(f"Failed to snapshot state: {e}")
+
+    def close(self) -> None:
+        """Writes a final snapshot and closes the persistence log, if any."""
+        if self._persistence is None:
+            return
+        with self._lock:
+            if self._checkpoint_timer is not None:
+                self._checkpoint_timer.cancel()
+                self._checkpoint_timer = None
+        self.checkpoint(background=False)
+        with self._lock:
+            self._persistence.close()
+
+    @property
+    def is_shared(self) -> bool:
+        """Whether the state is shared with other worker processes."""
+        return self._backend is not None
+
+    def claim(self, name: str) -> bool:
+        """
+        Claims a one-off task that only one worker process should run.
+
+        Args:
+            name: Name of the task.
+
+        Returns:
+            True if the caller should run the task: always without a shared
+            backend, and only for the first worker to ask with one. With
+            persistence, a task claimed before a restart stays claimed.
+        """
+        if self._backend is not None:
+            return self._backend.claim(name)
+        with self._lock:
+            if self._persistence is None:
+                return True
+            if name in self._claims:
+                return False
+            self._claims.add(name)
+            snapshot_due = self._persist(("claim", name))
+        if snapshot_due:
+            self.checkpoint()
+        return True
+
+    def _sync(self, key: str, version: Optional[int] = None) -> bool:
+        """
+        Reload a key if another process changed it. Must hold the lock.
+
+        Returns:
+            True if the key was reloaded
+        """
+        if version is None:
+            version = self._backend.get_version(key)
+        if version == self._versions.get(key, 0):
+            return False
+
+        version, payload = self._backend.read(key)
+        value = json.loads(payload) if payload is not None else None
+        self._state[key] = value
+        self._versions[key] = version
+        if self._tracks_deltas(key):
+            # Changes made elsewhere are not in the log; the reload itself
+            # becomes the only entry, so older versions get the whole value
+            snapshot = json.loads(payload) if payload is not None else None
+            self._snapshots[key] = snapshot
+            log = self._change_log.setdefault(key, deque(maxlen=self.change_log_size))
+            log.clear()
+            log.append((version, [{"op": "replace", "path": "", "value": snapshot}]))
+        return True
+
+    def sync(self) -> List[str]:
+        """
+        Reload every key changed by other worker processes and notify
+        listeners about them. Does nothing without a shared backend.
+
+        Returns:
+            The keys that were reloaded
+        """
+        if self._backend is None:
+            return []
+        with self._lock:
+            versions = self._backend.get_versions()
+            changed = [
+                key for key, version in versions.items() if self._sync(key, version)
+            ]
+            notifications = [
+                {"module": key, "version": self._versions[key], "paths": [""]}
+                for key in changed
+            ]
+            listeners = list(self._listeners)
+
+        for notification in notifications:
+            self._notify(listeners, notification)
+        return changed
+
+    def _notify(self, listeners, notification: Dict[str, Any]) -> None:
+        for listener in listeners:
+            try:
+                listener(notification)
+            except Exception as e:
+                logging.error(
+                    f"State change listener failed for '{notification['module']}': {e}"
+                )
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registers a callable to be told about state changes.
+
+        The listener is called after every ``set`` with a notification of the
+        form ``{"module": key, "version": n, "paths": [...]}``, where paths are
+        the JSON pointers that changed (``""`` for the whole document). It
+        runs on the thread that called ``set`` and must not block.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Unregisters a listener added with ``add_listener``."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
 
     def set(self, key: str, value: Any) -> None:
         """
         Sets or updates the value for a given key in the state.
 
+        With delta tracking enabled, setting a value equal to the previous
+        one leaves the version unchanged and notifies no one.
+
         Args:
             key: The key for the state entry (e.g., 'filesystem', 'email').
             value: The value to store.
+
+        Raises:
+            StateConflictError: With a shared backend, if another worker
+                process changed the key since this process last read it.
+                The key is reloaded, so reading and changing it again
+                works; ``update`` does that.
         """
         with self._lock:
+            shared = self._backend is not None
+            tracked = self._tracks_deltas(key)
+
+            patch: JsonPatch = [{"op": "replace", "path": ""}]
+            payload = None
+            if tracked or shared:
+                payload = json.dumps(value, default=str)
+            if tracked:
+                snapshot = json.loads(payload)
+                if key in self._snapshots:
+                    patch = make_json_patch(self._snapshots[key], snapshot)
+                    if not patch:
+                        # Nothing changed, so cached copies stay valid
+                        return
+                    if len(patch) > 1 and len(json.dumps(patch, default=str)) > len(payload):
+                        # Wholesale changes, such as a list shifted by one,
+                        # diff into more than the value itself
+                        patch = [{"op": "replace", "path": "", "value": snapshot}]
+                else:
+                    patch = [{"op": "replace", "path": "", "value": snapshot}]
+
+            previous = self._versions.get(key, 0)
+            if shared:
+                version = self._backend.write(key, payload, previous)
+                if version is None:
+                    # The value was based on a version another process has
+                    # replaced; writing it would lose that change
+                    self._sync(key)
+                    raise StateConflictError(
+                        f"State '{key}' was changed by another worker process"
+                    )
+            else:
+                version = previous + 1
             self._state[key] = value
+            self._versions[key] = version
+            if tracked:
+                self._snapshots[key] = snapshot
+                log = self._change_log.setdefault(
+                    key, deque(maxlen=self.change_log_size)
+                )
+                if len(patch) == 1 and patch[0]["path"] == "" and "value" in patch[0]:
+                    log.clear()
+                log.append((version, patch))
+
+            snapshot_due = False
+            if self._persistence is not None:
+                if tracked:
+                    snapshot_due = self._persist(("patch", key, version, patch))
+                elif key in self.no_delta_keys:
+                    # Too large to log on every change; saved by a snapshot
+                    self._schedule_checkpoint()
+                else:
+                    snapshot_due = self._persist(("set", key, version, value))
+
+            listeners = list(self._listeners)
+
+        if snapshot_due:
+            self.checkpoint()
+        if listeners:
+            self._notify(
+                listeners,
+                {
+                    "module": key,
+                    "version": version,
+                    "paths": summarize_paths([op["path"] for op in patch]),
+                },
+            )
+
+    def update(self, key: str, change: Callable[[Any], Any]) -> Any:
+        """
+        Reads, changes and sets a key's value, retrying from a fresh read
+        when another worker process changed the key in between.
+
+        Args:
+            key: The key for the state entry.
+            change: Called with the current value (None if the key was
+                never set) and returns the new value; it may change the
+                value in place. It runs again on every retry, so it should
+                have no other side effects.
+
+        Returns:
+            The value that was stored.
+
+        Raises:
+            StateConflictError: If the change lost the race every attempt.
+        """
+        for attempt in range(UPDATE_ATTEMPTS):
+            value = change(self.get(key))
+            try:
+                self.set(key, value)
+                return value
+            except StateConflictError:
+                if attempt == UPDATE_ATTEMPTS - 1:
+                    raise
+                logging.debug(f"Retrying update of state '{key}' after a conflict")
 
     def get(self, key: str) -> Any:
         """
@@ -40,8 +406,60 @@ class StateManager:
             The value associated with the key, or None if the key doesn't exist.
         """
         with self._lock:
+            if self._backend is not None:
+                self._sync(key)
             return self._state.get(key)
 
+    def get_version(self, key: str) -> int:
+        """
+        Gets the version of a key's state.
+
+        Returns:
+            The number of changes made to the key, 0 if it was never set.
+        """
+        with self._lock:
+            if self._backend is not None:
+                self._sync(key)
+            return self._versions.get(key, 0)
+
+    def get_changes_since(
+        self, key: str, version: int
+    ) -> Tuple[int, Optional[JsonPatch]]:
+        """
+        Gets a JSON patch from a previous version of a key's state to the
+        current one.
+
+        Args:
+            key: The key for the state entry.
+            version: Version the caller already has.
+
+        Returns:
+            The current version and the combined patch to it (empty if the
+            version is current). When the change log no longer reaches back
+            to that version the patch replaces the whole document; it is
+            None if deltas are disabled.
+        """
+        with self._lock:
+            if self._backend is not None:
+                self._sync(key)
+            current = self._versions.get(key, 0)
+            if version == current:
+                return current, []
+            if key not in self._snapshots:
+                return current, None
+
+            log = self._change_log[key]
+            if version > current or version < 0 or log[0][0] > version + 1:
+                return current, [
+                    {"op": "replace", "path": "", "value": self._snapshots[key]}
+                ]
+
+            patch: List[Dict[str, Any]] = []
+            for change_version, ops in log:
+                if change_version > version:
+                    patch.extend(ops)
+            return current, patch
+
     def get_full_state(self) -> Dict[str, Any]:
         """
         Returns a copy of the entire state dictionary.
@@ -50,9 +468,14 @@ class StateManager:
             A shallow copy of the state dictionary to prevent direct modification.
         """
         with self._lock:
+            if self._backend is not None:
+                for key, version in self._backend.get_versions().items():
+                    self._sync(key, version)
             return self._state.copy()
 
 
 # A single, global instance of the StateManager that can be imported
 # by other parts of the application to ensure shared state.
-state_manager = StateManager()
+state_manager = StateManager(
+    backend=create_state_backend(), persistence=create_state_persistence()
+)
@@ -0,0 +1,345 @@
+"""
+Merge engine for content pack state.
+
+Content packs are merged into the existing StateManager content module by
+module. Each module can register a merge strategy that declares the identity
+keys used to match records, so that a merge indexes both sides once and runs
+in linear time instead of searching lists for every existing record.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class MergeStrategy(ABC):
+    """
+    Base class for module state merge strategies.
+
+    Subclasses implement ``merge`` and must never mutate ``existing`` or
+    ``new`` in place; the returned value becomes the new module state.
+    """
+
+    @abstractmethod
+    def merge(self, existing: Any, new: Any) -> Any:
+        """Return the merged state of ``existing`` and ``new``."""
+        pass
+
+
+class DeepMergeStrategy(MergeStrategy):
+    """
+    Recursively merges dictionaries, with values from the new state taking
+    precedence. Lists are concatenated when ``concat_lists`` is set.
+    """
+
+    def __init__(self, concat_lists: bool = False):
+        self.concat_lists = concat_lists
+
+    def merge(self, existing: Any, new: Any) -> Any:
+        if isinstance(existing, dict) and isinstance(new, dict):
+            return deep_merge_dict(existing, new)
+
+        if self.concat_lists and isinstance(existing, list) and isinstance(new, list):
+            return existing + new
+
+        return new
+
+
+class KeyedCollectionMergeStrategy(MergeStrategy):
+    """
+    Merges a dict of record lists (e.g. email folders), appending records from
+    the new state whose identity key is not already present.
+
+    Records without the identity key are always appended. Keys of the state
+    that are not collections are taken from the new state.
+    """
+
+    def __init__(self, collections: Iterable[str], identity_key: str = "id"):
+        self.collections = tuple(collections)
+        self.identity_key = identity_key
+
+    def merge(self, existing: Any, new: Any) -> Any:
+        if not isinstance(existing, dict) or not isinstance(new, dict):
+            logging.warning("Collection state is not a dictionary, using new state")
+            return new
+
+        merged = dict(existing)
+
+        for collection in self.collections:
+            merged[collection] = merge_keyed_list(
+                existing.get(collection, []),
+                new.get(collection, []),
+                self.identity_key,
+            )
+
+        for key, value in new.items():
+            if key not in self.collections:
+                merged[key] = value
+
+        return merged
+
+
+class TreeMergeStrategy(MergeStrategy):
+    """
+    Merges tree-shaped state such as the filesystem, matching children by
+    identity key. Leaf nodes from the new state replace existing ones, and
+    branch nodes are merged recursively.
+    """
+
+    def __init__(
+        self,
+        identity_key: str = "name",
+        children_key: str = "children",
+        type_key: str = "type",
+        branch_type: str = "directory",
+    ):
+        self.identity_key = identity_key
+        self.children_key = children_key
+        self.type_key = type_key
+        self.branch_type = branch_type
+
+    def merge(self, existing: Any, new: Any) -> Any:
+        if not isinstance(existing, dict) or not isinstance(new, dict):
+            logging.warning("Tree state is not a dictionary, using new state")
+            return new
+
+        if (
+            existing.get(self.type_key) != self.branch_type
+            or new.get(self.type_key) != self.branch_type
+        ):
+            return new
+
+        return self._merge_node(existing, new)
+
+    def _merge_node(self, existing_node: Any, new_node: Any) -> Any:
+        if not isinstance(existing_node, dict) or not isinstance(new_node, dict):
+            return new_node
+
+        if new_node.get(self.type_key) != self.branch_type:
+            return new_node
+
+        merged = dict(existing_node)
+
+        if existing_node.get(self.type_key) == self.branch_type:
+            merged[self.children_key] = self._merge_children(
+                existing_node.get(self.children_key, []),
+                new_node.get(self.children_key, []),
+            )
+
+        for key, value in new_node.items():
+            if key != self.children_key:
+                merged[key] = value
+
+        return merged
+
+    def _merge_children(self, existing_children: Any, new_children: Any) -> List[Any]:
+        if not isinstance(existing_children, list):
+            existing_children = []
+        if not isinstance(new_children, list):
+            new_children = []
+
+        key = self.identity_key
+        new_index: Dict[Any, Any] = {}
+        for child in new_children:
+            if isinstance(child, dict) and key in child:
+                new_index.setdefault(child[key], child)
+
+        merged_children = []
+        seen = set()
+        for child in existing_children:
+            if isinstance(child, dict) and key in child:
+                child_id = child[key]
+                match = new_index.get(child_id)
+                merged_children.append(
+                    self._merge_node(child, match) if match is not None else child
+                )
+                seen.add(child_id)
+            else:
+                merged_children.append(child)
+
+        for child in new_children:
+            if isinstance(child, dict) and key in child:
+                if child[key] not in seen:
+                    merged_children.append(child)
+            else:
+                merged_children.append(child)
+
+        return merged_children
+
+
+class UniqueListMergeStrategy(MergeStrategy):
+    """
+    Merges the given list-valued keys of a dict state as an ordered union,
+    keeping the first occurrence of each value. Other keys are taken from the
+    new state.
+    """
+
+    def __init__(self, list_keys: Iterable[str]):
+        self.list_keys = tuple(list_keys)
+
+    def merge(self, existing: Any, new: Any) -> Any:
+        if not isinstance(existing, dict) or not isinstance(new, dict):
+            logging.warning("List state is not a dictionary, using new state")
+            return new
+
+        merged = dict(existing)
+
+        for list_key in self.list_keys:
+            if list_key not in new:
+                continue
+            existing_items = existing.get(list_key, [])
+            new_items = new[list_key]
+            if isinstance(existing_items, list) and isinstance(new_items, list):
+                merged[list_key] = merge_unique_list(existing_items, new_items)
+            else:
+                merged[list_key] = new_items
+
+        for key, value in new.items():
+            if key not in self.list_keys:
+                merged[key] = value
+
+        return merged
+
+
+class StateMergeEngine:
+    """
+    Registry of per-module merge strategies.
+
+    Modules without a registered strategy fall back to the default strategy,
+    which deep merges dictionaries and concatenates lists.
+    """
+
+    def __init__(self, default_strategy: Optional[MergeStrategy] = None):
+        self._strategies: Dict[str, MergeStrategy] = {}
+        self.default_strategy = default_strategy or DeepMergeStrategy(concat_lists=True)
+
+    def register(self, module_name: str, strategy: MergeStrategy) -> None:
+        """
+        Registers (or replaces) the merge strategy for a module.
+
+        Args:
+            module_name: Name of the module whose state the strategy merges
+            strategy: Strategy instance to use for that module
+        """
+        self._strategies[module_name] = strategy
+
+    def unregister(self, module_name: str) -> None:
+        """Removes a registered strategy, reverting the module to the default."""
+        self._strategies.pop(module_name, None)
+
+    def get_strategy(self, module_name: str) -> MergeStrategy:
+        """Returns the strategy used for a module."""
+        return self._strategies.get(module_name, self.default_strategy)
+
+    def has_strategy(self, module_name: str) -> bool:
+        """Returns True if a module has an explicitly registered strategy."""
+        return module_name in self._strategies
+
+    def merge(self, module_name: str, existing: Any, new: Any) -> Any:
+        """
+        Merges new module state into existing module state.
+
+        Args:
+            module_name: Name of the module
+            existing: Current state of the module
+            new: New state to merge in
+
+        Returns:
+            Merged state
+        """
+        return self.get_strategy(module_name).merge(existing, new)
+
+
+def deep_merge_dict(dict1: Dict[str, Any], dict2: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deep merge two dictionaries.
+
+    Args:
+        dict1: First dictionary
+        dict2: Second dictionary (takes precedence)
+
+    Returns:
+        Merged dictionary
+    """
+    result = dict1.copy()
+
+    for key, value in dict2.items():
+        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
+            result[key] = deep_merge_dict(result[key], value)
+        else:
+            result[key] = value
+
+    return result
+
+
+def merge_keyed_list(existing: Any, new: Any, identity_key: str) -> List[Any]:
+    """
+    Appends records from ``new`` whose identity key is not present in
+    ``existing``. Runs in O(len(existing) + len(new)).
+    """
+    if not isinstance(existing, list):
+        existing = []
+    if not isinstance(new, list):
+        new = []
+
+    existing_ids = set()
+    for record in existing:
+        if isinstance(record, dict) and identity_key in record:
+            record_id = record[identity_key]
+            if isinstance(record_id, Hashable):
+                existing_ids.add(record_id)
+
+    merged = list(existing)
+    for record in new:
+        if isinstance(record, dict):
+            record_id = record.get(identity_key)
+            if (
+                record_id is None
+                or not isinstance(record_id, Hashable)
+                or record_id not in existing_ids
+            ):
+                merged.append(record)
+        else:
+            merged.append(record)
+
+    return merged
+
+
+def merge_unique_list(existing: List[Any], new: List[Any]) -> List[Any]:
+    """
+    Returns ``existing`` followed by the items of ``new`` not already present,
+    comparing unhashable items (dicts, lists) by their canonical JSON form.
+    """
+    seen = {_fingerprint(item) for item in existing}
+    merged = list(existing)
+    for item in new:
+        fingerprint = _fingerprint(item)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            merged.append(item)
+    return merged
+
+
+def _fingerprint(item: Any) -> Tuple[str, Any]:
+    if isinstance(item, Hashable):
+        return ("value", item)
+    try:
+        return ("json", json.dumps(item, sort_keys=True, default=str))
+    except (TypeError, ValueError):
+        return ("repr", repr(item))
+
+
+def create_default_merge_engine() -> StateMergeEngine:
+    """
+    Creates a merge engine with the strategies for the built-in modules.
+    """
+    engine = StateMergeEngine()
+    engine.register(
+        "email",
+        KeyedCollectionMergeStrategy(["inbox", "sent", "drafts"], identity_key="id"),
+    )
+    engine.register("filesystem", TreeMergeStrategy(identity_key="name"))
+    engine.register("memory", DeepMergeStrategy())
+    engine.register("web_search", UniqueListMergeStrategy(["search_history"]))
+    return engine
@@ -0,0 +1,351 @@
+"""
+Optional on-disk persistence for module state.
+
+Without it, module state lives only in memory and every restart has to
+replay the default content pack. With a persistence directory configured,
+the StateManager records every change in an append-only log and
+periodically writes a compacted snapshot, so startup only has to load the
+latest snapshot and replay the few changes logged after it.
+
+Layout of the directory:
+
+- ``snapshot.bin``: pickle (protocol 5) of the full state, the versions,
+  the claimed one-off tasks and the number of the first log segment not
+  included in it. Written to a temporary file and renamed into place.
+- ``log-<n>.bin``: log segments. Each record is a length, a CRC32 and a
+  pickled tuple: ``("patch", key, version, ops)`` for a JSON patch,
+  ``("set", key, version, value)`` for a whole value and
+  ``("claim", name)`` for a claimed task. A snapshot starts a new segment;
+  once it is written the segments it covers are deleted.
+
+Keys whose changes are not diffed (the StateManager's no-delta keys, such
+as the timeline) are large and change often, so logging their whole value
+on every change would dwarf everything else. They are not logged at all;
+the StateManager writes a snapshot at most ``no_delta_snapshot_interval``
+seconds after they change, and on shutdown, so a crash loses at most that
+much of their history.
+
+Recovery stops at the first incomplete or corrupt record, which is what a
+crash in the middle of a write leaves behind, and truncates it.
+
+How often the log is flushed to disk is set by the fsync policy:
+``always`` syncs every record, ``interval`` at most once per
+``fsync_interval`` seconds, and ``never`` leaves it to the OS.
+"""
+
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .config import Config
+from .state_versioning import apply_json_patch
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+SNAPSHOT_FILE = "snapshot.bin"
+SNAPSHOT_FORMAT = 1
+
+# Record length and CRC32 of the pickled record
+_RECORD_HEADER = struct.Struct("<II")
+
+
+def _segment_number(path: Path) -> int:
+    return int(path.stem.split("-")[1])
+
+
+def _fsync_directory(directory: Path) -> None:
+    # Makes renames and new files durable; not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class RecoveredState:
+    """State read back from disk by ``StatePersistence.recover``."""
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.versions: Dict[str, int] = {}
+        self.claims: Set[str] = set()
+        self.records_replayed = 0
+        self.duration = 0.0
+
+
+class StatePersistence:
+    """
+    Append-only log and snapshots of StateManager changes.
+
+    ``recover`` must be called once before ``append``. Appends are made by
+    the StateManager while it holds its lock, so records are in version
+    order; they are pickled immediately, so later in-place changes to the
+    values do not leak into the log.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_policy: Optional[str] = None,
+        fsync_interval: Optional[float] = None,
+        snapshot_every: Optional[int] = None,
+        no_delta_snapshot_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            directory: Directory for the snapshot and log; created if missing
+            fsync_policy: "always", "interval" or "never"; defaults to the
+                configured policy
+            fsync_interval: Seconds between fsyncs with the "interval"
+                policy; defaults to the configured interval
+            snapshot_every: Records logged between snapshots; defaults to
+                the configured number
+            no_delta_snapshot_interval: Longest delay, in seconds, between a
+                change to a key that is not logged and the snapshot that
+                saves it; defaults to the configured interval
+        """
+        config = Config.get_state_persistence_config()
+        self.directory = Path(directory)
+        self.fsync_policy = (fsync_policy or config["fsync_policy"]).lower()
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        self.fsync_interval = (
+            config["fsync_interval"] if fsync_interval is None else fsync_interval
+        )
+        self.snapshot_every = snapshot_every or config["snapshot_every"]
+        self.no_delta_snapshot_interval = (
+            config["no_delta_snapshot_interval"]
+            if no_delta_snapshot_interval is None
+            else no_delta_snapshot_interval
+        )
+
+        self._log = None
+        self._segment = 0
+        self._records_since_snapshot = 0
+        self._last_fsync = time.monotonic()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread: Optional[threading.Thread] = None
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob("log-*.bin"), key=_segment_number)
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"log-{number:08d}.bin"
+
+    def _open_segment(self, number: int) -> None:
+        if self._log is not None:
+            self._sync_log(force=True)
+            self._log.close()
+        self._segment = number
+        self._log = open(self._segment_path(number), "ab")
+        _fsync_directory(self.directory)
+
+    def recover(self) -> RecoveredState:
+        """
+        Load the latest snapshot and replay the log written after it.
+
+        Returns:
+            The recovered state, versions and claims
+        """
+        started = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        recovered = RecoveredState()
+
+        first_segment = 0
+        snapshot_path = self.directory / SNAPSHOT_FILE
+        if snapshot_path.exists():
+            with open(snapshot_path, "rb") as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+            recovered.state = snapshot["state"]
+            recovered.versions = snapshot["versions"]
+            recovered.claims = set(snapshot["claims"])
+            first_segment = snapshot["segment"]
+
+        last_segment = first_segment
+        for path in self._segments():
+            number = _segment_number(path)
+            if number < first_segment:
+                # Left over from a snapshot interrupted before cleanup
+                path.unlink()
+                continue
+            self._replay(path, recovered)
+            last_segment = number
+
+        recovered.duration = time.perf_counter() - started
+        # Appending to the last segment keeps recovery's work proportional
+        # to the changes since the last snapshot
+        self._open_segment(last_segment)
+        self._records_since_snapshot = recovered.records_replayed
+        logging.info(
+            f"Recovered state of {len(recovered.state)} modules from {self.directory} "
+            f"({recovered.records_replayed} log records) in "
+            f"{recovered.duration * 1000:.1f} ms"
+        )
+        return recovered
+
+    def _replay(self, path: Path, recovered: RecoveredState) -> None:
+        with open(path, "rb") as segment:
+            data = segment.read()
+
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, checksum = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            self._apply(pickle.loads(payload), recovered)
+            recovered.records_replayed += 1
+            offset = start + length
+
+        if offset < len(data):
+            logging.warning(
+                f"Truncating {len(data) - offset} bytes of incomplete state log "
+                f"records in {path.name}"
+            )
+            with open(path, "r+b") as segment:
+                segment.truncate(offset)
+
+    @staticmethod
+    def _apply(record: Tuple, recovered: RecoveredState) -> None:
+        kind = record[0]
+        if kind == "claim":
+            recovered.claims.add(record[1])
+            return
+        _, key, version, body = record
+        if kind == "set":
+            recovered.state[key] = body
+        else:
+            recovered.state[key] = apply_json_patch(recovered.state.get(key), body)
+        recovered.versions[key] = version
+
+    def append(self, record: Tuple) -> None:
+        """Append a record to the log, syncing it as the fsync policy says."""
+        payload = pickle.dumps(record, protocol=5)
+        self._log.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._log.write(payload)
+        self._sync_log()
+        self._records_since_snapshot += 1
+
+    def _sync_log(self, force: bool = False) -> None:
+        self._log.flush()
+        if self.fsync_policy == "never" and not force:
+            return
+        now = time.monotonic()
+        if (
+            force
+            or self.fsync_policy == "always"
+            or now - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(self._log.fileno())
+            self._last_fsync = now
+
+    def snapshot_due(self) -> bool:
+        """Whether enough records were logged to compact into a snapshot."""
+        return self._records_since_snapshot >= self.snapshot_every and not (
+            self._snapshot_thread is not None and self._snapshot_thread.is_alive()
+        )
+
+    def begin_snapshot(
+        self,
+        state: Dict[str, Any],
+        versions: Dict[str, int],
+        claims: Set[str],
+        background: bool = True,
+    ) -> None:
+        """
+        Start a new log segment and write a snapshot of everything before it.
+
+        Must be called under the same lock as ``append``. The state is
+        pickled here, so the caller may keep changing it afterwards; writing
+        the file happens on a background thread unless ``background`` is
+        False.
+        """
+        segment = self._segment + 1
+        payload = pickle.dumps(
+            {
+                "format": SNAPSHOT_FORMAT,
+                "segment": segment,
+                "state": state,
+                "versions": dict(versions),
+                "claims": sorted(claims),
+            },
+            protocol=5,
+        )
+        self._open_segment(segment)
+        self._records_since_snapshot = 0
+
+        if background:
+            self._snapshot_thread = threading.Thread(
+                target=self._write_snapshot,
+                args=(payload, segment),
+                name="state-snapshot",
+                daemon=True,
+            )
+            self._snapshot_thread.start()
+        else:
+            self._write_snapshot(payload, segment)
+
+    def _write_snapshot(self, payload: bytes, segment: int) -> None:
+        with self._snapshot_lock:
+            try:
+                temporary = self.directory / f"{SNAPSHOT_FILE}.tmp"
+                with open(temporary, "wb") as snapshot_file:
+                    snapshot_file.write(payload)
+                    snapshot_file.flush()
+                    os.fsync(snapshot_file.fileno())
+                os.replace(temporary, self.directory / SNAPSHOT_FILE)
+                _fsync_directory(self.directory)
+
+                for path in self._segments():
+                    if _segment_number(path) < segment:
+                        path.unlink()
+                logging.info(
+                    f"Wrote state snapshot ({len(payload)} bytes), log continues "
+                    f"at segment {segment}"
+                )
+            except Exception as e:
+                # The previous snapshot and the older segments are still in
+                # place, so recovery is unaffected
+                logging.error(f"Failed to write state snapshot: {e}")
+
+    def close(self) -> None:
+        """Wait for a running snapshot and sync and close the log."""
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        if self._log is not None:
+            self._sync_log(force=True)
+            self._log.close()
+            self._log = None
+
+
+def create_state_persistence() -> Optional[StatePersistence]:
+    """
+    Create the configured state persistence.
+
+    Returns:
+        The persistence layer, or None if no directory is configured or the
+        state lives in a shared backend, which is persistent already
+    """
+    config = Config.get_state_persistence_config()
+    if not config["directory"]:
+        return None
+    if Config.get_state_backend() != "memory":
+        logging.warning(
+            "State persistence is ignored with a shared state backend, which "
+            "is persistent already"
+        )
+        return None
+    return StatePersistence(config["directory"])
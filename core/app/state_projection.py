@@ -0,0 +1,188 @@
+"""
+Server-side projection of module state.
+
+UI components poll ``GET /api/v1/{module_name}/state`` every few seconds but
+usually render only part of the state: one mailbox, the file names in a
+tree, the first page of a table. The helpers here let the endpoint return
+just that part:
+
+- ``path`` selects a sub-tree, e.g. ``inbox`` or ``tables.users``
+- ``limit``/``offset`` paginate list values
+- ``fields`` keeps only the named keys of the selected object (or of each
+  object in a selected list)
+- content elision replaces large strings such as file contents and email
+  bodies with their size
+
+None of the helpers modify the state they are given.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+# Keys whose values are bulk content rather than metadata
+CONTENT_KEYS = ("content", "body")
+
+MAX_PAGE_SIZE = 1000
+
+
+class StatePathError(KeyError):
+    """Raised when a projection path does not exist in the state."""
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated ``fields`` parameter into a list of names."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+def resolve_path(state: Any, path: Optional[str]) -> Any:
+    """
+    Select a sub-tree of the state by a dot-separated path.
+
+    Path segments index into dictionaries by key and into lists by
+    position, e.g. ``inbox.0.subject``.
+
+    Raises:
+        StatePathError: If a segment does not exist
+    """
+    if not path:
+        return state
+
+    value = state
+    for segment in path.split("."):
+        if isinstance(value, dict) and segment in value:
+            value = value[segment]
+        elif isinstance(value, list) and segment.lstrip("-").isdigit():
+            try:
+                value = value[int(segment)]
+            except IndexError:
+                raise StatePathError(path) from None
+        else:
+            raise StatePathError(path)
+    return value
+
+
+def paginate_value(value: Any, limit: int, offset: int = 0) -> Any:
+    """
+    Paginate list values.
+
+    A list is returned as one page with its totals. For a dictionary every
+    list-valued entry is paginated in place of the full list and the totals
+    are reported under ``_pagination``. Other values are returned unchanged.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    def page_info(items: list) -> Dict[str, Any]:
+        return {
+            "total_count": len(items),
+            "limit": limit,
+            "offset": offset,
+            "has_more": offset + limit < len(items),
+        }
+
+    if isinstance(value, list):
+        return {"items": value[offset : offset + limit], **page_info(value)}
+
+    if isinstance(value, dict):
+        paged = dict(value)
+        pagination = {}
+        for key, item in value.items():
+            if isinstance(item, list):
+                paged[key] = item[offset : offset + limit]
+                pagination[key] = page_info(item)
+        if pagination:
+            paged["_pagination"] = pagination
+        return paged
+
+    return value
+
+
+def select_fields(value: Any, fields: Sequence[str]) -> Any:
+    """
+    Keep only ``fields`` of an object, or of each object in a list.
+
+    A paginated list (see ``paginate_value``) keeps its page totals.
+    """
+    keep = set(fields)
+
+    def pick(item: Any) -> Any:
+        if isinstance(item, dict):
+            return {
+                key: item[key] for key in item if key in keep or key == "_pagination"
+            }
+        return item
+
+    if isinstance(value, list):
+        return [pick(item) for item in value]
+    if isinstance(value, dict) and isinstance(value.get("items"), list) and "total_count" in value:
+        return {**value, "items": [pick(item) for item in value["items"]]}
+    return pick(value)
+
+
+def elide_content(
+    value: Any, include_content: bool = True, max_length: Optional[int] = None
+) -> Any:
+    """
+    Replace bulk content in a state tree with its size.
+
+    Args:
+        value: State value to walk
+        include_content: When False, ``content``/``body`` strings are
+            dropped and a ``<key>_size`` entry with their length is added
+        max_length: When set, any longer string is cut to this length and
+            a ``<key>_size`` entry records the full length
+
+    Returns:
+        A copy of ``value`` with content elided
+    """
+    if include_content and max_length is None:
+        return value
+
+    if isinstance(value, list):
+        return [elide_content(item, include_content, max_length) for item in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    result = {}
+    for key, item in value.items():
+        if isinstance(item, str):
+            if not include_content and key in CONTENT_KEYS:
+                result[f"{key}_size"] = len(item)
+                continue
+            if max_length is not None and len(item) > max_length:
+                result[key] = item[:max_length]
+                result[f"{key}_size"] = len(item)
+                continue
+            result[key] = item
+        else:
+            result[key] = elide_content(item, include_content, max_length)
+    return result
+
+
+def project_state(
+    state: Any,
+    path: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    include_content: bool = True,
+    max_content_length: Optional[int] = None,
+) -> Any:
+    """
+    Apply a projection to a module state.
+
+    The steps run in the order path, pagination, fields, content elision,
+    so that each works on as little of the state as possible. With no
+    arguments the state is returned as is.
+
+    Raises:
+        StatePathError: If ``path`` does not exist in the state
+    """
+    value = resolve_path(state, path)
+    if limit is not None:
+        value = paginate_value(value, limit, offset)
+    if fields:
+        value = select_fields(value, fields)
+    return elide_content(value, include_content, max_content_length)
@@ -0,0 +1,198 @@
+"""
+Versioning helpers for module state.
+
+The StateManager numbers every ``set`` of a module's state. The state
+endpoints turn that number into an ``ETag`` so that pollers can send
+``If-None-Match`` and get a 304 when nothing changed, and into deltas:
+the StateManager keeps a short log of JSON patches (RFC 6902) per module,
+so ``?since_version=`` can return only what changed since a version the
+client already has.
+"""
+
+import hashlib
+from typing import Any, Dict, List, Optional
+
+JsonPatch = List[Dict[str, Any]]
+
+
+def _escape_pointer(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape_pointer(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def apply_json_patch(document: Any, patch: JsonPatch) -> Any:
+    """
+    Apply a patch produced by ``make_json_patch`` to a document.
+
+    The document is modified in place where possible; the result must be
+    used, since a patch on the root path replaces the document.
+
+    Args:
+        document: JSON-compatible value to patch
+        patch: Operations to apply, in order
+
+    Returns:
+        The patched document
+    """
+    for op in patch:
+        if op["path"] == "":
+            document = op.get("value")
+            continue
+
+        *parents, last = [_unescape_pointer(t) for t in op["path"].split("/")[1:]]
+        target = document
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+
+        if isinstance(target, list):
+            index = int(last)
+            if op["op"] == "add":
+                target.insert(index, op["value"])
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = op["value"]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return document
+
+
+def make_json_patch(old: Any, new: Any, path: str = "") -> JsonPatch:
+    """
+    Compute a JSON patch that turns ``old`` into ``new``.
+
+    Objects are diffed key by key and lists element by element (removals
+    are emitted from the end so that indexes stay valid); any other change
+    is a ``replace`` of the value.
+
+    Args:
+        old: Previous JSON-compatible value
+        new: Current JSON-compatible value
+        path: JSON pointer of the values within the document
+
+    Returns:
+        List of patch operations, empty if the values are equal
+    """
+    if old == new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: JsonPatch = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape_pointer(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape_pointer(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(make_json_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            ops.extend(make_json_patch(old[index], new[index], f"{path}/{index}"))
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        for index in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+        return ops
+
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def make_state_etag(instance_id: str, module_name: str, version: int, variant: str = "") -> str:
+    """
+    Build the ETag for a version of a module's state.
+
+    Args:
+        instance_id: Identifies the StateManager, so that versions from
+            before a restart never match
+        module_name: Module the state belongs to
+        version: State version
+        variant: Anything else the response body depends on, such as the
+            projection parameters
+
+    Returns:
+        A weak ETag, quoted
+    """
+    tag = f"{instance_id}-{module_name}-{version}"
+    if variant:
+        tag += "-" + hashlib.sha1(variant.encode()).hexdigest()[:12]
+    return f'W/"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    target = opaque(etag)
+    return any(
+        candidate.strip() == "*" or opaque(candidate) == target
+        for candidate in if_none_match.split(",")
+    )
+
+
+def state_delta(state_manager, module_name: str, since_version: int, state: Any) -> Dict[str, Any]:
+    """
+    Build the ``?since_version=`` response for a module.
+
+    When the change log no longer reaches back to ``since_version`` (or
+    the version is from before a restart, or deltas are disabled) the patch
+    replaces the whole document, so clients can always apply what they
+    receive.
+
+    Args:
+        state_manager: StateManager holding the module state
+        module_name: Module to diff
+        since_version: Version the client already has
+        state: Current state, used when deltas are disabled
+
+    Returns:
+        The current version and the patch from ``since_version`` to it
+    """
+    version, patch = state_manager.get_changes_since(module_name, since_version)
+    if patch is None:
+        patch = [{"op": "replace", "path": "", "value": state}]
+    return {
+        "module": module_name,
+        "version": version,
+        "since_version": since_version,
+        "patch": patch,
+    }
+
+
+def summarize_paths(paths: List[str], limit: int = 20) -> List[str]:
+    """
+    Reduce changed JSON pointers to a short, sorted list for notifications.
+
+    When there are more than ``limit`` paths they are collapsed to their
+    top-level members, and failing that to the whole document (``""``).
+
+    Args:
+        paths: JSON pointers of changed values
+        limit: Maximum number of paths to report
+
+    Returns:
+        Sorted, de-duplicated paths
+    """
+    unique = set(paths)
+    if "" in unique:
+        return [""]
+    if len(unique) > limit:
+        unique = {"/" + path.split("/")[1] for path in unique}
+    if len(unique) > limit:
+        return [""]
+    return sorted(unique)
@@ -0,0 +1,231 @@
+"""
+Refresh token revocation and compaction.
+
+Every login and refresh inserts a ``RefreshToken`` row and a refresh marks
+the previous one revoked, so the table only ever grows. Two pieces keep it
+in check:
+
+- ``RevocationSet`` keeps the ids of revoked, not yet expired refresh
+  tokens in memory. It is loaded at startup and updated by the endpoints
+  that revoke tokens, so replaying a revoked token is rejected without a
+  database read.
+- ``RefreshTokenCompactor`` deletes expired and revoked rows in small
+  batches on a background thread.
+
+The set is an optimisation, not the authority: a refresh still revokes the
+presented token with a conditional ``UPDATE``, which matches no row if the
+token was revoked by another worker or has already been compacted away.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .config import Config
+from .models import RefreshToken
+from .security import REFRESH_TOKEN_EXPIRE_DAYS
+
+
+class RevocationSet:
+    """
+    Thread-safe set of revoked refresh token ids.
+
+    Each id is kept until the token would have expired anyway, after which
+    the signature check rejects it and the entry can be pruned.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def add(self, token_id: str, expires_at: Optional[datetime] = None) -> None:
+        """
+        Mark a token as revoked.
+
+        Args:
+            token_id: The token's ``jti``
+            expires_at: When the token expires (naive UTC); defaults to the
+                longest lifetime a refresh token can have
+        """
+        if expires_at is None:
+            expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        with self._lock:
+            self._tokens[token_id] = expires_at
+
+    def add_many(self, tokens: Iterable[Tuple[str, datetime]]) -> None:
+        """Mark several tokens, given as (token id, expiry) pairs, as revoked."""
+        with self._lock:
+            for token_id, expires_at in tokens:
+                self._tokens[token_id] = expires_at
+
+    def is_revoked(self, token_id: str) -> bool:
+        """Whether a token id is known to be revoked."""
+        with self._lock:
+            return token_id in self._tokens
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """
+        Forget tokens that have expired.
+
+        Returns:
+            The number of entries removed
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            expired = [token for token, expires in self._tokens.items() if expires <= now]
+            for token in expired:
+                del self._tokens[token]
+        return len(expired)
+
+    def load(self, engine: Engine) -> int:
+        """
+        Replace the set with the revoked, unexpired tokens in the database.
+
+        Returns:
+            The number of revoked tokens loaded
+        """
+        with Session(engine) as session:
+            rows = session.exec(
+                select(RefreshToken.token, RefreshToken.expires_at)
+                .where(RefreshToken.is_revoked.is_(True))
+                .where(RefreshToken.expires_at > datetime.utcnow())
+            ).all()
+        with self._lock:
+            self._tokens = {token: expires_at for token, expires_at in rows}
+            self.loaded = True
+        return len(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self.loaded = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tokens)
+
+
+class RefreshTokenCompactor:
+    """
+    Deletes expired and revoked refresh tokens, either on demand with
+    ``run_once`` or periodically on a background thread.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        revocations: Optional[RevocationSet] = None,
+        batch_size: Optional[int] = None,
+        interval: Optional[float] = None,
+        batch_pause: float = 0.01,
+    ):
+        """
+        Args:
+            engine: Database engine holding the refresh tokens
+            revocations: Revocation set to prune after each run; defaults
+                to the shared set
+            batch_size: Rows deleted per transaction; defaults to the
+                configured size
+            interval: Seconds between background runs; defaults to the
+                configured interval
+            batch_pause: Seconds to sleep between batches, letting other
+                writers in
+        """
+        config = Config.get_refresh_token_compaction_config()
+        self.engine = engine
+        self.revocations = revocations if revocations is not None else revocation_set
+        self.batch_size = batch_size or config["batch_size"]
+        self.interval = interval or config["interval"]
+        self.batch_pause = batch_pause
+        if self.batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Delete expired and revoked refresh tokens once.
+
+        Args:
+            now: Reference time (naive UTC); defaults to the current time
+
+        Returns:
+            Counts of rows deleted, batches run and revocation set entries
+            pruned
+        """
+        now = now or datetime.utcnow()
+        stats = {"deleted": 0, "batches": 0, "pruned": 0}
+
+        with self._run_lock:
+            while not self._stop_event.is_set():
+                with Session(self.engine) as session:
+                    ids = session.exec(
+                        select(RefreshToken.id)
+                        .where(
+                            or_(
+                                RefreshToken.expires_at <= now,
+                                RefreshToken.is_revoked.is_(True),
+                            )
+                        )
+                        .order_by(RefreshToken.id)
+                        .limit(self.batch_size)
+                    ).all()
+                    if not ids:
+                        break
+                    session.exec(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+                    session.commit()
+
+                stats["deleted"] += len(ids)
+                stats["batches"] += 1
+                if len(ids) < self.batch_size:
+                    break
+                if self.batch_pause:
+                    time.sleep(self.batch_pause)
+
+            stats["pruned"] = self.revocations.prune(now)
+
+        if stats["deleted"]:
+            logging.info(f"Refresh token compaction completed: {stats}")
+        return stats
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Run compaction every ``interval`` seconds on a background thread."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="refresh-token-compactor", daemon=True
+        )
+        self._thread.start()
+        logging.info("Refresh token compaction started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background thread, interrupting a run between batches."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Refresh token compaction failed: {e}")
+            self._stop_event.wait(self.interval)
+
+
+# Shared revocation set used by the auth endpoints
+revocation_set = RevocationSet()
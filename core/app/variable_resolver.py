@@ -7,7 +7,7 @@ replacing {{variable_name}} tokens with actual values from pack defaults and use
 
 import re
 import logging
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Set, Tuple, Union
 from dataclasses import dataclass
 
 from .content_pack_variables import ContentPackVariableManager
@@ -24,6 +24,69 @@ class VariableToken:
     end_pos: int  # Ending position in the original string
 
 
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    A string pre-split into literal and variable segments.
+
+    ``parts`` alternates literal text and variable names, always starting and
+    ending with a (possibly empty) literal: ``"Hi {{name}}!"`` compiles to
+    ``("Hi ", "name", "!")``.
+    """
+    parts: Tuple[str, ...]
+
+    @property
+    def variables(self) -> Tuple[str, ...]:
+        """Variable names referenced by the template, in order of appearance."""
+        return self.parts[1::2]
+
+    @property
+    def is_static(self) -> bool:
+        """True if the template contains no variable tokens."""
+        return len(self.parts) == 1
+
+    def render(
+        self,
+        values: Dict[str, str],
+        strict: bool = True,
+        missing: Optional[Set[str]] = None,
+    ) -> str:
+        """
+        Render the template with a dictionary of resolved variable values.
+
+        Args:
+            values: Mapping of variable names to their resolved values
+            strict: If True, raise error for unresolved variables. If False, leave tokens unchanged.
+            missing: Optional set that collects the names of unresolved variables
+
+        Returns:
+            Rendered string
+
+        Raises:
+            VariableResolutionError: If strict=True and a variable has no value
+        """
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0]
+
+        output = list(parts)
+        for i in range(1, len(output), 2):
+            name = output[i]
+            value = values.get(name)
+            if value is not None:
+                output[i] = value
+            elif strict:
+                raise VariableResolutionError(
+                    f"Variable '{name}' not found in user overrides or pack defaults"
+                )
+            else:
+                output[i] = "{{" + name + "}}"
+                if missing is not None:
+                    missing.add(name)
+
+        return "".join(output)
+
+
 class VariableParseError(Exception):
     """
     Exception raised when variable token parsing fails.
@@ -47,8 +110,14 @@ class VariableResolver:
     1. User overrides (from database)
     2. Pack defaults (from content pack JSON)
     3. Error if not found
+
+    Strings are compiled once into CompiledTemplate objects and cached per
+    content pack, so re-resolving a pack only renders the cached templates.
     """
 
+    # Maximum number of compiled templates kept per content pack
+    MAX_CACHED_TEMPLATES_PER_PACK = 10000
+
     # Regex pattern for variable tokens: {{variable_name}}
     # Variable names must start with letter or underscore, followed by letters, numbers, or underscores
     VARIABLE_TOKEN_PATTERN = re.compile(r'\{\{([a-zA-Z_][a-zA-Z0-9_]*)\}\}')
@@ -62,6 +131,103 @@ class VariableResolver:
         """
         self.variable_manager = variable_manager
         self.logger = logging.getLogger(__name__)
+        self._template_cache: Dict[str, Dict[str, CompiledTemplate]] = {}
+
+    def compile_template(
+        self, text: str, content_pack_name: Optional[str] = None
+    ) -> CompiledTemplate:
+        """
+        Compile a string into literal and variable segments.
+
+        Strings without ``{{`` are returned as static templates without
+        running the token regex. Compiled templates are cached per content
+        pack when a pack name is given.
+
+        Args:
+            text: Text to compile
+            content_pack_name: Name of the content pack owning the text (for caching)
+
+        Returns:
+            CompiledTemplate for the text
+        """
+        if "{{" not in text:
+            return CompiledTemplate((text,))
+
+        pack_cache = None
+        if content_pack_name is not None:
+            pack_cache = self._template_cache.setdefault(content_pack_name, {})
+            template = pack_cache.get(text)
+            if template is not None:
+                return template
+
+        try:
+            template = CompiledTemplate(
+                tuple(self.VARIABLE_TOKEN_PATTERN.split(text))
+            )
+        except Exception as e:
+            raise VariableParseError(f"Failed to parse variable tokens: {e}")
+
+        if pack_cache is not None:
+            if len(pack_cache) >= self.MAX_CACHED_TEMPLATES_PER_PACK:
+                pack_cache.clear()
+            pack_cache[text] = template
+
+        return template
+
+    def clear_template_cache(self, content_pack_name: Optional[str] = None) -> None:
+        """
+        Drop compiled templates for one content pack, or for all packs.
+
+        Args:
+            content_pack_name: Pack whose templates to drop (all packs if None)
+        """
+        if content_pack_name is None:
+            self._template_cache.clear()
+        else:
+            self._template_cache.pop(content_pack_name, None)
+
+    def build_variable_context(
+        self,
+        pack_defaults: Dict[str, str],
+        content_pack_name: str,
+        user_id: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """
+        Resolve every variable for a (pack, user) pair into a single dictionary.
+
+        Pack defaults are overlaid with all of the user's overrides, which are
+        loaded with one bulk lookup rather than one query per variable.
+
+        Args:
+            pack_defaults: Default values from the content pack
+            content_pack_name: Name of the content pack
+            user_id: User ID for checking overrides
+
+        Returns:
+            Dictionary mapping variable names to their resolved string values
+
+        Raises:
+            VariableResolutionError: If user overrides cannot be loaded
+        """
+        context = {
+            name: value if isinstance(value, str) else str(value)
+            for name, value in (pack_defaults or {}).items()
+            if value is not None
+        }
+
+        if user_id is not None and self.variable_manager is not None:
+            try:
+                overrides = self.variable_manager.get_pack_variables(
+                    content_pack_name, user_id
+                )
+            except Exception as e:
+                raise VariableResolutionError(
+                    f"Failed to load variable overrides for pack '{content_pack_name}': {e}"
+                )
+            if isinstance(overrides, dict):
+                context.update(overrides)
+
+        return context
 
     def parse_tokens(self, text: str) -> List[VariableToken]:
         """
@@ -184,42 +350,32 @@ class VariableResolver:
         Raises:
             VariableResolutionError: If strict=True and any variable cannot be resolved
         """
-        if not isinstance(text, str):
+        if not isinstance(text, str) or "{{" not in text:
             return text
 
         try:
-            # Parse tokens
-            tokens = self.parse_tokens(text)
-            
-            if not tokens:
+            template = self.compile_template(text, content_pack_name)
+            if template.is_static:
                 return text  # No tokens to resolve
 
-            # Sort tokens by position (reverse order for replacement)
-            tokens.sort(key=lambda t: t.start_pos, reverse=True)
-
-            # Replace tokens from end to start to maintain positions
-            result = text
-            unresolved_variables = []
-
-            for token in tokens:
+            # Look up each distinct variable once, then render in a single join
+            values = {}
+            for variable_name in set(template.variables):
                 try:
-                    value = self.get_variable_value(
-                        token.variable_name, pack_defaults, content_pack_name, user_id
+                    values[variable_name] = self.get_variable_value(
+                        variable_name, pack_defaults, content_pack_name, user_id
                     )
-                    # Replace the token with its value
-                    result = result[:token.start_pos] + value + result[token.end_pos:]
-                    
                 except VariableResolutionError as e:
                     if strict:
                         raise
-                    else:
-                        # In non-strict mode, keep the original token
-                        unresolved_variables.append(token.variable_name)
-                        self.logger.warning(f"Could not resolve variable '{token.variable_name}': {e}")
+                    self.logger.warning(f"Could not resolve variable '{variable_name}': {e}")
+
+            unresolved_variables: Set[str] = set()
+            result = template.render(values, strict, unresolved_variables)
 
-            if unresolved_variables and not strict:
+            if unresolved_variables:
                 self.logger.info(
-                    f"Left {len(unresolved_variables)} variables unresolved: {unresolved_variables}"
+                    f"Left {len(unresolved_variables)} variables unresolved: {sorted(unresolved_variables)}"
                 )
 
             return result
@@ -242,6 +398,9 @@ class VariableResolver:
         """
         Recursively resolve variable tokens in a data structure (dict, list, or string).
 
+        Variable values are resolved once for the (pack, user) pair and every
+        string is rendered from its cached compiled template.
+
         Args:
             data: Data structure to process
             pack_defaults: Default values from the content pack
@@ -256,33 +415,62 @@ class VariableResolver:
             VariableResolutionError: If strict=True and any variable cannot be resolved
         """
         try:
-            if isinstance(data, str):
-                return self.resolve_string(data, pack_defaults, content_pack_name, user_id, strict)
-            
-            elif isinstance(data, dict):
-                resolved_dict = {}
-                for key, value in data.items():
-                    # Resolve both keys and values
-                    resolved_key = self.resolve_string(key, pack_defaults, content_pack_name, user_id, strict)
-                    resolved_value = self.resolve_data_structure(value, pack_defaults, content_pack_name, user_id, strict)
-                    resolved_dict[resolved_key] = resolved_value
-                return resolved_dict
-            
-            elif isinstance(data, list):
-                return [
-                    self.resolve_data_structure(item, pack_defaults, content_pack_name, user_id, strict)
-                    for item in data
-                ]
-            
-            else:
-                # For other types (int, float, bool, None), return as-is
-                return data
+            context = self.build_variable_context(pack_defaults, content_pack_name, user_id)
+            unresolved_variables: Set[str] = set()
+            resolved = self._render_data_structure(
+                data, context, content_pack_name, strict, unresolved_variables
+            )
+
+            if unresolved_variables:
+                self.logger.warning(
+                    f"Left {len(unresolved_variables)} variables unresolved: {sorted(unresolved_variables)}"
+                )
+
+            return resolved
 
         except (VariableParseError, VariableResolutionError):
             raise
         except Exception as e:
             raise VariableResolutionError(f"Failed to resolve data structure: {e}")
 
+    def _render_data_structure(
+        self,
+        data: Any,
+        context: Dict[str, str],
+        content_pack_name: str,
+        strict: bool,
+        missing: Set[str],
+    ) -> Any:
+        """Render all strings in a data structure against a resolved context."""
+        if isinstance(data, str):
+            if "{{" not in data:
+                return data
+            return self.compile_template(data, content_pack_name).render(
+                context, strict, missing
+            )
+
+        elif isinstance(data, dict):
+            resolved_dict = {}
+            for key, value in data.items():
+                # Resolve both keys and values
+                resolved_key = self._render_data_structure(
+                    key, context, content_pack_name, strict, missing
+                )
+                resolved_dict[resolved_key] = self._render_data_structure(
+                    value, context, content_pack_name, strict, missing
+                )
+            return resolved_dict
+
+        elif isinstance(data, list):
+            return [
+                self._render_data_structure(item, context, content_pack_name, strict, missing)
+                for item in data
+            ]
+
+        else:
+            # For other types (int, float, bool, None), return as-is
+            return data
+
     def get_variables_in_text(self, text: str) -> List[str]:
         """
         Get a list of all variable names used in a text string.
@@ -293,12 +481,11 @@ class VariableResolver:
         Returns:
             List of unique variable names found in the text
         """
-        if not isinstance(text, str):
+        if not isinstance(text, str) or "{{" not in text:
             return []
 
         try:
-            tokens = self.parse_tokens(text)
-            return list(set(token.variable_name for token in tokens))
+            return list(set(self.compile_template(text).variables))
         except VariableParseError:
             return []
 
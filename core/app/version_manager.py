@@ -183,6 +183,50 @@ v2.add_new_feature("Support for header-based versioning")
 version_manager.register_version(v2)
 
 
+def resolve_request_version(path: str, header_version: Optional[str] = None) -> str:
+    """
+    Determine the API version for a request.
+
+    Order of precedence:
+    1. URL path version (e.g., /api/v2/...)
+    2. X-API-Version header
+    3. Default to current version
+    """
+    # Check if URL contains version (e.g., /api/v2/...)
+    for part in path.split("/"):
+        if part.startswith("v") and len(part) > 1 and part[1:].isdigit():
+            return part
+
+    return header_version or version_manager.get_current_version()
+
+
+def get_version_headers(version: str) -> Dict[str, str]:
+    """
+    Build the version headers for a response, including deprecation
+    warnings when the version is deprecated.
+    """
+    headers = {"X-API-Version": version}
+
+    # Add deprecation warning if applicable
+    if version_manager.is_version_deprecated(version):
+        api_version = version_manager.get_version(version)
+        if api_version and api_version.sunset_date:
+            headers["X-API-Deprecated"] = "true"
+            headers["X-API-Sunset-Date"] = api_version.sunset_date.isoformat()
+            headers["X-API-Current-Version"] = version_manager.get_current_version()
+
+    return headers
+
+
+def unsupported_version_response(version: str) -> Response:
+    """Response returned for requests to a sunset API version."""
+    return Response(
+        content=f"API version {version} is no longer supported. Please upgrade to a newer version.",
+        status_code=410,  # Gone
+        media_type="text/plain",
+    )
+
+
 class VersionMiddleware(BaseHTTPMiddleware):
     """
     Middleware to handle API versioning via headers and add version headers to responses.
@@ -194,29 +238,14 @@ class VersionMiddleware(BaseHTTPMiddleware):
         if not request.url.path.startswith("/api"):
             return await call_next(request)
 
-        # Extract version from URL path or header
-        path_parts = request.url.path.split("/")
-        url_version = None
-
-        # Check if URL contains version (e.g., /api/v2/...)
-        for part in path_parts:
-            if part.startswith("v") and len(part) > 1 and part[1:].isdigit():
-                url_version = part
-                break
-
-        # Get version from header if present
-        header_version = request.headers.get("X-API-Version")
-
         # Determine which version to use
-        version = url_version or header_version or version_manager.get_current_version()
+        version = resolve_request_version(
+            request.url.path, request.headers.get("X-API-Version")
+        )
 
         # Check if version is supported
         if not version_manager.is_version_supported(version):
-            return Response(
-                content=f"API version {version} is no longer supported. Please upgrade to a newer version.",
-                status_code=410,  # Gone
-                media_type="text/plain",
-            )
+            return unsupported_version_response(version)
 
         # Add version to request state for handlers to use
         request.state.api_version = version
@@ -225,19 +254,7 @@ class VersionMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
 
         # Add version headers to response
-        response.headers["X-API-Version"] = version
-
-        # Add deprecation warning if applicable
-        if version_manager.is_version_deprecated(version):
-            api_version = version_manager.get_version(version)
-            if api_version and api_version.sunset_date:
-                response.headers["X-API-Deprecated"] = "true"
-                response.headers["X-API-Sunset-Date"] = (
-                    api_version.sunset_date.isoformat()
-                )
-                response.headers["X-API-Current-Version"] = (
-                    version_manager.get_current_version()
-                )
+        response.headers.update(get_version_headers(version))
 
         return response
 
@@ -2,24 +2,88 @@
 WebSocket connection manager for real-time updates.
 """
 
+import asyncio
 import logging
 import json
-from typing import Dict, List, Any, Set
-from fastapi import WebSocket, WebSocketDisconnect
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set
+from fastapi import WebSocket, WebSocketDisconnect, status
 from datetime import datetime
 
+from .config import Config
+from .state_versioning import summarize_paths
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+# Channels carrying change notifications for one module's state
+STATE_CHANNEL_PREFIX = "state:"
+
+# Window in seconds over which state change notifications are coalesced
+STATE_NOTIFY_WINDOW = 0.1
+
+
+class _Subscriber:
+    """A connected client with its bounded send queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.depth: Dict[str, int] = defaultdict(int)
+        self.writer: Optional[asyncio.Task] = None
+        self.closing = False
+
 
 class ConnectionManager:
     """
     Manages WebSocket connections and broadcasts messages to connected clients.
+
+    Broadcasting never waits on a client: each message is serialized once and
+    the same payload is put on every subscriber's bounded send queue, which a
+    per-connection writer task drains. When a queue is full the slow-consumer
+    policy decides what happens:
+
+    - ``drop_oldest``: discard the oldest queued message to make room
+    - ``drop_newest``: discard the new message
+    - ``disconnect``: close the slow client's connection
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        slow_consumer_policy: Optional[str] = None,
+    ):
+        """
+        Args:
+            queue_size: Messages buffered per connection; defaults to the
+                configured size
+            slow_consumer_policy: What to do when a client's queue is full;
+                defaults to the configured policy
+        """
+        self.queue_size = queue_size or Config.get_websocket_send_queue_size()
+        self.slow_consumer_policy = (
+            slow_consumer_policy or Config.get_websocket_slow_consumer_policy()
+        )
+        if self.slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"slow_consumer_policy must be one of {SLOW_CONSUMER_POLICIES}"
+            )
+
         # Store active connections by channel
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.client_info: Dict[WebSocket, Dict[str, Any]] = {}
+        self._subscribers: Dict[WebSocket, _Subscriber] = {}
+        self._channel_stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"sent": 0, "dropped": 0, "disconnected": 0}
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         logging.info("WebSocket connection manager initialized")
 
+    @staticmethod
+    def serialize(message: Dict[str, Any]) -> str:
+        """Serialize a message the way WebSocket.send_json() would."""
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
     async def connect(self, websocket: WebSocket, channel: str = "default"):
         """
         Connect a new WebSocket client to a specific channel.
@@ -29,6 +93,7 @@ class ConnectionManager:
             channel: The channel to connect to (default: "default")
         """
         await websocket.accept()
+        self._loop = asyncio.get_running_loop()
 
         # Initialize the channel if it doesn't exist
         if channel not in self.active_connections:
@@ -42,6 +107,7 @@ class ConnectionManager:
         connection_time = datetime.now().isoformat()
         self.client_info[websocket] = {
             "channel": channel,
+            "channels": {channel},
             "client_host": client_host,
             "connected_at": connection_time,
         }
@@ -57,6 +123,23 @@ class ConnectionManager:
             }
         )
 
+        subscriber = _Subscriber(websocket, self.queue_size)
+        subscriber.writer = asyncio.create_task(self._write(subscriber))
+        self._subscribers[websocket] = subscriber
+
+    def subscribe(self, websocket: WebSocket, channel: str):
+        """
+        Add a connected client to another channel.
+
+        Args:
+            websocket: A WebSocket connected with connect()
+            channel: The additional channel to receive broadcasts from
+        """
+        if websocket not in self.client_info:
+            return
+        self.active_connections.setdefault(channel, set()).add(websocket)
+        self.client_info[websocket]["channels"].add(channel)
+
     def disconnect(self, websocket: WebSocket):
         """
         Disconnect a WebSocket client.
@@ -64,28 +147,97 @@ class ConnectionManager:
         Args:
             websocket: The WebSocket connection to disconnect
         """
-        # Find which channel this connection belongs to
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber is not None and subscriber.writer is not None:
+            try:
+                current = asyncio.current_task()
+            except RuntimeError:
+                current = None
+            if subscriber.writer is not current:
+                subscriber.writer.cancel()
+
+        # Find which channels this connection belongs to
         if websocket in self.client_info:
             channel = self.client_info[websocket]["channel"]
             client_host = self.client_info[websocket]["client_host"]
 
-            # Remove from the channel
-            if channel in self.active_connections:
-                self.active_connections[channel].discard(websocket)
+            # Remove from the channels
+            for subscribed in self.client_info[websocket]["channels"]:
+                if subscribed in self.active_connections:
+                    self.active_connections[subscribed].discard(websocket)
 
-                # If the channel is empty, remove it
-                if not self.active_connections[channel]:
-                    del self.active_connections[channel]
+                    # If the channel is empty, remove it
+                    if not self.active_connections[subscribed]:
+                        del self.active_connections[subscribed]
 
             # Remove client info
             del self.client_info[websocket]
 
             logging.info(f"Client disconnected from channel '{channel}': {client_host}")
 
+    async def _write(self, subscriber: _Subscriber):
+        """Drain a subscriber's send queue onto its socket."""
+        websocket = subscriber.websocket
+        try:
+            while True:
+                channel, payload = await subscriber.queue.get()
+                subscriber.depth[channel] -= 1
+                await websocket.send_text(payload)
+                self._channel_stats[channel]["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Error sending to WebSocket client: {e}")
+            self.disconnect(websocket)
+
+    def _offer(self, subscriber: _Subscriber, channel: str, payload: str):
+        """Queue a payload for one subscriber, applying the slow-consumer policy."""
+        if subscriber.closing:
+            return
+        stats = self._channel_stats[channel]
+
+        if subscriber.queue.full():
+            if self.slow_consumer_policy == "drop_newest":
+                stats["dropped"] += 1
+                return
+            if self.slow_consumer_policy == "disconnect":
+                stats["disconnected"] += 1
+                subscriber.closing = True
+                logging.warning(
+                    f"Disconnecting slow WebSocket client on channel '{channel}'"
+                )
+                asyncio.ensure_future(self._close_slow(subscriber))
+                return
+            dropped_channel, _ = subscriber.queue.get_nowait()
+            subscriber.depth[dropped_channel] -= 1
+            self._channel_stats[dropped_channel]["dropped"] += 1
+
+        subscriber.queue.put_nowait((channel, payload))
+        subscriber.depth[channel] += 1
+
+    async def _close_slow(self, subscriber: _Subscriber):
+        websocket = subscriber.websocket
+        self.disconnect(websocket)
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception as e:
+            logging.debug(f"Error closing slow WebSocket client: {e}")
+
+    def _enqueue(self, channel: str, payload: str) -> int:
+        websockets = list(self.active_connections.get(channel, ()))
+        for websocket in websockets:
+            subscriber = self._subscribers.get(websocket)
+            if subscriber is not None:
+                self._offer(subscriber, channel, payload)
+        return len(websockets)
+
     async def broadcast(self, message: Dict[str, Any], channel: str = "default"):
         """
         Broadcast a message to all connected clients in a channel.
 
+        The message is queued for each client and this returns without
+        waiting for any of them to receive it.
+
         Args:
             message: The message to broadcast
             channel: The channel to broadcast to (default: "default")
@@ -94,22 +246,38 @@ class ConnectionManager:
             logging.debug(f"No clients in channel '{channel}' to broadcast to")
             return
 
-        disconnected_websockets = set()
+        count = self._enqueue(channel, self.serialize(message))
+        logging.debug(f"Broadcast message to {count} clients in channel '{channel}'")
 
-        for websocket in self.active_connections[channel]:
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logging.error(f"Error broadcasting to client: {e}")
-                disconnected_websockets.add(websocket)
+    def publish(self, message: Dict[str, Any], channel: str = "default"):
+        """
+        Broadcast a message from synchronous code on any thread.
 
-        # Clean up any disconnected websockets
-        for websocket in disconnected_websockets:
-            self.disconnect(websocket)
+        Nothing is scheduled when the channel has no clients. Off the event
+        loop thread the message is handed to the loop; no task is created
+        per message.
 
-        logging.debug(
-            f"Broadcast message to {len(self.active_connections[channel])} clients in channel '{channel}'"
-        )
+        Args:
+            message: The message to broadcast
+            channel: The channel to broadcast to (default: "default")
+        """
+        loop = self._loop
+        if loop is None or channel not in self.active_connections:
+            return
+
+        payload = self.serialize(message)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._enqueue(channel, payload)
+        elif not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._enqueue, channel, payload)
+            except RuntimeError:
+                logging.debug("Event loop closed, dropping WebSocket message")
 
     async def send_personal_message(
         self, message: Dict[str, Any], websocket: WebSocket
@@ -121,6 +289,10 @@ class ConnectionManager:
             message: The message to send
             websocket: The WebSocket connection to send to
         """
+        subscriber = self._subscribers.get(websocket)
+        if subscriber is not None:
+            self._offer(subscriber, "personal", self.serialize(message))
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
@@ -143,13 +315,185 @@ class ConnectionManager:
 
     def get_total_connections(self) -> int:
         """
-        Get the total number of connections across all channels.
+        Get the total number of connections.
 
         Returns:
             The total number of connections
         """
-        return sum(len(connections) for connections in self.active_connections.values())
+        return len(self.client_info)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get broadcast metrics per channel.
+
+        Returns:
+            The queue settings and, for every channel, its connection count,
+            queued messages, deepest client queue, and sent, dropped and
+            disconnected counts
+        """
+        channels: Dict[str, Dict[str, Any]] = {}
+        for channel in set(self.active_connections) | set(self._channel_stats):
+            depths = [
+                subscriber.depth.get(channel, 0)
+                for websocket in self.active_connections.get(channel, ())
+                for subscriber in [self._subscribers.get(websocket)]
+                if subscriber is not None
+            ]
+            channels[channel] = {
+                "connections": self.get_channel_count(channel),
+                "queued": sum(depths),
+                "max_queue_depth": max(depths, default=0),
+                **self._channel_stats[channel],
+            }
+        return {
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "total_connections": self.get_total_connections(),
+            "channels": channels,
+        }
+
+
+class StateChangeNotifier:
+    """
+    Pushes module state change notifications to WebSocket subscribers.
+
+    StateManager listeners run on whichever thread changed the state, so
+    notifications are handed to the event loop. Changes to a module within
+    one window are coalesced into a single message carrying the latest
+    version and the union of the changed paths, which is broadcast on the
+    module's ``state:<module>`` channel.
+
+    When the state is shared with other worker processes, changes they make
+    are picked up by polling the StateManager once per window.
+    """
+
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        window: float = STATE_NOTIFY_WINDOW,
+    ):
+        self.connection_manager = connection_manager
+        self.window = window
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._state_manager = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_scheduled = False
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def channel_for(module_name: str) -> str:
+        """Return the channel carrying a module's state changes."""
+        return f"{STATE_CHANNEL_PREFIX}{module_name}"
+
+    def start(self, state_manager, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Start forwarding changes from a StateManager.
+
+        Args:
+            state_manager: StateManager to listen to
+            loop: Event loop to broadcast on; defaults to the running loop
+        """
+        self._loop = loop or asyncio.get_running_loop()
+        self._state_manager = state_manager
+        state_manager.add_listener(self.notify)
+        if state_manager.is_shared:
+            self._poll_task = self._loop.create_task(self._poll_shared_state())
+
+    def stop(self):
+        """Stop forwarding changes and drop pending notifications."""
+        if self._loop is None:
+            return
+        self._state_manager.remove_listener(self.notify)
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self._loop = None
+        with self._lock:
+            self._pending.clear()
+            self._flush_scheduled = False
+
+    def notify(self, change: Dict[str, Any]):
+        """
+        Queue a change notification; safe to call from any thread.
+
+        Args:
+            change: Notification from StateManager with module, version and
+                paths
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        module_name = change["module"]
+        # Nobody is listening for this module, skip the work entirely
+        if self.channel_for(module_name) not in self.connection_manager.active_connections:
+            return
+
+        with self._lock:
+            pending = self._pending.get(module_name)
+            if pending is None:
+                self._pending[module_name] = {
+                    "version": change["version"],
+                    "paths": list(change["paths"]),
+                    "changes": 1,
+                }
+            else:
+                pending["version"] = max(pending["version"], change["version"])
+                pending["paths"] = summarize_paths(pending["paths"] + change["paths"])
+                pending["changes"] += 1
+
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        try:
+            loop.call_soon_threadsafe(self._schedule_flush)
+        except RuntimeError:
+            # The loop has been closed (shutdown)
+            with self._lock:
+                self._flush_scheduled = False
+
+    async def _poll_shared_state(self):
+        while True:
+            await asyncio.sleep(self.window)
+            # Only worth reloading state if someone here is subscribed
+            if not any(
+                channel.startswith(STATE_CHANNEL_PREFIX)
+                for channel in self.connection_manager.active_connections
+            ):
+                continue
+            try:
+                # Reloading calls notify() for every key changed elsewhere
+                await asyncio.to_thread(self._state_manager.sync)
+            except Exception as e:
+                logging.error(f"Failed to poll shared module state: {e}")
+
+    def _schedule_flush(self):
+        loop = self._loop
+        if loop is not None:
+            loop.call_later(self.window, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self):
+        """Broadcast the pending notifications, one message per module."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+
+        for module_name, change in pending.items():
+            await self.connection_manager.broadcast(
+                {
+                    "type": "state_changed",
+                    "module": module_name,
+                    "version": change["version"],
+                    "paths": summarize_paths(change["paths"]),
+                    "changes": change["changes"],
+                },
+                channel=self.channel_for(module_name),
+            )
 
 
 # Create a global instance of the connection manager
 manager = ConnectionManager()
+
+# Forwards StateManager changes to the state:<module> channels
+state_change_notifier = StateChangeNotifier(manager)
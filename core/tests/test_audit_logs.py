@@ -0,0 +1,199 @@
+"""
+Tests for the audit log endpoints.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.audit_log import (
+    build_audit_log_query,
+    decode_cursor,
+    encode_cursor,
+    export_audit_logs,
+    fetch_page,
+    iter_audit_logs,
+)
+from app.auth import get_audit_log_stats, get_audit_logs
+from app.models import AuditLog
+
+
+def add_logs(session, entries):
+    for username, action, status, age_hours in entries:
+        session.add(
+            AuditLog(
+                username=username,
+                action=action,
+                status=status,
+                details={"payload": "x" * 100},
+                timestamp=datetime.utcnow() - timedelta(hours=age_hours),
+            )
+        )
+    session.commit()
+
+
+def make_request():
+    request = Mock()
+    request.client.host = "127.0.0.1"
+    request.headers = {"user-agent": "pytest"}
+    return request
+
+
+class TestAuditLogStats:
+    def test_aggregates_in_database(self, session):
+        session.exec(AuditLog.__table__.delete())
+        add_logs(
+            session,
+            [
+                ("alice", "login", "success", 1),
+                ("alice", "login", "failure", 2),
+                ("alice", "execute_tool", "success", 3),
+                ("bob", "login", "success", 30),
+                ("bob", "execute_tool", "error", 48),
+                ("carol", "logout", "success", 72),
+            ],
+        )
+        current_user = Mock(id=1, username="admin")
+
+        stats = get_audit_log_stats(current_user, session, make_request())
+
+        assert stats["total_logs"] == 6
+        assert stats["status_breakdown"] == {"success": 4, "failure": 1, "error": 1}
+        assert stats["top_actions"][0] == {"action": "login", "count": 3}
+        assert stats["top_actions"][1] == {"action": "execute_tool", "count": 2}
+        assert [u["username"] for u in stats["top_users"]] == ["alice", "bob", "carol"]
+        assert stats["recent_activity_24h"] == 3
+
+    def test_empty_table(self, session):
+        session.exec(AuditLog.__table__.delete())
+        session.commit()
+
+        stats = get_audit_log_stats(Mock(id=1, username="admin"), session, make_request())
+
+        assert stats["total_logs"] == 0
+        assert stats["status_breakdown"] == {"success": 0, "failure": 0, "error": 0}
+        assert stats["top_actions"] == []
+        assert stats["recent_activity_24h"] == 0
+
+
+@pytest.fixture
+def populated(session):
+    session.exec(AuditLog.__table__.delete())
+    same_time = datetime.utcnow() - timedelta(hours=1)
+    for i in range(25):
+        session.add(
+            AuditLog(
+                username="alice" if i % 2 else "alfred",
+                action="login" if i % 3 else "login_failed",
+                status="success",
+                details={"i": i},
+                # Several rows share a timestamp to exercise the id tiebreak
+                timestamp=same_time - timedelta(minutes=i // 5),
+            )
+        )
+    session.add(AuditLog(username="bob", action="relogin", status="failure"))
+    session.commit()
+    return session
+
+
+class TestKeysetPagination:
+    def test_cursor_round_trip(self):
+        timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    def test_pages_cover_all_rows_once(self, populated):
+        query = build_audit_log_query()
+        seen, cursor = [], None
+
+        while True:
+            rows, cursor = fetch_page(populated, query, 7, cursor)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+
+        assert len(seen) == 26
+        assert len(set(seen)) == 26
+        ordered = populated.exec(query).all()
+        assert seen == [row.id for row in ordered]
+
+    def test_iter_audit_logs_batches(self, populated):
+        rows = list(iter_audit_logs(populated, build_audit_log_query(), batch_size=4))
+        assert len(rows) == 26
+
+    def test_endpoint_sets_next_cursor(self, populated):
+        response = Response()
+        page = get_audit_logs(
+            Mock(id=1, username="admin"),
+            populated,
+            Mock(client=Mock(host="127.0.0.1"), headers={}),
+            response,
+            limit=10,
+            match="contains",
+            cursor=None,
+        )
+
+        assert len(page) == 10
+        assert "X-Next-Cursor" in response.headers
+
+    def test_invalid_cursor_is_rejected(self, populated):
+        with pytest.raises(HTTPException) as excinfo:
+            get_audit_logs(
+                Mock(id=1, username="admin"),
+                populated,
+                Mock(client=Mock(host="127.0.0.1"), headers={}),
+                Response(),
+                match="contains",
+                cursor="not-a-cursor",
+            )
+        assert excinfo.value.status_code == 400
+
+
+class TestFilterModes:
+    def count(self, session, **filters):
+        return len(session.exec(build_audit_log_query(**filters)).all())
+
+    def test_contains_prefix_and_exact(self, populated):
+        assert self.count(populated, action="login", match="contains") == 26
+        assert self.count(populated, action="login", match="prefix") == 25
+        assert self.count(populated, action="login", match="exact") == 16
+        assert self.count(populated, username="al", match="prefix") == 25
+        assert self.count(populated, username="alice", match="exact") == 12
+
+    def test_prefix_is_not_a_wildcard(self, populated):
+        assert self.count(populated, action="log%", match="prefix") == 0
+
+    def test_prefix_ending_in_the_last_code_point(self, populated):
+        assert self.count(populated, action="login\U0010ffff", match="prefix") == 0
+        assert self.count(populated, action="\U0010ffff", match="prefix") == 0
+        populated.add(
+            AuditLog(username="alice", action="sync\U0010ffff-all", status="success")
+        )
+        populated.commit()
+        assert self.count(populated, action="sync\U0010ffff", match="prefix") == 1
+
+    def test_unknown_match_mode(self):
+        with pytest.raises(ValueError):
+            build_audit_log_query(action="x", match="regex")
+
+
+class TestExport:
+    def test_ndjson_export(self, populated):
+        output = "".join(export_audit_logs(populated, build_audit_log_query()))
+
+        records = [json.loads(line) for line in output.splitlines()]
+        assert len(records) == 26
+        assert {"id", "timestamp", "details"} <= set(records[0])
+
+    def test_csv_export(self, populated):
+        output = "".join(
+            export_audit_logs(populated, build_audit_log_query(status="success"), "csv")
+        )
+
+        rows = list(csv.DictReader(io.StringIO(output)))
+        assert len(rows) == 25
+        assert "i" in json.loads(rows[0]["details"])
@@ -0,0 +1,211 @@
+"""
+Tests for audit log retention.
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.audit_retention import (
+    AuditLogArchiver,
+    AuditRetentionManager,
+    AuditRetentionPolicy,
+    PartitionManager,
+    get_hourly_activity,
+    get_partition_manager,
+)
+from app.models import AuditLog, AuditLogHourlyAggregate
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+@pytest.fixture
+def engine(session):
+    session.exec(AuditLog.__table__.delete())
+    session.exec(AuditLogHourlyAggregate.__table__.delete())
+    session.commit()
+    return session.get_bind()
+
+
+def add_logs(session, count, age, action="login", username="alice"):
+    for i in range(count):
+        session.add(
+            AuditLog(
+                username=username,
+                action=action,
+                status="success",
+                timestamp=NOW - age - timedelta(minutes=i),
+            )
+        )
+    session.commit()
+
+
+class TestAuditRetentionManager:
+    def test_disabled_policy_keeps_everything(self, engine, session):
+        add_logs(session, 3, timedelta(days=400))
+
+        stats = AuditRetentionManager(engine, AuditRetentionPolicy()).run_once(NOW)
+
+        assert stats["deleted"] == 0
+        assert len(session.exec(select(AuditLog)).all()) == 3
+
+    def test_expired_rows_are_rolled_up_archived_and_deleted(
+        self, engine, session, tmp_path
+    ):
+        add_logs(session, 5, timedelta(days=1))
+        add_logs(session, 7, timedelta(days=40), action="execute_tool")
+        add_logs(session, 4, timedelta(days=40, hours=3), username="bob")
+        policy = AuditRetentionPolicy(
+            hot_days=30, archive_dir=str(tmp_path), batch_size=3, batch_pause=0
+        )
+
+        stats = AuditRetentionManager(engine, policy).run_once(NOW)
+
+        assert stats["deleted"] == 11
+        assert stats["archived"] == 11
+        assert stats["batches"] == 4
+        remaining = session.exec(select(AuditLog)).all()
+        assert len(remaining) == 5
+
+        activity = get_hourly_activity(session, NOW - timedelta(days=365))
+        assert sum(row["count"] for row in activity) == 11
+        by_key = {}
+        for row in activity:
+            key = (row["action"], row["username"])
+            by_key[key] = by_key.get(key, 0) + row["count"]
+        assert by_key[("execute_tool", "alice")] == 7
+        assert by_key[("login", "bob")] == 4
+
+        archived = []
+        for path in tmp_path.glob("auditlog-*.ndjson.gz"):
+            with gzip.open(path, "rt") as archive_file:
+                archived.extend(json.loads(line) for line in archive_file)
+        assert len(archived) == 11
+        assert {"id", "timestamp", "action"} <= set(archived[0])
+
+    def test_retried_batches_are_not_archived_twice(self, engine, session, tmp_path):
+        add_logs(session, 5, timedelta(days=40))
+        # A previous run archived these rows but failed to delete them
+        AuditLogArchiver(tmp_path).archive(session.exec(select(AuditLog)).all())
+        policy = AuditRetentionPolicy(
+            hot_days=30, archive_dir=str(tmp_path), batch_size=2, batch_pause=0
+        )
+
+        stats = AuditRetentionManager(engine, policy).run_once(NOW)
+
+        assert stats["deleted"] == 5
+        assert stats["archived"] == 0
+        archived = []
+        for path in tmp_path.glob("auditlog-*.ndjson.gz"):
+            with gzip.open(path, "rt") as archive_file:
+                archived.extend(json.loads(line)["id"] for line in archive_file)
+        assert sorted(archived) == sorted(set(archived))
+        assert len(archived) == 5
+
+    def test_rows_deleted_by_another_worker_are_not_rolled_up(self, engine, session):
+        add_logs(session, 6, timedelta(days=40))
+        policy = AuditRetentionPolicy(hot_days=30, batch_size=4, batch_pause=0)
+        manager = AuditRetentionManager(engine, policy)
+
+        class OtherWorker:
+            """Deletes part of the first batch between its select and delete."""
+
+            deleted = []
+
+            def archive(self, logs):
+                if not self.deleted:
+                    self.deleted = [log.id for log in logs[:2]]
+                    with Session(engine) as other:
+                        other.exec(delete(AuditLog).where(AuditLog.id.in_(self.deleted)))
+                        other.commit()
+                return 0
+
+        manager.archiver = OtherWorker()
+
+        stats = manager.run_once(NOW)
+
+        assert stats["conflicts"] == 1
+        assert stats["deleted"] == 4
+        assert stats["rolled_up"] == 4
+        activity = get_hourly_activity(session, NOW - timedelta(days=365))
+        assert sum(row["count"] for row in activity) == 4
+        assert session.exec(select(AuditLog)).all() == []
+
+    def test_rollup_can_be_disabled(self, engine, session):
+        add_logs(session, 2, timedelta(days=40))
+        policy = AuditRetentionPolicy(hot_days=30, rollup=False)
+
+        stats = AuditRetentionManager(engine, policy).run_once(NOW)
+
+        assert stats["deleted"] == 2
+        assert stats["rolled_up"] == 0
+        assert session.exec(select(AuditLogHourlyAggregate)).all() == []
+
+    def test_background_thread_starts_only_when_enabled(self, engine):
+        disabled = AuditRetentionManager(engine, AuditRetentionPolicy())
+        disabled.start()
+        assert not disabled.is_running
+
+        enabled = AuditRetentionManager(
+            engine, AuditRetentionPolicy(hot_days=30, interval=60)
+        )
+        enabled.start()
+        try:
+            assert enabled.is_running
+        finally:
+            enabled.stop()
+        assert not enabled.is_running
+
+
+class TestPartitioning:
+    def test_sqlite_has_no_partition_manager(self, engine):
+        assert get_partition_manager(engine) is None
+
+    def test_backends_must_implement_the_interface(self):
+        with pytest.raises(TypeError):
+            PartitionManager(engine=None)
+
+    def test_month_arithmetic(self):
+        start = PartitionManager.month_start(datetime(2024, 12, 31, 23, 59))
+        assert start == datetime(2024, 12, 1)
+        assert PartitionManager.next_month(start) == datetime(2025, 1, 1)
+
+    def test_ensure_future_partitions_and_expiry(self):
+        class FakePartitions(PartitionManager):
+            def __init__(self):
+                super().__init__(engine=None)
+                self.partitions = [("auditlog_p202401", datetime(2024, 2, 1))]
+
+            def list_partitions(self, session):
+                return list(self.partitions)
+
+            def create_partition(self, session, start, end):
+                self.partitions.append((self.partition_name(start), end))
+
+            def is_partitioned(self, session):
+                return True
+
+            def drop_partition(self, session, name):
+                self.partitions = [p for p in self.partitions if p[0] != name]
+
+            def hour_expression(self):
+                return "timestamp"
+
+            def partition_table_expression(self, name):
+                return name
+
+        manager = FakePartitions()
+
+        assert manager.ensure_future_partitions(None, NOW, months_ahead=2) == 3
+        assert [name for name, _ in manager.partitions][1:] == [
+            "auditlog_p202406",
+            "auditlog_p202407",
+            "auditlog_p202408",
+        ]
+        assert manager.expired_partitions(None, datetime(2024, 3, 1)) == [
+            ("auditlog_p202401", datetime(2024, 2, 1))
+        ]
@@ -79,10 +79,11 @@ class TestLocalContentPacks:
         db_tool.load_content_pack_database.assert_called_once_with(
             pack_data["database"]
         )
-        # Check that the state manager was called with the state data
-        state_manager.set.assert_called_once_with(
-            "filesystem", pack_data["state"]["filesystem"]
-        )
+        # Check that the state manager was updated with the state data
+        state_manager.update.assert_called_once()
+        key, change = state_manager.update.call_args[0]
+        assert key == "filesystem"
+        assert change(None) == pack_data["state"]["filesystem"]
         # Check that the loaded pack is tracked
         assert len(content_pack_manager.loaded_packs) == 1
         assert content_pack_manager.loaded_packs[0]["metadata"]["name"] == "Test Pack"
@@ -2,12 +2,13 @@
 Unit tests for ContentPackVariable model and CRUD operations.
 """
 
+import time
 import pytest
 from sqlmodel import Session, select
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from app.models import ContentPackVariable, User
-from app.content_pack_variables import ContentPackVariableManager
+from app.content_pack_variables import ContentPackVariableManager, VariableOverrideCache
 from app.security import get_password_hash
 
 
@@ -259,4 +260,79 @@ class TestContentPackVariableManager:
         success = variable_manager.delete_variable(
             "nonexistent_pack", "nonexistent_var", test_user.id
         )
-        assert success is False
\ No newline at end of file
+        assert success is False
+
+    def test_prefetch_pack_variables_is_cached(self, variable_manager, test_user):
+        """Test that overrides are loaded once and served from the cache."""
+        variable_manager.set_variable_value("cache_pack", "a", "1", test_user.id)
+        variable_manager.set_variable_value("cache_pack", "b", "2", test_user.id)
+
+        first = variable_manager.prefetch_pack_variables("cache_pack", test_user.id)
+        second = variable_manager.prefetch_pack_variables("cache_pack", test_user.id)
+
+        assert first == {"a": "1", "b": "2"}
+        assert first is second
+        assert variable_manager.get_variable_value("cache_pack", "b", test_user.id) == "2"
+
+    def test_writes_invalidate_prefetched_overrides(self, session, variable_manager, test_user):
+        """Test that writes through any manager invalidate cached overrides."""
+        other_manager = ContentPackVariableManager(session)
+        variable_manager.set_variable_value("inval_pack", "a", "1", test_user.id)
+        assert variable_manager.get_pack_variables("inval_pack", test_user.id) == {"a": "1"}
+
+        other_manager.set_variable_value("inval_pack", "a", "2", test_user.id)
+        assert variable_manager.get_variable_value("inval_pack", "a", test_user.id) == "2"
+
+        other_manager.delete_variable("inval_pack", "a", test_user.id)
+        assert variable_manager.get_variable_value("inval_pack", "a", test_user.id) is None
+
+        other_manager.set_variable_value("inval_pack", "b", "3", test_user.id)
+        assert variable_manager.get_pack_variables("inval_pack", test_user.id) == {"b": "3"}
+        other_manager.reset_pack_variables("inval_pack", test_user.id)
+        assert variable_manager.get_pack_variables("inval_pack", test_user.id) == {}
+
+    def test_override_cache_ignores_stale_loads(self):
+        """Test that a load started before a write is never cached."""
+        cache = VariableOverrideCache()
+        version = cache.version("pack", 1)
+
+        cache.invalidate("pack", 1)
+        cache.put("pack", 1, version, {"a": "stale"})
+
+        assert cache.get("pack", 1) is None
+
+    def test_override_cache_entries_expire(self):
+        """Test that entries expire so writes from other workers show up."""
+        cache = VariableOverrideCache(ttl=60)
+        cache.put("pack", 1, cache.version("pack", 1), {"a": "1"})
+        assert cache.get("pack", 1) == {"a": "1"}
+
+        with patch("app.content_pack_variables.time.monotonic", return_value=time.monotonic() + 61):
+            assert cache.get("pack", 1) is None
+
+    def test_override_cache_versions_are_bounded(self, monkeypatch):
+        """Test that versions of uncached pairs are pruned without reviving stale loads."""
+        monkeypatch.setattr(VariableOverrideCache, "MAX_ENTRIES", 4)
+        cache = VariableOverrideCache(ttl=60)
+        stale_version = cache.version("pack", 0)
+        cache.put("pack", 100, cache.version("pack", 100), {"kept": "1"})
+
+        for user_id in range(20):
+            cache.invalidate("pack", user_id)
+
+        assert len(cache._versions) <= 2 * VariableOverrideCache.MAX_ENTRIES
+        cache.put("pack", 0, stale_version, {"a": "stale"})
+        assert cache.get("pack", 0) is None
+        assert cache.get("pack", 100) == {"kept": "1"}
+
+    def test_get_variable_usage_stats_counts(self, variable_manager, test_user):
+        """Test that aggregated stats count rows per pack and variable."""
+        before = variable_manager.get_variable_usage_stats()
+        variable_manager.set_variable_value("agg_pack", "x", "1", test_user.id)
+        variable_manager.set_variable_value("agg_pack", "y", "2", test_user.id)
+
+        stats = variable_manager.get_variable_usage_stats()
+
+        assert stats["total_variables"] == before["total_variables"] + 2
+        assert stats["pack_breakdown"]["agg_pack"] == 2
+        assert stats["variable_breakdown"]["x"] == before["variable_breakdown"].get("x", 0) + 1
@@ -0,0 +1,198 @@
+"""
+Tests for the database module's SQLite engine and statement profiling.
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import Config
+from app.modules.database.engine import SQLiteEngine
+from app.modules.database.profiling import normalize_statement
+from app.modules.database.tool import DatabaseTool
+from app.state_manager import StateManager
+
+
+@pytest.fixture
+def engine():
+    engine = SQLiteEngine(read_connections=2, busy_timeout=0.5)
+    with engine.writer() as connection:
+        connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    yield engine
+    engine.close()
+
+
+class TestSQLiteEngine:
+    def test_pragmas_are_applied(self, tmp_path):
+        engine = SQLiteEngine(
+            str(tmp_path / "tool.db"), cache_size=-2000, mmap_size=1048576
+        )
+        with engine.reader() as connection:
+            assert connection.execute("PRAGMA cache_size").fetchone()[0] == -2000
+            assert connection.execute("PRAGMA mmap_size").fetchone()[0] == 1048576
+        assert engine.journal_mode == "wal"
+        assert engine.describe()["location"] == str(tmp_path / "tool.db")
+        engine.close()
+
+    def test_invalid_journal_mode(self):
+        with pytest.raises(ValueError):
+            SQLiteEngine(journal_mode="sideways")
+
+    def test_readers_are_read_only(self, engine):
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            with engine.reader() as connection:
+                connection.execute("INSERT INTO items (name) VALUES ('x')")
+
+    def test_read_runs_alongside_open_write(self, engine):
+        with engine.writer() as writer:
+            writer.execute("INSERT INTO items (name) VALUES ('pending')")
+            # The uncommitted row is invisible, and the reader is not blocked
+            with engine.reader() as connection:
+                assert connection.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+        with engine.reader() as connection:
+            assert connection.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+    def test_failed_write_is_rolled_back(self, engine):
+        with pytest.raises(sqlite3.IntegrityError):
+            with engine.writer() as connection:
+                connection.execute("INSERT INTO items (id, name) VALUES (1, 'a')")
+                connection.execute("INSERT INTO items (id, name) VALUES (1, 'b')")
+
+        with engine.reader() as connection:
+            assert connection.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+    def test_reader_pool_is_bounded(self, engine):
+        with engine.reader(), engine.reader():
+            with pytest.raises(sqlite3.OperationalError, match="read connection"):
+                with engine.reader():
+                    pass
+        with engine.reader():
+            pass
+
+    def test_close_removes_temporary_database(self):
+        engine = SQLiteEngine()
+        directory = os.path.dirname(engine.path)
+
+        engine.close()
+
+        assert not os.path.exists(directory)
+
+
+class TestDatabaseToolConcurrency:
+    @pytest.fixture
+    def database_tool(self):
+        tool = DatabaseTool(StateManager())
+        tool.execute_sql("CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER)")
+        tool.execute_sql("INSERT INTO counters (id, value) VALUES (1, 0)")
+        yield tool
+        tool.close()
+
+    def test_concurrent_calls(self, database_tool):
+        def increment(_):
+            database_tool.execute_sql("UPDATE counters SET value = value + 1 WHERE id = 1")
+            return database_tool.query("SELECT value FROM counters WHERE id = 1")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(increment, range(40)))
+
+        assert all(len(rows) == 1 for rows in results)
+        assert database_tool.query("SELECT value FROM counters")[0]["value"] == 40
+        assert len(database_tool.get_query_history()) == 50
+
+    def test_writing_cte_runs_on_writer(self, database_tool):
+        rows = database_tool.execute_sql(
+            "WITH next AS (SELECT 2 AS id) "
+            "INSERT INTO counters (id, value) SELECT id, 5 FROM next RETURNING value"
+        )
+
+        assert rows == [{"value": 5}]
+        assert database_tool.query("SELECT COUNT(*) AS n FROM counters")[0]["n"] == 2
+
+
+class TestStatementProfiling:
+    @pytest.fixture
+    def database_tool(self):
+        tool = DatabaseTool(StateManager())
+        tool.execute_sql("CREATE TABLE numbers (n INTEGER)")
+        tool.connection.executemany(
+            "INSERT INTO numbers (n) VALUES (?)", [(i,) for i in range(50)]
+        )
+        tool.connection.commit()
+        yield tool
+        tool.close()
+
+    def test_normalize_statement(self):
+        assert (
+            normalize_statement("SELECT * FROM t  WHERE id IN (1, 2.5) AND name = 'o''k';")
+            == "SELECT * FROM t WHERE id IN (?) AND name = ?"
+        )
+        assert normalize_statement("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+    def test_stats_group_by_normalized_statement(self, database_tool):
+        for i in range(5):
+            database_tool.query(f"SELECT n FROM numbers WHERE n = {i}")
+
+        stats = database_tool.get_query_stats()
+        select = next(s for s in stats if s["statement"].startswith("SELECT n FROM"))
+
+        assert select["statement"] == "SELECT n FROM numbers WHERE n = ?"
+        assert select["count"] == 5
+        assert select["rows"] == 5
+        assert 0 <= select["p50_ms"] <= select["p95_ms"] <= select["max_ms"]
+
+    def test_slow_queries_are_logged_with_plan(self, database_tool, monkeypatch):
+        monkeypatch.setattr(Config, "DATABASE_TOOL_SLOW_QUERY_MS", 0)
+        monkeypatch.setattr(Config, "DATABASE_TOOL_SLOW_QUERY_LOG_SIZE", 2)
+
+        for _ in range(3):
+            database_tool.query("SELECT n FROM numbers WHERE n > 10")
+
+        slow = database_tool.get_slow_queries()
+        assert len(slow) == 2
+        assert slow[-1]["rows"] == 39
+        assert any("SCAN" in step for step in slow[-1]["plan"])
+
+    def test_plan_is_explained_on_the_running_connection(self, monkeypatch):
+        monkeypatch.setattr(Config, "DATABASE_TOOL_READ_CONNECTIONS", 1)
+        monkeypatch.setattr(Config, "DATABASE_TOOL_SLOW_QUERY_MS", 0)
+        tool = DatabaseTool(StateManager())
+        tool.execute_sql("CREATE TABLE numbers (n INTEGER)")
+
+        started = time.perf_counter()
+        tool.query("SELECT n FROM numbers WHERE n > 10")
+
+        assert time.perf_counter() - started < 0.5
+        assert any("SCAN" in step for step in tool.get_slow_queries()[-1]["plan"])
+        tool.close()
+
+    def test_row_budget_aborts_query(self, database_tool, monkeypatch):
+        monkeypatch.setattr(Config, "DATABASE_TOOL_ROW_BUDGET", 10)
+
+        with pytest.raises(HTTPException) as exc_info:
+            database_tool.query("SELECT n FROM numbers")
+
+        assert exc_info.value.status_code == 400
+        assert "10 rows" in exc_info.value.detail
+        assert database_tool.get_slow_queries()[-1]["aborted"]
+        # Paging is not limited by the budget
+        assert database_tool.query_page("SELECT n FROM numbers", max_rows=20)["row_count"] == 20
+
+    def test_time_budget_aborts_runaway_query(self, database_tool, monkeypatch):
+        monkeypatch.setattr(Config, "DATABASE_TOOL_TIME_BUDGET", 0.05)
+        runaway = (
+            "WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r) "
+            "SELECT COUNT(*) FROM r"
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            database_tool.execute_sql(runaway)
+
+        assert "time budget" in exc_info.value.detail
+        assert database_tool.get_query_stats()[0]["aborted"] == 1
+        # The connection is usable afterwards
+        assert database_tool.query("SELECT COUNT(*) AS c FROM numbers") == [{"c": 50}]
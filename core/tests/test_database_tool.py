@@ -595,3 +595,57 @@ class TestDatabaseTool:
 
         assert exc_info.value.status_code == 400
         assert "SQL Error" in str(exc_info.value.detail)
+
+    def test_query_page_pages_through_results(self, database_tool):
+        """Test paging a large result with max_rows and cursors."""
+        database_tool.execute_sql("CREATE TABLE numbers (n INTEGER)")
+        database_tool.connection.executemany(
+            "INSERT INTO numbers (n) VALUES (?)", [(i,) for i in range(25)]
+        )
+        database_tool.connection.commit()
+
+        sql = "SELECT n FROM numbers WHERE n >= ? ORDER BY n"
+        pages = []
+        cursor = None
+        while True:
+            page = database_tool.query_page(sql, (5,), max_rows=8, cursor=cursor)
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert [page["row_count"] for page in pages] == [8, 8, 4]
+        assert pages[0]["columns"] == ["n"]
+        assert [row[0] for page in pages for row in page["rows"]] == list(range(5, 25))
+
+    def test_query_page_rejects_foreign_cursor(self, database_tool_with_data):
+        """Test that a cursor only continues the query it came from."""
+        page = database_tool_with_data.query_page("SELECT * FROM users", max_rows=1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            database_tool_with_data.query_page(
+                "SELECT * FROM products", max_rows=1, cursor=page["next_cursor"]
+            )
+        assert exc_info.value.status_code == 400
+
+        with pytest.raises(HTTPException):
+            database_tool_with_data.query_page("DELETE FROM users")
+
+    def test_large_result_is_capped_in_state(self, database_tool, state_manager, monkeypatch):
+        """Test that only the first rows of a large result are kept in state."""
+        from app.config import Config
+
+        monkeypatch.setattr(Config, "DATABASE_TOOL_STATE_ROWS", 3)
+        database_tool.execute_sql("CREATE TABLE numbers (n INTEGER)")
+        for i in range(5):
+            database_tool.execute_sql("INSERT INTO numbers (n) VALUES (?)", (i,))
+
+        results = database_tool.execute_sql("SELECT n FROM numbers")
+
+        assert len(results) == 5
+        assert state_manager.get("database")["last_query_result"] == {
+            "columns": ["n"],
+            "rows": [[0], [1], [2]],
+            "truncated": True,
+            "total_rows": 5,
+        }
@@ -115,3 +115,18 @@ def test_read_nonexistent_email(email_tool: EmailTool):
         email_tool.read_email(email_id="nonexistent-id")
     assert excinfo.value.status_code == 404
     assert "not found" in excinfo.value.detail
+
+
+def test_update_email_records_a_change(email_tool: EmailTool):
+    """Tests that updating an email bumps the state version with a delta."""
+    result = email_tool.send_email(
+        to=["old@example.com"], subject="Original", body="Body"
+    )
+    state_manager = email_tool.state_manager
+    version = state_manager.get_version("email")
+
+    email_tool.update_email(email_id=result["email_id"], subject="Updated")
+
+    new_version, patch = state_manager.get_changes_since("email", version)
+    assert new_version == version + 1
+    assert [op["path"] for op in patch] == ["/sent_items/0/subject"]
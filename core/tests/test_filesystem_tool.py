@@ -140,3 +140,42 @@ def test_create_directory_already_exists():
         filesystem_tool.create_directory("/test_dir")
 
     assert "Directory already exists" in str(exc_info.value)
+
+
+def test_concurrent_writes_from_two_workers(tmp_path):
+    """
+    Tests that a write racing another worker's write keeps both files.
+    """
+    from app.state_backends import SQLiteStateBackend
+
+    # ARRANGE: Two workers sharing one state store
+    path = tmp_path / "state.db"
+    first = StateManager(backend=SQLiteStateBackend(path))
+    second = StateManager(backend=SQLiteStateBackend(path))
+    tool_a = FileSystemTool(first)
+    tool_b = FileSystemTool(second)
+    tool_a.list_files("/")
+    tool_b.list_files("/")
+
+    # The second worker writes while the first is between its read and write
+    set_state = first.set
+    raced = []
+
+    def racing_set(key, value):
+        if not raced:
+            raced.append(True)
+            tool_b.write_file(path="/other.txt", content="from B")
+        set_state(key, value)
+
+    first.set = racing_set
+
+    # ACT
+    result = tool_a.write_file(path="/z.txt", content="from A")
+
+    # ASSERT: Both files are visible to both workers
+    assert result == "Successfully wrote to file: /z.txt"
+    for tool in (tool_a, tool_b):
+        assert sorted(item["name"] for item in tool.list_files("/")) == [
+            "other.txt",
+            "z.txt",
+        ]
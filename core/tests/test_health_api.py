@@ -0,0 +1,137 @@
+"""
+Tests for the health check endpoints and background health sampler.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import database_compat
+from app.health_api import HealthSampler, create_health_router
+from tests.conftest import get_auth_headers, get_service_headers, get_session_override
+
+
+HEALTHY = {"status": "healthy", "checks": {"database": {"status": "healthy"}}}
+
+
+@pytest.fixture
+def checks():
+    with patch(
+        "app.health_api.collect_system_health", return_value=HEALTHY
+    ) as health, patch(
+        "app.health_api.collect_readiness",
+        return_value={"ready": True, "error": None},
+    ) as readiness:
+        yield health, readiness
+
+
+def make_client(sampler):
+    app = FastAPI()
+    app.include_router(create_health_router(sampler))
+    return TestClient(app)
+
+
+class TestHealthSampler:
+    def test_probes_share_cached_snapshot(self, checks):
+        health, _ = checks
+        client = make_client(HealthSampler(interval=60, max_staleness=60))
+
+        first = client.get("/api/v2/health/")
+        second = client.get("/api/v2/health/")
+        ready = client.get("/api/v2/health/readiness")
+
+        assert first.status_code == second.status_code == ready.status_code == 200
+        assert first.json()["status"] == "healthy"
+        assert first.json()["sampled_at"] == second.json()["sampled_at"]
+        assert health.call_count == 1
+
+    def test_fresh_forces_resample(self, checks):
+        health, _ = checks
+        client = make_client(HealthSampler(interval=60, max_staleness=60))
+
+        client.get("/api/v2/health/")
+        response = client.get(
+            "/api/v2/health/?fresh=true", headers=get_service_headers()
+        )
+
+        assert response.status_code == 200
+        assert health.call_count == 2
+
+    def test_fresh_requires_an_authenticated_admin(self, checks, test_user, monkeypatch):
+        monkeypatch.setattr(database_compat, "get_session", get_session_override)
+        health, _ = checks
+        client = make_client(HealthSampler(interval=60, max_staleness=60))
+        client.get("/api/v2/health/")
+
+        anonymous = client.get("/api/v2/health/?fresh=true")
+        assert anonymous.status_code == 401
+        assert health.call_count == 1
+
+        admin = client.get(
+            "/api/v2/health/readiness?fresh=true", headers=get_auth_headers()
+        )
+        assert admin.status_code == 200
+        assert health.call_count == 2
+
+    def test_concurrent_requests_share_one_sample(self, checks):
+        health, _ = checks
+        release = threading.Event()
+
+        def slow_health():
+            release.wait(2)
+            return HEALTHY
+
+        health.side_effect = slow_health
+        sampler = HealthSampler(interval=60, max_staleness=60)
+
+        async def fetch_all():
+            requests = [asyncio.ensure_future(sampler.get(fresh=True)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*requests)
+
+        snapshots = asyncio.run(fetch_all())
+
+        assert health.call_count == 1
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+    def test_stale_snapshot_is_not_served(self, checks):
+        health, _ = checks
+        sampler = HealthSampler(interval=60, max_staleness=5)
+        sampler.sample()
+        sampler._snapshot["sampled_at"] -= 10
+
+        assert sampler.get_snapshot() is None
+        make_client(sampler).get("/api/v2/health/")
+
+        assert health.call_count == 2
+
+    def test_readiness_failure_returns_503(self, checks):
+        _, readiness = checks
+        readiness.return_value = {"ready": False, "error": "Database not ready: down"}
+        client = make_client(HealthSampler(interval=60, max_staleness=60))
+
+        response = client.get("/api/v2/health/readiness")
+
+        assert response.status_code == 503
+        assert response.json()["detail"] == "Database not ready: down"
+
+    def test_background_thread_refreshes(self, checks):
+        health, _ = checks
+        sampler = HealthSampler(interval=0.01, max_staleness=60)
+
+        sampler.start()
+        try:
+            deadline = time.time() + 2
+            while health.call_count < 2 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            sampler.stop()
+
+        assert health.call_count >= 2
+        assert not sampler.is_running
+        assert sampler.get_snapshot() is not None
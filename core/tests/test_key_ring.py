@@ -0,0 +1,94 @@
+"""
+Tests for the JWT signing key ring.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from jose import jwt
+
+from app import key_ring as key_ring_module
+from app import security
+from app.key_ring import KeyRing
+
+
+@pytest.fixture
+def ring_path(tmp_path):
+    return tmp_path / "keys" / "jwt-keys.json"
+
+
+class TestKeyRing:
+    def test_in_memory_ring_has_one_key(self):
+        ring = KeyRing()
+
+        kid, secret = ring.get_signing_key()
+
+        assert ring.key_ids() == [kid]
+        assert ring.get_key(kid) == secret
+        assert ring.get_key(None) == secret
+        assert ring.get_key("unknown") is None
+
+    def test_file_is_shared_between_processes(self, ring_path):
+        first = KeyRing(ring_path)
+        second = KeyRing(ring_path)
+
+        assert first.get_signing_key() == second.get_signing_key()
+        assert oct(ring_path.stat().st_mode & 0o777) == "0o600"
+
+    def test_rotation_keeps_previous_keys(self, ring_path, monkeypatch):
+        monkeypatch.setattr(key_ring_module, "RELOAD_CHECK_INTERVAL", 0)
+        first = KeyRing(ring_path, max_keys=2)
+        second = KeyRing(ring_path, max_keys=2)
+        old_kid, old_secret = first.get_signing_key()
+
+        new_kid = first.rotate()
+
+        # The other process picks up the new key and still accepts the old
+        assert second.get_key(new_kid) is not None
+        assert second.get_signing_key()[0] == new_kid
+        assert second.get_key(old_kid) == old_secret
+
+        first.rotate()
+        assert first.get_key(old_kid) is None
+
+    def test_rotation_when_due(self, ring_path):
+        old = {
+            "kid": "old",
+            "secret": "s" * 64,
+            "created_at": (datetime.utcnow() - timedelta(days=10)).isoformat(),
+        }
+        ring_path.parent.mkdir()
+        ring_path.write_text(json.dumps({"keys": [old]}))
+
+        ring = KeyRing(ring_path, rotation_days=7)
+        kid, _ = ring.get_signing_key()
+
+        assert kid != "old"
+        assert ring.key_ids() == ["old", kid]
+        # A second worker sees the fresh key and does not rotate again
+        assert KeyRing(ring_path, rotation_days=7).key_ids() == ["old", kid]
+
+
+class TestTokenKeys:
+    def test_tokens_carry_key_id(self):
+        token = security.create_access_token({"sub": "alice"})
+
+        kid = jwt.get_unverified_header(token)["kid"]
+        assert kid == security.key_ring.get_signing_key()[0]
+        assert security.decode_access_token(token) == "alice"
+
+    def test_token_from_retired_key_is_rejected(self, monkeypatch):
+        token = security.create_access_token({"sub": "alice"})
+        monkeypatch.setattr(security, "key_ring", KeyRing())
+
+        assert security.decode_access_token(token) is None
+
+    def test_token_without_key_id_uses_active_key(self):
+        token = jwt.encode(
+            {"sub": "alice", "type": "access"},
+            security.key_ring.get_signing_key()[1],
+            algorithm=security.ALGORITHM,
+        )
+
+        assert security.decode_access_token(token) == "alice"
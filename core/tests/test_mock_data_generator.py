@@ -0,0 +1,148 @@
+"""
+Unit tests for the columnar mode of the mock data generator.
+"""
+
+import io
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app.modules.mock_data_generator import (
+    _NUMPY_AVAILABLE,
+    ColumnarDataset,
+    MockDataGenerator,
+    VectorSampler,
+)
+
+REFERENCE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+SAMPLER_MODES = [False] + ([True] if _NUMPY_AVAILABLE else [])
+
+
+def make_generator(seed=42, use_numpy=False):
+    return MockDataGenerator(
+        seed=seed, reference_time=REFERENCE_TIME, use_numpy=use_numpy
+    )
+
+
+@pytest.mark.parametrize("use_numpy", SAMPLER_MODES)
+class TestColumnarGeneration:
+    @pytest.mark.parametrize("kind", MockDataGenerator.COLUMNAR_KINDS)
+    def test_records_match_row_mode_schema(self, kind, use_numpy):
+        generator = make_generator(use_numpy=use_numpy)
+        row_method = {
+            "users": generator.generate_users,
+            "servers": generator.generate_servers,
+            "security_events": generator.generate_security_events,
+        }.get(kind)
+
+        dataset = generator.generate_columnar(kind, 25)
+
+        assert isinstance(dataset, ColumnarDataset)
+        assert len(dataset) == 25
+        records = dataset.to_records()
+        assert len(records) == 25
+        json.dumps(records)
+        if row_method:
+            assert set(records[0]) == set(row_method(1)[0])
+
+    def test_same_seed_is_deterministic(self, use_numpy):
+        first = make_generator(seed=3, use_numpy=use_numpy)
+        second = make_generator(seed=3, use_numpy=use_numpy)
+        other = make_generator(seed=4, use_numpy=use_numpy)
+
+        records = first.generate_columnar("users", 50).to_records()
+
+        assert records == second.generate_columnar("users", 50).to_records()
+        assert records != other.generate_columnar("users", 50).to_records()
+
+    def test_value_ranges(self, use_numpy):
+        dataset = make_generator(use_numpy=use_numpy).generate_columnar("users", 500)
+
+        assert dataset[0]["manager"] is None
+        assert dataset[10]["manager"].startswith("manager_")
+        assert {len(groups) for groups in dataset.column("groups")} == {1, 2, 3}
+        assert set(dataset.column("status")) == {"Active", "Inactive"}
+        assert dataset[-1]["id"] == "user_500"
+
+    def test_stream_chunks_continue_ids(self, use_numpy):
+        generator = make_generator(use_numpy=use_numpy)
+
+        chunks = list(generator.stream_columnar("servers", 25, chunk_size=10))
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        ids = [record["id"] for record in generator.stream_records("servers", 25, 10)]
+        assert ids == [f"srv_{i:03d}" for i in range(1, 26)]
+
+
+class TestColumnarDataset:
+    def test_records_are_built_on_access(self):
+        calls = []
+        generator = make_generator()
+        dataset = generator.generate_columnar("security_events", 5)
+        original = dataset.columns["id"].func
+        dataset.columns["id"].func = lambda i: calls.append(i) or original(i)
+
+        record = dataset[2]
+
+        assert calls == [2]
+        assert record["id"] == "sec_003"
+
+    def test_list_values_are_copies(self):
+        dataset = make_generator().generate_columnar("users", 3)
+
+        dataset[0]["groups"].append("Mutated")
+
+        assert "Mutated" not in dataset[0]["groups"]
+
+    def test_index_out_of_range(self):
+        dataset = make_generator().generate_columnar("users", 3)
+        with pytest.raises(IndexError):
+            dataset[3]
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            make_generator().generate_columnar("printers", 3)
+
+
+class TestStreamingWriters:
+    def test_write_json_array(self):
+        buffer = io.StringIO()
+
+        written = make_generator().write_json_array(buffer, "dns_queries", 30, 7)
+
+        records = json.loads(buffer.getvalue())
+        assert written == 30
+        assert len(records) == 30
+        assert records[0]["id"] == "query_001"
+
+    def test_write_sqlite_table(self):
+        connection = sqlite3.connect(":memory:")
+
+        inserted = make_generator().write_sqlite_table(
+            connection, "users", "users", 120, chunk_size=50
+        )
+
+        assert inserted == 120
+        assert connection.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 120
+        groups, is_sandbox = connection.execute(
+            "SELECT groups, is_sandbox FROM users LIMIT 1"
+        ).fetchone()
+        assert isinstance(json.loads(groups), list)
+        assert is_sandbox == 1
+
+    def test_write_sqlite_table_rejects_bad_name(self):
+        with pytest.raises(ValueError):
+            make_generator().write_sqlite_table(
+                sqlite3.connect(":memory:"), "users; DROP", "users", 1
+            )
+
+
+def test_sampler_requires_numpy_when_requested():
+    if _NUMPY_AVAILABLE:
+        assert VectorSampler(1, use_numpy=True).use_numpy
+    else:
+        with pytest.raises(ImportError):
+            VectorSampler(1, use_numpy=True)
@@ -0,0 +1,112 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+
+import asyncio
+
+import pytest
+
+from app.password_hashing import HashingBusyError, PasswordHasher
+from app.security import get_password_hash
+from tests.conftest import TEST_USER_DATA
+
+
+@pytest.fixture(scope="module")
+def hashed():
+    return get_password_hash("correct horse")
+
+
+class TestPasswordHasher:
+    @pytest.mark.asyncio
+    async def test_verify_in_process_pool(self, hashed):
+        hasher = PasswordHasher(workers=1, queue_limit=4, executor_kind="process")
+        try:
+            assert await hasher.verify("correct horse", hashed) is True
+            assert await hasher.verify("wrong", hashed) is False
+        finally:
+            hasher.shutdown()
+
+        stats = hasher.get_stats()
+        assert stats["completed"] == 2
+        assert stats["pending"] == 0
+        assert stats["hash_time_ms"]["p50"] > 0
+
+    @pytest.mark.asyncio
+    async def test_hash_round_trip(self):
+        hasher = PasswordHasher(workers=1, queue_limit=4, executor_kind="thread")
+        try:
+            hashed = await hasher.hash("secret")
+            assert await hasher.verify("secret", hashed)
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self, hashed):
+        hasher = PasswordHasher(workers=1, queue_limit=2, executor_kind="thread")
+        try:
+            results = await asyncio.gather(
+                *(hasher.verify("correct horse", hashed) for _ in range(4)),
+                return_exceptions=True,
+            )
+        finally:
+            hasher.shutdown()
+
+        assert results.count(True) == 2
+        assert sum(isinstance(r, HashingBusyError) for r in results) == 2
+        assert hasher.get_stats()["rejected"] == 2
+
+    def test_invalid_executor_kind(self):
+        with pytest.raises(ValueError):
+            PasswordHasher(executor_kind="gpu")
+
+
+class TestLoginWithHashingPool:
+    def test_login_rejected_when_saturated(self, client, test_user, monkeypatch):
+        from app import auth
+
+        async def busy(*args):
+            raise HashingBusyError("full")
+
+        monkeypatch.setattr(auth.password_hasher, "verify", busy)
+
+        response = client.post(
+            "/auth/login",
+            data={"username": TEST_USER_DATA["username"], "password": "x"},
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    def test_login_database_work_runs_off_the_event_loop(
+        self, client, test_user, monkeypatch
+    ):
+        from app import auth
+
+        on_loop = []
+        log_audit_event = auth.log_audit_event
+
+        def record(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return log_audit_event(*args, **kwargs)
+
+        monkeypatch.setattr(auth, "log_audit_event", record)
+
+        username = TEST_USER_DATA["username"]
+        client.post("/auth/login", data={"username": username, "password": "x"})
+        response = client.post(
+            "/auth/login",
+            data={"username": username, "password": TEST_USER_DATA["password"]},
+        )
+
+        assert response.status_code == 200
+        assert on_loop == [False, False]
+
+    def test_hashing_metrics_endpoint(self, client):
+        response = client.get("/api/v2/health/password-hashing")
+
+        assert response.status_code == 200
+        assert "queue_wait_ms" in response.json()
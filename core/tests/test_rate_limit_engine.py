@@ -0,0 +1,189 @@
+"""
+Tests for the GCRA rate limiter, its storages and per-tool execute limits.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from starlette.requests import Request
+
+from app import rate_limiter
+from app.config import Config
+from app.rate_limit_engine import (
+    GCRALimiter,
+    MemoryRateLimitStorage,
+    RateLimit,
+    SharedMemoryRateLimitStorage,
+    SQLiteRateLimitStorage,
+    _FCNTL_AVAILABLE,
+)
+
+
+@pytest.fixture(params=["memory", "shared_memory", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        storage = MemoryRateLimitStorage()
+    elif request.param == "shared_memory":
+        if not _FCNTL_AVAILABLE:
+            pytest.skip("fcntl is not available")
+        storage = SharedMemoryRateLimitStorage(str(tmp_path / "limits"), slots=64)
+    else:
+        storage = SQLiteRateLimitStorage(str(tmp_path / "limits.db"))
+    yield storage
+    storage.close()
+
+
+class TestRateLimit:
+    def test_parse(self):
+        assert RateLimit.parse("60/minute") == RateLimit(60, 60.0)
+        assert RateLimit.parse("1000/hours") == RateLimit(1000, 3600.0)
+
+    @pytest.mark.parametrize("value", ["60", "x/minute", "60/fortnight", "0/second"])
+    def test_parse_invalid(self, value):
+        with pytest.raises(ValueError):
+            RateLimit.parse(value)
+
+
+class TestGCRALimiter:
+    def test_allows_burst_up_to_limit(self, storage):
+        limiter = GCRALimiter(storage)
+        rate = RateLimit(10, 60.0)
+
+        results = [limiter.hit("caller", rate, now=1000.0) for _ in range(11)]
+
+        assert all(result.allowed for result in results[:10])
+        assert [result.remaining for result in results[:10]] == list(range(9, -1, -1))
+        assert not results[10].allowed
+        assert results[10].retry_after == pytest.approx(6.0)
+        assert results[10].reset_after == pytest.approx(60.0)
+
+    def test_budget_refills_over_time(self, storage):
+        limiter = GCRALimiter(storage)
+        rate = RateLimit(10, 60.0)
+        for _ in range(10):
+            limiter.hit("caller", rate, now=1000.0)
+
+        assert limiter.hit("caller", rate, now=1006.0).allowed
+        assert not limiter.hit("caller", rate, now=1006.0).allowed
+        assert limiter.peek("caller", rate, now=1036.0).remaining == 5
+        assert limiter.peek("caller", rate, now=1100.0).remaining == 10
+
+    def test_cost_spends_several_units(self, storage):
+        limiter = GCRALimiter(storage)
+        rate = RateLimit(10, 60.0)
+
+        assert limiter.hit("caller", rate, cost=4, now=1000.0).remaining == 6
+        assert limiter.hit("caller", rate, cost=6, now=1000.0).remaining == 0
+        denied = limiter.hit("caller", rate, cost=3, now=1000.0)
+        assert not denied.allowed
+        assert denied.retry_after == pytest.approx(18.0)
+        # A cost above the limit is allowed with a full budget
+        assert limiter.hit("other", rate, cost=50, now=1000.0).allowed
+
+    def test_keys_are_independent(self, storage):
+        limiter = GCRALimiter(storage)
+        rate = RateLimit(1, 60.0)
+
+        assert limiter.hit("a", rate, now=1000.0).allowed
+        assert limiter.hit("b", rate, now=1000.0).allowed
+        assert not limiter.hit("a", rate, now=1000.0).allowed
+
+    def test_peek_reuses_recent_reads(self):
+        storage = MemoryRateLimitStorage()
+        limiter = GCRALimiter(storage, peek_ttl=1.0)
+        rate = RateLimit(10, 60.0)
+        limiter.hit("caller", rate, now=1000.0)
+
+        with patch.object(storage, "get", wraps=storage.get) as get:
+            assert limiter.peek("caller", rate, now=1000.5).remaining == 9
+            assert limiter.peek("other", rate, now=1000.5).remaining == 10
+            assert limiter.peek("other", rate, now=1000.9).remaining == 10
+            assert limiter.peek("caller", rate, now=1002.0).remaining == 9
+
+        assert [c.args[0] for c in get.call_args_list] == ["other", "caller"]
+
+    def test_denied_headers(self, storage):
+        limiter = GCRALimiter(storage)
+        rate = RateLimit(1, 60.0)
+        limiter.hit("caller", rate, now=1000.0)
+
+        headers = limiter.hit("caller", rate, now=1000.0).headers()
+
+        assert headers == {
+            "X-RateLimit-Limit": "1",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": "60",
+            "Retry-After": "60",
+        }
+
+
+@pytest.mark.skipif(not _FCNTL_AVAILABLE, reason="fcntl is not available")
+class TestSharedMemoryRateLimitStorage:
+    def test_budgets_are_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "limits")
+        first = GCRALimiter(SharedMemoryRateLimitStorage(path, slots=64))
+        second = GCRALimiter(SharedMemoryRateLimitStorage(path, slots=64))
+        rate = RateLimit(2, 60.0)
+
+        assert first.hit("caller", rate, now=1000.0).allowed
+        assert second.hit("caller", rate, now=1000.0).allowed
+        assert not first.hit("caller", rate, now=1000.0).allowed
+
+    def test_full_table_evicts_the_soonest_refilled_key(self, tmp_path):
+        limiter = GCRALimiter(SharedMemoryRateLimitStorage(str(tmp_path / "l"), slots=4))
+        rate = RateLimit(1, 60.0)
+
+        for index in range(10):
+            assert limiter.hit(f"caller-{index}", rate, now=1000.0 + index).allowed
+        assert not limiter.hit("caller-9", rate, now=1010.0).allowed
+
+
+class TestToolRateLimits:
+    @pytest.fixture(autouse=True)
+    def fresh_limiter(self, monkeypatch):
+        monkeypatch.setattr(rate_limiter, "tool_rate_limiter", GCRALimiter())
+        monkeypatch.setattr(Config, "EXECUTE_RATE_LIMIT", "10/minute")
+
+    def test_tool_costs(self, monkeypatch):
+        assert rate_limiter.get_tool_cost("memory.get_memory") == 1
+        assert rate_limiter.get_tool_cost("database.execute_sql") == 5
+
+        monkeypatch.setattr(Config, "TOOL_RATE_COSTS", "memory.*=2, bad")
+
+        assert rate_limiter.get_tool_cost("memory.get_memory") == 2
+
+    def test_service_key_is_not_stored(self):
+        request = Request(
+            {
+                "type": "http",
+                "headers": [(b"x-api-key", rate_limiter.SERVICE_API_KEY.encode())],
+                "client": ("127.0.0.1", 1234),
+            }
+        )
+
+        key, _ = rate_limiter.get_rate_limit_key_and_rate(request)
+
+        assert key.startswith("service:")
+        assert rate_limiter.SERVICE_API_KEY not in key
+
+    def test_execute_spends_tool_cost(self, service_client):
+        # Modules are not loaded in tests, so the calls that pass the limit
+        # end in 404, which still spends the budget
+        payload = {"tool_name": "database.execute_sql", "parameters": {"sql_query": "SELECT 1"}}
+
+        first = service_client.post("/api/v1/execute", json=payload)
+        second = service_client.post("/api/v1/execute", json=payload)
+        third = service_client.post("/api/v1/execute", json=payload)
+
+        assert first.status_code != 429
+        assert first.headers["X-RateLimit-Limit"] == "10"
+        assert first.headers["X-RateLimit-Remaining"] == "5"
+        assert second.headers["X-RateLimit-Remaining"] == "0"
+        assert third.status_code == 429
+        assert int(third.headers["Retry-After"]) >= 1
+
+        # The cheaper tool is still refused with an exhausted budget, and
+        # other endpoints report the budget without spending it
+        memory = {"tool_name": "memory.get_memory", "parameters": {"key": "k"}}
+        assert service_client.post("/api/v1/execute", json=memory).status_code == 429
+        assert service_client.get("/api/v1/ui/layout").headers["X-RateLimit-Remaining"] == "0"
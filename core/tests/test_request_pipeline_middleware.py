@@ -0,0 +1,149 @@
+"""
+Tests for the fused request pipeline middleware.
+"""
+
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware import RequestPipelineMiddleware
+from app.security_headers import get_security_headers_config
+from app.version_manager import version_manager
+
+
+def create_app(**kwargs):
+    app = FastAPI()
+    app.add_middleware(
+        RequestPipelineMiddleware,
+        security_config=get_security_headers_config("testing"),
+        **kwargs,
+    )
+
+    @app.get("/api/v1/whoami")
+    async def whoami(request: Request):
+        user = getattr(request.state, "user", None)
+        return {
+            "user": user.username if user else None,
+            "api_version": getattr(request.state, "api_version", None),
+        }
+
+    @app.get("/api/v1/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i}\n"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/api/v1/fail")
+    async def fail():
+        raise RuntimeError("boom")
+
+    @app.get("/")
+    async def root():
+        return {"message": "ui"}
+
+    return app
+
+
+class FakeUser:
+    id = 7
+    username = "alice"
+    is_admin = False
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app())
+
+
+def test_all_stages_apply_headers(client):
+    response = client.get("/api/v1/whoami", headers={"Origin": "http://ui.local"})
+
+    assert response.status_code == 200
+    assert response.json()["api_version"] == "v1"
+    assert response.headers["X-API-Version"] == "v1"
+    assert "X-RateLimit-Limit" in response.headers
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["Access-Control-Allow-Origin"] == "http://ui.local"
+    assert "no-store" in response.headers["Cache-Control"]
+
+
+def test_non_api_path_has_only_security_headers(client):
+    response = client.get("/")
+
+    assert "X-Frame-Options" in response.headers
+    assert "X-API-Version" not in response.headers
+    assert "X-RateLimit-Limit" not in response.headers
+    assert "Access-Control-Allow-Origin" not in response.headers
+
+
+def test_auth_stage_sets_user_state():
+    client = TestClient(create_app())
+    with patch(
+        "app.middleware.get_user_from_authorization", return_value=FakeUser()
+    ) as lookup:
+        response = client.get(
+            "/api/v1/whoami", headers={"Authorization": "Bearer token"}
+        )
+
+    lookup.assert_called_once_with("Bearer token")
+    assert response.json()["user"] == "alice"
+
+
+def test_disabled_stages_are_skipped():
+    client = TestClient(
+        create_app(disabled_stages=["auth", "versioning", "rate_limit_headers"])
+    )
+    with patch("app.middleware.get_user_from_authorization") as lookup:
+        response = client.get(
+            "/api/v1/whoami", headers={"Authorization": "Bearer token"}
+        )
+
+    lookup.assert_not_called()
+    assert response.json() == {"user": None, "api_version": None}
+    assert "X-API-Version" not in response.headers
+    assert "X-RateLimit-Limit" not in response.headers
+    assert "X-Frame-Options" in response.headers
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError):
+        RequestPipelineMiddleware(FastAPI(), disabled_stages=["compression"])
+
+
+def test_preflight_returns_cors_headers(client):
+    response = client.options(
+        "/api/v1/whoami", headers={"Origin": "http://ui.local"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == "http://ui.local"
+
+
+def test_unsupported_version_is_gone(client):
+    with patch.object(version_manager, "is_version_supported", return_value=False):
+        response = client.get("/api/v1/whoami")
+
+    assert response.status_code == 410
+    assert "X-Frame-Options" in response.headers
+
+
+def test_unhandled_error_returns_json_500(client):
+    with patch("app.middleware.timeline_log_error") as timeline:
+        response = client.get("/api/v1/fail")
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal server error"}
+    assert "X-Frame-Options" in response.headers
+    timeline.assert_called_once()
+
+
+def test_streaming_response_is_passed_through(client):
+    with client.stream("GET", "/api/v1/stream") as response:
+        body = "".join(response.iter_text())
+
+    assert body == "chunk0\nchunk1\nchunk2\n"
+    assert response.headers["X-API-Version"] == "v1"
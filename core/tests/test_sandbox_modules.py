@@ -0,0 +1,251 @@
+"""
+Unit tests for lazy, seeded mock data and indexed queries in sandbox modules.
+"""
+
+import json
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.modules.active_directory.tool import ActiveDirectoryTool
+from app.modules.dns_management.tool import DnsManagementTool
+from app.modules.azure_entra_id.tool import AzureEntraIdTool
+from app.modules.indexed_collection import IndexedCollection, paginate
+
+
+def make_tool(tool_class, cache_dir, seed=42, cache_enabled=True):
+    tool = tool_class()
+    tool.mock_data_seed = seed
+    tool.mock_data_cache_dir = cache_dir
+    tool.mock_data_cache_enabled = cache_enabled
+    return tool
+
+
+ISO_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}T")
+
+
+def strip_timestamps(value):
+    """Blank out wall-clock dependent values so datasets can be compared."""
+    if isinstance(value, dict):
+        return {k: strip_timestamps(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [strip_timestamps(v) for v in value]
+    if isinstance(value, str) and ISO_TIMESTAMP.match(value):
+        return "<timestamp>"
+    return value
+
+
+class TestLazyMockData:
+    def test_construction_does_not_generate(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+
+        assert not tool.mock_data_loaded
+        assert tool.get_simulation_status()["mock_data_loaded"] is False
+        assert not any(tmp_path.iterdir())
+
+    def test_first_tool_call_generates(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+
+        result = tool.list_dns_zones()
+
+        assert tool.mock_data_loaded
+        assert result
+        assert tool.get_mock_data_cache_path().exists()
+
+    def test_same_seed_is_deterministic(self, tmp_path):
+        first = make_tool(AzureEntraIdTool, tmp_path, seed=7, cache_enabled=False)
+        second = make_tool(AzureEntraIdTool, tmp_path, seed=7, cache_enabled=False)
+        other = make_tool(AzureEntraIdTool, tmp_path, seed=8, cache_enabled=False)
+
+        first_data = strip_timestamps(first.ensure_mock_data())
+
+        assert first_data == strip_timestamps(second.ensure_mock_data())
+        assert first_data != strip_timestamps(other.ensure_mock_data())
+
+    def test_restart_reuses_disk_cache(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+        generated = tool.ensure_mock_data()
+
+        restarted = make_tool(DnsManagementTool, tmp_path)
+        restarted.initialize_mock_data = pytest.fail
+
+        assert strip_timestamps(restarted.ensure_mock_data()) == strip_timestamps(
+            json.loads(json.dumps(generated))
+        )
+
+    def test_cached_timestamps_follow_the_clock(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+        recent = tool.get_dns_statistics()["data"]["queries_in_period"]
+        assert recent
+
+        # The cache was written two days ago
+        cache_path = tool.get_mock_data_cache_path()
+        cached = json.loads(cache_path.read_text())
+        generated_at = datetime.fromisoformat(cached["generated_at"])
+        cached["generated_at"] = (generated_at - timedelta(days=2)).isoformat()
+        cache_path.write_text(json.dumps(cached))
+
+        restarted = make_tool(DnsManagementTool, tmp_path)
+        restarted.initialize_mock_data = pytest.fail
+
+        assert restarted.get_dns_statistics()["data"]["queries_in_period"] == recent
+        first_query = restarted.mock_data["dns_queries"][0]["timestamp"]
+        original = cached["data"]["dns_queries"][0]["timestamp"]
+        shift = datetime.fromisoformat(first_query) - datetime.fromisoformat(original)
+        assert timedelta(days=2) <= shift < timedelta(days=2, minutes=1)
+
+    def test_corrupt_cache_is_regenerated(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+        cache_path = tool.get_mock_data_cache_path()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text("{not json")
+
+        assert tool.ensure_mock_data()["dns_zones"]
+
+    def test_reset_simulation_restores_initial_data(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+        zone_count = len(tool.mock_data["dns_zones"])
+        tool.mock_data["dns_zones"].clear()
+
+        assert tool.reset_simulation()
+        assert len(tool.mock_data["dns_zones"]) == zone_count
+
+
+class TestIndexedCollection:
+    RECORDS = [
+        {"id": 1, "name": "Alpha Web", "kind": "web", "ts": "2024-01-01T10:00:00"},
+        {"id": 2, "name": "Beta DB", "kind": "db", "ts": "2024-01-01T08:00:00"},
+        {"id": 3, "name": "alphabet", "kind": "web", "ts": "2024-01-02T09:00:00"},
+    ]
+
+    def make_collection(self):
+        return IndexedCollection(
+            list(self.RECORDS),
+            hash_fields=["id", "kind"],
+            time_fields=["ts"],
+            text_fields=["name", "kind"],
+        )
+
+    def test_hash_lookup(self):
+        collection = self.make_collection()
+
+        assert collection.get("id", 2)["name"] == "Beta DB"
+        assert collection.get("id", 99) is None
+        assert [r["id"] for r in collection.query(equals={"kind": "web"})] == [1, 3]
+
+    def test_substring_search_matches_linear_scan(self):
+        collection = self.make_collection()
+
+        for text in ["alpha", "ph", "a", "bet", "web", "zzz", "ALPHA"]:
+            expected = [r for r in self.RECORDS if text.lower() in r["name"].lower()]
+            assert collection.query(contains=[(text, ["name"])]) == expected
+
+    def test_contains_terms_are_combined(self):
+        collection = self.make_collection()
+
+        result = collection.query(
+            contains=[("alpha", ["name"]), ("web", ["kind"]), ("", ["name"])]
+        )
+
+        assert [r["id"] for r in result] == [1, 3]
+
+    def test_time_range(self):
+        collection = self.make_collection()
+
+        result = collection.query(
+            time_field="ts",
+            since=datetime(2024, 1, 1, 9),
+            until=datetime(2024, 1, 2, 9),
+        )
+
+        assert [r["id"] for r in result] == [1, 3]
+
+    def test_appended_records_are_indexed(self):
+        collection = self.make_collection()
+        collection.records.append(
+            {"id": 4, "name": "Gamma", "kind": "web", "ts": "2023-12-31T00:00:00"}
+        )
+
+        assert collection.get("id", 4)["name"] == "Gamma"
+        assert [r["id"] for r in collection.query(time_field="ts", until=datetime(2024, 1, 1))] == [4]
+
+    def test_paginate(self):
+        page, pagination = paginate(list(range(250)), limit=100, offset=200)
+
+        assert page == list(range(200, 250))
+        assert pagination == {
+            "total_count": 250,
+            "limit": 100,
+            "offset": 200,
+            "has_more": False,
+        }
+        with pytest.raises(ValueError):
+            paginate([], limit=0)
+
+
+class TestIndexedSandboxQueries:
+    def test_list_users_matches_linear_filter(self, tmp_path):
+        tool = make_tool(ActiveDirectoryTool, tmp_path)
+        users = tool.mock_data["users"]
+        text = users[0]["department"][:4].lower()
+
+        result = tool.list_users(filter=text, enabled_only=True, limit=1000)["data"]
+
+        expected = [
+            u
+            for u in users
+            if (
+                text in u["display_name"].lower()
+                or text in u["department"].lower()
+                or text in u["username"].lower()
+            )
+            and u.get("enabled", True)
+        ]
+        assert result["users"] == expected
+        assert result["total_count"] == len(expected)
+
+    def test_list_users_paginates(self, tmp_path):
+        tool = make_tool(ActiveDirectoryTool, tmp_path)
+        users = tool.mock_data["users"]
+
+        result = tool.list_users(limit=5, offset=5)["data"]
+
+        assert result["users"] == users[5:10]
+        assert result["total_count"] == len(users)
+        assert result["has_more"] == (len(users) > 10)
+
+    def test_authenticate_finds_created_user(self, tmp_path):
+        tool = make_tool(ActiveDirectoryTool, tmp_path)
+        tool.authenticate_user(username="nobody", password="x")
+
+        tool.create_user(username="newbie", first_name="New", last_name="User")
+        result = tool.authenticate_user(username="newbie", password="x")
+
+        assert result["data"].get("reason") != "User not found"
+
+    def test_indexes_rebuilt_after_reset(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+        tool.list_dns_zones()
+        tool.mock_data["dns_zones"].pop()
+
+        assert tool.list_dns_zones()["data"]["total_count"] == len(
+            tool.mock_data["dns_zones"]
+        )
+        assert tool.reset_simulation()
+        assert tool.list_dns_zones()["data"]["total_count"] == len(
+            tool.mock_data["dns_zones"]
+        )
+
+    def test_dns_statistics_uses_time_index(self, tmp_path):
+        tool = make_tool(DnsManagementTool, tmp_path)
+        cutoff = datetime.now() - timedelta(hours=24)
+        expected = [
+            q
+            for q in tool.mock_data["dns_queries"]
+            if datetime.fromisoformat(q["timestamp"]) >= cutoff
+        ]
+
+        stats = tool.get_dns_statistics(time_range="24h")["data"]
+
+        assert stats["queries_in_period"] == len(expected)
@@ -24,3 +24,162 @@ def test_set_and_get_state(state_manager: StateManager):
 def test_get_nonexistent_state(state_manager: StateManager):
     """Tests that getting a nonexistent key returns None."""
     assert state_manager.get("nonexistent_key") is None
+
+
+def test_set_increments_version(state_manager: StateManager):
+    """Tests that every set bumps the key's version."""
+    assert state_manager.get_version("test_key") == 0
+    state_manager.set("test_key", {"value": 1})
+    state_manager.set("test_key", {"value": 2})
+    assert state_manager.get_version("test_key") == 2
+    assert state_manager.get_version("other_key") == 0
+
+
+def test_changes_since_returns_patch(state_manager: StateManager):
+    """Tests that deltas cover in-place mutations between versions."""
+    state = {"items": [1]}
+    state_manager.set("test_key", state)
+    state["items"].append(2)
+    state_manager.set("test_key", state)
+
+    assert state_manager.get_changes_since("test_key", 1) == (
+        2,
+        [{"op": "add", "path": "/items/1", "value": 2}],
+    )
+    assert state_manager.get_changes_since("test_key", 2) == (2, [])
+
+
+def test_changes_since_falls_back_to_replace(state_manager: StateManager):
+    """Tests that versions outside the change log get a full replacement."""
+    manager = StateManager(change_log_size=2)
+    for i in range(5):
+        manager.set("test_key", {"value": i})
+
+    version, patch = manager.get_changes_since("test_key", 1)
+    assert version == 5
+    assert patch == [{"op": "replace", "path": "", "value": {"value": 4}}]
+    assert manager.get_changes_since("test_key", 99)[1] == patch
+    assert StateManager(change_log_size=0).get_changes_since("test_key", 0) == (0, [])
+
+
+def test_large_patches_become_replacements(state_manager: StateManager):
+    """Tests that a patch larger than the value is logged as a replacement."""
+    state = {"items": [{"id": i} for i in range(20)]}
+    state_manager.set("test_key", state)
+    state["items"] = state["items"][1:] + [{"id": 20}]
+    state_manager.set("test_key", state)
+
+    assert state_manager.get_changes_since("test_key", 1)[1] == [
+        {"op": "replace", "path": "", "value": state}
+    ]
+
+
+def test_no_delta_keys_are_not_diffed():
+    """Tests that no-delta keys are versioned but their deltas replace the value."""
+    manager = StateManager(no_delta_keys={"timeline"})
+    seen = []
+    manager.add_listener(seen.append)
+    state = {"events": [1]}
+    manager.set("timeline", state)
+    state["events"].append(2)
+    manager.set("timeline", state)
+
+    assert manager.get_version("timeline") == 2
+    assert manager.get_changes_since("timeline", 1) == (2, None)
+    assert seen[-1] == {"module": "timeline", "version": 2, "paths": [""]}
+
+
+def test_shared_backend_between_managers(tmp_path):
+    """Tests that managers sharing a SQLite backend see each other's changes."""
+    from app.state_backends import SQLiteStateBackend
+
+    path = tmp_path / "state.db"
+    first = StateManager(backend=SQLiteStateBackend(path))
+    second = StateManager(backend=SQLiteStateBackend(path))
+    assert first.instance_id == second.instance_id
+
+    first.set("memory", {"a": 1})
+    assert second.get("memory") == {"a": 1}
+
+    state = second.get("memory")
+    state["b"] = 2
+    second.set("memory", state)
+    assert first.get_version("memory") == 2
+    assert first.get_full_state() == {"memory": {"a": 1, "b": 2}}
+    # The change came from elsewhere, so older versions get the whole value
+    assert first.get_changes_since("memory", 1)[1] == [
+        {"op": "replace", "path": "", "value": {"a": 1, "b": 2}}
+    ]
+
+
+def test_shared_backend_rejects_stale_writes(tmp_path):
+    """Tests that a set based on a value another manager changed fails."""
+    from app.state_backends import SQLiteStateBackend
+    from app.state_manager import StateConflictError
+
+    path = tmp_path / "state.db"
+    first = StateManager(backend=SQLiteStateBackend(path))
+    second = StateManager(backend=SQLiteStateBackend(path))
+    first.set("timeline", {"events": []})
+
+    state_a = first.get("timeline")
+    state_b = second.get("timeline")
+    state_a["events"].append("from A")
+    first.set("timeline", state_a)
+    state_b["events"].append("from B")
+    with pytest.raises(StateConflictError):
+        second.set("timeline", state_b)
+
+    # The conflict reloads the key, so the next read sees the other change
+    assert second.get("timeline") == {"events": ["from A"]}
+
+
+def test_update_retries_after_a_conflict(tmp_path):
+    """Tests that update() reapplies a change that lost a race."""
+    from app.state_backends import SQLiteStateBackend
+
+    path = tmp_path / "state.db"
+    first = StateManager(backend=SQLiteStateBackend(path))
+    second = StateManager(backend=SQLiteStateBackend(path))
+    first.set("timeline", {"events": []})
+    second.get("timeline")
+
+    def append(label):
+        def change(state):
+            state["events"].append(label)
+            return state
+
+        return change
+
+    first.update("timeline", append("from A"))
+    second.update("timeline", append("from B"))
+
+    assert first.get("timeline") == {"events": ["from A", "from B"]}
+    assert first.get_version("timeline") == 3
+
+
+def test_shared_backend_sync_notifies_listeners(tmp_path):
+    """Tests that sync() reports keys changed by another manager."""
+    from app.state_backends import SQLiteStateBackend
+
+    path = tmp_path / "state.db"
+    first = StateManager(backend=SQLiteStateBackend(path))
+    second = StateManager(backend=SQLiteStateBackend(path))
+    seen = []
+    first.add_listener(seen.append)
+
+    second.set("email", {"inbox": []})
+
+    assert first.sync() == ["email"]
+    assert seen == [{"module": "email", "version": 1, "paths": [""]}]
+    assert first.sync() == []
+
+
+def test_claim_runs_once_per_backend(tmp_path):
+    """Tests that only the first worker claims a one-off task."""
+    from app.state_backends import SQLiteStateBackend
+
+    path = tmp_path / "state.db"
+    assert StateManager(backend=SQLiteStateBackend(path)).claim("content")
+    assert not StateManager(backend=SQLiteStateBackend(path)).claim("content")
+    assert StateManager().claim("content")
@@ -0,0 +1,180 @@
+"""
+Unit tests for the content pack state merge engine.
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from app.state_merger import (
+    DeepMergeStrategy,
+    KeyedCollectionMergeStrategy,
+    MergeStrategy,
+    StateMergeEngine,
+    TreeMergeStrategy,
+    UniqueListMergeStrategy,
+    create_default_merge_engine,
+)
+from app.content_pack_manager import ContentPackManager
+from app.state_manager import StateManager
+
+
+class TestKeyedCollectionMergeStrategy:
+    def test_appends_only_new_ids(self):
+        strategy = KeyedCollectionMergeStrategy(["inbox", "sent"], identity_key="id")
+        existing = {"inbox": [{"id": 1, "subject": "a"}], "sent": []}
+        new = {
+            "inbox": [{"id": 1, "subject": "dup"}, {"id": 2, "subject": "b"}],
+            "sent": [{"subject": "no id"}],
+        }
+
+        merged = strategy.merge(existing, new)
+
+        assert [e["id"] for e in merged["inbox"]] == [1, 2]
+        assert merged["inbox"][0]["subject"] == "a"
+        assert merged["sent"] == [{"subject": "no id"}]
+
+    def test_does_not_mutate_inputs(self):
+        strategy = KeyedCollectionMergeStrategy(["inbox"])
+        existing = {"inbox": [{"id": 1}]}
+        new = {"inbox": [{"id": 2}], "settings": {"theme": "dark"}}
+
+        merged = strategy.merge(existing, new)
+
+        assert existing == {"inbox": [{"id": 1}]}
+        assert merged["settings"] == {"theme": "dark"}
+
+    def test_non_dict_state_uses_new(self):
+        strategy = KeyedCollectionMergeStrategy(["inbox"])
+        assert strategy.merge([1], {"inbox": []}) == {"inbox": []}
+
+
+class TestTreeMergeStrategy:
+    def _dir(self, name, children):
+        return {"type": "directory", "name": name, "children": children}
+
+    def _file(self, name, content=""):
+        return {"type": "file", "name": name, "content": content}
+
+    def test_merges_nested_directories(self):
+        existing = self._dir(
+            "/",
+            [
+                self._dir("docs", [self._file("a.txt", "old")]),
+                self._file("keep.txt", "keep"),
+            ],
+        )
+        new = self._dir(
+            "/",
+            [
+                self._dir("docs", [self._file("a.txt", "new"), self._file("b.txt")]),
+                self._file("extra.txt"),
+            ],
+        )
+
+        merged = TreeMergeStrategy().merge(existing, new)
+
+        names = [child["name"] for child in merged["children"]]
+        assert names == ["docs", "keep.txt", "extra.txt"]
+        docs = merged["children"][0]
+        assert [c["name"] for c in docs["children"]] == ["a.txt", "b.txt"]
+        assert docs["children"][0]["content"] == "new"
+
+    def test_file_replaces_directory(self):
+        existing = self._dir("/", [self._dir("x", [])])
+        new = self._dir("/", [self._file("x", "file now")])
+
+        merged = TreeMergeStrategy().merge(existing, new)
+
+        assert merged["children"] == [self._file("x", "file now")]
+
+    def test_large_directory_merge(self):
+        existing = self._dir("/", [self._file(f"f{i}") for i in range(5000)])
+        new = self._dir("/", [self._file(f"f{i}", "v2") for i in range(2500, 7500)])
+
+        merged = TreeMergeStrategy().merge(existing, new)
+
+        assert len(merged["children"]) == 7500
+        assert merged["children"][2500]["content"] == "v2"
+        assert merged["children"][0]["content"] == ""
+
+
+class TestUniqueListMergeStrategy:
+    def test_unhashable_items_are_deduplicated(self):
+        strategy = UniqueListMergeStrategy(["search_history"])
+        existing = {"search_history": [{"q": "a"}, "plain"]}
+        new = {"search_history": [{"q": "a"}, {"q": "b"}, "plain"], "cache": {}}
+
+        merged = strategy.merge(existing, new)
+
+        assert merged["search_history"] == [{"q": "a"}, "plain", {"q": "b"}]
+        assert merged["cache"] == {}
+
+
+class TestStateMergeEngine:
+    def test_default_strategy_for_unknown_modules(self):
+        engine = StateMergeEngine()
+        assert engine.merge("custom", [1], [2]) == [1, 2]
+        assert engine.merge("custom", {"a": {"b": 1}}, {"a": {"c": 2}}) == {
+            "a": {"b": 1, "c": 2}
+        }
+        assert engine.merge("custom", "old", "new") == "new"
+
+    def test_register_and_unregister(self):
+        engine = StateMergeEngine()
+        engine.register("custom", DeepMergeStrategy())
+        assert engine.has_strategy("custom")
+        assert engine.merge("custom", [1], [2]) == [2]
+
+        engine.unregister("custom")
+        assert not engine.has_strategy("custom")
+
+    def test_default_engine_registers_builtin_modules(self):
+        engine = create_default_merge_engine()
+        for module_name in ["email", "filesystem", "memory", "web_search"]:
+            assert engine.has_strategy(module_name)
+
+
+class TestContentPackManagerMerging:
+    @pytest.fixture
+    def manager(self):
+        module_loader = Mock()
+        module_loader.get_tool.return_value = None
+        return ContentPackManager(StateManager(), module_loader)
+
+    def test_merge_state_content_uses_engine(self, manager):
+        manager.state_manager.set("email", {"inbox": [{"id": 1}], "sent": []})
+
+        manager._merge_state_content(
+            {"email": {"inbox": [{"id": 1}, {"id": 2}]}, "database": {"x": 1}}
+        )
+
+        assert [e["id"] for e in manager.state_manager.get("email")["inbox"]] == [1, 2]
+        assert manager.state_manager.get("database") is None
+
+    def test_registered_strategy_overrides_default(self, manager):
+        manager.register_merge_strategy(
+            "notes", KeyedCollectionMergeStrategy(["items"], identity_key="slug")
+        )
+        manager.state_manager.set("notes", {"items": [{"slug": "a"}]})
+
+        manager._merge_state_content(
+            {"notes": {"items": [{"slug": "a"}, {"slug": "b"}]}}
+        )
+
+        assert manager.state_manager.get("notes") == {
+            "items": [{"slug": "a"}, {"slug": "b"}]
+        }
+
+    def test_tool_declared_strategy_takes_precedence(self, manager):
+        class ReplaceStrategy(MergeStrategy):
+            def merge(self, existing, new):
+                return new
+
+        tool = Mock()
+        tool.merge_strategy = ReplaceStrategy()
+        manager.module_loader.get_tool.return_value = tool
+        manager.state_manager.set("memory", {"a": 1})
+
+        manager._merge_state_content({"memory": {"b": 2}})
+
+        assert manager.state_manager.get("memory") == {"b": 2}
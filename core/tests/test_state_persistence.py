@@ -0,0 +1,173 @@
+"""
+Tests for the module state log and snapshots.
+"""
+
+import copy
+import time
+
+import pytest
+
+from app.state_manager import StateManager
+from app.state_persistence import SNAPSHOT_FILE, StatePersistence
+from app.state_versioning import apply_json_patch, make_json_patch
+
+
+def open_manager(directory, **kwargs):
+    snapshot_every = kwargs.pop("snapshot_every", 1000)
+    interval = kwargs.pop("no_delta_snapshot_interval", 60)
+    return StateManager(
+        persistence=StatePersistence(
+            directory,
+            fsync_policy="always",
+            snapshot_every=snapshot_every,
+            no_delta_snapshot_interval=interval,
+        ),
+        **kwargs,
+    )
+
+
+class TestApplyJsonPatch:
+    @pytest.mark.parametrize(
+        "old,new",
+        [
+            ({"a": [1, 2, 3], "b": {"c": 1}}, {"a": [1], "b": {"d": 2}, "e/f": 3}),
+            ({"items": [{"x": 1}]}, {"items": [{"x": 2}, {"x": 3}]}),
+            ([1, 2], {"replaced": True}),
+        ],
+    )
+    def test_applies_generated_patches(self, old, new):
+        patch = make_json_patch(old, new)
+
+        assert apply_json_patch(copy.deepcopy(old), patch) == new
+
+
+class TestStatePersistence:
+    def test_state_survives_restart(self, tmp_path):
+        manager = open_manager(tmp_path)
+        state = {"inbox": [], "sent_items": []}
+        manager.set("email", state)
+        state["inbox"].append({"subject": "hi"})
+        manager.set("email", state)
+        manager.set("memory", {"k": "v"})
+        manager._persistence.close()
+
+        restarted = open_manager(tmp_path)
+
+        assert restarted.get_full_state() == {
+            "email": {"inbox": [{"subject": "hi"}], "sent_items": []},
+            "memory": {"k": "v"},
+        }
+        assert restarted.get_version("email") == 2
+        # Deltas from before the restart fall back to the whole document
+        assert restarted.get_changes_since("email", 1)[1][0]["path"] == ""
+
+        restarted.set("memory", {"k": "w"})
+        assert restarted.get_version("memory") == 2
+
+    def test_whole_values_are_logged_without_deltas(self, tmp_path):
+        manager = open_manager(tmp_path, change_log_size=0)
+        state = {"count": 1}
+        manager.set("counter", state)
+        state["count"] = 2
+        manager.set("counter", state)
+        manager._persistence.close()
+
+        assert open_manager(tmp_path).get("counter") == {"count": 2}
+
+    def test_no_delta_keys_survive_restart(self, tmp_path):
+        manager = open_manager(tmp_path, snapshot_every=3, no_delta_keys={"timeline"})
+        state = {"events": []}
+        for i in range(5):
+            state["events"].append(i)
+            manager.set("timeline", state)
+            manager.set("memory", {"value": i})
+        manager.close()
+
+        restarted = open_manager(tmp_path, no_delta_keys={"timeline"})
+        assert restarted.get("timeline") == {"events": [0, 1, 2, 3, 4]}
+        assert restarted.get("memory") == {"value": 4}
+        assert restarted.get_changes_since("timeline", 1) == (5, None)
+
+    def test_no_delta_keys_are_not_logged_per_change(self, tmp_path):
+        manager = open_manager(tmp_path, no_delta_keys={"timeline"})
+        state = {"events": []}
+        for i in range(200):
+            state["events"].append({"id": i, "details": "x" * 2000})
+            manager.set("timeline", state)
+        manager._persistence._log.flush()
+
+        log_bytes = sum(path.stat().st_size for path in tmp_path.glob("log-*.bin"))
+        assert log_bytes / 200 < 100
+
+        manager.close()
+        restarted = open_manager(tmp_path, no_delta_keys={"timeline"})
+        assert len(restarted.get("timeline")["events"]) == 200
+
+    def test_no_delta_keys_are_snapshotted_after_a_delay(self, tmp_path):
+        manager = open_manager(
+            tmp_path, no_delta_keys={"timeline"}, no_delta_snapshot_interval=0.01
+        )
+        manager.set("timeline", {"events": [1]})
+
+        deadline = time.monotonic() + 5
+        while not (tmp_path / SNAPSHOT_FILE).exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        manager._persistence.close()
+
+        restarted = open_manager(tmp_path, no_delta_keys={"timeline"})
+        assert restarted.get("timeline") == {"events": [1]}
+
+    def test_snapshot_compacts_log(self, tmp_path):
+        manager = open_manager(tmp_path, snapshot_every=3)
+        for i in range(7):
+            manager.set("memory", {"value": i})
+        manager._persistence.close()
+
+        assert (tmp_path / SNAPSHOT_FILE).exists()
+        assert len(list(tmp_path.glob("log-*.bin"))) == 1
+
+        restarted = open_manager(tmp_path)
+        assert restarted.get("memory") == {"value": 6}
+        # Only the changes after the latest snapshot are replayed
+        assert restarted._persistence._records_since_snapshot < 7
+
+    def test_close_writes_final_snapshot(self, tmp_path):
+        manager = open_manager(tmp_path)
+        manager.set("memory", {"value": 1})
+        manager.close()
+
+        persistence = StatePersistence(tmp_path)
+        recovered = persistence.recover()
+        persistence.close()
+
+        assert recovered.records_replayed == 0
+        assert recovered.state == {"memory": {"value": 1}}
+
+    def test_torn_record_is_truncated(self, tmp_path):
+        manager = open_manager(tmp_path)
+        manager.set("memory", {"value": 1})
+        manager.set("memory", {"value": 2})
+        manager._persistence.close()
+        (segment,) = tmp_path.glob("log-*.bin")
+        size = segment.stat().st_size
+        with open(segment, "r+b") as log:
+            log.truncate(size - 3)
+
+        restarted = open_manager(tmp_path)
+
+        assert restarted.get("memory") == {"value": 1}
+        restarted.set("memory", {"value": 3})
+        restarted._persistence.close()
+        assert open_manager(tmp_path).get("memory") == {"value": 3}
+
+    def test_claims_are_persisted(self, tmp_path):
+        manager = open_manager(tmp_path)
+        assert manager.claim("default_content_pack")
+        assert not manager.claim("default_content_pack")
+        manager._persistence.close()
+
+        assert not open_manager(tmp_path).claim("default_content_pack")
+
+    def test_invalid_fsync_policy(self, tmp_path):
+        with pytest.raises(ValueError):
+            StatePersistence(tmp_path, fsync_policy="sometimes")
@@ -0,0 +1,135 @@
+"""
+Tests for server-side projection of module state.
+"""
+
+import copy
+
+import pytest
+
+from app.state_manager import state_manager
+from app.state_projection import (
+    StatePathError,
+    parse_fields,
+    project_state,
+    resolve_path,
+)
+
+EMAIL_STATE = {
+    "inbox": [
+        {"email_id": i, "subject": f"Subject {i}", "body": "x" * 500}
+        for i in range(5)
+    ],
+    "sent_items": [],
+}
+
+FILESYSTEM_STATE = {
+    "type": "directory",
+    "name": "/",
+    "children": [
+        {"type": "file", "name": "a.txt", "content": "hello world"},
+        {
+            "type": "directory",
+            "name": "docs",
+            "children": [{"type": "file", "name": "b.txt", "content": "abc"}],
+        },
+    ],
+}
+
+
+class TestProjectState:
+    def test_no_arguments_returns_state(self):
+        assert project_state(EMAIL_STATE) is EMAIL_STATE
+
+    def test_path(self):
+        assert resolve_path(EMAIL_STATE, "inbox.1.subject") == "Subject 1"
+        with pytest.raises(StatePathError):
+            resolve_path(EMAIL_STATE, "drafts")
+        with pytest.raises(StatePathError):
+            resolve_path(EMAIL_STATE, "inbox.10")
+
+    def test_paginate_list(self):
+        result = project_state(EMAIL_STATE, path="inbox", limit=2, offset=2)
+
+        assert [e["email_id"] for e in result["items"]] == [2, 3]
+        assert result["total_count"] == 5
+        assert result["has_more"] is True
+
+    def test_paginate_dict_lists(self):
+        result = project_state(EMAIL_STATE, limit=2)
+
+        assert len(result["inbox"]) == 2
+        assert result["_pagination"]["inbox"]["total_count"] == 5
+        assert result["_pagination"]["sent_items"]["total_count"] == 0
+
+    def test_fields(self):
+        result = project_state(
+            EMAIL_STATE, path="inbox", fields=parse_fields("email_id, subject"), limit=1
+        )
+
+        assert result["items"] == [{"email_id": 0, "subject": "Subject 0"}]
+
+    def test_content_elision_recurses(self):
+        result = project_state(FILESYSTEM_STATE, include_content=False)
+
+        first, docs = result["children"]
+        assert first == {"type": "file", "name": "a.txt", "content_size": 11}
+        assert docs["children"][0]["content_size"] == 3
+
+    def test_max_content_length(self):
+        result = project_state(EMAIL_STATE, path="inbox.0", max_content_length=10)
+
+        assert result["body"] == "x" * 10
+        assert result["body_size"] == 500
+        assert result["subject"] == "Subject 0"
+
+    def test_state_is_not_modified(self):
+        original = copy.deepcopy(FILESYSTEM_STATE)
+
+        project_state(FILESYSTEM_STATE, fields=["name"], include_content=False)
+
+        assert FILESYSTEM_STATE == original
+
+
+class TestStateEndpointProjection:
+    @pytest.fixture(autouse=True)
+    def email_state(self):
+        previous = state_manager.get("projection_test")
+        state_manager.set("projection_test", copy.deepcopy(EMAIL_STATE))
+        yield
+        state_manager.set("projection_test", previous)
+
+    def test_full_state_by_default(self, service_client):
+        response = service_client.get("/api/v1/projection_test/state")
+
+        assert response.status_code == 200
+        assert response.json() == EMAIL_STATE
+
+    def test_projection_parameters(self, service_client):
+        response = service_client.get(
+            "/api/v1/projection_test/state",
+            params={
+                "path": "inbox",
+                "fields": "email_id,body",
+                "limit": 2,
+                "include_content": "false",
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "items": [
+                {"email_id": 0, "body_size": 500},
+                {"email_id": 1, "body_size": 500},
+            ],
+            "total_count": 5,
+            "limit": 2,
+            "offset": 0,
+            "has_more": True,
+        }
+
+    def test_unknown_path_is_404(self, service_client):
+        response = service_client.get(
+            "/api/v1/projection_test/state", params={"path": "drafts"}
+        )
+
+        assert response.status_code == 404
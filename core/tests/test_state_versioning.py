@@ -0,0 +1,155 @@
+"""
+Tests for state versions, ETags and JSON patch deltas.
+"""
+
+import copy
+from unittest.mock import Mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api_v2 import create_api_routes_v2
+from app.auth import get_current_user_or_service
+from app.state_manager import state_manager
+from app.state_versioning import etag_matches, make_json_patch, make_state_etag
+
+
+def apply_patch(document, patch):
+    """Minimal RFC 6902 add/remove/replace application for the tests."""
+    document = copy.deepcopy(document)
+    for op in patch:
+        if op["path"] == "":
+            document = copy.deepcopy(op["value"])
+            continue
+        *parents, last = [
+            t.replace("~1", "/").replace("~0", "~") for t in op["path"][1:].split("/")
+        ]
+        target = document
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add":
+                target.insert(index, op["value"])
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = op["value"]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return document
+
+
+class TestJsonPatch:
+    @pytest.mark.parametrize(
+        "old,new",
+        [
+            ({"a": 1}, {"a": 1}),
+            ({"a": 1, "b": 2}, {"a": 3, "c": 4}),
+            ({"a/b": {"~x": 1}}, {"a/b": {"~x": 2}}),
+            ({"l": [1, 2, 3, 4]}, {"l": [1, 5]}),
+            ({"l": [{"n": 1}]}, {"l": [{"n": 2}, {"n": 3}]}),
+            ({"a": [1]}, {"a": {"b": 1}}),
+        ],
+    )
+    def test_patch_round_trips(self, old, new):
+        assert apply_patch(old, make_json_patch(old, new)) == new
+
+    def test_equal_values_produce_no_ops(self):
+        assert make_json_patch({"a": [1, {"b": 2}]}, {"a": [1, {"b": 2}]}) == []
+
+
+class TestEtags:
+    def test_etag_varies_with_version_and_variant(self):
+        etag = make_state_etag("abc", "email", 1)
+
+        assert etag != make_state_etag("abc", "email", 2)
+        assert etag != make_state_etag("abc", "email", 1, "fields=subject")
+        assert etag != make_state_etag("def", "email", 1)
+
+    def test_etag_matching(self):
+        etag = make_state_etag("abc", "email", 1)
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", {etag[2:]}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches('"other"', etag)
+
+
+class TestStateEndpointVersioning:
+    @pytest.fixture(autouse=True)
+    def module_state(self):
+        previous = state_manager.get("versioning_test")
+        state_manager.set("versioning_test", {"items": [1, 2]})
+        yield
+        state_manager.set("versioning_test", previous)
+
+    def test_not_modified(self, service_client):
+        response = service_client.get("/api/v1/versioning_test/state")
+        etag = response.headers["ETag"]
+
+        cached = service_client.get(
+            "/api/v1/versioning_test/state", headers={"If-None-Match": etag}
+        )
+        assert cached.status_code == 304
+
+        state_manager.set("versioning_test", {"items": [1, 2, 3]})
+        changed = service_client.get(
+            "/api/v1/versioning_test/state", headers={"If-None-Match": etag}
+        )
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+
+    def test_projection_has_its_own_etag(self, service_client):
+        full = service_client.get("/api/v1/versioning_test/state")
+        projected = service_client.get(
+            "/api/v1/versioning_test/state", params={"limit": 1}
+        )
+
+        assert full.headers["ETag"] != projected.headers["ETag"]
+
+    def test_since_version_returns_delta(self, service_client):
+        response = service_client.get("/api/v1/versioning_test/state")
+        version = int(response.headers["X-State-Version"])
+        state = response.json()
+
+        state_manager.get("versioning_test")["items"].append(3)
+        state_manager.set("versioning_test", state_manager.get("versioning_test"))
+
+        delta = service_client.get(
+            "/api/v1/versioning_test/state", params={"since_version": version}
+        ).json()
+
+        assert delta["version"] == version + 1
+        assert delta["patch"] == [{"op": "add", "path": "/items/2", "value": 3}]
+        assert apply_patch(state, delta["patch"]) == {"items": [1, 2, 3]}
+
+    def test_since_version_rejects_projection(self, service_client):
+        response = service_client.get(
+            "/api/v1/versioning_test/state",
+            params={"since_version": 0, "path": "items"},
+        )
+
+        assert response.status_code == 400
+
+    def test_v2_not_modified(self):
+        loader = Mock()
+        loader.modules = {"versioning_test": Mock()}
+        app = FastAPI()
+        app.include_router(create_api_routes_v2(loader))
+        app.dependency_overrides[get_current_user_or_service] = lambda: "service"
+        client = TestClient(app)
+
+        response = client.get("/api/v2/versioning_test/state")
+        assert response.status_code == 200
+        assert response.json() == {"items": [1, 2]}
+
+        cached = client.get(
+            "/api/v2/versioning_test/state",
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        assert cached.status_code == 304
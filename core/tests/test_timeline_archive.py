@@ -0,0 +1,168 @@
+"""
+Tests for the on-disk timeline archive.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import Config
+from app.modules.timeline import archive as archive_module
+from app.modules.timeline import tool as timeline
+from app.modules.timeline.archive import TimelineArchive
+from app.modules.timeline.compaction import BlobStore, PayloadCompactor
+from app.state_manager import StateManager
+
+
+def make_event(index, timestamp, event_type="tool_execution"):
+    return {
+        "id": f"event-{index}",
+        "timestamp": timestamp.isoformat(),
+        "event_type": event_type,
+        "title": f"Event {index}",
+        "description": "description",
+        "details": {},
+        "status": "success",
+    }
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return TimelineArchive(str(tmp_path / "archive"))
+
+
+@pytest.fixture
+def start_time():
+    return datetime(2026, 3, 1, 22, 0, tzinfo=timezone.utc)
+
+
+class TestTimelineArchive:
+    def test_query_across_days_newest_first(self, archive, start_time):
+        # 30 minutes apart, crossing midnight
+        events = [make_event(i, start_time + timedelta(minutes=30 * i)) for i in range(10)]
+        archive.append(events)
+
+        results = archive.query(limit=100)
+
+        assert [e["id"] for e in results] == [f"event-{i}" for i in reversed(range(10))]
+        assert archive.stats()["segments"] == 2
+
+    def test_time_range_and_type_filter(self, archive, start_time):
+        events = [
+            make_event(i, start_time + timedelta(minutes=30 * i), "a" if i % 2 else "b")
+            for i in range(10)
+        ]
+        archive.append(events)
+
+        results = archive.query(
+            {"a"},
+            start=start_time + timedelta(hours=1),
+            end=start_time + timedelta(hours=4),
+        )
+
+        assert [e["id"] for e in results] == ["event-7", "event-5", "event-3"]
+
+    def test_limit_keeps_newest_and_excludes_ids(self, archive, start_time):
+        archive.append(make_event(i, start_time + timedelta(minutes=i)) for i in range(20))
+
+        results = archive.query(limit=3, exclude_ids={"event-19"})
+
+        assert [e["id"] for e in results] == ["event-18", "event-17", "event-16"]
+
+    def test_unordered_appends_are_stored_in_time_order(
+        self, archive, start_time, monkeypatch
+    ):
+        monkeypatch.setattr(archive_module, "INDEX_INTERVAL", 1000)
+        day_start = start_time.replace(hour=0)
+        events = [make_event(i, day_start + timedelta(seconds=i)) for i in range(100)]
+        archive.append(reversed(events[50:]))
+        archive.append(reversed(events[:50]))
+
+        results = archive.query(start=day_start + timedelta(seconds=90), limit=5)
+
+        assert [e["id"] for e in results] == [f"event-{i}" for i in range(99, 94, -1)]
+        assert len(archive.query(start=day_start + timedelta(seconds=90))) == 10
+
+    def test_index_seeks_into_segment(self, archive, start_time, monkeypatch):
+        monkeypatch.setattr(archive_module, "INDEX_INTERVAL", 1000)
+        day_start = start_time.replace(hour=0)
+        archive.append(make_event(i, day_start + timedelta(seconds=i)) for i in range(500))
+
+        day = day_start.date()
+        offset = archive._seek_offset(day, day_start + timedelta(seconds=400))
+        assert offset > 0
+        first = next(archive._scan(day, day_start + timedelta(seconds=400)))
+        assert first["timestamp"] <= (day_start + timedelta(seconds=400)).isoformat()
+
+        results = archive.query(start=day_start + timedelta(seconds=400), limit=1000)
+        assert len(results) == 100
+
+    def test_torn_lines_are_skipped(self, archive, start_time):
+        archive.append([make_event(0, start_time)])
+        with open(archive._segment_path(start_time.date()), "a") as segment:
+            segment.write('{"id": "torn"')
+
+        archive.append([make_event(1, start_time + timedelta(minutes=1))])
+
+        assert [e["id"] for e in archive.query()] == ["event-1", "event-0"]
+
+    def test_retention_removes_old_segments(self, tmp_path):
+        archive = TimelineArchive(str(tmp_path), retention_days=7)
+        now = datetime.now(timezone.utc)
+
+        archive.append([make_event(0, now - timedelta(days=30)), make_event(1, now)])
+
+        assert archive.stats()["segments"] == 1
+        assert [e["id"] for e in archive.query()] == ["event-1"]
+
+
+class TestTimelineSpill:
+    @pytest.fixture(autouse=True)
+    def state(self, monkeypatch, archive):
+        manager = StateManager()
+        manager.set("timeline", {"events": []})
+        monkeypatch.setattr(timeline, "state_manager", manager)
+        monkeypatch.setattr(timeline, "_event_sizes", {})
+        monkeypatch.setattr(
+            timeline, "payload_compactor", PayloadCompactor(BlobStore())
+        )
+        monkeypatch.setattr(timeline, "timeline_archive", archive)
+        monkeypatch.setattr(Config, "TIMELINE_MAX_EVENTS", 5)
+        yield manager
+
+    def test_dropped_events_are_archived(self, state, archive):
+        for i in range(12):
+            timeline.add_event("test", f"Event {i}", "description")
+
+        assert len(state.get("timeline")["events"]) == 5
+        assert len(archive.query(limit=100)) == 7
+
+        events = timeline.query_events(limit=100)
+        assert [e["title"] for e in events] == [f"Event {i}" for i in reversed(range(12))]
+
+    def test_endpoint_spans_memory_and_archive(self, service_client, state):
+        for i in range(12):
+            timeline.add_event("even" if i % 2 == 0 else "odd", f"Event {i}", "description")
+
+        response = service_client.get(
+            "/api/v1/timeline/events", params={"event_type": "even,other", "limit": 4}
+        )
+
+        assert response.status_code == 200
+        assert [e["title"] for e in response.json()] == [
+            "Event 10",
+            "Event 8",
+            "Event 6",
+            "Event 4",
+        ]
+
+    def test_endpoint_time_range(self, service_client, state):
+        events = [timeline.add_event("test", f"Event {i}", "description") for i in range(12)]
+
+        response = service_client.get(
+            "/api/v1/timeline/events",
+            params={"start": events[2]["timestamp"], "end": events[4]["timestamp"]},
+        )
+
+        assert response.status_code == 200
+        assert [e["title"] for e in response.json()] == ["Event 4", "Event 3", "Event 2"]
@@ -0,0 +1,136 @@
+"""
+Tests for timeline payload compaction and the timeline byte budget.
+"""
+
+import pytest
+
+from app.config import Config
+from app.modules.timeline import tool as timeline
+from app.modules.timeline.compaction import BlobStore, PayloadCompactor, is_truncated
+from app.state_manager import StateManager
+
+
+@pytest.fixture
+def compactor():
+    return PayloadCompactor(BlobStore(), field_max_bytes=300, preview_chars=10)
+
+
+class TestPayloadCompactor:
+    def test_small_payload_is_unchanged(self, compactor):
+        payload = {"path": "/a.txt", "lines": [1, 2, 3]}
+
+        assert compactor.compact(payload) == payload
+
+    def test_large_string_is_replaced_by_marker(self, compactor):
+        content = "x" * 500
+        payload = {"path": "/big.txt", "content": content}
+
+        compacted = compactor.compact(payload)
+
+        assert compacted["path"] == "/big.txt"
+        marker = compacted["content"]
+        assert is_truncated(marker)
+        assert marker["preview"] == "x" * 10
+        assert marker["length"] == 500
+        assert compactor.blob_store.get(marker["blob_id"]) == content
+        # The original is not modified
+        assert payload["content"] == content
+
+    def test_many_small_items_are_replaced_as_a_whole(self, compactor):
+        rows = [{"id": i} for i in range(100)]
+
+        marker = compactor.compact({"rows": rows})["rows"]
+
+        assert is_truncated(marker)
+        assert marker["type"] == "list"
+        assert marker["length"] == 100
+        assert compactor.blob_store.get(marker["blob_id"]) == rows
+
+    def test_identical_payloads_share_a_blob(self, compactor):
+        first = compactor.compact({"body": "y" * 300})["body"]
+        second = compactor.compact({"other": "y" * 300})["other"]
+
+        assert first["blob_id"] == second["blob_id"]
+        assert len(compactor.blob_store._blobs) == 1
+
+
+class TestBlobStore:
+    def test_memory_store_evicts_least_recently_used(self):
+        store = BlobStore(max_bytes=200)
+        ids = [store.put(f"{i}" * 1000 + "unique" * i) for i in range(20)]
+
+        assert store.size <= 200 or len(store._blobs) == 1
+        assert store.get(ids[-1]) is not None
+        assert store.get(ids[0]) is None
+
+    def test_directory_store(self, tmp_path):
+        store = BlobStore(directory=str(tmp_path))
+        blob_id = store.put({"content": "z" * 1000})
+
+        assert BlobStore(directory=str(tmp_path)).get(blob_id) == {"content": "z" * 1000}
+        assert store.get("../../etc/passwd") is None
+
+
+class TestTimelineBudget:
+    @pytest.fixture(autouse=True)
+    def state(self, monkeypatch):
+        manager = StateManager()
+        manager.set("timeline", {"events": []})
+        monkeypatch.setattr(timeline, "state_manager", manager)
+        monkeypatch.setattr(timeline, "_event_sizes", {})
+        monkeypatch.setattr(
+            timeline,
+            "payload_compactor",
+            PayloadCompactor(BlobStore(), field_max_bytes=1000, preview_chars=20),
+        )
+        yield manager
+
+    def test_events_are_dropped_past_byte_budget(self, state, monkeypatch):
+        monkeypatch.setattr(Config, "TIMELINE_MAX_BYTES", 2000)
+
+        for i in range(50):
+            timeline.add_event("test", f"Event {i}", "description")
+
+        events = state.get("timeline")["events"]
+        assert 5 < len(events) < 50
+        assert events[-1]["title"] == "Event 49"
+        assert sum(timeline._event_size(event) for event in events) <= 2000
+        assert set(timeline._event_sizes) == {event["id"] for event in events}
+
+    def test_websocket_connect_keeps_timeline_order(self, service_client, state, monkeypatch):
+        monkeypatch.setattr(Config, "TIMELINE_MAX_EVENTS", 5)
+        for i in range(5):
+            timeline.add_event("test", f"e{i}", "description")
+
+        with service_client.websocket_connect("/api/v1/timeline/ws") as websocket:
+            assert websocket.receive_json()["type"] == "connection_established"
+            initial = websocket.receive_json()
+        for i in range(5, 8):
+            timeline.add_event("test", f"e{i}", "description")
+
+        assert [e["title"] for e in initial["events"]] == ["e4", "e3", "e2", "e1", "e0"]
+        events = state.get("timeline")["events"]
+        assert [event["title"] for event in events] == ["e3", "e4", "e5", "e6", "e7"]
+
+    def test_tool_execution_payloads_are_compacted(self, state):
+        timeline.log_tool_execution(
+            "filesystem.read_file",
+            {"path": "/big.txt"},
+            {"status": "success", "result": "line\n" * 10000},
+        )
+
+        event = state.get("timeline")["events"][-1]
+        marker = event["details"]["result"]["result"]
+        assert event["details"]["parameters"] == {"path": "/big.txt"}
+        assert is_truncated(marker)
+        assert timeline.TimelineTool(state).get_payload(marker["blob_id"]) == "line\n" * 10000
+
+    def test_blob_endpoint(self, service_client, state):
+        event = timeline.add_event("test", "Big", "description", {"body": "b" * 1000})
+        blob_id = event["details"]["body"]["blob_id"]
+
+        response = service_client.get(f"/api/v1/timeline/blobs/{blob_id}")
+
+        assert response.status_code == 200
+        assert response.json() == {"blob_id": blob_id, "value": "b" * 1000}
+        assert service_client.get("/api/v1/timeline/blobs/unknown").status_code == 404
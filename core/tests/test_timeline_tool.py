@@ -467,6 +467,25 @@ class TestTimelineAPIUnit:
 
             assert len(result) == 2
 
+    async def test_get_timeline_events_queries_off_the_event_loop(self):
+        """Test that archive queries do not block the event loop."""
+        import threading
+        from app.modules.timeline.tool import get_timeline_events
+
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return []
+
+        with patch("app.modules.timeline.tool.query_events", side_effect=record_thread):
+            result = await get_timeline_events(
+                request=Mock(), current_user_or_service="service"
+            )
+
+        assert result == []
+        assert threads and threads[0] is not threading.current_thread()
+
 
 class TestTimelineAPI:
     """Integration tests for timeline API endpoints."""
@@ -0,0 +1,168 @@
+"""
+Tests for refresh token revocation and compaction.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.models import RefreshToken, User
+from app.security import create_refresh_token, decode_refresh_token
+from app.token_revocation import RefreshTokenCompactor, RevocationSet, revocation_set
+from tests.conftest import TEST_USER_DATA
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+@pytest.fixture
+def engine(session):
+    session.exec(RefreshToken.__table__.delete())
+    session.commit()
+    return session.get_bind()
+
+
+@pytest.fixture
+def user_id(session, test_user):
+    return session.exec(
+        select(User.id).where(User.username == TEST_USER_DATA["username"])
+    ).one()
+
+
+def add_token(session, user_id, name, expires_in, revoked=False):
+    session.add(
+        RefreshToken(
+            token=name,
+            user_id=user_id,
+            expires_at=NOW + expires_in,
+            is_revoked=revoked,
+            revoked_at=NOW if revoked else None,
+        )
+    )
+    session.commit()
+
+
+class TestRevocationSet:
+    def test_add_and_prune(self):
+        revocations = RevocationSet()
+        revocations.add("old", NOW - timedelta(minutes=1))
+        revocations.add_many([("new", NOW + timedelta(days=1))])
+
+        assert revocations.is_revoked("old")
+        assert revocations.prune(NOW) == 1
+        assert not revocations.is_revoked("old")
+        assert revocations.is_revoked("new")
+
+    def test_load_only_keeps_unexpired_revoked_tokens(self, engine, session, user_id):
+        future = datetime.utcnow() + timedelta(days=1)
+        add_token(session, user_id, "active", future - NOW)
+        add_token(session, user_id, "revoked", future - NOW, revoked=True)
+        add_token(session, user_id, "stale", timedelta(days=-1), revoked=True)
+
+        revocations = RevocationSet()
+
+        assert revocations.load(engine) == 1
+        assert revocations.is_revoked("revoked")
+        assert not revocations.is_revoked("active")
+        assert revocations.loaded
+
+
+class TestRefreshTokenCompactor:
+    def test_deletes_expired_and_revoked_tokens_in_batches(
+        self, engine, session, user_id
+    ):
+        for i in range(3):
+            add_token(session, user_id, f"expired-{i}", timedelta(days=-1))
+        add_token(session, user_id, "revoked", timedelta(days=1), revoked=True)
+        add_token(session, user_id, "active", timedelta(days=1))
+        revocations = RevocationSet()
+        revocations.add("revoked", NOW - timedelta(seconds=1))
+
+        stats = RefreshTokenCompactor(
+            engine, revocations, batch_size=2, batch_pause=0
+        ).run_once(NOW)
+
+        assert stats == {"deleted": 4, "batches": 2, "pruned": 1}
+        remaining = session.exec(select(RefreshToken.token)).all()
+        assert remaining == ["active"]
+
+    def test_start_and_stop(self, engine):
+        compactor = RefreshTokenCompactor(engine, RevocationSet(), interval=60)
+
+        compactor.start()
+        assert compactor.is_running
+        compactor.stop()
+        assert not compactor.is_running
+
+
+class TestRefreshEndpoint:
+    def login(self, client):
+        response = client.post(
+            "/auth/login",
+            data={
+                "username": TEST_USER_DATA["username"],
+                "password": TEST_USER_DATA["password"],
+            },
+        )
+        assert response.status_code == 200
+        return response.json()["refresh_token"]
+
+    def test_reused_token_is_rejected_from_memory(self, client, test_user):
+        refresh_token = self.login(client)
+
+        first = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+        assert first.status_code == 200
+
+        _, token_id = decode_refresh_token(refresh_token)
+        assert revocation_set.is_revoked(token_id)
+
+        second = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+        assert second.status_code == 401
+
+    def test_compacted_token_is_rejected(self, client, test_user, engine):
+        refresh_token = self.login(client)
+        with Session(engine) as session:
+            session.exec(RefreshToken.__table__.delete())
+            session.commit()
+
+        response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+        assert response.status_code == 401
+
+    def test_refresh_does_not_read_the_user(self, client, test_user, engine):
+        refresh_token = self.login(client)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert statements
+        assert not [s for s in statements if "FROM user " in s or "FROM user\n" in s]
+
+    def test_tokens_without_a_user_id_still_refresh(
+        self, client, test_user, engine, user_id
+    ):
+        refresh_token, token_id, expires_at = create_refresh_token(
+            data={"sub": TEST_USER_DATA["username"]}
+        )
+        with Session(engine) as session:
+            session.add(
+                RefreshToken(
+                    token=token_id,
+                    user_id=user_id,
+                    expires_at=expires_at.replace(tzinfo=None),
+                )
+            )
+            session.commit()
+
+        response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+        assert response.status_code == 200
@@ -8,6 +8,7 @@ from unittest.mock import Mock, MagicMock
 from app.variable_resolver import (
     VariableResolver,
     VariableToken,
+    CompiledTemplate,
     VariableParseError,
     VariableResolutionError,
     create_variable_resolver,
@@ -389,6 +390,85 @@ class TestVariableResolver:
         assert result["unused_variables"] == ["unused_var"]
 
 
+class TestCompiledTemplates:
+    """Tests for compiled templates and per-pack context resolution."""
+
+    def test_compile_template_segments(self):
+        """Test that templates alternate literal and variable segments."""
+        resolver = VariableResolver()
+
+        template = resolver.compile_template("Hi {{name}}, from {{company}}")
+
+        assert template.parts == ("Hi ", "name", ", from ", "company", "")
+        assert template.variables == ("name", "company")
+        assert not template.is_static
+
+    def test_compile_template_without_tokens_is_static(self):
+        """Test that strings without '{{' short-circuit to static templates."""
+        resolver = VariableResolver()
+
+        template = resolver.compile_template("plain text", "pack")
+
+        assert template.is_static
+        assert template.render({}) == "plain text"
+        assert "pack" not in resolver._template_cache
+
+    def test_compile_template_cached_per_pack(self):
+        """Test that compiled templates are cached and cleared per pack."""
+        resolver = VariableResolver()
+
+        first = resolver.compile_template("{{a}}-{{b}}", "pack_one")
+        second = resolver.compile_template("{{a}}-{{b}}", "pack_one")
+        assert first is second
+
+        resolver.compile_template("{{a}}", "pack_two")
+        resolver.clear_template_cache("pack_one")
+        assert "pack_one" not in resolver._template_cache
+        assert "pack_two" in resolver._template_cache
+
+    def test_render_strict_and_non_strict(self):
+        """Test rendering with missing values in both modes."""
+        template = CompiledTemplate(("x=", "x", ", y=", "y", ""))
+        missing = set()
+
+        assert template.render({"x": "1"}, strict=False, missing=missing) == "x=1, y={{y}}"
+        assert missing == {"y"}
+        with pytest.raises(VariableResolutionError):
+            template.render({"x": "1"}, strict=True)
+
+    def test_build_variable_context_uses_bulk_overrides(self):
+        """Test that user overrides are loaded once per (pack, user)."""
+        mock_manager = Mock(spec=ContentPackVariableManager)
+        mock_manager.get_pack_variables.return_value = {"domain": "custom.com"}
+        resolver = VariableResolver(mock_manager)
+
+        context = resolver.build_variable_context(
+            {"domain": "example.com", "company": "ACME", "port": 8080}, "pack", 7
+        )
+
+        assert context == {"domain": "custom.com", "company": "ACME", "port": "8080"}
+        mock_manager.get_pack_variables.assert_called_once_with("pack", 7)
+
+    def test_resolve_data_structure_single_override_lookup(self):
+        """Test that resolving a whole pack never does per-variable lookups."""
+        mock_manager = Mock(spec=ContentPackVariableManager)
+        mock_manager.get_pack_variables.return_value = {"domain": "custom.com"}
+        resolver = VariableResolver(mock_manager)
+        data = {
+            "emails": [{"from": f"user{i}@{{{{domain}}}}"} for i in range(50)],
+            "title": "{{company}}",
+        }
+
+        result = resolver.resolve_data_structure(
+            data, {"domain": "example.com", "company": "ACME"}, "pack", user_id=1
+        )
+
+        assert result["emails"][49]["from"] == "user49@custom.com"
+        assert result["title"] == "ACME"
+        mock_manager.get_pack_variables.assert_called_once_with("pack", 1)
+        mock_manager.get_variable_value.assert_not_called()
+
+
 class TestFactoryAndStandaloneFunctions:
     """Tests for factory and standalone functions."""
 
@@ -0,0 +1,264 @@
+"""
+Tests for WebSocket channels and state change notifications.
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi import status
+from starlette.websockets import WebSocketDisconnect
+
+from app import database_compat
+from app.main import module_loader
+from app.state_manager import StateManager, state_manager
+from app.websocket_manager import ConnectionManager, StateChangeNotifier
+from app.websocket_manager import manager as websocket_manager
+from tests.conftest import get_auth_headers, get_session_override
+
+
+class RecordingConnectionManager(ConnectionManager):
+    def __init__(self, channels):
+        super().__init__()
+        self.active_connections = {channel: set() for channel in channels}
+        self.sent = []
+
+    async def broadcast(self, message, channel="default"):
+        self.sent.append((channel, message))
+
+
+class FakeWebSocket:
+    """Records sent payloads; sends block while ``gate`` is cleared."""
+
+    def __init__(self):
+        self.client = None
+        self.sent = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def send_text(self, payload):
+        await self.gate.wait()
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestBroadcast:
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_block_others(self):
+        manager = ConnectionManager(queue_size=10)
+        slow, fast = FakeWebSocket(), FakeWebSocket()
+        slow.gate.clear()
+        await manager.connect(slow, "timeline")
+        await manager.connect(fast, "timeline")
+
+        for n in range(2):
+            await manager.broadcast({"n": n}, "timeline")
+            await drain()
+
+        assert fast.sent[1:] == [{"n": 0}, {"n": 1}]
+        assert len(slow.sent) == 1  # only the welcome message
+        # The slow writer holds the first message; the second is queued
+        assert manager.get_stats()["channels"]["timeline"]["queued"] == 1
+
+        slow.gate.set()
+        await drain()
+        assert slow.sent[1:] == [{"n": 0}, {"n": 1}]
+        assert manager.get_stats()["channels"]["timeline"]["sent"] == 4
+
+    @pytest.mark.asyncio
+    async def test_message_is_serialized_once(self, monkeypatch):
+        manager = ConnectionManager()
+        for _ in range(3):
+            await manager.connect(FakeWebSocket(), "timeline")
+        calls = []
+        original = ConnectionManager.serialize
+        monkeypatch.setattr(
+            ConnectionManager,
+            "serialize",
+            staticmethod(lambda message: calls.append(message) or original(message)),
+        )
+
+        await manager.broadcast({"n": 1}, "timeline")
+
+        assert calls == [{"n": 1}]
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_policy(self):
+        manager = ConnectionManager(queue_size=2, slow_consumer_policy="drop_oldest")
+        websocket = FakeWebSocket()
+        websocket.gate.clear()
+        await manager.connect(websocket, "timeline")
+
+        for n in range(5):
+            await manager.broadcast({"n": n}, "timeline")
+        websocket.gate.set()
+        await drain()
+
+        assert [m["n"] for m in websocket.sent[1:]] == [3, 4]
+        assert manager.get_stats()["channels"]["timeline"]["dropped"] == 3
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy(self):
+        manager = ConnectionManager(queue_size=1, slow_consumer_policy="disconnect")
+        websocket = FakeWebSocket()
+        websocket.gate.clear()
+        await manager.connect(websocket, "timeline")
+
+        for n in range(4):
+            await manager.broadcast({"n": n}, "timeline")
+        await drain()
+
+        assert websocket.closed_with == 1013
+        assert manager.get_total_connections() == 0
+        assert manager.get_stats()["channels"]["timeline"]["disconnected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_publish_from_another_thread(self):
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "timeline")
+
+        thread = threading.Thread(
+            target=manager.publish, args=({"n": 1}, "timeline")
+        )
+        thread.start()
+        thread.join()
+        await drain()
+
+        assert websocket.sent[-1] == {"n": 1}
+
+    def test_publish_without_clients_is_a_no_op(self):
+        ConnectionManager().publish({"n": 1}, "timeline")
+
+    def test_stats_endpoint(self, client):
+        response = client.get("/api/v2/health/websockets")
+
+        assert response.status_code == 200
+        assert "channels" in response.json()
+
+
+class TestStateChangeNotifier:
+    @pytest.mark.asyncio
+    async def test_changes_are_coalesced_per_window(self):
+        manager = StateManager()
+        connections = RecordingConnectionManager(["state:email"])
+        notifier = StateChangeNotifier(connections, window=0.05)
+        notifier.start(manager)
+        try:
+            state = {"inbox": [], "sent_items": []}
+            manager.set("email", state)
+            state["inbox"].append({"subject": "hi"})
+            manager.set("email", state)
+            state["sent_items"].append({"subject": "re: hi"})
+            manager.set("email", state)
+            # Nobody subscribed to this module
+            manager.set("filesystem", {"name": "/"})
+
+            await asyncio.sleep(0.15)
+        finally:
+            notifier.stop()
+
+        assert connections.sent == [
+            (
+                "state:email",
+                {
+                    "type": "state_changed",
+                    "module": "email",
+                    "version": 3,
+                    "paths": [""],
+                    "changes": 3,
+                },
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_paths_are_reported(self):
+        manager = StateManager()
+        manager.set("email", {"inbox": [], "sent_items": []})
+        connections = RecordingConnectionManager(["state:email"])
+        notifier = StateChangeNotifier(connections, window=0.01)
+        notifier.start(manager)
+        try:
+            manager.set("email", {"inbox": [{"subject": "hi"}], "sent_items": []})
+            await asyncio.sleep(0.05)
+        finally:
+            notifier.stop()
+
+        (_, message), = connections.sent
+        assert message["version"] == 2
+        assert message["paths"] == ["/inbox/0"]
+
+    def test_unchanged_set_keeps_version(self):
+        manager = StateManager()
+        seen = []
+        manager.add_listener(seen.append)
+
+        manager.set("memory", {"a": 1})
+        manager.set("memory", {"a": 1})
+
+        assert manager.get_version("memory") == 1
+        assert len(seen) == 1
+
+
+class TestStateWebSocket:
+    @pytest.fixture
+    def token(self, client, test_user, monkeypatch):
+        # WebSocket authentication opens its own session, outside the
+        # dependency overrides
+        monkeypatch.setattr(database_compat, "get_session", get_session_override)
+        monkeypatch.setitem(module_loader.modules, "ws_test", object())
+        return get_auth_headers()["Authorization"].split()[1]
+
+    def test_state_changes_are_pushed(self, client, token):
+        with client.websocket_connect(
+            f"/api/v1/state/ws?modules=ws_test&token={token}"
+        ) as websocket:
+            assert websocket.receive_json()["type"] == "connection_established"
+            versions = websocket.receive_json()
+            assert versions["type"] == "state_versions"
+            start = versions["versions"]["ws_test"]
+
+            state_manager.set("ws_test", {"count": start + 1})
+            message = websocket.receive_json()
+
+        assert message["type"] == "state_changed"
+        assert message["module"] == "ws_test"
+        assert message["version"] == start + 1
+
+    def test_connections_without_a_token_are_rejected(self, client):
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            with client.websocket_connect("/api/v1/state/ws?modules=ws_test"):
+                pass
+
+        assert excinfo.value.code == status.WS_1008_POLICY_VIOLATION
+
+    def test_unknown_modules_are_ignored(self, client, token):
+        with client.websocket_connect(
+            f"/api/v1/state/ws?modules=ws_test,no_such_module&token={token}"
+        ) as websocket:
+            assert websocket.receive_json()["type"] == "connection_established"
+            versions = websocket.receive_json()
+            websocket.send_text(json.dumps({"subscribe": ["also_missing"]}))
+            websocket.send_text("ping")
+            assert websocket.receive_text() == "pong"
+
+            channels = set(websocket_manager.get_stats()["channels"])
+
+        assert list(versions["versions"]) == ["ws_test"]
+        assert StateChangeNotifier.channel_for("no_such_module") not in channels
+        assert StateChangeNotifier.channel_for("also_missing") not in channels
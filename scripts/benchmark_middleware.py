@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark request throughput of the middleware stack on /api/v1/execute.
+
+Runs the same tool call through the application twice:
+1. "legacy": the previous stack of five BaseHTTPMiddleware classes
+2. "fused": the single pure ASGI RequestPipelineMiddleware
+
+Requests are sent in-process through httpx's ASGI transport against a
+throwaway SQLite database, so the numbers reflect application overhead
+rather than network latency. Rate limiting is disabled for the run.
+
+Usage:
+    python scripts/benchmark_middleware.py [--requests N] [--concurrency C]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parent.parent / "core"
+sys.path.insert(0, str(CORE_DIR))
+
+SERVICE_KEY = "benchmark-service-key"
+
+
+def configure_environment(db_dir):
+    os.environ["SERVICE_API_KEY"] = SERVICE_KEY
+    os.environ["INTENTVERSE_DB_TYPE"] = "sqlite"
+    os.environ["INTENTVERSE_DB_URL"] = f"sqlite:///{Path(db_dir) / 'benchmark.db'}"
+    os.environ.setdefault("INTENTVERSE_ENVIRONMENT", "testing")
+
+
+def legacy_middleware(environment):
+    from starlette.middleware import Middleware
+    from app.middleware import (
+        AuthenticationMiddleware,
+        RateLimitHeaderMiddleware,
+        RequestLoggingMiddleware,
+    )
+    from app.version_manager import VersionMiddleware
+    from app.security_headers import create_security_headers_middleware
+
+    # Outermost first, matching the previous add_middleware() order
+    return [
+        Middleware(create_security_headers_middleware(environment)),
+        Middleware(VersionMiddleware),
+        Middleware(RequestLoggingMiddleware),
+        Middleware(RateLimitHeaderMiddleware),
+        Middleware(AuthenticationMiddleware),
+    ]
+
+
+async def run_requests(app, total, concurrency):
+    import httpx
+
+    payload = {"tool_name": "memory.get_memory", "parameters": {"key": "k"}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://benchmark",
+        headers={"X-API-Key": SERVICE_KEY},
+    ) as client:
+        response = await client.post("/api/v1/execute", json=payload)
+        response.raise_for_status()
+
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await client.post("/api/v1/execute", json=payload)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        configure_environment(db_dir)
+
+        import logging
+        from app.main import app, module_loader
+        from app.database_compat import create_db_and_tables, get_session
+        from app.init_db import init_db
+        from app.rate_limiter import limiter
+
+        logging.disable(logging.INFO)
+        create_db_and_tables()
+        init_db()
+        for session in get_session():
+            module_loader.load_modules(session)
+            break
+        limiter.enabled = False
+
+        fused = list(app.user_middleware)
+        variants = {
+            "legacy": legacy_middleware(os.environ["INTENTVERSE_ENVIRONMENT"]),
+            "fused": fused,
+        }
+
+        results = {}
+        for name, middleware in variants.items():
+            app.user_middleware = middleware
+            app.middleware_stack = None
+            results[name] = asyncio.run(
+                run_requests(app, args.requests, args.concurrency)
+            )
+            print(f"{name:<8}{results[name]:>10.1f} req/s")
+
+        app.user_middleware = fused
+        app.middleware_stack = None
+        print(f"speedup {results['fused'] / results['legacy']:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark startup cost of the sandbox modules.
+
+For every sandbox module this measures:
+1. Construction time (mock data is lazy, so this should be near zero)
+2. First tool call with a cold disk cache (seeded generation + cache write)
+3. First tool call with a warm disk cache (what a restart pays)
+4. Eager generation via initialize_mock_data(), the previous startup cost
+
+Usage:
+    python scripts/benchmark_module_startup.py [--repeat N] [--seed SEED]
+"""
+
+import argparse
+import importlib
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parent.parent / "core"
+sys.path.insert(0, str(CORE_DIR))
+
+SANDBOX_MODULES = [
+    "active_directory",
+    "azure_entra_id",
+    "certificate_authority",
+    "dhcp_services",
+    "dns_management",
+    "firewall_management",
+    "load_balancer",
+]
+
+
+def load_tool_class(module_name):
+    """Import a sandbox module and return its SandboxModule subclass."""
+    tool_module = importlib.import_module(f"app.modules.{module_name}.tool")
+    for obj in vars(tool_module).values():
+        if (
+            isinstance(obj, type)
+            and obj.__module__ == tool_module.__name__
+            and hasattr(obj, "initialize_mock_data")
+        ):
+            return obj
+    raise ImportError(f"No SandboxModule subclass found in {module_name}")
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark_module(tool_class, cache_dir, seed, repeat):
+    construct, cold, warm, eager = [], [], [], []
+
+    for i in range(repeat):
+        run_dir = Path(cache_dir) / f"run_{i}"
+
+        tool = None
+
+        def construct_tool():
+            nonlocal tool
+            tool = tool_class()
+            tool.mock_data_seed = seed
+            tool.mock_data_cache_dir = run_dir
+
+        construct.append(timed(construct_tool))
+        cold.append(timed(tool.ensure_mock_data))
+
+        restarted = tool_class()
+        restarted.mock_data_seed = seed
+        restarted.mock_data_cache_dir = run_dir
+        warm.append(timed(restarted.ensure_mock_data))
+
+        eager.append(timed(tool_class().initialize_mock_data))
+
+    return {
+        "construct": statistics.median(construct),
+        "cold": statistics.median(cold),
+        "warm": statistics.median(warm),
+        "eager": statistics.median(eager),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args()
+
+    print(
+        f"{'module':<24}{'construct ms':>14}{'cold ms':>10}"
+        f"{'warm ms':>10}{'eager ms':>10}"
+    )
+    totals = {"construct": 0.0, "cold": 0.0, "warm": 0.0, "eager": 0.0}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for module_name in SANDBOX_MODULES:
+            try:
+                tool_class = load_tool_class(module_name)
+            except ImportError as e:
+                print(f"{module_name:<24}skipped ({e})")
+                continue
+
+            result = benchmark_module(
+                tool_class, Path(cache_dir) / module_name, args.seed, args.repeat
+            )
+            for key in totals:
+                totals[key] += result[key]
+            print(
+                f"{module_name:<24}{result['construct']:>14.3f}{result['cold']:>10.2f}"
+                f"{result['warm']:>10.2f}{result['eager']:>10.2f}"
+            )
+
+    print(
+        f"{'total':<24}{totals['construct']:>14.3f}{totals['cold']:>10.2f}"
+        f"{totals['warm']:>10.2f}{totals['eager']:>10.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/v1/execute throughput against the number of uvicorn workers.
+
+For each worker count the core is started with ``uvicorn --workers N`` in
+multi-worker mode: module state in the shared SQLite backend, JWT keys in
+a shared key ring file and execute budgets in shared memory, all in a
+throwaway directory. Before measuring, the run checks that a memory written
+through one request is read back by every following request, whichever
+worker serves it, and that an access token issued by one worker is
+accepted by the others.
+
+Load comes from several client processes so that the client is not the
+bottleneck. Rate limiting is raised out of the way for the run. Scaling is
+only linear up to the number of CPU cores available.
+
+Usage:
+    python scripts/benchmark_workers.py [--workers 1,2,4] [--duration S]
+        [--clients C] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parent.parent / "core"
+sys.path.insert(0, str(CORE_DIR))
+
+SERVICE_KEY = "benchmark-service-key"
+EXECUTE_PAYLOAD = {"tool_name": "memory.get_memory", "parameters": {"key": "k"}}
+
+
+def configure_environment(work_dir):
+    work_dir = Path(work_dir)
+    os.environ["SERVICE_API_KEY"] = SERVICE_KEY
+    os.environ["INTENTVERSE_DB_TYPE"] = "sqlite"
+    os.environ["INTENTVERSE_DB_URL"] = f"sqlite:///{work_dir / 'benchmark.db'}"
+    os.environ["INTENTVERSE_STATE_BACKEND"] = "sqlite"
+    os.environ["INTENTVERSE_STATE_BACKEND_PATH"] = str(work_dir / "state.db")
+    os.environ["INTENTVERSE_KEY_RING_FILE"] = str(work_dir / "jwt-keys.json")
+    os.environ["INTENTVERSE_RATE_LIMIT_STORAGE"] = "shared_memory"
+    os.environ["INTENTVERSE_RATE_LIMIT_STORAGE_PATH"] = str(work_dir / "rate-limits")
+    os.environ["INTENTVERSE_EXECUTE_RATE_LIMIT"] = "1000000/minute"
+    os.environ.setdefault("INTENTVERSE_ENVIRONMENT", "testing")
+
+
+def initialize_database():
+    # Done once up front, so that workers starting together do not race to
+    # create the schema and the admin user
+    import logging
+    from app.database_compat import create_db_and_tables
+    from app.init_db import init_db
+
+    logging.disable(logging.INFO)
+    create_db_and_tables()
+    init_db()
+    logging.disable(logging.NOTSET)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port):
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=CORE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    import httpx
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            # Every worker has to be up, so wait for a few good responses
+            if all(
+                httpx.post(
+                    f"http://127.0.0.1:{port}/api/v1/execute",
+                    json=EXECUTE_PAYLOAD,
+                    headers={"X-API-Key": SERVICE_KEY},
+                ).status_code == 200
+                for _ in range(workers * 4)
+            ):
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+def check_consistency(base_url, workers):
+    import httpx
+
+    from app.security import create_access_token
+
+    headers = {"X-API-Key": SERVICE_KEY}
+    with httpx.Client(base_url=base_url, headers=headers) as client:
+        value = f"written-{time.time()}"
+        client.post(
+            "/api/v1/execute",
+            json={
+                "tool_name": "memory.set_memory",
+                "parameters": {"key": "consistency", "value": value},
+            },
+        ).raise_for_status()
+        for _ in range(workers * 10):
+            result = client.post(
+                "/api/v1/execute",
+                json={"tool_name": "memory.get_memory", "parameters": {"key": "consistency"}},
+            ).json()["result"]
+            if result != value:
+                raise RuntimeError(f"A worker served stale state: {result!r}")
+
+    # Signed with the shared key ring from this process, like another worker
+    token = create_access_token({"sub": "admin"})
+    with httpx.Client(
+        base_url=base_url, headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        for _ in range(workers * 10):
+            client.get("/users/me").raise_for_status()
+
+
+def client_process(base_url, duration, concurrency, results):
+    import httpx
+
+    async def run():
+        count = 0
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(
+            base_url=base_url, headers={"X-API-Key": SERVICE_KEY}, limits=limits
+        ) as client:
+            deadline = time.monotonic() + duration
+
+            async def worker():
+                nonlocal count
+                while time.monotonic() < deadline:
+                    response = await client.post("/api/v1/execute", json=EXECUTE_PAYLOAD)
+                    if response.status_code == 200:
+                        count += 1
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return count
+
+    results.put(asyncio.run(run()))
+
+
+def measure(base_url, duration, clients, concurrency):
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=client_process, args=(base_url, duration, concurrency, results)
+        )
+        for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    worker_counts = [int(count) for count in args.workers.split(",")]
+
+    print(f"CPU cores available: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        initialize_database()
+
+        baseline = None
+        for workers in worker_counts:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            server = start_server(workers, port)
+            try:
+                check_consistency(base_url, workers)
+                rate = measure(base_url, args.duration, args.clients, args.concurrency)
+            finally:
+                server.terminate()
+                server.wait()
+
+            baseline = baseline or rate / workers
+            print(
+                f"workers={workers:<3}{rate:>10.1f} req/s"
+                f"   scaling {rate / baseline:>5.2f} (ideal {workers})"
+            )
+
+
+if __name__ == "__main__":
+    main()